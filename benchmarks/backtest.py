@@ -0,0 +1,154 @@
+"""
+Backtest benchmark
+
+Writes a synthetic capture log (random-walk underlyings with a daily chain
+per weekly expiration, quotes, VIX and closing bars, in the format of the
+market data service's MARKET_DATA_CAPTURE_PATH), imports it into a snapshot
+store and backtests a parameter grid over it, building the candidate cache.
+A second, weight sweep (scoring weights x the same filters) then re-ranks
+the cached candidates and finds the Pareto front. Prints one JSON object.
+
+Usage (from the repository root, with the scanner's dependencies installed):
+    python benchmarks/backtest.py --days 250 --symbols 8 --workers 4
+"""
+
+import argparse
+import gzip
+import json
+import math
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'opportunity-scanner'))
+
+from fake_tradestation import _option_price, spot_price, strike_step  # noqa: E402
+from src.backtest import Backtester, Optimizer, SnapshotStore, import_captures, param_grid  # noqa: E402
+
+MARKET_TZ = ZoneInfo('America/New_York')
+
+
+def _record(t: float, path: str, query: str, body) -> dict:
+    return {'t': round(t, 3), 'method': 'GET', 'path': f"/v3/marketdata/{path}", 'query': query,
+            'status': 200, 'elapsed': 0.05, 'headers': {}, 'body': json.dumps(body, separators=(',', ':'))}
+
+
+def write_capture(path: Path, days: int, symbols: int, expirations: int, strikes: int, seed: int) -> int:
+    """Synthetic capture of `days` trading days ending today; returns the record count"""
+    rng = random.Random(seed)
+    names = ['SPY'] + [f"SYM{i}" for i in range(symbols - 1)]
+    prices = {name: spot_price(name, seed) for name in names}
+    trading_days = []
+    day = date.today()
+    while len(trading_days) < days:
+        if day.weekday() < 5:
+            trading_days.append(day)
+        day -= timedelta(days=1)
+    trading_days.reverse()
+    
+    records = 0
+    vol = 0.012
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        def write(record):
+            nonlocal records
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            records += 1
+        
+        for day in trading_days:
+            # Volatility wanders, so the days span several regimes
+            vol = min(0.04, max(0.005, vol * math.exp(rng.gauss(0, 0.15))))
+            entry = datetime.combine(day, datetime.min.time(), MARKET_TZ).replace(hour=10, minute=30).timestamp()
+            quotes = [{'Symbol': name, 'Last': str(round(price, 2))} for name, price in prices.items()]
+            quotes.append({'Symbol': 'VIX', 'Last': str(round(vol * math.sqrt(252) * 100, 2))})
+            write(_record(entry, f"quotes/{','.join(names)},VIX", '', {'Quotes': quotes}))
+            
+            first = day + timedelta(days=(4 - day.weekday()) % 7 or 7)
+            for name, spot in prices.items():
+                step = strike_step(spot)
+                center = round(spot / step) * step
+                for week in range(expirations):
+                    exp = first + timedelta(weeks=week)
+                    dte = (exp - day).days
+                    rows = []
+                    for i in range(-strikes, strikes + 1):
+                        strike = center + step * i
+                        if strike <= 0:
+                            continue
+                        for option_type in ('C', 'P'):
+                            mid = _option_price(option_type, spot, strike, dte) * vol / 0.012
+                            spread = max(0.01, round(mid * 0.04, 2))
+                            bid = max(0.0, round(mid - spread / 2, 2))
+                            rows.append({'OptionType': option_type, 'Strike': strike, 'Bid': bid,
+                                         'Ask': round(bid + spread, 2)})
+                    write(_record(entry + 1, f"options/chains/{name}", f"expiration={exp.isoformat()}",
+                                  {'Underlying': name, 'Expiration': exp.isoformat(), 'OptionQuotes': rows}))
+            
+            # The day's move, then closing bars captured after the close
+            close_time = datetime.combine(day, datetime.min.time(), MARKET_TZ).replace(hour=16, minute=5).timestamp()
+            for name in prices:
+                prices[name] *= math.exp(rng.gauss(0.0003, vol))
+                bar = {'TimeStamp': f"{day.isoformat()}T20:00:00Z", 'Close': str(round(prices[name], 2))}
+                write(_record(close_time, f"barcharts/{name}", 'barsback=1&interval=1&unit=Daily', {'Bars': [bar]}))
+    return records
+
+
+def run(days: int, symbols: int, expirations: int, strikes: int, workers: int, seed: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        capture = Path(directory) / 'capture.jsonl.gz'
+        records = write_capture(capture, days, symbols, expirations, strikes, seed)
+        
+        store = SnapshotStore(str(Path(directory) / 'snapshots'))
+        import_start = time.perf_counter()
+        imported = import_captures([str(capture)], store)
+        import_seconds = time.perf_counter() - import_start
+        
+        filters = dict(spread_width=(1.0, 2.5, 5.0, 10.0), min_dte=(0, 7, 14, 21, 28),
+                       max_dte=(14, 21, 30, 45, 60), min_credit=(0.05, 0.1, 0.25, 0.5, 1.0),
+                       top_n=(1, 3, 5, 10), max_expirations=(1, 3))
+        params = param_grid(**filters)
+        backtester = Backtester(store, workers)
+        report = backtester.run(params)
+        best = report.ranked('total_pnl', limit=1)
+        
+        sweep = param_grid(**filters, probability_weight=(1.0, 5.0), risk_reward_weight=(2.0, 8.0))
+        sweep_report, front = Optimizer(backtester).run(sweep)
+    
+    return {
+        'days': days,
+        'symbols': symbols,
+        'capture_records': records,
+        'chains': imported['chains'],
+        'import_seconds': round(import_seconds, 2),
+        'parameter_sets': len(params),
+        'workers': workers,
+        'candidates': report.accumulator.candidates,
+        'backtest_seconds': round(report.seconds, 2),
+        'parameter_set_days_per_second': round(len(params) * days / report.seconds, 1),
+        'best': best[0] if best else None,
+        'sweep_parameter_sets': len(sweep),
+        'sweep_cached_candidate_sets': sweep_report.accumulator.cache_hits,
+        'sweep_seconds': round(sweep_report.seconds, 2),
+        'sweep_parameter_set_days_per_second': round(len(sweep) * days / sweep_report.seconds, 1),
+        'pareto_front': len(front),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=250)
+    parser.add_argument('--symbols', type=int, default=8)
+    parser.add_argument('--expirations', type=int, default=8)
+    parser.add_argument('--strikes', type=int, default=30, help='Strikes per side of spot')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    print(json.dumps(run(args.days, args.symbols, args.expirations, args.strikes, args.workers, args.seed)))
+
+
+if __name__ == '__main__':
+    main()
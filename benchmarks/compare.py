@@ -0,0 +1,83 @@
+"""
+Compare two benchmark result files
+
+Prints every numeric metric that changed and flags regressions beyond a
+threshold. Throughput metrics (rps, per_second) regress when they drop;
+everything else (latencies, CPU time) regresses when it grows. Exits 1 if
+any regression was found, so it can gate a CI job.
+
+Usage:
+    python benchmarks/compare.py base.json new.json [--threshold 0.10] [--filter latency]
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Iterator, Tuple
+
+# Metrics that describe the workload rather than performance
+IGNORED = ('count', 'lines', 'rounds', 'symbols', 'repeat', 'chains', 'rows', 'spreads_found',
+           'opportunities', 'x_cache', 'errors', 'requests', 'by_family', 'clients', 'events',
+           'ws_messages', 'ws_connections', 'ws_open', 'streams')
+HIGHER_IS_BETTER = ('rps', 'per_second', 'per_cpu_second')
+
+
+def flatten(data, prefix: str = '') -> Iterator[Tuple[str, float]]:
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key in IGNORED:
+                continue
+            yield from flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        yield prefix, float(data)
+
+
+def compare(base: Dict, new: Dict, threshold: float, name_filter: str = '') -> int:
+    base_metrics = dict(flatten(base['results']))
+    new_metrics = dict(flatten(new['results']))
+
+    print(f"base: {base['meta']['git']['commit'][:10]} {base['meta']['git']['subject']}")
+    print(f"new:  {new['meta']['git']['commit'][:10]} {new['meta']['git']['subject']}")
+    print(f"{'metric':<70} {'base':>12} {'new':>12} {'change':>9}")
+
+    regressions = 0
+    for name in sorted(base_metrics.keys() & new_metrics.keys()):
+        if name_filter and name_filter not in name:
+            continue
+        old, current = base_metrics[name], new_metrics[name]
+        if old == current:
+            continue
+        change = (current - old) / old if old else float('inf')
+        worse = -change if any(marker in name for marker in HIGHER_IS_BETTER) else change
+        flag = ''
+        if worse > threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif worse < -threshold:
+            flag = '  improved'
+        print(f"{name:<70} {old:>12.3f} {current:>12.3f} {change:>+8.1%}{flag}")
+
+    missing = sorted(base_metrics.keys() - new_metrics.keys())
+    if missing:
+        print(f"\nMissing from new results: {', '.join(missing)}")
+    print(f"\n{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative change counted as a regression')
+    parser.add_argument('--filter', default='', help='Only metrics whose name contains this')
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    sys.exit(1 if compare(base, new, args.threshold, args.filter) else 0)
+
+
+if __name__ == '__main__':
+    main()
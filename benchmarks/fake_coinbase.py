@@ -0,0 +1,330 @@
+"""
+Fake Coinbase Exchange API for benchmarks
+
+Serves the public REST endpoints the market data service's Coinbase
+provider calls (product ticker, candles and the level 2 book) and the
+WebSocket feed at /ws ('ticker' and 'level2_batch' channels: a snapshot on
+subscribe, then l2update and ticker messages at --updates-per-second per
+product). Prices are a deterministic random walk per product. With
+--updates-per-second 0 the feed only moves on POST /control/step/<product>,
+so tests can check the exact book a client should hold.
+
+REST responses are delayed by a configurable latency and can be rate
+limited (429) or made to fail with 5xx errors, as in fake_tradestation.
+
+Usage:
+    python benchmarks/fake_coinbase.py --port 18050 --latency-ms 40 --updates-per-second 20
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+
+from fake_tradestation import _Bucket, _symbol_seed
+
+CHANNELS = ('ticker', 'level2_batch')
+
+
+@dataclass
+class FakeConfig:
+    latency_ms: float = 30.0
+    jitter_ms: float = 10.0
+    rate_limit: float = 0.0        # REST requests/second (0 = unlimited)
+    burst: int = 15
+    error_rate: float = 0.0        # fraction of REST requests answered with 503
+    levels: int = 200              # book levels per side
+    updates_per_second: float = 10.0  # per product (0 = only on POST /control/step)
+    seed: int = 7
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def _valid_product(product: str) -> bool:
+    base, _, quote = product.partition('-')
+    return base.isalpha() and quote.isalpha() and 2 <= len(base) <= 6 and 2 <= len(quote) <= 5
+
+
+class FakeProduct:
+    """Random-walk mid price with an L2 book around it"""
+
+    def __init__(self, product: str, config: FakeConfig):
+        self.product = product
+        self.rng = random.Random(_symbol_seed(product, config.seed))
+        base = product.split('-')[0]
+        self.mid = {'BTC': 60000.0, 'ETH': 3000.0, 'SOL': 150.0}.get(base, round(self.rng.uniform(1, 500), 2))
+        self.tick = max(0.01, round(self.mid / 100000, 2))
+        self.levels = config.levels
+        self.sequence = 1
+        self.volume = round(self.rng.uniform(1e3, 1e5), 4)
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self._rebuild()
+
+    def _price(self, value: float) -> float:
+        return round(round(value / self.tick) * self.tick, 2)
+
+    def _size(self) -> float:
+        return round(self.rng.uniform(0.001, 5), 6)
+
+    def _rebuild(self):
+        best_bid = self._price(self.mid - self.tick / 2)
+        self.bids = {self._price(best_bid - i * self.tick): self._size() for i in range(self.levels)}
+        self.asks = {self._price(best_bid + (i + 1) * self.tick): self._size() for i in range(self.levels)}
+
+    def best(self) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+        bid = max(self.bids)
+        ask = min(self.asks)
+        return (bid, self.bids[bid]), (ask, self.asks[ask])
+
+    def step(self) -> List[List[str]]:
+        """Move the market; the level changes as [side, price, size]"""
+        changes = []
+        self.mid = max(self.tick * 10, self.mid + self.rng.gauss(0, self.tick * 2))
+        best_bid = self._price(self.mid - self.tick / 2)
+        for price in [p for p in self.bids if p > best_bid]:
+            del self.bids[price]
+            changes.append(['buy', f"{price}", '0'])
+        for price in [p for p in self.asks if p <= best_bid]:
+            del self.asks[price]
+            changes.append(['sell', f"{price}", '0'])
+        for _ in range(3):
+            side = self.rng.choice(('buy', 'sell'))
+            offset = int(self.rng.expovariate(0.2))
+            if side == 'buy':
+                price, book = self._price(best_bid - offset * self.tick), self.bids
+            else:
+                price, book = self._price(best_bid + (offset + 1) * self.tick), self.asks
+            size = 0.0 if price in book and self.rng.random() < 0.2 else self._size()
+            if size:
+                book[price] = size
+            else:
+                book.pop(price, None)
+            changes.append([side, f"{price}", f"{size}"])
+        if not self.bids or not self.asks:
+            self._rebuild()
+        self.sequence += 1
+        self.volume = round(self.volume + self.rng.uniform(0, 1), 4)
+        return changes
+
+    def ticker(self) -> Dict:
+        (bid, _), (ask, _) = self.best()
+        return {'trade_id': self.sequence, 'price': f"{self._price(self.mid)}", 'size': f"{self._size()}",
+                'time': _now(), 'bid': f"{bid}", 'ask': f"{ask}", 'volume': f"{self.volume}"}
+
+    def book(self) -> Dict:
+        return {
+            'sequence': self.sequence,
+            'bids': [[f"{p}", f"{self.bids[p]}", 1] for p in sorted(self.bids, reverse=True)],
+            'asks': [[f"{p}", f"{self.asks[p]}", 1] for p in sorted(self.asks)],
+            'time': _now(),
+        }
+
+    def candles(self, granularity: int, start: int, end: int) -> List[List[float]]:
+        """[time, low, high, open, close, volume], newest first; stable per candle"""
+        rows = []
+        first = math.ceil(start / granularity) * granularity
+        for t in range(end // granularity * granularity, first - 1, -granularity):
+            rng = random.Random(_symbol_seed(f"{self.product}:{granularity}:{t}", 0))
+            open_ = self.mid * (1 + rng.uniform(-0.02, 0.02))
+            close = open_ * (1 + rng.uniform(-0.005, 0.005))
+            high = max(open_, close) * (1 + rng.uniform(0, 0.003))
+            low = min(open_, close) * (1 - rng.uniform(0, 0.003))
+            rows.append([t, round(low, 2), round(high, 2), round(open_, 2), round(close, 2),
+                         round(rng.uniform(1, 100), 4)])
+        return rows
+
+
+# ==================== App ====================
+
+def _epoch(value: str) -> int:
+    return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp())
+
+
+def create_app(config: FakeConfig) -> FastAPI:
+    app = FastAPI(title="Fake Coinbase Exchange API")
+    products: Dict[str, FakeProduct] = {}
+    # Feed subscribers by (product, channel)
+    subscribers: Dict[Tuple[str, str], Set[WebSocket]] = {}
+    tickers: Dict[str, asyncio.Task] = {}
+    bucket = _Bucket(config.rate_limit, config.burst) if config.rate_limit > 0 else None
+    rng = random.Random(config.seed)
+    stats = {'requests': 0, 'rate_limited': 0, 'errors': 0,
+             'ws_connections': 0, 'ws_open': 0, 'ws_messages': 0}
+
+    def product_for(product_id: str) -> FakeProduct:
+        product_id = product_id.upper()
+        if not _valid_product(product_id):
+            raise HTTPException(status_code=404, detail='NotFound')
+        if product_id not in products:
+            products[product_id] = FakeProduct(product_id, config)
+        return products[product_id]
+
+    @app.middleware("http")
+    async def upstream_behaviour(request: Request, call_next):
+        if not request.url.path.startswith('/products'):
+            return await call_next(request)
+
+        stats['requests'] += 1
+        if bucket:
+            wait = bucket.take()
+            if wait is not None:
+                stats['rate_limited'] += 1
+                return JSONResponse({'message': 'Public rate limit exceeded'}, status_code=429,
+                                    headers={'Retry-After': str(max(1, math.ceil(wait)))})
+
+        delay = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        if config.error_rate and rng.random() < config.error_rate:
+            stats['errors'] += 1
+            return JSONResponse({'message': 'ServiceUnavailable'}, status_code=503)
+
+        return await call_next(request)
+
+    @app.get("/products/{product_id}/ticker")
+    async def ticker(product_id: str):
+        return product_for(product_id).ticker()
+
+    @app.get("/products/{product_id}/candles")
+    async def candles(product_id: str, granularity: int = 60, start: Optional[str] = None,
+                      end: Optional[str] = None):
+        if granularity not in (60, 300, 900, 3600, 21600, 86400):
+            raise HTTPException(status_code=400, detail='Unsupported granularity')
+        end_ts = _epoch(end) if end else int(time.time())
+        start_ts = _epoch(start) if start else end_ts - 299 * granularity
+        if (end_ts - start_ts) // granularity + 1 > 300:
+            raise HTTPException(status_code=400, detail='granularity too small for the requested time range')
+        return product_for(product_id).candles(granularity, start_ts, end_ts)
+
+    @app.get("/products/{product_id}/book")
+    async def book(product_id: str, level: int = 1):
+        return product_for(product_id).book()
+
+    async def publish(product: FakeProduct):
+        """Move the product's market and send the update to its subscribers"""
+        changes = product.step()
+        (bid, bid_size), (ask, ask_size) = product.best()
+        now = _now()
+        messages = {
+            'level2_batch': {'type': 'l2update', 'product_id': product.product, 'changes': changes, 'time': now},
+            'ticker': {'type': 'ticker', 'sequence': product.sequence, 'product_id': product.product,
+                       'price': f"{product._price(product.mid)}", 'volume_24h': f"{product.volume}",
+                       'best_bid': f"{bid}", 'best_bid_size': f"{bid_size}",
+                       'best_ask': f"{ask}", 'best_ask_size': f"{ask_size}", 'time': now},
+        }
+        for channel, message in messages.items():
+            for ws in list(subscribers.get((product.product, channel), ())):
+                try:
+                    await ws.send_json(message)
+                    stats['ws_messages'] += 1
+                except Exception:
+                    subscribers[(product.product, channel)].discard(ws)
+
+    async def run_product(product: FakeProduct):
+        """Publish the product's updates while anyone is subscribed"""
+        interval = 1 / config.updates_per_second
+        while any(key[0] == product.product and sockets for key, sockets in subscribers.items()):
+            await asyncio.sleep(interval)
+            await publish(product)
+        tickers.pop(product.product, None)
+
+    @app.websocket("/ws")
+    async def feed(ws: WebSocket):
+        await ws.accept()
+        stats['ws_connections'] += 1
+        stats['ws_open'] += 1
+        mine: Set[Tuple[str, str]] = set()
+        try:
+            while True:
+                message = await ws.receive_json()
+                kind = message.get('type')
+                channels = message.get('channels', [])
+                product_ids = [p.upper() for p in message.get('product_ids', [])]
+                bad = [c for c in channels if c not in CHANNELS] + [p for p in product_ids if not _valid_product(p)]
+                if kind not in ('subscribe', 'unsubscribe') or bad:
+                    await ws.send_json({'type': 'error', 'message': 'Failed to subscribe',
+                                        'reason': f"{', '.join(bad) or kind} is not valid"})
+                    continue
+                for product_id in product_ids:
+                    product = product_for(product_id)
+                    for channel in channels:
+                        key = (product_id, channel)
+                        if kind == 'unsubscribe':
+                            subscribers.get(key, set()).discard(ws)
+                            mine.discard(key)
+                            continue
+                        if channel == 'level2_batch':
+                            snapshot = product.book()
+                            await ws.send_json({'type': 'snapshot', 'product_id': product_id,
+                                                'bids': [level[:2] for level in snapshot['bids']],
+                                                'asks': [level[:2] for level in snapshot['asks']]})
+                            stats['ws_messages'] += 1
+                        subscribers.setdefault(key, set()).add(ws)
+                        mine.add(key)
+                    if kind == 'subscribe' and config.updates_per_second > 0 and product_id not in tickers:
+                        tickers[product_id] = asyncio.create_task(run_product(product))
+                await ws.send_json({'type': 'subscriptions', 'channels': [
+                    {'name': channel, 'product_ids': sorted(p for p, c in mine if c == channel)}
+                    for channel in CHANNELS
+                ]})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            stats['ws_open'] -= 1
+            for key in mine:
+                subscribers.get(key, set()).discard(ws)
+
+    @app.post("/control/step/{product_id}")
+    async def step(product_id: str, count: int = 1):
+        """Publish count updates now (with --updates-per-second 0, the only updates)"""
+        product = product_for(product_id)
+        for _ in range(count):
+            await publish(product)
+        return {'sequence': product.sequence}
+
+    @app.get("/stats")
+    async def get_stats():
+        return {**stats, 'streams': sum(1 for sockets in subscribers.values() if sockets)}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18050)
+    parser.add_argument('--latency-ms', type=float, default=FakeConfig.latency_ms)
+    parser.add_argument('--jitter-ms', type=float, default=FakeConfig.jitter_ms)
+    parser.add_argument('--rate-limit', type=float, default=FakeConfig.rate_limit,
+                        help='REST requests/second (0 = unlimited)')
+    parser.add_argument('--burst', type=int, default=FakeConfig.burst)
+    parser.add_argument('--error-rate', type=float, default=FakeConfig.error_rate)
+    parser.add_argument('--levels', type=int, default=FakeConfig.levels)
+    parser.add_argument('--updates-per-second', type=float, default=FakeConfig.updates_per_second,
+                        help='Feed updates per product')
+    parser.add_argument('--seed', type=int, default=FakeConfig.seed)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_limit=args.rate_limit,
+        burst=args.burst, error_rate=args.error_rate, levels=args.levels,
+        updates_per_second=args.updates_per_second, seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+"""
+Fake Redis server for benchmarks
+
+An in-memory RESP2 server implementing the commands RedisCache and the
+scanner's scan state use (strings with expiry, INCRBY, MGET, hashes, lists, KEYS,
+DEL, PING). There is no Lua: the two redis-py lock scripts (release and
+extend) are recognised when loaded and emulated. The services connect to it
+like a real Redis, so cache paths are measured with a network round trip
+but without depending on a shared Redis instance.
+
+Usage:
+    python benchmarks/fake_redis.py --port 16379
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import hashlib
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class Store:
+    """Keys with optional expiry (monotonic deadline)"""
+
+    def __init__(self):
+        self.data: Dict[bytes, Any] = {}
+        self.expires: Dict[bytes, float] = {}
+        # SHA1 -> emulated script ('release' or 'extend')
+        self.scripts: Dict[bytes, str] = {}
+
+    def _alive(self, key: bytes) -> bool:
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def get(self, key: bytes, kind: type) -> Any:
+        if not self._alive(key):
+            return None
+        value = self.data[key]
+        if not isinstance(value, kind):
+            raise TypeError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def delete(self, key: bytes) -> int:
+        self.expires.pop(key, None)
+        return 1 if self.data.pop(key, None) is not None else 0
+
+    def keys(self, pattern: bytes) -> List[bytes]:
+        return [key for key in list(self.data)
+                if self._alive(key) and fnmatch.fnmatchcase(key.decode(), pattern.decode())]
+
+    def pttl(self, key: bytes) -> int:
+        if not self._alive(key):
+            return -2
+        deadline = self.expires.get(key)
+        if deadline is None:
+            return -1
+        return int((deadline - time.monotonic()) * 1000)
+
+    def expire(self, key: bytes, seconds: float) -> int:
+        if not self._alive(key):
+            return 0
+        self.expires[key] = time.monotonic() + seconds
+        return 1
+
+
+class Error(str):
+    """RESP error reply"""
+
+
+class Status(str):
+    """RESP simple string reply"""
+
+
+OK = Status('OK')
+
+
+def load_script(store: Store, source: bytes) -> bytes:
+    """Register a redis-py lock script by its SHA1"""
+    sha = hashlib.sha1(source).hexdigest().encode()
+    if b"'pexpire'" in source:
+        store.scripts[sha] = 'extend'
+    elif b"'del'" in source:
+        store.scripts[sha] = 'release'
+    return sha
+
+
+def run_script(store: Store, sha: bytes, args: List[bytes]) -> Any:
+    kind = store.scripts.get(sha)
+    if kind is None:
+        return Error('NOSCRIPT No matching script. Please use EVAL.')
+    keys, argv = args[1:1 + int(args[0])], args[1 + int(args[0]):]
+    if store.get(keys[0], bytes) != argv[0]:
+        return 0
+    if kind == 'release':
+        return store.delete(keys[0])
+    remaining = store.pttl(keys[0])
+    if remaining < 0:
+        return 0
+    new_ttl = int(argv[1]) + (remaining if argv[2] == b'0' else 0)
+    return store.expire(keys[0], new_ttl / 1000)
+
+
+def execute(store: Store, command: List[bytes]) -> Any:
+    name = command[0].upper()
+    args = command[1:]
+
+    if name == b'PING':
+        return Status('PONG')
+    if name in (b'CLIENT', b'SELECT'):
+        return OK
+    if name == b'GET':
+        return store.get(args[0], bytes)
+    if name == b'SET':
+        options = [arg.upper() for arg in args[2:]]
+        exists = store.get(args[0], object) is not None
+        if (b'NX' in options and exists) or (b'XX' in options and not exists):
+            return None
+        store.delete(args[0])
+        store.data[args[0]] = args[1]
+        if b'EX' in options:
+            store.expire(args[0], int(args[2 + options.index(b'EX') + 1]))
+        if b'PX' in options:
+            store.expire(args[0], int(args[2 + options.index(b'PX') + 1]) / 1000)
+        return OK
+    if name == b'SETEX':
+        store.delete(args[0])
+        store.data[args[0]] = args[2]
+        store.expire(args[0], int(args[1]))
+        return OK
+    if name == b'PTTL':
+        return store.pttl(args[0])
+    if name == b'TTL':
+        remaining = store.pttl(args[0])
+        return remaining if remaining < 0 else remaining // 1000
+    if name == b'EXPIRE':
+        return store.expire(args[0], int(args[1]))
+    if name == b'PEXPIRE':
+        return store.expire(args[0], int(args[1]) / 1000)
+    if name in (b'INCR', b'INCRBY'):
+        value = int(store.get(args[0], bytes) or 0) + (int(args[1]) if name == b'INCRBY' else 1)
+        store.data[args[0]] = str(value).encode()
+        return value
+    if name == b'SCRIPT' and args[0].upper() == b'LOAD':
+        return load_script(store, args[1])
+    if name == b'EVALSHA':
+        return run_script(store, args[0], args[1:])
+    if name == b'EXISTS':
+        return sum(1 for key in args if store.get(key, object) is not None)
+    if name == b'MGET':
+        return [store.get(key, object) for key in args]
+    if name == b'DEL':
+        return sum(store.delete(key) for key in args)
+    if name == b'KEYS':
+        return store.keys(args[0])
+    if name == b'HSET':
+        value = store.get(args[0], dict)
+        if value is None:
+            value = store.data[args[0]] = {}
+        added = 0
+        for field, item in zip(args[1::2], args[2::2]):
+            added += field not in value
+            value[field] = item
+        return added
+    if name == b'HDEL':
+        value = store.get(args[0], dict) or {}
+        removed = sum(1 for field in args[1:] if value.pop(field, None) is not None)
+        if args[0] in store.data and not value:
+            store.delete(args[0])
+        return removed
+    if name == b'HGETALL':
+        value = store.get(args[0], dict) or {}
+        return [item for pair in value.items() for item in pair]
+    if name == b'LPUSH':
+        value = store.get(args[0], list)
+        if value is None:
+            value = store.data[args[0]] = []
+        for item in args[1:]:
+            value.insert(0, item)
+        return len(value)
+    if name in (b'LTRIM', b'LRANGE'):
+        value = store.get(args[0], list) or []
+        start, end = int(args[1]), int(args[2])
+        end = len(value) + end if end < 0 else end
+        selected = value[start:end + 1] if start >= 0 else value[start:]
+        if name == b'LRANGE':
+            return selected
+        if args[0] in store.data:
+            store.data[args[0]][:] = selected
+        return OK
+    if name == b'DBSIZE':
+        return len(store.keys(b'*'))
+    if name == b'FLUSHDB':
+        store.data.clear()
+        store.expires.clear()
+        return OK
+    return Error(f"ERR unknown command '{name.decode()}'")
+
+
+def encode(value: Any) -> bytes:
+    if isinstance(value, Error):
+        return b'-' + value.encode() + b'\r\n'
+    if isinstance(value, Status):
+        return b'+' + value.encode() + b'\r\n'
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, bytes):
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+    if isinstance(value, list):
+        return b'*%d\r\n' % len(value) + b''.join(encode(item) for item in value)
+    raise TypeError(f"Cannot encode {type(value)}")
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b'*'):
+        # Inline command (e.g. from telnet)
+        return line.strip().split()
+    parts = []
+    for _ in range(int(line[1:])):
+        header = await reader.readline()
+        length = int(header[1:])
+        data = await reader.readexactly(length + 2)
+        parts.append(data[:-2])
+    return parts
+
+
+async def serve(host: str, port: int) -> Tuple[asyncio.AbstractServer, Store]:
+    store = Store()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                command = await read_command(reader)
+                if command is None:
+                    break
+                if not command:
+                    continue
+                try:
+                    reply = execute(store, command)
+                except TypeError as e:
+                    reply = Error(str(e))
+                except (IndexError, ValueError):
+                    reply = Error(f"ERR wrong arguments for '{command[0].decode()}' command")
+                writer.write(encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    return server, store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=16379)
+    args = parser.parse_args()
+
+    async def run():
+        server, _ = await serve(args.host, args.port)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+"""
+Fake TradeStation API for benchmarks
+
+Serves the v3 market data endpoints the market data service calls (quotes,
+bars, option expirations, strikes, chains and symbol lookup) plus the OAuth
+token endpoint.
+Data is synthetic and deterministic per symbol, or read from recorded JSON
+fixtures when a fixtures directory is given:
+
+    <fixtures>/quotes/<SYMBOL>.json
+    <fixtures>/bars/<SYMBOL>.json
+    <fixtures>/expirations/<SYMBOL>.json
+    <fixtures>/chains/<SYMBOL>_<YYYY-MM-DD>.json
+
+Responses are delayed by a configurable latency, and each endpoint family
+can be rate limited (429 with Retry-After) or made to fail with 5xx errors.
+
+Usage:
+    python benchmarks/fake_tradestation.py --port 18020 --latency-ms 40 --rate-limit 20
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+# Endpoint families, matching the service's rate limiter buckets
+FAMILIES = [
+    ('/v3/marketdata/quotes', 'quotes'),
+    ('/v3/marketdata/barcharts', 'barcharts'),
+    ('/v3/marketdata/options/expirations', 'options_expirations'),
+    ('/v3/marketdata/options/strikes', 'options_strikes'),
+    ('/v3/marketdata/options/chains', 'options_chains'),
+    ('/v3/marketdata/symbollookup', 'symbollookup'),
+]
+
+
+@dataclass
+class FakeConfig:
+    latency_ms: float = 30.0
+    jitter_ms: float = 10.0
+    rate_limit: float = 0.0        # requests/second per family (0 = unlimited)
+    burst: int = 10
+    error_rate: float = 0.0        # fraction of requests answered with 503
+    expirations: int = 8
+    strikes: int = 60              # strikes per side of spot
+    seed: int = 7
+    fixtures: Optional[str] = None
+
+
+class _Bucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> Optional[float]:
+        """None if a token was taken, else seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return None
+        return (1 - self.tokens) / self.rate
+
+
+# ==================== Synthetic Data ====================
+
+def _symbol_seed(symbol: str, seed: int) -> int:
+    return int(hashlib.md5(f"{seed}:{symbol}".encode()).hexdigest()[:8], 16)
+
+
+def spot_price(symbol: str, seed: int) -> float:
+    """Stable price per symbol (VIX stays in a plausible range)"""
+    rng = random.Random(_symbol_seed(symbol, seed))
+    if symbol.upper() in ('VIX', '$VIX.X'):
+        return round(rng.uniform(12, 30), 2)
+    return round(rng.uniform(20, 600), 2)
+
+
+# Symbol lookup universe: symbols matching the search by prefix, or whose
+# description has a word starting with it
+LISTINGS = [
+    ('AAPL', 'Apple Inc'), ('AMD', 'Advanced Micro Devices Inc'), ('AMZN', 'Amazon.com Inc'),
+    ('AVGO', 'Broadcom Inc'), ('BAC', 'Bank of America Corp'), ('COST', 'Costco Wholesale Corp'),
+    ('DIA', 'SPDR Dow Jones Industrial Average ETF Trust'), ('GLD', 'SPDR Gold Shares'),
+    ('GOOGL', 'Alphabet Inc Class A'), ('IWM', 'iShares Russell 2000 ETF'),
+    ('JPM', 'JPMorgan Chase & Co'), ('META', 'Meta Platforms Inc'), ('MSFT', 'Microsoft Corp'),
+    ('MU', 'Micron Technology Inc'), ('NFLX', 'Netflix Inc'), ('NVDA', 'NVIDIA Corp'),
+    ('QQQ', 'Invesco QQQ Trust'), ('SPY', 'SPDR S&P 500 ETF Trust'), ('TLT', 'iShares 20+ Year Treasury Bond ETF'),
+    ('TSLA', 'Tesla Inc'), ('XLE', 'Energy Select Sector SPDR Fund'), ('XLF', 'Financial Select Sector SPDR Fund'),
+]
+
+
+def symbol_lookup(search: str) -> List[Dict]:
+    search = search.upper()
+    return [{'Symbol': symbol, 'Description': description, 'Exchange': 'NASDAQ'}
+            for symbol, description in LISTINGS
+            if symbol.startswith(search) or any(word.startswith(search) for word in description.upper().split())]
+
+
+def strike_step(spot: float) -> float:
+    if spot < 50:
+        return 1.0
+    if spot < 200:
+        return 2.5
+    return 5.0
+
+
+def expiration_dates(count: int, today: Optional[date] = None) -> List[date]:
+    """Weekly Friday expirations starting next Friday"""
+    today = today or datetime.now().date()
+    first = today + timedelta(days=(4 - today.weekday()) % 7 or 7)
+    return [first + timedelta(weeks=i) for i in range(count)]
+
+
+def _option_price(option_type: str, spot: float, strike: float, dte: int) -> float:
+    """Intrinsic value plus a time value that decays away from the money"""
+    intrinsic = max(0.0, spot - strike) if option_type == 'C' else max(0.0, strike - spot)
+    width = 0.08 * spot * math.sqrt(max(dte, 1) / 30)
+    time_value = 0.4 * width * math.exp(-((strike - spot) / width) ** 2)
+    return intrinsic + time_value
+
+
+class FakeMarket:
+    """Synthetic (or recorded) market data"""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.fixtures = Path(config.fixtures) if config.fixtures else None
+
+    def _fixture(self, kind: str, name: str) -> Optional[Dict]:
+        if not self.fixtures:
+            return None
+        path = self.fixtures / kind / f"{name}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def quote(self, symbol: str) -> Dict:
+        recorded = self._fixture('quotes', symbol)
+        if recorded:
+            return recorded
+        spot = spot_price(symbol, self.config.seed)
+        return {
+            'Symbol': symbol,
+            'Last': str(spot),
+            'Bid': str(round(spot - 0.01, 2)),
+            'Ask': str(round(spot + 0.01, 2)),
+            'Volume': str(1_000_000 + _symbol_seed(symbol, self.config.seed) % 9_000_000),
+            'TradeTime': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+        }
+
+    def bars(self, symbol: str, bars_back: int) -> Dict:
+        recorded = self._fixture('bars', symbol)
+        if recorded:
+            return recorded
+        rng = random.Random(_symbol_seed(symbol, self.config.seed) + 1)
+        price = spot_price(symbol, self.config.seed)
+        closes = [price]
+        for _ in range(bars_back - 1):
+            closes.append(closes[-1] / (1 + rng.gauss(0, 0.01)))
+        closes.reverse()
+        start = datetime.now().date() - timedelta(days=bars_back)
+        bars = []
+        for i, close in enumerate(closes):
+            open_ = close * (1 + rng.gauss(0, 0.003))
+            bars.append({
+                'TimeStamp': f"{(start + timedelta(days=i)).isoformat()}T20:00:00Z",
+                'Open': str(round(open_, 2)),
+                'High': str(round(max(open_, close) * 1.005, 2)),
+                'Low': str(round(min(open_, close) * 0.995, 2)),
+                'Close': str(round(close, 2)),
+                'TotalVolume': str(rng.randint(1_000_000, 50_000_000)),
+            })
+        return {'Bars': bars}
+
+    def expirations(self, symbol: str) -> Dict:
+        recorded = self._fixture('expirations', symbol)
+        if recorded:
+            return recorded
+        return {'Expirations': [
+            {'Date': f"{exp.isoformat()}T00:00:00Z", 'Type': 'Weekly'}
+            for exp in expiration_dates(self.config.expirations)
+        ]}
+
+    def _strikes(self, symbol: str) -> List[float]:
+        spot = spot_price(symbol, self.config.seed)
+        step = strike_step(spot)
+        center = round(spot / step) * step
+        return [center + step * i for i in range(-self.config.strikes, self.config.strikes + 1)
+                if center + step * i > 0]
+
+    def strikes(self, symbol: str) -> Dict:
+        return {'Strikes': [[str(strike)] for strike in self._strikes(symbol)]}
+
+    def chain(self, symbol: str, expiration: Optional[str]) -> Dict:
+        exp = datetime.strptime(expiration[:10], '%Y-%m-%d').date() if expiration else expiration_dates(1)[0]
+        recorded = self._fixture('chains', f"{symbol}_{exp.isoformat()}")
+        if recorded:
+            return recorded
+
+        spot = spot_price(symbol, self.config.seed)
+        dte = (exp - datetime.now().date()).days
+        rng = random.Random(_symbol_seed(symbol, self.config.seed) + exp.toordinal())
+        rows = []
+        for strike in self._strikes(symbol):
+            for option_type in ('C', 'P'):
+                mid = _option_price(option_type, spot, strike, dte)
+                spread = max(0.01, round(mid * 0.04, 2))
+                bid = max(0.0, round(mid - spread / 2, 2))
+                rows.append({
+                    'Symbol': f"{symbol} {exp.strftime('%y%m%d')}{option_type}{strike:g}",
+                    'Expiration': exp.isoformat(),
+                    'OptionType': option_type,
+                    'Strike': strike,
+                    'Bid': bid,
+                    'Ask': round(bid + spread, 2),
+                    'Last': round(mid, 2),
+                    'Volume': rng.randint(0, 5000),
+                    'OpenInterest': rng.randint(0, 50000),
+                    'ImpliedVolatility': round(0.15 + 0.1 * abs(strike - spot) / spot, 4),
+                    'Delta': round(max(0.0, min(1.0, 0.5 + (spot - strike) / (spot * 0.2))) * (1 if option_type == 'C' else -1), 4),
+                })
+        return {'Underlying': symbol, 'Expiration': exp.isoformat(), 'OptionQuotes': rows}
+
+
+# ==================== App ====================
+
+def create_app(config: FakeConfig) -> FastAPI:
+    app = FastAPI(title="Fake TradeStation API")
+    market = FakeMarket(config)
+    buckets: Dict[str, _Bucket] = {}
+    rng = random.Random(config.seed)
+    stats = {'requests': 0, 'rate_limited': 0, 'errors': 0, 'by_family': {}}
+
+    def family(path: str) -> str:
+        return next((name for prefix, name in FAMILIES if path.startswith(prefix)), 'default')
+
+    @app.middleware("http")
+    async def upstream_behaviour(request: Request, call_next):
+        if not request.url.path.startswith('/v3/'):
+            return await call_next(request)
+
+        name = family(request.url.path)
+        stats['requests'] += 1
+        stats['by_family'][name] = stats['by_family'].get(name, 0) + 1
+
+        if config.rate_limit > 0:
+            bucket = buckets.setdefault(name, _Bucket(config.rate_limit, config.burst))
+            wait = bucket.take()
+            if wait is not None:
+                stats['rate_limited'] += 1
+                return JSONResponse({'Error': 'TooManyRequests'}, status_code=429,
+                                    headers={'Retry-After': str(max(1, math.ceil(wait)))})
+
+        delay = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        if config.error_rate and rng.random() < config.error_rate:
+            stats['errors'] += 1
+            return JSONResponse({'Error': 'ServiceUnavailable'}, status_code=503)
+
+        return await call_next(request)
+
+    @app.post("/oauth/token")
+    async def token():
+        return {'access_token': f"fake-{time.time():.0f}", 'refresh_token': 'fake-refresh', 'expires_in': 1200}
+
+    @app.get("/v3/marketdata/quotes/{symbols}")
+    async def quotes(symbols: str):
+        return {'Quotes': [market.quote(symbol.upper()) for symbol in symbols.split(',') if symbol]}
+
+    @app.get("/v3/marketdata/barcharts/{symbol}")
+    async def barcharts(symbol: str, barsback: int = 100):
+        return market.bars(symbol.upper(), barsback)
+
+    @app.get("/v3/marketdata/options/expirations/{symbol}")
+    async def expirations(symbol: str):
+        return market.expirations(symbol.upper())
+
+    @app.get("/v3/marketdata/options/strikes/{symbol}")
+    async def strikes(symbol: str, expiration: Optional[str] = None):
+        return market.strikes(symbol.upper())
+
+    @app.get("/v3/marketdata/options/chains/{symbol}")
+    async def chains(symbol: str, expiration: Optional[str] = None):
+        try:
+            return market.chain(symbol.upper(), expiration)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Bad expiration: {expiration}")
+
+    @app.get("/v3/marketdata/symbollookup")
+    async def symbollookup(search: str = ''):
+        return {'Symbols': symbol_lookup(search)}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18020)
+    parser.add_argument('--latency-ms', type=float, default=FakeConfig.latency_ms)
+    parser.add_argument('--jitter-ms', type=float, default=FakeConfig.jitter_ms)
+    parser.add_argument('--rate-limit', type=float, default=FakeConfig.rate_limit,
+                        help='Requests/second per endpoint family (0 = unlimited)')
+    parser.add_argument('--burst', type=int, default=FakeConfig.burst)
+    parser.add_argument('--error-rate', type=float, default=FakeConfig.error_rate)
+    parser.add_argument('--expirations', type=int, default=FakeConfig.expirations)
+    parser.add_argument('--strikes', type=int, default=FakeConfig.strikes)
+    parser.add_argument('--seed', type=int, default=FakeConfig.seed)
+    parser.add_argument('--fixtures', help='Directory of recorded responses')
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_limit=args.rate_limit,
+        burst=args.burst, error_rate=args.error_rate, expirations=args.expirations,
+        strikes=args.strikes, seed=args.seed, fixtures=args.fixtures,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,534 @@
+"""
+Benchmark runner
+
+Starts a fake TradeStation API, a fake Coinbase exchange, a fake Redis, the
+market data service and the opportunity scanner as local processes, then
+measures:
+
+    endpoint_latency   p50/p90/p99 per market data endpoint, cold (use_cache=false)
+                       and warm (cache hits), with X-Cache counts
+    bulk_chains        bulk NDJSON chain stream: time to first chain and total
+    scan               full scan wall time and throughput, with per-stage times
+                       from the scanner's /metrics
+    spread_cpu         chain parsing and spread enumeration CPU time (no I/O)
+    crypto             Coinbase provider quote, bars and order book latency (cold,
+                       warm and live from the stream), and the NDJSON stream: time
+                       to first quote/book, events/second, upstream connections
+
+Results are written as JSON (benchmarks/results/<timestamp>_<commit>.json by
+default) and can be compared across commits with benchmarks/compare.py.
+
+Usage:
+    python benchmarks/run.py                      # full run
+    python benchmarks/run.py --quick              # smaller, for a smoke check
+    python benchmarks/run.py --latency-ms 80 --rate-limit 10 --output base.json
+    python benchmarks/run.py --replay captures/2026-10-16.jsonl.gz --symbols SPY,QQQ
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+MARKET_DATA_DIR = ROOT / 'market-data-service'
+SCANNER_DIR = ROOT / 'opportunity-scanner'
+
+DEFAULT_SYMBOLS = ['SPY', 'QQQ', 'IWM', 'AAPL', 'MSFT', 'NVDA', 'TSLA', 'AMD', 'AMZN', 'GOOGL']
+DEFAULT_PRODUCTS = ['BTC-USD', 'ETH-USD', 'SOL-USD']
+
+
+# ==================== Helpers ====================
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(latencies: List[float], wall: Optional[float] = None) -> Dict:
+    """Latency summary in milliseconds"""
+    if not latencies:
+        return {'count': 0}
+    summary = {
+        'count': len(latencies),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3),
+    }
+    if wall:
+        summary['throughput_rps'] = round(len(latencies) / wall, 2)
+    return summary
+
+
+def git_info() -> Dict:
+    def git(*args: str) -> str:
+        try:
+            return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True, timeout=30).stdout.strip()
+        except Exception:
+            return ''
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'subject': git('log', '-1', '--format=%s'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+    }
+
+
+def service_python(service_dir: Path, override: Optional[str]) -> str:
+    """The service's own venv if it has one, like PM2 runs it"""
+    if override:
+        return override
+    venv_python = service_dir / '.venv' / 'bin' / 'python'
+    return str(venv_python) if venv_python.exists() else sys.executable
+
+
+def parse_prometheus(text: str) -> Dict[str, float]:
+    """Flat {'name{labels}': value} from the Prometheus text format"""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        name, _, value = line.rpartition(' ')
+        try:
+            samples[name] = float(value)
+        except ValueError:
+            continue
+    return samples
+
+
+# ==================== Processes ====================
+
+class Stack:
+    """Fake upstreams plus both services, each in its own process"""
+
+    def __init__(self, args: argparse.Namespace, workdir: Path):
+        self.args = args
+        self.workdir = workdir
+        self.processes: Dict[str, subprocess.Popen] = {}
+        self.ts_url = f"http://127.0.0.1:{args.base_port + 20}"
+        self.redis_port = args.base_port + 30
+        self.market_data_url = f"http://127.0.0.1:{args.base_port}"
+        self.scanner_url = f"http://127.0.0.1:{args.base_port + 1}"
+        self.coinbase_url = f"http://127.0.0.1:{args.base_port + 40}"
+
+    def _spawn(self, name: str, command: List[str], cwd: Path, env: Optional[Dict] = None):
+        log = open(self.workdir / f"{name}.log", 'w')
+        process = subprocess.Popen(command, cwd=cwd, env={**os.environ, **(env or {})},
+                                   stdout=log, stderr=subprocess.STDOUT)
+        self.processes[name] = process
+
+    def start(self):
+        args = self.args
+        token_path = self.workdir / 'token.json'
+        token_path.write_text(json.dumps({
+            'access_token': 'bench',
+            'refresh_token': 'bench',
+            'expires_at': (datetime.now() + timedelta(hours=12)).isoformat(),
+        }))
+
+        fake_ts = [
+            sys.executable, str(BENCH_DIR / 'fake_tradestation.py'),
+            '--port', str(args.base_port + 20),
+            '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+            '--rate-limit', str(args.rate_limit), '--burst', str(args.burst),
+            '--error-rate', str(args.error_rate),
+            '--expirations', str(args.expirations), '--strikes', str(args.strikes),
+        ]
+        if args.fixtures:
+            fake_ts += ['--fixtures', args.fixtures]
+        if not args.replay:
+            self._spawn('fake_tradestation', fake_ts, ROOT)
+        self._spawn('fake_coinbase', [
+            sys.executable, str(BENCH_DIR / 'fake_coinbase.py'),
+            '--port', str(args.base_port + 40),
+            '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+            '--updates-per-second', str(args.feed_rate),
+        ], BENCH_DIR)
+        self._spawn('fake_redis', [sys.executable, str(BENCH_DIR / 'fake_redis.py'),
+                                   '--port', str(self.redis_port)], ROOT)
+
+        self._spawn('market_data', [
+            service_python(MARKET_DATA_DIR, args.python), '-m', 'uvicorn', 'src.api.server:app',
+            '--host', '127.0.0.1', '--port', str(args.base_port), '--log-level', 'warning',
+        ], MARKET_DATA_DIR, {
+            'TRADESTATION_CLIENT_ID': 'bench',
+            'TRADESTATION_CLIENT_SECRET': 'bench',
+            'TRADESTATION_TOKEN_PATH': str(token_path),
+            'TRADESTATION_API_URL': f"{self.ts_url}/v3",
+            'TRADESTATION_TOKEN_URL': f"{self.ts_url}/oauth/token",
+            'REDIS_HOST': '127.0.0.1',
+            'REDIS_PORT': str(self.redis_port),
+            'PREWARM_ENABLED': 'false',
+            'SYMBOL_MASTER_PATH': str(self.workdir / 'symbols.json'),
+            'SYMBOL_MASTER_REFRESH_HOURS': '0',
+            'TRADESTATION_RATE_LIMIT_SCALE': str(args.service_rate_scale),
+            'COINBASE_API_URL': self.coinbase_url,
+            'COINBASE_WS_URL': f"ws://127.0.0.1:{args.base_port + 40}/ws",
+            'COINBASE_RATE_LIMIT_SCALE': str(args.service_rate_scale),
+            **({'MARKET_DATA_REPLAY_PATH': str(Path(args.replay).resolve()),
+                'MARKET_DATA_REPLAY_SPEED': str(args.replay_speed)} if args.replay else {}),
+        })
+        self._spawn('scanner', [
+            service_python(SCANNER_DIR, args.python), '-m', 'uvicorn', 'src.api.server:app',
+            '--host', '127.0.0.1', '--port', str(args.base_port + 1), '--log-level', 'warning',
+        ], SCANNER_DIR, {
+            'MARKET_DATA_SERVICE_URL': self.market_data_url,
+            'SCAN_STATE_REDIS_URL': f"redis://127.0.0.1:{self.redis_port}/1",
+        })
+
+    async def wait_ready(self, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        urls = [f"{self.coinbase_url}/stats", f"{self.market_data_url}/health", f"{self.scanner_url}/health"]
+        if not self.args.replay:
+            urls.insert(0, f"{self.ts_url}/stats")
+        async with httpx.AsyncClient(timeout=2.0) as client:
+            for url in urls:
+                while True:
+                    for name, process in self.processes.items():
+                        if process.poll() is not None:
+                            raise RuntimeError(f"{name} exited early, see {self.workdir / name}.log")
+                    try:
+                        if (await client.get(url)).status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        pass
+                    if time.monotonic() > deadline:
+                        raise RuntimeError(f"Timed out waiting for {url}, see logs in {self.workdir}")
+                    await asyncio.sleep(0.2)
+
+    def stop(self):
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+# ==================== Scenarios ====================
+
+async def _load(client: httpx.AsyncClient, urls: List[str], concurrency: int) -> Dict:
+    """GET every url with bounded concurrency; latency summary plus X-Cache counts"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    cache_status: Counter = Counter()
+    by_cache: Dict[str, List[float]] = {}
+    errors: Counter = Counter()
+
+    async def one(url: str):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.get(url)
+                elapsed = time.perf_counter() - start
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] += 1
+                return
+            if response.status_code != 200:
+                errors[str(response.status_code)] += 1
+                return
+            latencies.append(elapsed)
+            status = response.headers.get('X-Cache', 'NONE')
+            cache_status[status] += 1
+            by_cache.setdefault(status, []).append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(url) for url in urls))
+    wall = time.perf_counter() - start
+    return {
+        **summarize(latencies, wall),
+        'x_cache': dict(cache_status),
+        'by_cache': {status: summarize(values) for status, values in by_cache.items()},
+        'errors': dict(errors),
+    }
+
+
+async def endpoint_latency(stack: Stack, symbols: List[str], requests: int, concurrency: int) -> Dict:
+    base = stack.market_data_url
+    async with httpx.AsyncClient(timeout=60.0, limits=httpx.Limits(max_connections=concurrency)) as client:
+        expirations = (await client.get(f"{base}/api/options/expirations/{symbols[0]}")).json()
+        first_exp = expirations.get('Expirations', [{}])[0].get('Date', '')[:10] if isinstance(expirations, dict) else ''
+
+        endpoints = {
+            'quote': lambda sym: f"{base}/api/quotes/{sym}",
+            'bars': lambda sym: f"{base}/api/bars/{sym}?unit=Daily&bars_back=20",
+            'expirations': lambda sym: f"{base}/api/options/expirations/{sym}",
+            'chain': lambda sym: f"{base}/api/options/chain/{sym}?expiration={first_exp}",
+            'symbol_search': lambda sym: f"{base}/api/symbols/search?query={sym[:2]}",
+        }
+        results = {}
+        for name, url_for in endpoints.items():
+            urls = [url_for(symbols[i % len(symbols)]) for i in range(requests)]
+            cold = await _load(client, [f"{url}{'&' if '?' in url else '?'}use_cache=false" for url in urls], concurrency)
+            # Prime every symbol once, then measure the cache hit path
+            await _load(client, [url_for(sym) for sym in symbols], concurrency)
+            warm = await _load(client, urls, concurrency)
+            results[name] = {'cold': cold, 'warm': warm}
+        return results
+
+
+async def bulk_chains(stack: Stack, symbols: List[str], rounds: int) -> Dict:
+    url = f"{stack.market_data_url}/api/options/chains"
+    params = {'symbols': ','.join(symbols), 'min_dte': 0, 'max_dte': 60, 'max_expirations': 3}
+
+    async def one(use_cache: bool) -> Dict:
+        start = time.perf_counter()
+        first = None
+        lines = 0
+        async with httpx.AsyncClient(timeout=120.0) as client:
+            async with client.stream('GET', url, params={**params, 'use_cache': str(use_cache).lower()}) as response:
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    if first is None and line.startswith('{"type":"chain"'):
+                        first = time.perf_counter() - start
+                    lines += 1
+        return {'first': first or 0.0, 'total': time.perf_counter() - start, 'lines': lines}
+
+    results = {}
+    for label, use_cache in (('cold', False), ('warm', True)):
+        runs = [await one(use_cache) for _ in range(rounds)]
+        results[label] = {
+            'lines': runs[-1]['lines'],
+            'first_chain': summarize([run['first'] for run in runs]),
+            'total': summarize([run['total'] for run in runs]),
+        }
+    return results
+
+
+async def scan(stack: Stack, symbols: List[str], rounds: int) -> Dict:
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        before = parse_prometheus((await client.get(f"{stack.scanner_url}/metrics")).text)
+        wall_times = []
+        start_all = time.perf_counter()
+        for _ in range(rounds):
+            start = time.perf_counter()
+            response = await client.post(f"{stack.scanner_url}/api/scan/full", json=symbols)
+            response.raise_for_status()
+            job_url = f"{stack.scanner_url}{response.json()['job']}"
+            while (await client.get(job_url)).json()['status'] not in ('completed', 'failed', 'cancelled'):
+                await asyncio.sleep(0.01)
+            wall_times.append(time.perf_counter() - start)
+        status = (await client.get(f"{stack.scanner_url}/api/scan/status")).json()
+        total = time.perf_counter() - start_all
+        after = parse_prometheus((await client.get(f"{stack.scanner_url}/metrics")).text)
+
+    def delta(name: str) -> float:
+        return after.get(name, 0.0) - before.get(name, 0.0)
+
+    scans = delta('opportunity_scanner_scan_duration_seconds_count{kind="full"}')
+    stages = {}
+    for stage in ('regime', 'fetch', 'compute', 'rank'):
+        seconds = delta(f'opportunity_scanner_scan_stage_duration_seconds_sum{{stage="{stage}"}}')
+        stages[f"{stage}_ms"] = round(seconds / scans * 1000, 3) if scans else None
+    server_seconds = delta('opportunity_scanner_scan_duration_seconds_sum{kind="full"}')
+    return {
+        'rounds': rounds,
+        'symbols': len(symbols),
+        'opportunities': (status.get('latest_scan_summary') or {}).get('total_opportunities'),
+        'wall': summarize(wall_times),
+        'server_mean_ms': round(server_seconds / scans * 1000, 3) if scans else None,
+        'stages_mean': stages,
+        'scans_per_second': round(rounds / total, 3),
+        'symbols_per_second': round(rounds * len(symbols) / total, 2),
+    }
+
+
+async def _stream(url: str, params: Dict, seconds: float) -> Dict:
+    """Read an NDJSON market data stream for seconds: time to first event of each type, events/second"""
+    start = time.perf_counter()
+    first: Dict[str, float] = {}
+    events: Counter = Counter()
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        async with client.stream('GET', url, params=params) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                kind = json.loads(line).get('type')
+                events[kind] += 1
+                first.setdefault(kind, time.perf_counter() - start)
+                if time.perf_counter() - start >= seconds:
+                    break
+    elapsed = time.perf_counter() - start
+    return {
+        'first_quote': first.get('quote'),
+        'first_book': first.get('book'),
+        'events': dict(events),
+        'events_per_second': (events['quote'] + events['book']) / elapsed,
+    }
+
+
+async def crypto(stack: Stack, products: List[str], requests: int, concurrency: int,
+                 stream_seconds: float, stream_clients: int) -> Dict:
+    base = stack.market_data_url
+    async with httpx.AsyncClient(timeout=60.0, limits=httpx.Limits(max_connections=concurrency)) as client:
+        endpoints = {
+            'quote': lambda product: f"{base}/api/quotes/coinbase:{product}",
+            # Two candle requests per call (300 per page)
+            'bars': lambda product: f"{base}/api/bars/coinbase:{product}?unit=Minute&bars_back=500",
+            'orderbook': lambda product: f"{base}/api/orderbook/coinbase:{product}?depth=20",
+        }
+        results = {}
+        for name, url_for in endpoints.items():
+            urls = [url_for(products[i % len(products)]) for i in range(requests)]
+            cold = await _load(client, [f"{url}{'&' if '?' in url else '?'}use_cache=false" for url in urls], concurrency)
+            await _load(client, [url_for(product) for product in products], concurrency)
+            warm = await _load(client, urls, concurrency)
+            results[name] = {'cold': cold, 'warm': warm}
+        
+        # Concurrent streams of every product share one upstream connection, and
+        # quotes and books of streamed products are answered from the stream
+        connections_before = (await client.get(f"{stack.coinbase_url}/stats")).json()['ws_connections']
+        params = {'symbols': ','.join(f"coinbase:{product}" for product in products),
+                  'channels': 'quotes,book', 'depth': 10}
+        streams = [asyncio.create_task(_stream(f"{base}/api/stream", params, stream_seconds))
+                   for _ in range(stream_clients)]
+        await asyncio.sleep(min(1.0, stream_seconds / 2))
+        for name in ('quote', 'orderbook'):
+            urls = [endpoints[name](products[i % len(products)]) for i in range(requests)]
+            results[name]['live'] = await _load(client, urls, concurrency)
+        runs = await asyncio.gather(*streams)
+        upstream = (await client.get(f"{stack.coinbase_url}/stats")).json()
+    
+    results['stream'] = {
+        'clients': stream_clients,
+        'first_quote': summarize([run['first_quote'] for run in runs if run['first_quote'] is not None]),
+        'first_book': summarize([run['first_book'] for run in runs if run['first_book'] is not None]),
+        'events_per_second': round(statistics.mean(run['events_per_second'] for run in runs), 1),
+        'events': dict(sum((Counter(run['events']) for run in runs), Counter())),
+        'upstream_connections': upstream['ws_connections'] - connections_before,
+    }
+    results['upstream'] = upstream
+    return results
+
+
+def spread_cpu(args: argparse.Namespace) -> Dict:
+    output = subprocess.run(
+        [service_python(SCANNER_DIR, args.python), str(BENCH_DIR / 'spread_cpu.py'),
+         '--symbols', str(len(args.symbols)), '--expirations', str(args.expirations),
+         '--strikes', str(args.strikes), '--repeat', str(args.cpu_repeat)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+# ==================== Main ====================
+
+async def run(args: argparse.Namespace) -> Dict:
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git': git_info(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'config': {key: value for key, value in vars(args).items() if key not in ('output', 'keep_logs')},
+        },
+        'results': {},
+    }
+
+    results['results']['spread_cpu'] = spread_cpu(args)
+    print(f"spread_cpu: {results['results']['spread_cpu']['enumerate_us_per_chain']} us/chain", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory(prefix='caelum-bench-') as tmp:
+        workdir = Path(args.keep_logs) if args.keep_logs else Path(tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+        stack = Stack(args, workdir)
+        stack.start()
+        try:
+            await stack.wait_ready()
+            results['results']['endpoint_latency'] = await endpoint_latency(
+                stack, args.symbols, args.requests, args.concurrency)
+            print("endpoint_latency: done", file=sys.stderr)
+            results['results']['bulk_chains'] = await bulk_chains(stack, args.symbols, args.rounds)
+            print("bulk_chains: done", file=sys.stderr)
+            results['results']['scan'] = await scan(stack, args.symbols, args.rounds)
+            print(f"scan: {results['results']['scan']['wall']['p50_ms']} ms p50", file=sys.stderr)
+            results['results']['crypto'] = await crypto(
+                stack, args.crypto_products, args.requests, args.concurrency,
+                args.stream_seconds, args.stream_clients)
+            print(f"crypto: {results['results']['crypto']['stream']['events_per_second']} events/s per stream",
+                  file=sys.stderr)
+
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                if args.replay:
+                    health = (await client.get(f"{stack.market_data_url}/health")).json()
+                    results['results']['upstream'] = health.get('upstream_capture')
+                else:
+                    results['results']['upstream'] = (await client.get(f"{stack.ts_url}/stats")).json()
+        finally:
+            stack.stop()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=lambda value: [s.strip().upper() for s in value.split(',') if s.strip()],
+                        default=DEFAULT_SYMBOLS, help='Comma-separated symbols')
+    parser.add_argument('--requests', type=int, default=300, help='Requests per endpoint and phase')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=5, help='Bulk chain streams and full scans per phase')
+    parser.add_argument('--cpu-repeat', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=40.0, help='Fake TradeStation latency')
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='Fake TradeStation requests/second per family')
+    parser.add_argument('--burst', type=int, default=10)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--service-rate-scale', type=float, default=100.0,
+                        help="Multiplier on the service's own TradeStation quotas (1 = production limits)")
+    parser.add_argument('--expirations', type=int, default=8)
+    parser.add_argument('--strikes', type=int, default=60, help='Strikes per side of spot')
+    parser.add_argument('--fixtures', help='Recorded responses for the fake API (see fake_tradestation.py)')
+    parser.add_argument('--replay', help='Serve a market data capture (MARKET_DATA_CAPTURE_PATH log) instead of the fake API')
+    parser.add_argument('--replay-speed', type=float, default=0.0,
+                        help='Replay speed (0 = no delays, 1 = recorded latency)')
+    parser.add_argument('--crypto-products', type=lambda value: [s.strip().upper() for s in value.split(',') if s.strip()],
+                        default=DEFAULT_PRODUCTS, help='Comma-separated Coinbase products')
+    parser.add_argument('--feed-rate', type=float, default=20.0, help='Fake Coinbase feed updates/second per product')
+    parser.add_argument('--stream-seconds', type=float, default=5.0)
+    parser.add_argument('--stream-clients', type=int, default=4, help='Concurrent market data streams')
+    parser.add_argument('--base-port', type=int, default=18010)
+    parser.add_argument('--python', help='Interpreter for the services (default: their .venv, else this one)')
+    parser.add_argument('--keep-logs', help='Directory for service logs (default: temporary)')
+    parser.add_argument('--quick', action='store_true', help='Few requests, for a smoke check')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/<timestamp>_<commit>.json)')
+    args = parser.parse_args()
+
+    if args.quick:
+        args.requests, args.rounds, args.cpu_repeat, args.stream_seconds = 40, 2, 1, 2.0
+        args.symbols = args.symbols[:4]
+
+    results = asyncio.run(run(args))
+
+    output = Path(args.output) if args.output else (
+        BENCH_DIR / 'results' / f"{datetime.now():%Y%m%d-%H%M%S}_{results['meta']['git']['commit'][:10] or 'nogit'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
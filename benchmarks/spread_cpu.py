@@ -0,0 +1,86 @@
+"""
+Spread enumeration CPU benchmark
+
+Times the opportunity scanner's chain parsing and credit spread enumeration
+on synthetic chains, without any I/O. Prints one JSON object.
+
+Usage (from the repository root, with the scanner's dependencies installed):
+    python benchmarks/spread_cpu.py --symbols 20 --expirations 6 --repeat 5
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'opportunity-scanner'))
+
+from fake_tradestation import FakeConfig, FakeMarket, expiration_dates, spot_price  # noqa: E402
+from src.market_data import OptionChain  # noqa: E402
+from src.scanners.options.spread_scanner import OptionsSpreadScanner  # noqa: E402
+
+
+def run(symbols: int, expirations: int, strikes: int, repeat: int, seed: int) -> dict:
+    config = FakeConfig(strikes=strikes, expirations=expirations, seed=seed)
+    market = FakeMarket(config)
+    names = [f"SYM{i}" for i in range(symbols)]
+    exp_dates = expiration_dates(expirations)
+    payloads = [
+        (name, exp.isoformat(), market.chain(name, exp.isoformat()))
+        for name in names for exp in exp_dates
+    ]
+    rows = sum(len(payload['OptionQuotes']) for _, _, payload in payloads)
+
+    # Parsing JSON rows into column arrays
+    parse_start_cpu, parse_start = time.process_time(), time.perf_counter()
+    for _ in range(repeat):
+        chains = [(name, exp, OptionChain.from_json(payload)) for name, exp, payload in payloads]
+    parse_cpu = (time.process_time() - parse_start_cpu) / repeat
+    parse_wall = (time.perf_counter() - parse_start) / repeat
+
+    scanner = OptionsSpreadScanner(market_data_url='http://127.0.0.1:0')
+    today = date.today()
+    spreads = 0
+    enum_start_cpu, enum_start = time.process_time(), time.perf_counter()
+    for _ in range(repeat):
+        spreads = 0
+        for name, exp, chain in chains:
+            price = spot_price(name, seed)
+            dte = (date.fromisoformat(exp) - today).days
+            for spread_type in ('put_credit', 'call_credit'):
+                spreads += len(scanner._find_credit_spreads(name, price, exp, dte, chain,
+                                                            0.25, 5.0, spread_type))
+    enum_cpu = (time.process_time() - enum_start_cpu) / repeat
+    enum_wall = (time.perf_counter() - enum_start) / repeat
+
+    return {
+        'chains': len(payloads),
+        'rows': rows,
+        'spreads_found': spreads,
+        'repeat': repeat,
+        'parse_cpu_seconds': round(parse_cpu, 6),
+        'parse_wall_seconds': round(parse_wall, 6),
+        'parse_us_per_chain': round(parse_cpu / len(payloads) * 1e6, 2),
+        'enumerate_cpu_seconds': round(enum_cpu, 6),
+        'enumerate_wall_seconds': round(enum_wall, 6),
+        'enumerate_us_per_chain': round(enum_cpu / len(payloads) * 1e6, 2),
+        'chains_per_cpu_second': round(len(payloads) / enum_cpu, 1) if enum_cpu else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--expirations', type=int, default=6)
+    parser.add_argument('--strikes', type=int, default=60, help='Strikes per side of spot')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=FakeConfig.seed)
+    args = parser.parse_args()
+    print(json.dumps(run(args.symbols, args.expirations, args.strikes, args.repeat, args.seed)))
+
+
+if __name__ == '__main__':
+    main()
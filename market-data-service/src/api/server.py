@@ -1,15 +1,40 @@
 """FastAPI server for Market Data Service"""
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, List
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import Any, Optional, List, Dict, Tuple
+import asyncio
 import logging
+import orjson
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
-from ..clients.tradestation import TradeStationClient
+from ..clients.tradestation import TradeStationClient, RateLimitError
+from ..clients.rate_limiter import Priority, UpstreamScheduler, scaled_rate_limits
+from ..clients.circuit_breaker import CircuitOpenError
+from ..clients.recording import RecordingTransport, ReplayTransport
 from ..cache.redis_cache import RedisCache
+from ..cache.prewarm import CachePrewarmer
+from ..cache.chain_store import ChainFilter, ChainStore
+from ..cache.options_index import OptionsIndex
+from ..cache.symbol_master import SymbolMaster
+from ..cache.keys import (
+    QUOTE_TTL, BARS_TTL, OPTIONS_CHAIN_TTL, OPTIONS_EXPIRATIONS_TTL, OPTIONS_STRIKES_TTL, ORDER_BOOK_TTL,
+    QUOTE_MAX_STALE, BARS_MAX_STALE, OPTIONS_CHAIN_MAX_STALE, ORDER_BOOK_MAX_STALE,
+    quote_key, bars_key, options_chain_key, options_expirations_key, options_strikes_key, order_book_key,
+)
+from ..providers import (
+    CoinbaseProvider, MarketDataProvider, ProviderRouter, TradeStationProvider,
+    UnknownProvider, UnsupportedOperation,
+)
+from ..providers.base import CHANNELS
+from ..providers.models import bars_to_dicts
 from ..utils.market_hours import MarketHoursUtil
+from ..utils import metrics, tracing
+from ..utils.compression import CompressionMiddleware
+from ..utils.etag import content_etag, etag_matches, parse_etags
 
 # Load environment variables
 load_dotenv()
@@ -25,7 +50,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Market Data Service",
     description="Unified market data access for TradeStation, crypto exchanges, and more",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -37,54 +63,156 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/zstd for bodies of at least COMPRESSION_MIN_BYTES, per Accept-Encoding
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv('COMPRESSION_MIN_BYTES', '1024')))
+
+# Request latency by route and in-flight gauge (served at /metrics)
+metrics.instrument_app(app)
+
+# Request spans, continuing the caller's trace (exported when configured, see utils/tracing.py)
+tracing.instrument_app(app)
+
 # Initialize clients and cache
 ts_client: Optional[TradeStationClient] = None
 cache: Optional[RedisCache] = None
+chain_store: Optional[ChainStore] = None
+options_index: Optional[OptionsIndex] = None
+prewarmer: Optional[CachePrewarmer] = None
+symbol_master: Optional[SymbolMaster] = None
+providers: Optional[ProviderRouter] = None
+
+# Seconds without stream events before a keepalive line
+STREAM_KEEPALIVE = float(os.getenv('STREAM_KEEPALIVE_SECONDS', '15'))
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
-    global ts_client, cache
+    global ts_client, cache, chain_store, options_index, prewarmer, symbol_master, providers
     
     logger.info("Starting Market Data Service...")
     
+    tracing.setup_tracing("market-data-service")
+    
     # Initialize Redis cache
     redis_host = os.getenv('REDIS_HOST', '10.32.3.27')
     redis_port = int(os.getenv('REDIS_PORT', '6379'))
     cache = RedisCache(host=redis_host, port=redis_port)
+    options_index = OptionsIndex(cache)
+    chain_store = ChainStore(cache, index=options_index)
     
     # Initialize TradeStation client
     ts_client_id = os.getenv('TRADESTATION_CLIENT_ID')
     ts_client_secret = os.getenv('TRADESTATION_CLIENT_SECRET')
     
-    if ts_client_id and ts_client_secret:
-        ts_client = TradeStationClient(ts_client_id, ts_client_secret)
-        if ts_client.is_authenticated():
+    # Capture upstream responses to disk, or replay a capture instead of calling TradeStation
+    replay_path = os.getenv('MARKET_DATA_REPLAY_PATH')
+    capture_path = os.getenv('MARKET_DATA_CAPTURE_PATH')
+    transport = None
+    if replay_path:
+        transport = ReplayTransport(replay_path, speed=float(os.getenv('MARKET_DATA_REPLAY_SPEED', '1')))
+    elif capture_path:
+        transport = RecordingTransport(capture_path)
+    
+    if (ts_client_id and ts_client_secret) or replay_path:
+        ts_client = TradeStationClient(
+            ts_client_id or 'replay',
+            ts_client_secret or 'replay',
+            token_storage_path=os.getenv('TRADESTATION_TOKEN_PATH'),
+            scheduler=UpstreamScheduler(scaled_rate_limits(float(os.getenv('TRADESTATION_RATE_LIMIT_SCALE', '1')))),
+            base_url=os.getenv('TRADESTATION_API_URL'),
+            token_url=os.getenv('TRADESTATION_TOKEN_URL'),
+            transport=transport
+        )
+        if replay_path:
+            logger.info("TradeStation client replaying captured responses")
+        elif ts_client.is_authenticated():
             logger.info("TradeStation client authenticated")
+            ts_client.start_token_refresher()
         else:
             logger.warning("TradeStation client not authenticated. OAuth flow needed.")
     else:
         logger.warning("TradeStation credentials not configured")
     
+    # Providers by symbol namespace: coinbase:BTC-USD, crypto:BTC-USD (CRYPTO_PROVIDER), tradestation:AAPL
+    providers = ProviderRouter(default='tradestation', aliases={'crypto': os.getenv('CRYPTO_PROVIDER', 'coinbase')})
+    if ts_client:
+        providers.register(TradeStationProvider(ts_client))
+    if os.getenv('COINBASE_ENABLED', 'true').lower() == 'true':
+        providers.register(CoinbaseProvider(
+            base_url=os.getenv('COINBASE_API_URL'),
+            ws_url=os.getenv('COINBASE_WS_URL'),
+            rate_limit_scale=float(os.getenv('COINBASE_RATE_LIMIT_SCALE', '1'))
+        ))
+    
+    # Session-aware prewarming and refresh-ahead of hot keys
+    if ts_client and cache and cache.is_connected() and os.getenv('PREWARM_ENABLED', 'true').lower() == 'true':
+        watchlist = [s.strip().upper() for s in os.getenv('PREWARM_SYMBOLS', '').split(',') if s.strip()]
+        prewarmer = CachePrewarmer(
+            ts_client,
+            cache,
+            chain_store=chain_store,
+            watchlist=watchlist or None,
+            lead_seconds=int(os.getenv('PREWARM_LEAD_SECONDS', '300')),
+            max_dte=int(os.getenv('PREWARM_MAX_DTE', '60'))
+        )
+        prewarmer.start()
+    
+    # Local symbol search index, swept from TradeStation daily and kept on disk
+    if ts_client:
+        symbol_master = SymbolMaster(
+            ts_client,
+            path=os.getenv('SYMBOL_MASTER_PATH', str(Path.home() / ".market_data_symbols.json")),
+            asset_types=[s.strip() for s in os.getenv('SYMBOL_MASTER_ASSET_TYPES', 'STOCK').split(',') if s.strip()],
+            seeds=[s.strip() for s in os.getenv('SYMBOL_MASTER_SEEDS', '').split(',') if s.strip()] or None,
+            refresh_seconds=float(os.getenv('SYMBOL_MASTER_REFRESH_HOURS', '24')) * 3600
+        )
+        symbol_master.start()
+    
     logger.info("Market Data Service started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down Market Data Service...")
+    if prewarmer:
+        await prewarmer.stop()
+    if symbol_master:
+        await symbol_master.stop()
+    if providers:
+        await providers.close()
+    if ts_client:
+        await ts_client.close()
+    tracing.shutdown_tracing()
 
 # ==================== Health Check ====================
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    # Degraded: some upstream endpoint families are down and served from cache only
+    open_circuits = ts_client.breakers.open_families() if ts_client else []
+    provider_circuits = providers.open_circuits() if providers else []
     return {
-        "status": "healthy",
+        "status": "degraded" if open_circuits or provider_circuits else "healthy",
         "service": "market-data-service",
         "tradestation_authenticated": ts_client.is_authenticated() if ts_client else False,
-        "redis_connected": cache.is_connected() if cache else False
+        "redis_connected": cache.is_connected() if cache else False,
+        "prewarm": prewarmer.get_stats() if prewarmer else None,
+        "chain_store": chain_store.get_stats() if chain_store else None,
+        "options_index": options_index.get_stats() if options_index else None,
+        "symbol_master": symbol_master.get_stats() if symbol_master else None,
+        "stale_while_revalidate": {**swr_stats, "revalidating": len(_revalidating)},
+        "upstream_throttling": ts_client.scheduler.get_stats() if ts_client else None,
+        "circuit_breakers": ts_client.breakers.get_stats() if ts_client else None,
+        "upstream_capture": ts_client.transport.get_stats() if ts_client and ts_client.transport else None,
+        "providers": providers.get_stats() if providers else None
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics"""
+    return metrics.metrics_response()
+
 # ==================== Market Status ====================
 
 @app.get("/api/market/status")
@@ -92,31 +220,290 @@ async def get_market_status():
     """Get current market status"""
     return MarketHoursUtil.get_market_status()
 
+# ==================== Cached Fetch ====================
+
+# Background revalidations in flight, by cache key
+_revalidating: Dict[str, asyncio.Task] = {}
+swr_stats = {"hits": 0, "stale_served": 0, "misses": 0, "revalidations": 0,
+             "revalidation_errors": 0, "revalidations_skipped": 0, "degraded_served": 0}
+
+def _set_cache_headers(response: Optional[Response], status: str, age: Optional[float]):
+    """X-Cache (HIT, STALE, MISS, or LIVE from a stream) and the entry's Age in whole seconds"""
+    if response is None:
+        return
+    response.headers['X-Cache'] = status
+    response.headers['Age'] = str(int(age or 0))
+
+def _json_response(content: Any, request: Request, response: Optional[Response] = None,
+                   etag: Optional[str] = None) -> Response:
+    """
+    JSON response with an ETag, skipping FastAPI's encoder
+    
+    bytes are taken to be JSON already (straight from Redis or the chain
+    store) and sent as they are; anything else is serialized with orjson.
+    The ETag is a hash of the body unless one is passed, and a request whose
+    If-None-Match lists it gets an empty 304 instead. Headers set on the
+    endpoint's response (X-Cache, Age, ...) are kept.
+    """
+    body = content if isinstance(content, bytes) else orjson.dumps(content)
+    etag = etag or content_etag(body)
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        result = Response(status_code=304)
+    else:
+        result = Response(body, media_type="application/json")
+    result.headers['ETag'] = etag
+    if response is not None:
+        result.headers.raw.extend(response.headers.raw)
+    return result
+
+def _ndjson(item: Dict, **raw: bytes) -> bytes:
+    """One NDJSON line; raw values are JSON bytes appended as fields without re-encoding"""
+    line = orjson.dumps(item)
+    for field, value in raw.items():
+        separator = b',' if len(line) > 2 else b''
+        line = line[:-1] + separator + orjson.dumps(field) + b':' + value + b'}'
+    return line + b'\n'
+
+def _revalidate(cache_key: str, refresh) -> None:
+    """Run refresh() in the background unless cache_key is already being refreshed"""
+    if cache_key in _revalidating:
+        return
+    
+    async def run():
+        try:
+            with tracing.tracer.start_as_current_span("cache.revalidate", attributes={'cache.key': cache_key}):
+                await refresh()
+            swr_stats["revalidations"] += 1
+        except CircuitOpenError:
+            # Degraded mode: keep serving the cached copy
+            swr_stats["revalidations_skipped"] += 1
+        except Exception as e:
+            swr_stats["revalidation_errors"] += 1
+            logger.error(f"Background revalidation failed for {cache_key}: {e}")
+        finally:
+            _revalidating.pop(cache_key, None)
+    
+    _revalidating[cache_key] = asyncio.create_task(run())
+
+@tracing.traced("cache.fetch")
+async def _cached_fetch(cache_key: str, ttl: int, loader, use_cache: bool = True,
+                        max_stale: int = 0, response: Optional[Response] = None, raw: bool = False):
+    """
+    Serve cache_key from Redis, falling back to loader(priority) and caching the result
+    
+    Entries are stored for ttl + max_stale seconds. Past ttl they are still
+    served immediately (X-Cache: STALE) while a background request refreshes
+    them; only entries older than that make the caller wait on TradeStation.
+
+    Every access is reported to the prewarmer so frequently requested keys are
+    refreshed ahead of their TTL.
+    
+    With raw=True the value is returned as JSON bytes: cache hits exactly as
+    stored in Redis, without being decoded, and fresh data serialized once
+    for both Redis and the response.
+    """
+    if prewarmer:
+        prewarmer.track(cache_key, ttl, loader, max_stale=max_stale)
+    
+    async def fetch(priority: int):
+        data = await loader(priority)
+        if not data:
+            return None if raw else data
+        body = orjson.dumps(data)
+        if cache:
+            cache.set_raw(cache_key, body, ttl_seconds=ttl + max_stale)
+            if prewarmer:
+                prewarmer.mark_stored(cache_key, ttl)
+        return body if raw else data
+    
+    cache_get = (cache.get_raw_with_ttl if raw else cache.get_with_ttl) if cache else None
+    if use_cache and cache:
+        cached, remaining = cache_get(cache_key)
+        if cached:
+            age = ttl + max_stale - remaining if remaining is not None else 0.0
+            if age < ttl:
+                logger.debug(f"Cache hit: {cache_key}")
+                swr_stats["hits"] += 1
+                metrics.record_cache(cache_key, 'hit')
+                tracing.record_cache(cache_key, 'hit')
+                _set_cache_headers(response, 'HIT', age)
+                return cached
+            
+            logger.debug(f"Serving stale {cache_key} ({age:.1f}s old), revalidating")
+            swr_stats["stale_served"] += 1
+            metrics.record_cache(cache_key, 'stale')
+            tracing.record_cache(cache_key, 'stale')
+            _revalidate(cache_key, lambda: fetch(Priority.INTERACTIVE))
+            _set_cache_headers(response, 'STALE', age)
+            return cached
+    
+    swr_stats["misses"] += 1
+    metrics.record_cache(cache_key, 'miss')
+    tracing.record_cache(cache_key, 'miss')
+    try:
+        data = await fetch(Priority.INTERACTIVE)
+    except CircuitOpenError:
+        # Degraded mode: TradeStation is down, answer from cache if at all possible
+        cached, remaining = cache_get(cache_key) if cache and not use_cache else (None, None)
+        if not cached:
+            raise
+        swr_stats["degraded_served"] += 1
+        tracing.record_cache(cache_key, 'degraded')
+        _set_cache_headers(response, 'STALE', ttl + max_stale - remaining if remaining is not None else 0.0)
+        return cached
+    _set_cache_headers(response, 'MISS', 0)
+    return data
+
+def _unavailable(e: CircuitOpenError) -> HTTPException:
+    """TradeStation is down and nothing usable is cached"""
+    headers = {'Retry-After': str(int(e.retry_after) + 1)} if e.retry_after is not None else None
+    return HTTPException(status_code=503, detail=str(e), headers=headers)
+
+def _rate_limited(e: RateLimitError) -> HTTPException:
+    """Pass upstream throttling through as a 429 instead of a 500"""
+    headers = {'Retry-After': str(int(e.retry_after))} if e.retry_after else None
+    return HTTPException(status_code=429, detail=str(e), headers=headers)
+
+def _route(symbol: str) -> Tuple[MarketDataProvider, str]:
+    """The provider and native symbol for symbol's namespace (404 for an unknown one)"""
+    if not providers:
+        raise HTTPException(status_code=503, detail="Providers not available")
+    try:
+        return providers.resolve(symbol)
+    except UnknownProvider as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 # ==================== TradeStation Endpoints ====================
 
 @app.get("/api/quotes/{symbol}")
-async def get_quote(symbol: str, use_cache: bool = True):
-    """Get real-time quote for a symbol"""
+async def get_quote(symbol: str, request: Request, response: Response, use_cache: bool = True):
+    """
+    Get real-time quote for a symbol
+    
+    Quotes up to QUOTE_MAX_STALE seconds past their TTL are served
+    immediately (X-Cache: STALE, Age header) and refreshed in the background.
+    Like every cacheable response it carries an ETag; send it back in
+    If-None-Match to get a 304 while the quote is unchanged.
+    
+    Namespaced symbols (coinbase:BTC-USD, crypto:BTC-USD, tradestation:AAPL)
+    are answered by their provider in the normalized quote format; bare
+    symbols return TradeStation's own response.
+    
+    A comma-separated list of bare symbols (SPY,QQQ,IWM) is served symbol by
+    symbol from the same per-symbol cache keys, with one TradeStation call
+    for the symbols not cached.
+    """
+    if ProviderRouter.is_namespaced(symbol):
+        return await _provider_quote(symbol, request, response, use_cache)
     if not ts_client:
         raise HTTPException(status_code=503, detail="TradeStation client not available")
     
-    # Check cache first
-    cache_key = f"quote:{symbol}"
-    if use_cache and cache:
-        cached = cache.get(cache_key)
-        if cached:
-            logger.debug(f"Cache hit for quote: {symbol}")
-            return cached
+    try:
+        if ',' in symbol:
+            return await _quote_list(symbol, request, response, use_cache)
+        # Cache for 5 seconds (quotes change rapidly)
+        body = await _cached_fetch(
+            quote_key(symbol), QUOTE_TTL,
+            lambda priority: ts_client.get_quote(symbol, priority=priority),
+            use_cache, QUOTE_MAX_STALE, response, raw=True
+        )
+        return _json_response(body, request, response) if body else {"error": "Quote not found"}
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        logger.error(f"Error fetching quote for {symbol}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+class _QuoteBatch:
+    """
+    Quote loaders for the symbols of one request that share upstream calls
+    
+    Loaders started together (the cache misses of one list request) are
+    answered by a single TradeStation request per priority. Each symbol's
+    quote is returned in TradeStation's single-symbol shape, so it is cached
+    under its own quote_key exactly as a single-symbol request would be.
+    """
+    
+    def __init__(self):
+        self._pending: Dict[int, Dict[str, asyncio.Future]] = {}
+    
+    def loader(self, symbol: str):
+        return lambda priority: self._load(symbol, priority)
+    
+    async def _load(self, symbol: str, priority: int) -> Optional[Dict]:
+        pending = self._pending.setdefault(priority, {})
+        future = pending.get(symbol)
+        if future is None:
+            future = pending[symbol] = asyncio.get_running_loop().create_future()
+        if len(pending) == 1:
+            # First miss leads: let the request's other misses join before sending
+            await asyncio.sleep(0)
+            del self._pending[priority]
+            await self._fetch(pending, priority)
+        return await future
+    
+    @staticmethod
+    async def _fetch(pending: Dict[str, asyncio.Future], priority: int):
+        try:
+            data = await ts_client.get_quote(','.join(pending), priority=priority)
+            quotes = {str(quote.get('Symbol', '')).upper(): quote for quote in (data or {}).get('Quotes') or []}
+            for symbol, future in pending.items():
+                quote = quotes.get(symbol.upper())
+                future.set_result({'Quotes': [quote]} if quote else None)
+        except Exception as e:
+            # Raised by each symbol's loader, the leader's included
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+        except BaseException:
+            for future in pending.values():
+                future.cancel()
+            raise
+
+# Worst first, for the X-Cache of a quote list
+_CACHE_STATUS_ORDER = ('MISS', 'STALE', 'HIT')
+
+async def _quote_list(symbols: str, request: Request, response: Response, use_cache: bool):
+    """Quotes for comma-separated bare symbols, each cached under its own quote_key"""
+    symbols = list(dict.fromkeys(symbol.strip() for symbol in symbols.split(',') if symbol.strip()))
+    batch = _QuoteBatch()
+    statuses = [Response() for _ in symbols]
+    results = await asyncio.gather(*(
+        _cached_fetch(quote_key(symbol), QUOTE_TTL, batch.loader(symbol), use_cache, QUOTE_MAX_STALE, status)
+        for symbol, status in zip(symbols, statuses)
+    ))
+    
+    quotes = [quote for result in results for quote in (result or {}).get('Quotes') or []]
+    if not quotes:
+        return {"error": "Quote not found"}
+    worst = min((status.headers.get('X-Cache', 'MISS') for status in statuses), key=_CACHE_STATUS_ORDER.index)
+    _set_cache_headers(response, worst, max(float(status.headers.get('Age', 0)) for status in statuses))
+    return _json_response({'Quotes': quotes}, request, response)
+
+async def _provider_quote(symbol: str, request: Request, response: Response, use_cache: bool):
+    """Normalized quote from symbol's provider: streamed if live, else cached like TradeStation quotes"""
+    provider, native = _route(symbol)
+    live = provider.live_quote(native) if use_cache else None
+    if live:
+        _set_cache_headers(response, 'LIVE', 0)
+        return _json_response(live.to_dict(), request, response)
+    
+    async def load(priority: int):
+        quote = await provider.get_quote(native, priority=priority)
+        return quote.to_dict() if quote else None
     
-    # Fetch from API
     try:
-        data = await ts_client.get_quote(symbol)
-        
-        if data and cache:
-            # Cache for 5 seconds (quotes change rapidly)
-            cache.set(cache_key, data, ttl_seconds=5)
-        
-        return data or {"error": "Quote not found"}
+        body = await _cached_fetch(quote_key(provider.qualify(native)), QUOTE_TTL, load,
+                                   use_cache, QUOTE_MAX_STALE, response, raw=True)
+        return _json_response(body, request, response) if body else {"error": "Quote not found"}
+    except UnsupportedOperation as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
     except Exception as e:
         logger.error(f"Error fetching quote for {symbol}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -124,97 +511,563 @@ async def get_quote(symbol: str, use_cache: bool = True):
 @app.get("/api/bars/{symbol}")
 async def get_bars(
     symbol: str,
+    request: Request,
+    response: Response,
     interval: str = "1",
     unit: str = "Minute",
     bars_back: int = Query(100, ge=1, le=1000),
     start_date: Optional[str] = None,
     use_cache: bool = True
 ):
-    """Get historical bars"""
+    """
+    Get historical bars (served stale up to BARS_MAX_STALE while revalidating)
+    
+    Namespaced symbols get their provider's bars, oldest first, in the
+    normalized bar format.
+    """
+    if ProviderRouter.is_namespaced(symbol):
+        return await _provider_bars(symbol, request, response, interval, unit, bars_back, start_date, use_cache)
     if not ts_client:
         raise HTTPException(status_code=503, detail="TradeStation client not available")
     
-    # Check cache
-    cache_key = f"bars:{symbol}:{interval}:{unit}:{bars_back}:{start_date}"
-    if use_cache and cache:
-        cached = cache.get(cache_key)
-        if cached:
-            logger.debug(f"Cache hit for bars: {symbol}")
-            return cached
+    try:
+        # Cache for 60 seconds (bars update less frequently)
+        body = await _cached_fetch(
+            bars_key(symbol, interval, unit, bars_back, start_date), BARS_TTL,
+            lambda priority: ts_client.get_bars(symbol, interval, unit, bars_back, start_date, priority=priority),
+            use_cache, BARS_MAX_STALE, response, raw=True
+        )
+        return _json_response(body, request, response) if body else []
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        logger.error(f"Error fetching bars for {symbol}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _provider_bars(symbol: str, request: Request, response: Response, interval: str, unit: str,
+                         bars_back: int, start_date: Optional[str], use_cache: bool):
+    provider, native = _route(symbol)
+    
+    async def load(priority: int):
+        bars = await provider.get_bars(native, interval, unit, bars_back, start_date, priority=priority)
+        return bars_to_dicts(bars) if bars else None
     
-    # Fetch from API
     try:
-        data = await ts_client.get_bars(symbol, interval, unit, bars_back, start_date)
-        
-        if data and cache:
-            # Cache for 60 seconds (bars update less frequently)
-            cache.set(cache_key, data, ttl_seconds=60)
-        
-        return data or []
+        body = await _cached_fetch(bars_key(provider.qualify(native), interval, unit, bars_back, start_date),
+                                   BARS_TTL, load, use_cache, BARS_MAX_STALE, response, raw=True)
+        return _json_response(body, request, response) if body else []
+    except UnsupportedOperation as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
     except Exception as e:
         logger.error(f"Error fetching bars for {symbol}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ==================== Providers and Streaming ====================
+
+@app.get("/api/providers")
+async def list_providers():
+    """Registered providers, their namespaces and what they serve"""
+    if not providers:
+        raise HTTPException(status_code=503, detail="Providers not available")
+    return {"default": providers.default, "providers": providers.describe()}
+
+@app.get("/api/orderbook/{symbol}")
+async def get_order_book(
+    symbol: str,
+    request: Request,
+    response: Response,
+    depth: int = Query(10, ge=1, le=50),
+    use_cache: bool = True
+):
+    """
+    Aggregated order book (best depth levels per side) for a namespaced symbol
+    
+    While the symbol is streamed the book is read from the stream (X-Cache:
+    LIVE); otherwise it is cached for ORDER_BOOK_TTL and served stale up to
+    ORDER_BOOK_MAX_STALE while revalidating.
+    """
+    provider, native = _route(symbol)
+    live = provider.live_order_book(native, depth) if use_cache else None
+    if live:
+        _set_cache_headers(response, 'LIVE', 0)
+        return _json_response(live.to_dict(), request, response)
+    
+    async def load(priority: int):
+        book = await provider.get_order_book(native, depth, priority=priority)
+        return book.to_dict() if book else None
+    
+    try:
+        body = await _cached_fetch(order_book_key(provider.qualify(native), depth), ORDER_BOOK_TTL, load,
+                                   use_cache, ORDER_BOOK_MAX_STALE, response, raw=True)
+        if not body:
+            raise HTTPException(status_code=404, detail=f"No order book for {symbol}")
+        return _json_response(body, request, response)
+    except HTTPException:
+        raise
+    except UnsupportedOperation as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        logger.error(f"Error fetching order book for {symbol}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/stream")
+async def stream_market_data(
+    symbols: str = Query(..., description="Comma-separated namespaced symbols, e.g. coinbase:BTC-USD,coinbase:ETH-USD"),
+    channels: str = Query("quotes,book", description="quotes and/or book"),
+    depth: int = Query(10, ge=1, le=50, description="Levels per side in book events")
+):
+    """
+    Stream quote and order book updates as NDJSON
+    
+    Each provider streams over one upstream connection shared by every
+    client, so opening more streams costs no extra upstream connections.
+    Lines are {"type": "quote", ...} and {"type": "book", ...} in the
+    normalized formats (the current state first, where already known),
+    {"type": "status", ...} when a provider connects or reconnects, and
+    {"type": "keepalive"} after STREAM_KEEPALIVE seconds without events.
+    A client that falls behind skips to the latest updates.
+    """
+    wanted = [c.strip().lower() for c in channels.split(',') if c.strip()]
+    unknown = set(wanted) - set(CHANNELS)
+    if unknown or not wanted:
+        raise HTTPException(status_code=400, detail=f"channels must be among {', '.join(CHANNELS)}")
+    
+    # Native symbols by provider
+    routed: Dict[str, Tuple[MarketDataProvider, List[str]]] = {}
+    for symbol in [s.strip() for s in symbols.split(',') if s.strip()]:
+        provider, native = _route(symbol)
+        routed.setdefault(provider.name, (provider, []))[1].append(native)
+    if not routed:
+        raise HTTPException(status_code=400, detail="No symbols given")
+    
+    subscriptions = []
+    try:
+        for provider, natives in routed.values():
+            subscriptions.append(await provider.subscribe(natives, wanted))
+    except UnsupportedOperation as e:
+        for subscription in subscriptions:
+            subscription.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    def trim(event: Dict) -> bytes:
+        if event.get('type') == 'book':
+            event = {**event, 'bids': event['bids'][:depth], 'asks': event['asks'][:depth]}
+        return _ndjson(event)
+    
+    async def stream():
+        pending = {asyncio.ensure_future(s.get()): s for s in subscriptions}
+        try:
+            while True:
+                done, _ = await asyncio.wait(pending, timeout=STREAM_KEEPALIVE,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    yield _ndjson({'type': 'keepalive'})
+                    continue
+                for task in done:
+                    subscription = pending.pop(task)
+                    pending[asyncio.ensure_future(subscription.get())] = subscription
+                    yield trim(task.result())
+        finally:
+            for task in pending:
+                task.cancel()
+            for subscription in subscriptions:
+                subscription.close()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+def chain_filter_params(
+    option_type: Optional[str] = Query(None, description="C/call or P/put"),
+    moneyness: Optional[str] = Query(None, description="otm or itm, relative to spot"),
+    min_strike_pct: Optional[float] = Query(None, description="Lowest strike as % from spot, e.g. -10"),
+    max_strike_pct: Optional[float] = Query(None, description="Highest strike as % from spot, e.g. 5"),
+    min_bid: Optional[float] = Query(None, ge=0),
+    min_open_interest: Optional[float] = Query(None, ge=0),
+    fields: Optional[str] = Query(None, description="Comma-separated option fields to return")
+) -> ChainFilter:
+    """Filter and projection query parameters shared by the chain endpoints"""
+    if option_type is not None:
+        option_type = {'c': 'C', 'call': 'C', 'p': 'P', 'put': 'P'}.get(option_type.lower())
+        if option_type is None:
+            raise HTTPException(status_code=400, detail="option_type must be C, P, call or put")
+    if moneyness is not None:
+        moneyness = moneyness.lower()
+        if moneyness not in ('otm', 'itm'):
+            raise HTTPException(status_code=400, detail="moneyness must be otm or itm")
+    field_list = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+    return ChainFilter(option_type, moneyness, min_strike_pct, max_strike_pct,
+                       min_bid, min_open_interest, field_list)
+
+async def _spot_price(symbol: str, use_cache: bool = True) -> Optional[float]:
+    """Last trade price of the underlying (from the quote cache)"""
+    quote = await _cached_fetch(
+        quote_key(symbol), QUOTE_TTL,
+        lambda priority: ts_client.get_quote(symbol, priority=priority),
+        use_cache, QUOTE_MAX_STALE
+    )
+    return _last_price(quote)
+
+def _last_price(quote: Optional[Dict]) -> Optional[float]:
+    quotes = (quote or {}).get('Quotes') or []
+    if quotes and quotes[0].get('Last') is not None:
+        return float(quotes[0]['Last'])
+    return None
+
+@tracing.traced("cache.load_chain")
+async def _load_chain(symbol: str, expiration: Optional[str], use_cache: bool = True,
+                      response: Optional[Response] = None) -> Optional[int]:
+    """
+    Make sure the chain store holds a chain, refreshing it from TradeStation if stale
+    
+    A chain past its TTL but within OPTIONS_CHAIN_MAX_STALE is served as is
+    and refreshed in the background.
+    
+    Returns the chain version (read the chain itself from chain_store), or
+    None if there is no chain.
+    """
+    cache_key = options_chain_key(symbol, expiration)
+    loader = lambda priority: ts_client.get_options_chain(symbol, expiration, priority=priority)
+    writer = lambda data: chain_store.apply(symbol, expiration, data)
+    if prewarmer:
+        # The chain lives in the store, not under cache_key, so its age comes from there
+        prewarmer.track(cache_key, OPTIONS_CHAIN_TTL, loader, writer,
+                        age=lambda: chain_store.age(symbol, expiration))
+    
+    async def fetch(priority: int) -> Optional[int]:
+        data = await loader(priority)
+        if not data:
+            return None
+        # Only the rows that changed since the last refresh are written
+        version = writer(data)
+        if prewarmer:
+            prewarmer.mark_stored(cache_key, OPTIONS_CHAIN_TTL)
+        return version
+    
+    # Serve from the chain store while fresh (60 seconds during market hours)
+    age = chain_store.age(symbol, expiration)
+    if use_cache and age is not None and age < OPTIONS_CHAIN_TTL + OPTIONS_CHAIN_MAX_STALE:
+        if age < OPTIONS_CHAIN_TTL:
+            logger.debug(f"Cache hit for options chain: {symbol}")
+            swr_stats["hits"] += 1
+            metrics.record_cache(cache_key, 'hit')
+            tracing.record_cache(cache_key, 'hit')
+            _set_cache_headers(response, 'HIT', age)
+        else:
+            swr_stats["stale_served"] += 1
+            metrics.record_cache(cache_key, 'stale')
+            tracing.record_cache(cache_key, 'stale')
+            _revalidate(cache_key, lambda: fetch(Priority.INTERACTIVE))
+            _set_cache_headers(response, 'STALE', age)
+        return chain_store.version(symbol, expiration)
+    
+    swr_stats["misses"] += 1
+    metrics.record_cache(cache_key, 'miss')
+    tracing.record_cache(cache_key, 'miss')
+    try:
+        version = await fetch(Priority.INTERACTIVE)
+    except CircuitOpenError:
+        # Degraded mode: serve the last stored chain however old it is
+        if age is None:
+            raise
+        swr_stats["degraded_served"] += 1
+        tracing.record_cache(cache_key, 'degraded')
+        _set_cache_headers(response, 'STALE', age)
+        return chain_store.version(symbol, expiration)
+    _set_cache_headers(response, 'MISS', 0)
+    return version
+
+async def _list_expirations(symbol: str, use_cache: bool = True) -> bool:
+    """
+    Make sure the options index holds a recent expiration list for symbol
+    
+    The list is parsed and held in memory, so only a symbol not listed within
+    OPTIONS_EXPIRATIONS_TTL goes to the cached TradeStation response (or
+    TradeStation itself). Returns False if TradeStation has no expirations.
+    """
+    cache_key = options_expirations_key(symbol)
+    if use_cache and options_index.is_listed(symbol):
+        swr_stats["hits"] += 1
+        metrics.record_cache(cache_key, 'hit')
+        return True
+    
+    # Cache for 24 hours (expirations don't change often)
+    expirations = await _cached_fetch(
+        cache_key, OPTIONS_EXPIRATIONS_TTL,
+        lambda priority: ts_client.get_options_expirations(symbol, priority=priority),
+        use_cache
+    )
+    if not expirations:
+        return False
+    options_index.record_expirations(symbol, expirations)
+    return True
+
 @app.get("/api/options/chain/{symbol}")
 async def get_options_chain(
     symbol: str,
+    request: Request,
+    response: Response,
     expiration: Optional[str] = None,
-    use_cache: bool = True
+    use_cache: bool = True,
+    chain_filter: ChainFilter = Depends(chain_filter_params)
 ):
-    """Get options chain for a symbol"""
+    """
+    Get options chain for a symbol
+    
+    The chain version is returned in the X-Chain-Version header; pass it to
+    /api/options/chain/{symbol}/changes to receive only what moved since.
+    
+    Filter parameters (option_type, moneyness, strike range relative to spot,
+    min_bid, min_open_interest) and a fields projection are applied to the
+    cached chain, so only the rows and fields the caller needs are sent.
+    An unfiltered chain is sent as serialized once per refresh.
+    """
     if not ts_client:
         raise HTTPException(status_code=503, detail="TradeStation client not available")
     
-    # Check cache
-    cache_key = f"options_chain:{symbol}:{expiration}"
-    if use_cache and cache:
-        cached = cache.get(cache_key)
-        if cached:
-            logger.debug(f"Cache hit for options chain: {symbol}")
-            return cached
-    
-    # Fetch from API
     try:
-        data = await ts_client.get_options_chain(symbol, expiration)
+        version = await _load_chain(symbol, expiration, use_cache, response)
+        if version is None:
+            return {"error": "Options chain not found"}
         
-        if data and cache:
-            # Cache for 60 seconds (options chains update frequently during market hours)
-            cache.set(cache_key, data, ttl_seconds=60)
+        response.headers['X-Chain-Version'] = str(version)
+        if chain_filter.is_empty():
+            return _json_response(chain_store.get_json(symbol, expiration), request, response,
+                                  etag=chain_store.get_etag(symbol, expiration))
         
-        return data or {"error": "Options chain not found"}
+        spot = await _spot_price(symbol, use_cache) if chain_filter.needs_spot() else None
+        if chain_filter.needs_spot() and spot is None:
+            raise HTTPException(status_code=503, detail=f"Spot price not available for {symbol}")
+        return _json_response(chain_store.query(symbol, expiration, chain_filter, spot), request, response)
+    except HTTPException:
+        raise
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
     except Exception as e:
         logger.error(f"Error fetching options chain for {symbol}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/options/expirations/{symbol}")
-async def get_options_expirations(symbol: str, use_cache: bool = True):
-    """Get available option expiration dates"""
+@app.get("/api/options/chain/{symbol}/changes")
+async def get_options_chain_changes(
+    symbol: str,
+    request: Request,
+    since_version: int = Query(0, ge=0),
+    expiration: Optional[str] = None
+):
+    """
+    Get field-level changes to an options chain since a version
+    
+    Returns merged 'added' rows, 'changed' fields per row key and 'removed'
+    row keys. If since_version is too old the full chain is returned with
+    full=true. The chain is refreshed from TradeStation first if stale.
+    """
     if not ts_client:
         raise HTTPException(status_code=503, detail="TradeStation client not available")
     
-    # Check cache
-    cache_key = f"options_expirations:{symbol}"
-    if use_cache and cache:
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
-    
-    # Fetch from API
     try:
-        data = await ts_client.get_options_expirations(symbol)
+        await _load_chain(symbol, expiration)
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        logger.error(f"Error refreshing options chain for {symbol}: {e}")
+    
+    changes = chain_store.changes_since(symbol, expiration, since_version)
+    if changes is None:
+        raise HTTPException(status_code=404, detail="Options chain not found")
+    return _json_response(changes, request)
+
+@app.get("/api/options/chains")
+async def get_options_chains_bulk(
+    request: Request,
+    symbols: str = Query(..., min_length=1, description="Comma-separated underlying symbols"),
+    min_dte: int = Query(0, ge=0),
+    max_dte: int = Query(60, ge=0),
+    max_expirations: int = Query(3, ge=1, le=50),
+    include_quotes: bool = False,
+    use_cache: bool = True,
+    chain_filter: ChainFilter = Depends(chain_filter_params)
+):
+    """
+    Get chains for several symbols and every expiration in a DTE window
+    
+    Expirations are resolved here, missing chains are fetched from
+    TradeStation concurrently, and results are streamed as NDJSON, one line
+    per item as soon as it is ready. The chain filter and projection
+    parameters apply to every chain, with strikes relative to each symbol's
+    own spot price:
         
-        if data and cache:
-            # Cache for 24 hours (expirations don't change often)
-            cache.set(cache_key, data, ttl_seconds=86400)
+        {"type": "expirations", "symbol": ..., "expirations": [{"expiration": ..., "dte": ...}]}
+        {"type": "quote", "symbol": ...,  "quote": {...}}             (include_quotes)
+        {"type": "chain", "symbol": ..., "expiration": ..., "dte": ..., "version": ..., "age": ..., "etag": ..., "chain": {...}}
+        {"type": "error", "symbol": ..., "expiration": ..., "detail": ...}
+    
+    Each symbol's expirations line (the chains that will follow) and quote
+    are always sent before any chain of the same symbol.
+    
+    Every chain line carries the chain's ETag. Chains whose ETag is listed in
+    If-None-Match are sent without the "chain" field and with
+    "not_modified": true, so a caller holding them only receives what changed.
+    """
+    if not ts_client:
+        raise HTTPException(status_code=503, detail="TradeStation client not available")
+    
+    symbol_list = list(dict.fromkeys(s.strip().upper() for s in symbols.split(',') if s.strip()))
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="No symbols given")
+    known_etags = parse_etags(request.headers.get('if-none-match'))
+    
+    async def resolve_expirations(symbol: str) -> List[Tuple[str, int]]:
+        if not await _list_expirations(symbol, use_cache):
+            return []
+        return (options_index.select(symbol, min_dte, max_dte) or [])[:max_expirations]
+    
+    async def fetch_quote(symbol: str) -> Dict:
+        try:
+            quote = await _cached_fetch(
+                quote_key(symbol), QUOTE_TTL,
+                lambda priority: ts_client.get_quote(symbol, priority=priority),
+                use_cache, QUOTE_MAX_STALE
+            )
+            if quote:
+                return {"type": "quote", "symbol": symbol, "quote": quote}
+            return {"type": "error", "symbol": symbol, "detail": "Quote not found"}
+        except Exception as e:
+            return {"type": "error", "symbol": symbol, "detail": str(e)}
+    
+    async def fetch_chain(symbol: str, expiration: str, dte: int, spot: Optional[float]) -> bytes:
+        try:
+            version = await _load_chain(symbol, expiration, use_cache)
+            if version is None:
+                return _ndjson({"type": "error", "symbol": symbol, "expiration": expiration,
+                                "detail": "Options chain not found"})
+            if chain_filter.is_empty():
+                # Serialized and hashed once per refresh, shared by every request
+                chain = chain_store.get_json(symbol, expiration)
+                etag = chain_store.get_etag(symbol, expiration)
+            elif chain_filter.needs_spot() and spot is None:
+                return _ndjson({"type": "error", "symbol": symbol, "expiration": expiration,
+                                "detail": "Spot price not available"})
+            else:
+                chain = orjson.dumps(chain_store.query(symbol, expiration, chain_filter, spot))
+                etag = content_etag(chain)
+            age = chain_store.age(symbol, expiration)
+            item = {"type": "chain", "symbol": symbol, "expiration": expiration,
+                    "dte": dte, "version": version, "age": round(age or 0.0, 1), "etag": etag}
+            if etag in known_etags:
+                return _ndjson({**item, "not_modified": True})
+            return _ndjson(item, chain=chain)
+        except Exception as e:
+            return _ndjson({"type": "error", "symbol": symbol, "expiration": expiration, "detail": str(e)})
+    
+    async def stream():
+        # Quotes and expiration lookups first (mostly cache hits), then all chains at once
+        lookups = await asyncio.gather(
+            *(resolve_expirations(symbol) for symbol in symbol_list),
+            *(fetch_quote(symbol) for symbol in symbol_list if include_quotes),
+            return_exceptions=True
+        )
+        quotes = lookups[len(symbol_list):]
+        
+        # Spot prices for strike filters, reusing the quotes already fetched
+        spots: Dict[str, Optional[float]] = {}
+        if chain_filter.needs_spot():
+            for item in quotes:
+                if item.get('type') == 'quote':
+                    spots[item['symbol']] = _last_price(item['quote'])
+            missing = [symbol for symbol in symbol_list if spots.get(symbol) is None]
+            prices = await asyncio.gather(*(_spot_price(symbol, use_cache) for symbol in missing),
+                                          return_exceptions=True)
+            for symbol, price in zip(missing, prices):
+                spots[symbol] = None if isinstance(price, Exception) else price
+        
+        tasks = []
+        for symbol, expirations in zip(symbol_list, lookups[:len(symbol_list)]):
+            if isinstance(expirations, Exception):
+                yield _ndjson({"type": "error", "symbol": symbol, "detail": str(expirations)})
+                continue
+            tasks.extend(fetch_chain(symbol, expiration, dte, spots.get(symbol)) for expiration, dte in expirations)
+            yield _ndjson({"type": "expirations", "symbol": symbol,
+                           "expirations": [{"expiration": expiration, "dte": dte}
+                                           for expiration, dte in expirations]})
         
-        return data or []
+        for quote in quotes:
+            yield _ndjson(quote)
+        
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/api/options/expirations/{symbol}")
+async def get_options_expirations(symbol: str, request: Request, use_cache: bool = True):
+    """Get available option expiration dates"""
+    if not ts_client:
+        raise HTTPException(status_code=503, detail="TradeStation client not available")
+    
+    try:
+        if not await _list_expirations(symbol, use_cache):
+            return []
+        return _json_response(options_index.expirations(symbol), request)
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
     except Exception as e:
         logger.error(f"Error fetching expirations for {symbol}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/options/index/{symbol}")
+async def get_options_index(
+    symbol: str,
+    request: Request,
+    min_dte: int = Query(0, ge=0),
+    max_dte: Optional[int] = Query(None, ge=0),
+    use_cache: bool = True
+):
+    """
+    Expirations in a DTE window with their type and strike range
+    
+    Answered from the options index, so callers can pick expirations by DTE
+    in one request instead of an expirations lookup plus one strikes lookup
+    per expiration. Strike ranges are only present for expirations whose
+    chain has been fetched:
+        
+        {"symbol": ..., "listed_at": ..., "expirations": [
+            {"expiration": ..., "dte": ..., "type": ..., "strikes": ..., "min_strike": ..., "max_strike": ...}]}
+    """
+    if not ts_client:
+        raise HTTPException(status_code=503, detail="TradeStation client not available")
+    
+    try:
+        if not await _list_expirations(symbol, use_cache):
+            raise HTTPException(status_code=404, detail=f"No option expirations for {symbol}")
+        return _json_response(options_index.describe(symbol, min_dte, max_dte), request)
+    except HTTPException:
+        raise
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        logger.error(f"Error fetching options index for {symbol}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/options/strikes/{symbol}")
 async def get_options_strikes(
     symbol: str,
+    request: Request,
     expiration: str,
     use_cache: bool = True
 ):
@@ -222,22 +1075,31 @@ async def get_options_strikes(
     if not ts_client:
         raise HTTPException(status_code=503, detail="TradeStation client not available")
     
-    # Check cache
-    cache_key = f"options_strikes:{symbol}:{expiration}"
-    if use_cache and cache:
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
-    
-    # Fetch from API
     try:
-        data = await ts_client.get_options_strikes(symbol, expiration)
+        cache_key = options_strikes_key(symbol, expiration)
+        strikes = options_index.strikes(symbol, expiration) if use_cache else None
+        if strikes is not None:
+            swr_stats["hits"] += 1
+            metrics.record_cache(cache_key, 'hit')
+            return _json_response(strikes, request)
         
-        if data and cache:
-            # Cache for 24 hours
-            cache.set(cache_key, data, ttl_seconds=86400)
+        # A chain lists every strike of its expiration, and is usually what the caller asks for next
+        if await _load_chain(symbol, expiration, use_cache) is not None:
+            strikes = options_index.strikes(symbol, expiration)
+            if strikes is not None:
+                return _json_response(strikes, request)
         
-        return data or []
+        # Cache for 24 hours
+        body = await _cached_fetch(
+            cache_key, OPTIONS_STRIKES_TTL,
+            lambda priority: ts_client.get_options_strikes(symbol, expiration, priority=priority),
+            use_cache, raw=True
+        )
+        return _json_response(body, request) if body else []
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
     except Exception as e:
         logger.error(f"Error fetching strikes for {symbol}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -245,15 +1107,26 @@ async def get_options_strikes(
 @app.get("/api/symbols/search")
 async def search_symbols(
     query: str = Query(..., min_length=1),
-    asset_type: str = "STOCK"
+    asset_type: str = "STOCK",
+    limit: int = Query(20, ge=1, le=100),
+    use_cache: bool = True
 ):
-    """Search for symbols"""
-    if not ts_client:
+    """
+    Search for symbols by prefix of the symbol or its name, or by approximate match
+    
+    Answered from the local symbol master; TradeStation is only asked when
+    nothing matches locally. asset_type=ALL searches every asset type.
+    """
+    if not symbol_master:
         raise HTTPException(status_code=503, detail="TradeStation client not available")
     
     try:
-        data = await ts_client.search_symbols(query, asset_type)
-        return data or []
+        asset_type = None if asset_type.upper() == 'ALL' else asset_type
+        return await symbol_master.lookup(query, asset_type, limit, use_cache)
+    except RateLimitError as e:
+        raise _rate_limited(e)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
     except Exception as e:
         logger.error(f"Error searching symbols: {e}")
         raise HTTPException(status_code=500, detail=str(e))
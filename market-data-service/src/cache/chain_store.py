@@ -0,0 +1,556 @@
+"""
+Options chain store with field-level deltas
+
+Each (symbol, expiration) chain is kept as a canonical strike table: one row
+per option contract, keyed by contract. When a fresh chain arrives from
+TradeStation it is diffed against the table and only the changed fields are
+recorded as a versioned delta. Redis receives just the changed rows, and
+clients can ask for "changes since version V" instead of refetching the
+whole chain.
+
+Chains are held in memory least recently used first: past max_chains, or
+idle for max_idle seconds, the oldest are evicted (they rehydrate from Redis
+on the next read), and chains whose expiration has passed are dropped once a
+day.
+
+Redis layout per chain:
+    options_chain_rows:{symbol}:{expiration}    hash  row key -> option quote
+    options_chain_meta:{symbol}:{expiration}    JSON  version, fetch time, top-level fields
+    options_chain_deltas:{symbol}:{expiration}  list  recent deltas, newest first
+"""
+
+import logging
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from .options_index import OptionsIndex
+from .redis_cache import RedisCache
+from ..utils.etag import content_etag
+from ..utils.expirations import parse_expiration
+
+logger = logging.getLogger(__name__)
+
+# Persisted rows outlive the freshness TTL so a restart can resume from them
+PERSIST_TTL = 86400
+
+ROWS_FIELD = 'OptionQuotes'
+
+# TradeStation reports open interest under either name depending on the feed
+OPEN_INTEREST_FIELDS = ('OpenInterest', 'DailyOpenInterest')
+
+
+@dataclass
+class ChainFilter:
+    """
+    Row filter and field projection for chain queries
+    
+    Strike percentages are relative to the underlying's spot price, e.g.
+    min_strike_pct=-10 keeps strikes at or above 90% of spot. Moneyness 'otm'
+    keeps puts at or below spot and calls at or above it ('itm' the reverse).
+    """
+    option_type: Optional[str] = None
+    moneyness: Optional[str] = None
+    min_strike_pct: Optional[float] = None
+    max_strike_pct: Optional[float] = None
+    min_bid: Optional[float] = None
+    min_open_interest: Optional[float] = None
+    fields: Optional[List[str]] = None
+    
+    def needs_spot(self) -> bool:
+        return (self.moneyness is not None or self.min_strike_pct is not None
+                or self.max_strike_pct is not None)
+    
+    def is_empty(self) -> bool:
+        return not (self.needs_spot() or self.option_type or self.min_bid is not None
+                    or self.min_open_interest is not None or self.fields)
+    
+    def strike_bounds(self, option_type: str, spot: Optional[float]) -> Tuple[Optional[float], Optional[float]]:
+        """(min_strike, max_strike) for one option type"""
+        min_strike = max_strike = None
+        if spot is None:
+            return min_strike, max_strike
+        if self.min_strike_pct is not None:
+            min_strike = spot * (1 + self.min_strike_pct / 100)
+        if self.max_strike_pct is not None:
+            max_strike = spot * (1 + self.max_strike_pct / 100)
+        
+        below_spot = (self.moneyness == 'otm') == (option_type == 'P')
+        if self.moneyness and below_spot:
+            max_strike = spot if max_strike is None else min(max_strike, spot)
+        elif self.moneyness:
+            min_strike = spot if min_strike is None else max(min_strike, spot)
+        return min_strike, max_strike
+
+
+def _option_type(value: Any) -> str:
+    """'C' or 'P' for any spelling of the option type ('Call', 'put', ...)"""
+    return str(value or '')[:1].upper()
+
+
+def _row_key(row: Dict, index: int) -> str:
+    """Stable identity for an option row"""
+    if row.get('Symbol'):
+        return str(row['Symbol'])
+    if 'Strike' in row and 'OptionType' in row:
+        return f"{row.get('Expiration', '')}|{row['OptionType']}|{row['Strike']}"
+    return f"#{index}"
+
+
+# Placeholder for fields a row doesn't have
+_MISSING = object()
+
+
+class _Chain:
+    """
+    Canonical strike table plus recent deltas for one chain
+
+    Rows are stored compactly as value tuples aligned to one field schema
+    shared by the whole chain, rather than as a dict per row repeating every
+    key. Unchanged rows are detected with a single tuple comparison. The
+    serialized chain and its ETag are kept until the next refresh, so serving
+    an unfiltered chain doesn't rebuild, re-encode or re-hash every row.
+    """
+    
+    __slots__ = ('fields', '_positions', 'rows', 'meta', 'version', 'fetched_at', 'accessed_at', 'deltas',
+                 '_index', '_json', '_etag')
+
+    def __init__(self, max_deltas: int):
+        self.fields: Tuple[str, ...] = ()
+        self._positions: Dict[str, int] = {}
+        self.rows: Dict[str, tuple] = {}
+        self.meta: Dict[str, Any] = {}
+        self.version = 0
+        self.fetched_at = 0.0
+        self.accessed_at = time.monotonic()
+        self.deltas: Deque[Dict] = deque(maxlen=max_deltas)
+        self._index: Optional[Dict[str, Tuple[List[float], List[tuple]]]] = None
+        self._json: Optional[bytes] = None
+        self._etag: Optional[str] = None
+    
+    def extend_schema(self, rows: Iterable[Dict]):
+        """Append fields not seen before (existing rows read them as missing)"""
+        for row in rows:
+            for field in row:
+                if field not in self._positions:
+                    self._positions[field] = len(self.fields)
+                    self.fields += (field,)
+    
+    def encode(self, row: Dict) -> tuple:
+        return tuple(row.get(field, _MISSING) for field in self.fields)
+    
+    def decode(self, values: tuple) -> Dict:
+        return {field: value for field, value in zip(self.fields, values) if value is not _MISSING}
+    
+    def value(self, values: tuple, field: str, default: Any = None) -> Any:
+        position = self._positions.get(field)
+        if position is None or position >= len(values) or values[position] is _MISSING:
+            return default
+        return values[position]
+    
+    def pad(self, values: tuple) -> tuple:
+        """Widen a row encoded before the schema grew"""
+        missing = len(self.fields) - len(values)
+        return values + (_MISSING,) * missing if missing else values
+    
+    def index(self) -> Dict[str, Tuple[List[float], List[tuple]]]:
+        """
+        Rows per option type ('C', 'P') sorted by numeric strike (built once per version)
+
+        TradeStation sends strikes as strings, which would sort '100' before '80'.
+        """
+        if self._index is None:
+            by_type: Dict[str, List[Tuple[float, tuple]]] = {}
+            for values in self.rows.values():
+                strike = self.value(values, 'Strike')
+                if strike is not None:
+                    option_type = _option_type(self.value(values, 'OptionType'))
+                    by_type.setdefault(option_type, []).append((float(strike), values))
+            self._index = {}
+            for option_type, pairs in by_type.items():
+                pairs.sort(key=lambda pair: pair[0])
+                self._index[option_type] = ([strike for strike, _ in pairs], [values for _, values in pairs])
+        return self._index
+
+    def snapshot(self) -> Dict:
+        """Chain in TradeStation's response shape"""
+        return {**self.meta, ROWS_FIELD: [self.decode(values) for values in self.rows.values()]}
+    
+    def to_json(self) -> bytes:
+        """snapshot() as JSON (serialized once per refresh)"""
+        if self._json is None:
+            self._json = orjson.dumps(self.snapshot())
+        return self._json
+    
+    def etag(self) -> str:
+        """Content hash of to_json()"""
+        if self._etag is None:
+            self._etag = content_etag(self.to_json())
+        return self._etag
+
+
+class ChainStore:
+    """Versioned option chains with delta encoding between refreshes"""
+
+    def __init__(self, cache: Optional[RedisCache] = None, max_deltas: int = 64,
+                 index: Optional[OptionsIndex] = None, max_chains: int = 1000,
+                 max_idle: float = 3600.0):
+        """
+        Args:
+            cache: Redis cache chains are persisted to and rehydrated from
+            max_deltas: Deltas retained per chain
+            index: Expirations and strikes index fed from every chain
+            max_chains: Chains held in memory before the least recently used is evicted
+            max_idle: Seconds since its last read or write before a chain is evicted
+        """
+        self.cache = cache
+        self.max_deltas = max_deltas
+        # Expirations and strikes are indexed from every chain that comes through
+        self.index = index
+        self.max_chains = max_chains
+        self.max_idle = max_idle
+        # Least recently used first
+        self._chains: 'OrderedDict[Tuple[str, Optional[str]], _Chain]' = OrderedDict()
+        self._pruned_on: Optional[date] = None
+
+        # Write-volume stats
+        self.rows_written = 0
+        self.rows_unchanged = 0
+        self.evictions = 0
+
+    # ==================== Redis Keys ====================
+
+    @staticmethod
+    def _suffix(symbol: str, expiration: Optional[str]) -> str:
+        return f"{symbol}:{expiration}"
+
+    def _rows_key(self, symbol: str, expiration: Optional[str]) -> str:
+        return f"options_chain_rows:{self._suffix(symbol, expiration)}"
+
+    def _meta_key(self, symbol: str, expiration: Optional[str]) -> str:
+        return f"options_chain_meta:{self._suffix(symbol, expiration)}"
+
+    def _deltas_key(self, symbol: str, expiration: Optional[str]) -> str:
+        return f"options_chain_deltas:{self._suffix(symbol, expiration)}"
+
+    # ==================== Loading ====================
+
+    def _chain(self, symbol: str, expiration: Optional[str]) -> Optional[_Chain]:
+        """In-memory chain, hydrated from Redis after a restart or eviction"""
+        chain = self._chains.get((symbol, expiration))
+        if chain is not None:
+            chain.accessed_at = time.monotonic()
+            self._chains.move_to_end((symbol, expiration))
+            return chain
+        if not self.cache or self._expired(expiration, date.today()):
+            return None
+
+        meta = self.cache.get(self._meta_key(symbol, expiration))
+        rows = self.cache.hash_get_all(self._rows_key(symbol, expiration))
+        if not meta or rows is None:
+            return None
+
+        chain = _Chain(self.max_deltas)
+        chain.meta = meta.get('meta', {})
+        chain.version = meta.get('version', 0)
+        chain.fetched_at = meta.get('fetched_at', 0.0)
+        order = meta.get('order') or list(rows.keys())
+        chain.extend_schema(rows.values())
+        chain.rows = {key: chain.encode(rows[key]) for key in order if key in rows}
+        for delta in reversed(self.cache.list_range(self._deltas_key(symbol, expiration), 0, self.max_deltas - 1)):
+            chain.deltas.append(delta)
+
+        self._chains[(symbol, expiration)] = chain
+        self._evict()
+        return chain
+
+    def _evict(self):
+        """Drop expired chains (once a day), then idle ones and the least recently used past max_chains"""
+        today = date.today()
+        if self._pruned_on != today:
+            self._pruned_on = today
+            for key in [key for key in self._chains if self._expired(key[1], today)]:
+                del self._chains[key]
+                self.evictions += 1
+
+        idle_before = time.monotonic() - self.max_idle
+        while self._chains:
+            oldest = next(iter(self._chains.values()))
+            if len(self._chains) <= self.max_chains and oldest.accessed_at >= idle_before:
+                break
+            self._chains.popitem(last=False)
+            self.evictions += 1
+
+    @staticmethod
+    def _expired(expiration: Optional[str], today: date) -> bool:
+        exp_date = parse_expiration(expiration) if expiration else None
+        return exp_date is not None and exp_date < today
+
+    def get(self, symbol: str, expiration: Optional[str]) -> Optional[Dict]:
+        """Current chain in TradeStation's shape, or None if never fetched"""
+        chain = self._chain(symbol, expiration)
+        return chain.snapshot() if chain else None
+    
+    def get_json(self, symbol: str, expiration: Optional[str]) -> Optional[bytes]:
+        """Current chain as JSON bytes, or None if never fetched"""
+        chain = self._chain(symbol, expiration)
+        return chain.to_json() if chain else None
+    
+    def get_etag(self, symbol: str, expiration: Optional[str]) -> Optional[str]:
+        """ETag of get_json()"""
+        chain = self._chain(symbol, expiration)
+        return chain.etag() if chain else None
+
+    def version(self, symbol: str, expiration: Optional[str]) -> int:
+        chain = self._chain(symbol, expiration)
+        return chain.version if chain else 0
+
+    def is_fresh(self, symbol: str, expiration: Optional[str], ttl: float) -> bool:
+        """Whether the chain was fetched within the last ttl seconds"""
+        chain = self._chain(symbol, expiration)
+        return chain is not None and time.time() - chain.fetched_at < ttl
+
+    def age(self, symbol: str, expiration: Optional[str]) -> Optional[float]:
+        """Seconds since the chain was last fetched"""
+        chain = self._chain(symbol, expiration)
+        return time.time() - chain.fetched_at if chain else None
+
+    def select(self, symbol: str, expiration: Optional[str],
+               option_type: Optional[str] = None,
+               min_strike: Optional[float] = None,
+               max_strike: Optional[float] = None,
+               min_bid: Optional[float] = None,
+               min_open_interest: Optional[float] = None,
+               fields: Optional[Iterable[str]] = None) -> Optional[List[Dict]]:
+        """
+        Filtered, projected rows of a chain
+        
+        The strike range is resolved by bisecting the per-type strike index;
+        bid and open interest are checked only on rows inside it.
+        """
+        chain = self._chain(symbol, expiration)
+        if chain is None:
+            return None
+        
+        index = chain.index()
+        types = [_option_type(option_type)] if option_type else list(index)
+        projection = [field for field in fields if field in chain.fields] if fields else None
+        
+        selected = []
+        for typ in types:
+            if typ not in index:
+                continue
+            strikes, rows = index[typ]
+            lo = bisect_left(strikes, min_strike) if min_strike is not None else 0
+            hi = bisect_right(strikes, max_strike) if max_strike is not None else len(rows)
+            
+            for values in rows[lo:hi]:
+                if min_bid is not None and float(chain.value(values, 'Bid') or 0) < min_bid:
+                    continue
+                if min_open_interest is not None:
+                    open_interest = next((chain.value(values, f) for f in OPEN_INTEREST_FIELDS
+                                          if chain.value(values, f) is not None), 0)
+                    if float(open_interest) < min_open_interest:
+                        continue
+                if projection is None:
+                    selected.append(chain.decode(values))
+                    continue
+                row = {}
+                for field in projection:
+                    value = chain.value(values, field, _MISSING)
+                    if value is not _MISSING:
+                        row[field] = value
+                selected.append(row)
+        
+        return selected
+    
+    def query(self, symbol: str, expiration: Optional[str], chain_filter: ChainFilter,
+              spot: Optional[float] = None) -> Optional[Dict]:
+        """Chain in TradeStation's shape with only the rows and fields chain_filter keeps"""
+        chain = self._chain(symbol, expiration)
+        if chain is None:
+            return None
+        
+        types = [_option_type(chain_filter.option_type)] if chain_filter.option_type else list(chain.index())
+        rows = []
+        for option_type in types:
+            min_strike, max_strike = chain_filter.strike_bounds(option_type, spot)
+            rows.extend(self.select(
+                symbol, expiration, option_type, min_strike, max_strike,
+                chain_filter.min_bid, chain_filter.min_open_interest, chain_filter.fields
+            ))
+        return {**chain.meta, ROWS_FIELD: rows}
+    
+    # ==================== Updating ====================
+
+    def apply(self, symbol: str, expiration: Optional[str], data: Dict) -> int:
+        """
+        Diff a freshly fetched chain against the canonical table
+
+        Returns the chain version after the update (unchanged if nothing moved).
+        """
+        chain = self._chain(symbol, expiration)
+        if chain is None:
+            chain = _Chain(self.max_deltas)
+            self._chains[(symbol, expiration)] = chain
+            self._evict()
+
+        new_meta = {k: v for k, v in data.items() if k != ROWS_FIELD}
+        raw_rows = data.get(ROWS_FIELD) or []
+        chain.extend_schema(raw_rows)
+
+        new_rows: Dict[str, tuple] = {}
+        added: Dict[str, Dict] = {}
+        changed: Dict[str, Dict] = {}
+        for index, row in enumerate(raw_rows):
+            key = _row_key(row, index)
+            values = chain.encode(row)
+            new_rows[key] = values
+            
+            old = chain.rows.get(key)
+            if old is None:
+                added[key] = row
+                continue
+            old = chain.pad(old)
+            if old == values:
+                continue
+            fields = {}
+            for field, old_value, value in zip(chain.fields, old, values):
+                # A dropped field is sent as None
+                old_value = None if old_value is _MISSING else old_value
+                value = None if value is _MISSING else value
+                if old_value != value:
+                    fields[field] = value
+            if fields:
+                changed[key] = fields
+        removed = [key for key in chain.rows if key not in new_rows]
+        meta_changes = {k: v for k, v in new_meta.items() if chain.meta.get(k) != v}
+
+        chain.rows = new_rows
+        chain.meta = new_meta
+        chain.fetched_at = time.time()
+        chain._index = None
+        chain._json = None
+        chain._etag = None
+
+        has_changes = bool(added or changed or removed or meta_changes)
+        if has_changes:
+            chain.version += 1
+            chain.deltas.append({
+                'version': chain.version,
+                'added': added,
+                'changed': changed,
+                'removed': removed,
+                'meta': meta_changes,
+            })
+
+        self.rows_written += len(added) + len(changed)
+        self.rows_unchanged += len(new_rows) - len(added) - len(changed)
+        self._persist(symbol, expiration, chain, added, changed, removed, has_changes)
+        if self.index is not None:
+            strikes = (chain.value(values, 'Strike') for values in new_rows.values())
+            self.index.record_chain(symbol, expiration, (strike for strike in strikes if strike is not None))
+        return chain.version
+
+    def _persist(self, symbol: str, expiration: Optional[str], chain: _Chain,
+                 added: Dict, changed: Dict, removed: List[str], has_changes: bool):
+        """Write only the rows that changed, plus the small meta record"""
+        if not self.cache:
+            return
+
+        upserts = {**added, **{key: chain.decode(chain.rows[key]) for key in changed}}
+        if upserts or removed:
+            self.cache.hash_update(self._rows_key(symbol, expiration), upserts, removed, PERSIST_TTL)
+        if has_changes:
+            self.cache.list_push(self._deltas_key(symbol, expiration), chain.deltas[-1],
+                                 self.max_deltas, PERSIST_TTL)
+
+        meta = {
+            'version': chain.version,
+            'fetched_at': chain.fetched_at,
+            'meta': chain.meta,
+            'order': list(chain.rows),
+        }
+        self.cache.set(self._meta_key(symbol, expiration), meta, ttl_seconds=PERSIST_TTL)
+
+    # ==================== Deltas ====================
+
+    def changes_since(self, symbol: str, expiration: Optional[str], since_version: int) -> Optional[Dict]:
+        """
+        Changes between since_version and the current version
+
+        Deltas are merged into one: 'added' holds whole rows, 'changed' holds
+        only the fields that moved, 'removed' lists dropped row keys. If
+        since_version is older than the retained deltas, the whole chain is
+        returned with full=True.
+        """
+        chain = self._chain(symbol, expiration)
+        if chain is None:
+            return None
+
+        result = {
+            'symbol': symbol,
+            'expiration': expiration,
+            'since_version': since_version,
+            'version': chain.version,
+            'full': False,
+        }
+
+        if since_version == chain.version:
+            return {**result, 'added': [], 'changed': {}, 'removed': [], 'meta': {}}
+
+        oldest = chain.deltas[0]['version'] if chain.deltas else chain.version + 1
+        if since_version > chain.version or since_version < oldest - 1:
+            return {**result, 'full': True, 'chain': chain.snapshot()}
+
+        added: Dict[str, Dict] = {}
+        changed: Dict[str, Dict] = {}
+        removed = set()
+        readded = set()
+        meta: Dict[str, Any] = {}
+
+        for delta in chain.deltas:
+            if delta['version'] <= since_version:
+                continue
+            for key, row in delta['added'].items():
+                if key in removed:
+                    # The client still has the old row; it must be dropped if this one goes too
+                    removed.discard(key)
+                    readded.add(key)
+                changed.pop(key, None)
+                added[key] = row
+            for key, fields in delta['changed'].items():
+                if key in added:
+                    row = {**added[key], **fields}
+                    added[key] = {field: value for field, value in row.items() if value is not None or field not in fields}
+                else:
+                    changed.setdefault(key, {}).update(fields)
+            for key in delta['removed']:
+                changed.pop(key, None)
+                if added.pop(key, None) is None or key in readded:
+                    readded.discard(key)
+                    removed.add(key)
+            meta.update(delta['meta'])
+
+        return {
+            **result,
+            'added': list(added.values()),
+            'changed': changed,
+            'removed': sorted(removed),
+            'meta': meta,
+        }
+
+    def get_stats(self) -> Dict:
+        total = self.rows_written + self.rows_unchanged
+        return {
+            "chains": len(self._chains),
+            "evictions": self.evictions,
+            "rows_written": self.rows_written,
+            "rows_unchanged": self.rows_unchanged,
+            "write_ratio": round(self.rows_written / total, 3) if total else None,
+        }
@@ -0,0 +1,43 @@
+"""Cache key layout and TTLs shared by the API server and background jobs"""
+
+from typing import Optional
+
+# TTLs in seconds (see README "Caching Strategy")
+QUOTE_TTL = 5
+BARS_TTL = 60
+OPTIONS_CHAIN_TTL = 60
+OPTIONS_EXPIRATIONS_TTL = 86400
+OPTIONS_STRIKES_TTL = 86400
+ORDER_BOOK_TTL = 1
+
+# How long past its TTL an entry may still be served while it is refreshed
+# in the background (stale-while-revalidate). Entries are kept in Redis for
+# TTL + max staleness; older data is never served.
+QUOTE_MAX_STALE = 30
+BARS_MAX_STALE = 300
+OPTIONS_CHAIN_MAX_STALE = 240
+ORDER_BOOK_MAX_STALE = 2
+
+
+def quote_key(symbol: str) -> str:
+    return f"quote:{symbol}"
+
+
+def bars_key(symbol: str, interval: str, unit: str, bars_back: int, start_date: Optional[str]) -> str:
+    return f"bars:{symbol}:{interval}:{unit}:{bars_back}:{start_date}"
+
+
+def order_book_key(symbol: str, depth: int) -> str:
+    return f"order_book:{symbol}:{depth}"
+
+
+def options_chain_key(symbol: str, expiration: Optional[str]) -> str:
+    return f"options_chain:{symbol}:{expiration}"
+
+
+def options_expirations_key(symbol: str) -> str:
+    return f"options_expirations:{symbol}"
+
+
+def options_strikes_key(symbol: str, expiration: str) -> str:
+    return f"options_strikes:{symbol}:{expiration}"
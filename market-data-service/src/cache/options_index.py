@@ -0,0 +1,185 @@
+"""
+Options metadata index: expirations and strikes per underlying
+
+Strikes are derived from fetched chains. A chain lists every contract of its
+expiration, so once it has been fetched the strikes lookup is answered
+locally instead of with its own TradeStation call. The expiration list comes
+from one upstream lookup per OPTIONS_EXPIRATIONS_TTL, merged with every
+expiration seen in a chain fetch, and is held parsed, so selecting
+expirations by DTE costs neither a Redis read nor JSON decoding.
+
+Redis layout per underlying:
+    options_index:{symbol}    JSON  listed_at, expiration -> type, expiration -> strikes
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .keys import OPTIONS_EXPIRATIONS_TTL
+from .redis_cache import RedisCache
+from ..utils.expirations import days_to_expiration, parse_expiration
+
+logger = logging.getLogger(__name__)
+
+# Same lifetime as the persisted chains the strikes come from
+PERSIST_TTL = 86400
+
+
+def _strike_text(strike: Any) -> str:
+    """A strike as TradeStation writes it: strings as sent, numbers without a trailing '.0'"""
+    if isinstance(strike, str):
+        return strike
+    value = float(strike)
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+@dataclass
+class _Underlying:
+    """Known expirations (ISO date -> TradeStation type) and strikes of one underlying"""
+    expirations: Dict[str, Optional[str]] = field(default_factory=dict)
+    strikes: Dict[str, List[Any]] = field(default_factory=dict)
+    # When the full expiration list was last loaded from TradeStation (0: never)
+    listed_at: float = 0.0
+
+
+class OptionsIndex:
+    """Expirations and strikes answered from chain fetches and cached listings"""
+    
+    def __init__(self, cache: Optional[RedisCache] = None):
+        self.cache = cache
+        self._underlyings: Dict[str, _Underlying] = {}
+    
+    @staticmethod
+    def _key(symbol: str) -> str:
+        return f"options_index:{symbol}"
+    
+    def _underlying(self, symbol: str, create: bool = False) -> Optional[_Underlying]:
+        """In-memory entry, hydrated from Redis after a restart"""
+        entry = self._underlyings.get(symbol)
+        if entry is None and self.cache:
+            stored = self.cache.get(self._key(symbol))
+            if stored:
+                entry = _Underlying(stored.get('expirations', {}), stored.get('strikes', {}),
+                                    stored.get('listed_at', 0.0))
+                self._underlyings[symbol] = entry
+        if entry is None and create:
+            entry = self._underlyings[symbol] = _Underlying()
+        return entry
+    
+    def _persist(self, symbol: str, entry: _Underlying):
+        if not self.cache:
+            return
+        self.cache.set(self._key(symbol), {
+            'listed_at': entry.listed_at,
+            'expirations': entry.expirations,
+            'strikes': entry.strikes,
+        }, ttl_seconds=PERSIST_TTL)
+    
+    @staticmethod
+    def _prune(entry: _Underlying):
+        """Drop expired dates"""
+        today = date.today()
+        for exp in [exp for exp in entry.expirations if date.fromisoformat(exp) < today]:
+            del entry.expirations[exp]
+            entry.strikes.pop(exp, None)
+    
+    # ==================== Updating ====================
+    
+    def record_expirations(self, symbol: str, expirations: Iterable[Any]):
+        """Store a full expiration list as returned by TradeStation"""
+        entry = self._underlying(symbol, create=True)
+        listed: Dict[str, Optional[str]] = {}
+        for expiration in expirations:
+            exp_date = parse_expiration(expiration)
+            if exp_date is not None:
+                listed[exp_date.isoformat()] = expiration.get('Type') if isinstance(expiration, dict) else None
+        # Expirations only known from chains stay until they expire
+        seen = {exp: None for exp in entry.strikes if exp not in listed}
+        entry.expirations = {**seen, **listed}
+        entry.listed_at = time.time()
+        self._prune(entry)
+        self._persist(symbol, entry)
+    
+    def record_chain(self, symbol: str, expiration: Optional[str], strikes: Iterable[Any]):
+        """Strikes of a freshly fetched chain (persisted only when they changed)"""
+        exp_date = parse_expiration(expiration) if expiration else None
+        if exp_date is None:
+            return
+        exp = exp_date.isoformat()
+        entry = self._underlying(symbol, create=True)
+        ordered = sorted(set(strikes), key=float)
+        if entry.strikes.get(exp) == ordered and exp in entry.expirations:
+            return
+        entry.strikes[exp] = ordered
+        entry.expirations.setdefault(exp, None)
+        self._prune(entry)
+        self._persist(symbol, entry)
+    
+    # ==================== Lookups ====================
+    
+    def _listed(self, symbol: str) -> Optional[_Underlying]:
+        """Entry whose full expiration list is recent enough to answer from"""
+        entry = self._underlying(symbol)
+        if entry is None or time.time() - entry.listed_at >= OPTIONS_EXPIRATIONS_TTL:
+            return None
+        return entry
+    
+    def is_listed(self, symbol: str) -> bool:
+        """Whether expirations of symbol can be answered without TradeStation"""
+        return self._listed(symbol) is not None
+    
+    def expirations(self, symbol: str) -> Optional[List[Dict]]:
+        """Unexpired expirations in TradeStation's shape, or None if not listed recently"""
+        entry = self._listed(symbol)
+        if entry is None:
+            return None
+        self._prune(entry)
+        return [{'Date': f"{exp}T00:00:00Z", 'Type': typ} if typ else {'Date': f"{exp}T00:00:00Z"}
+                for exp, typ in sorted(entry.expirations.items())]
+    
+    def select(self, symbol: str, min_dte: int = 0, max_dte: Optional[int] = None) -> Optional[List[Tuple[str, int]]]:
+        """(expiration, dte) pairs within the DTE window, nearest first; None if not listed recently"""
+        entry = self._listed(symbol)
+        if entry is None:
+            return None
+        today = date.today()
+        selected = []
+        for exp in sorted(entry.expirations):
+            dte = days_to_expiration(date.fromisoformat(exp), today)
+            if dte >= min_dte and (max_dte is None or dte <= max_dte):
+                selected.append((exp, dte))
+        return selected
+    
+    def strikes(self, symbol: str, expiration: str) -> Optional[List[List[str]]]:
+        """Strikes of an expiration in TradeStation's shape, or None if its chain wasn't fetched"""
+        exp_date = parse_expiration(expiration)
+        entry = self._underlying(symbol)
+        strikes = entry.strikes.get(exp_date.isoformat()) if entry and exp_date else None
+        if strikes is None:
+            return None
+        return [[_strike_text(strike)] for strike in strikes]
+    
+    def describe(self, symbol: str, min_dte: int = 0, max_dte: Optional[int] = None) -> Optional[Dict]:
+        """Expirations in a DTE window with their type and strike range, for callers picking expirations"""
+        selected = self.select(symbol, min_dte, max_dte)
+        if selected is None:
+            return None
+        entry = self._underlyings[symbol]
+        expirations = []
+        for exp, dte in selected:
+            item = {'expiration': exp, 'dte': dte, 'type': entry.expirations.get(exp)}
+            strikes = entry.strikes.get(exp)
+            if strikes:
+                item.update(strikes=len(strikes), min_strike=float(strikes[0]), max_strike=float(strikes[-1]))
+            expirations.append(item)
+        return {'symbol': symbol, 'listed_at': entry.listed_at, 'expirations': expirations}
+    
+    def get_stats(self) -> Dict:
+        return {
+            "underlyings": len(self._underlyings),
+            "expirations": sum(len(entry.expirations) for entry in self._underlyings.values()),
+            "strike_lists": sum(len(entry.strikes) for entry in self._underlyings.values()),
+        }
@@ -0,0 +1,487 @@
+"""
+Session-aware cache prewarming and refresh-ahead
+
+Shortly before each regular session opens, the prewarmer fetches expirations,
+option chains and quotes for the configured watchlist so the first requests
+after the bell hit a warm cache. Strikes come with the chains (see
+options_index.py) and are only fetched on their own without a chain store.
+While the market is active it also refreshes hot keys before their TTL runs
+out, so a request for a popular key never has to wait on TradeStation.
+
+Option chains share a quota of 30 requests a minute, far fewer than the
+watchlist has chains, so chain work is sized to the options_chains bucket:
+the early pass fetches as many chains as the bucket admits before the final
+pass (nearest expirations first), and only as many chains are pinned for
+refresh-ahead as a share of its refill rate can keep fresh.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .keys import (
+    OPTIONS_CHAIN_TTL, OPTIONS_EXPIRATIONS_TTL, OPTIONS_STRIKES_TTL, QUOTE_MAX_STALE, QUOTE_TTL,
+    options_chain_key, options_expirations_key, options_strikes_key, quote_key,
+)
+from .chain_store import ChainStore
+from .redis_cache import RedisCache
+from ..clients.rate_limiter import Priority
+from ..utils.market_hours import MarketHoursUtil
+from ..utils.expirations import days_to_expiration, parse_expiration
+
+logger = logging.getLogger(__name__)
+
+# Loaders take the upstream priority to fetch with
+Loader = Callable[[int], Awaitable[Any]]
+
+# Writers store a loaded value somewhere other than the plain cache key
+Writer = Callable[[Any], None]
+
+# Seconds since a key's value was fetched, for keys whose data isn't under the
+# cache key itself (chains live in the ChainStore); None if there is none
+AgeFn = Callable[[], Optional[float]]
+
+# Rate limit bucket that chain fetches draw from
+CHAINS_ENDPOINT = '/marketdata/options/chains'
+
+DEFAULT_WATCHLIST = ['SPY', 'QQQ', 'IWM', 'AAPL', 'MSFT', 'NVDA', 'TSLA', 'AMD', 'AMZN', 'GOOGL']
+
+
+@dataclass
+class _HotKey:
+    """Refresh-ahead bookkeeping for one cache key"""
+    ttl: int
+    loader: Loader
+    writer: Optional[Writer] = None
+    max_stale: int = 0
+    age: Optional[AgeFn] = None
+    hits: int = 0
+    last_access: float = 0.0
+    expires_at: Optional[float] = None
+    pinned_until: float = 0.0
+    refreshing: bool = False
+
+
+class CachePrewarmer:
+    """Prefetches the watchlist before the open and keeps hot keys warm"""
+
+    def __init__(self, ts_client, cache: RedisCache,
+                 chain_store: Optional[ChainStore] = None,
+                 watchlist: Optional[List[str]] = None,
+                 lead_seconds: int = 300,
+                 final_pass_seconds: int = 15,
+                 max_dte: int = 60,
+                 hot_window: int = 120,
+                 hot_hits: int = 2,
+                 refresh_fraction: float = 0.25,
+                 max_concurrency: int = 4,
+                 prewarm_share: float = 0.8,
+                 refresh_share: float = 0.5):
+        """
+        Args:
+            ts_client: TradeStationClient used for upstream fetches
+            cache: Redis cache to populate
+            chain_store: Store that option chains are written through
+            watchlist: Symbols to prewarm before each session
+            lead_seconds: How long before the open to prefetch chains and metadata
+            final_pass_seconds: How long before the open to fetch quotes
+            max_dte: Only prewarm expirations up to this many days out
+            hot_window: Seconds a key stays hot after its last access
+            hot_hits: Accesses within hot_window before a key is refreshed ahead
+            refresh_fraction: Refresh when this fraction of the TTL remains
+            max_concurrency: Maximum concurrent upstream fetches
+            prewarm_share: Share of the chain quota the early pass may spend
+            refresh_share: Share of the chain refill rate pinned chains may spend
+                           on refresh-ahead after the open
+        """
+        self.ts_client = ts_client
+        self.cache = cache
+        self.chain_store = chain_store
+        self.watchlist = watchlist or DEFAULT_WATCHLIST
+        self.lead_seconds = lead_seconds
+        self.final_pass_seconds = final_pass_seconds
+        self.max_dte = max_dte
+        self.hot_window = hot_window
+        self.hot_hits = hot_hits
+        self.refresh_fraction = refresh_fraction
+        self.prewarm_share = prewarm_share
+        self.refresh_share = refresh_share
+
+        self._keys: Dict[str, _HotKey] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: List[asyncio.Task] = []
+        self._refreshing: Set[asyncio.Task] = set()
+        # Chain key -> when a prewarm pass fetched it
+        self._prewarmed: Dict[str, float] = {}
+        self._early_pass_at: Optional[float] = None
+
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.chains_deferred = 0
+        self.last_prewarm: Optional[str] = None
+
+    # ==================== Key Tracking ====================
+
+    def track(self, key: str, ttl: int, loader: Loader, writer: Optional[Writer] = None,
+              max_stale: int = 0, age: Optional[AgeFn] = None):
+        """Record an access to key (called on every request path)"""
+        entry = self._keys.get(key)
+        if entry is None:
+            entry = _HotKey(ttl=ttl, loader=loader, writer=writer, max_stale=max_stale, age=age)
+            self._keys[key] = entry
+        else:
+            entry.loader = loader
+            entry.writer = writer
+            entry.max_stale = max_stale
+            entry.age = age
+
+        now = time.monotonic()
+        if now - entry.last_access > self.hot_window:
+            entry.hits = 0
+        entry.hits += 1
+        entry.last_access = now
+
+    def mark_stored(self, key: str, ttl: int):
+        """Record that key was just written to the cache with ttl"""
+        entry = self._keys.get(key)
+        if entry is not None:
+            entry.expires_at = time.monotonic() + ttl
+
+    def _is_hot(self, entry: _HotKey, now: float) -> bool:
+        if now < entry.pinned_until:
+            return True
+        return entry.hits >= self.hot_hits and now - entry.last_access <= self.hot_window
+
+    def _remaining(self, key: str, entry: _HotKey) -> Optional[float]:
+        """Seconds until entry's TTL runs out, for keys not stored through the prewarmer"""
+        if entry.age is not None:
+            age = entry.age()
+            return None if age is None else entry.ttl - age
+        remaining = self.cache.ttl(key)
+        return None if remaining is None else remaining - entry.max_stale
+
+    # ==================== Fetching ====================
+
+    async def _load(self, key: str, ttl: int, loader: Loader, writer: Optional[Writer] = None,
+                    max_stale: int = 0) -> Any:
+        """Fetch from upstream under the concurrency limit and store in cache"""
+        async with self._semaphore:
+            data = await loader(Priority.BACKGROUND)
+        if data:
+            if writer:
+                writer(data)
+            else:
+                # Kept past the TTL so it can be served stale while revalidating
+                self.cache.set(key, data, ttl_seconds=ttl + max_stale)
+            self.mark_stored(key, ttl)
+        return data
+
+    async def _load_if_missing(self, key: str, ttl: int, loader: Loader) -> Any:
+        """Like _load, but reuse a cached value (for long-TTL metadata)"""
+        cached = self.cache.get(key)
+        if cached:
+            return cached
+        return await self._load(key, ttl, loader)
+
+    async def _refresh(self, key: str, entry: _HotKey):
+        entry.refreshing = True
+        try:
+            if await self._load(key, entry.ttl, entry.loader, entry.writer, entry.max_stale):
+                self.refreshes += 1
+                return
+            self.refresh_errors += 1
+        except Exception as e:
+            self.refresh_errors += 1
+            logger.error(f"Refresh-ahead failed for {key}: {e}")
+        finally:
+            entry.refreshing = False
+
+        # Back off instead of retrying a failing key on every tick
+        entry.expires_at = time.monotonic() + self._refresh_margin(entry) * 2
+
+    def _refresh_margin(self, entry: _HotKey) -> float:
+        return max(1.0, entry.ttl * self.refresh_fraction)
+
+    def _warm(self, key: str, ttl: int, loader: Loader, pinned_until: float,
+              writer: Optional[Writer] = None, max_stale: int = 0, age: Optional[AgeFn] = None):
+        """Register a prewarmed key so refresh-ahead carries it through the open"""
+        self.track(key, ttl, loader, writer, max_stale, age)
+        self._keys[key].pinned_until = max(self._keys[key].pinned_until, pinned_until)
+
+    def _chain_budget(self, seconds: float) -> int:
+        """Chain requests the prewarm may spend over the next seconds"""
+        bucket = self.ts_client.scheduler.bucket_for(CHAINS_ENDPOINT)
+        return int(bucket.available(seconds) * self.prewarm_share)
+
+    def _pinned_chain_limit(self) -> int:
+        """Chains refresh-ahead can keep fresh on refresh_share of the chain refill rate"""
+        bucket = self.ts_client.scheduler.bucket_for(CHAINS_ENDPOINT)
+        # Each pinned chain is refetched once every TTL minus the refresh margin
+        period = OPTIONS_CHAIN_TTL - max(1.0, OPTIONS_CHAIN_TTL * self.refresh_fraction)
+        return int(bucket.rate * self.refresh_share * period)
+
+    async def prewarm(self, final: bool = True) -> int:
+        """
+        Prefetch the watchlist into the cache
+
+        The early pass fetches expirations and as many chains as the chain
+        quota admits before the final pass, nearest expirations first and
+        round-robin across the watchlist; the rest are loaded on demand.
+
+        Args:
+            final: The pass just before the bell: fetch quotes and pin quotes
+                   and the nearest chains for refresh-ahead until hot_window
+                   seconds after the open. Chains are only fetched here if no
+                   early pass ran, so the bucket is full at the bell.
+
+        Returns the number of keys written.
+        """
+        logger.info(f"Prewarming market data caches for {len(self.watchlist)} symbols")
+        start = time.monotonic()
+
+        until_open = MarketHoursUtil.seconds_until_open() or 0.0
+        pinned_until = start + until_open + self.hot_window
+
+        written = 0
+        if final:
+            written += await self._gather(
+                [self._prewarm_quote(symbol, pinned_until) for symbol in self.watchlist], self.watchlist)
+
+        chains, expirations = await self._plan_chains()
+        written += expirations
+
+        early_ran = self._early_pass_at is not None and start - self._early_pass_at <= self.lead_seconds
+        if not final or not early_ran:
+            window = until_open if final else until_open - self.final_pass_seconds
+            written += await self._prewarm_chains(chains, self._chain_budget(max(window, 0.0)))
+            if not final:
+                self._early_pass_at = start
+
+        if final:
+            self._pin_chains(chains, pinned_until)
+
+        self.last_prewarm = datetime.now().isoformat()
+        logger.info(f"Prewarmed {written} cache keys in {time.monotonic() - start:.1f}s")
+        return written
+
+    async def _gather(self, fetches: List[Awaitable[int]], labels: List[str]) -> int:
+        """Run fetches, logging failures; returns the number of keys written"""
+        written = 0
+        for label, result in zip(labels, await asyncio.gather(*fetches, return_exceptions=True)):
+            if isinstance(result, Exception):
+                logger.error(f"Error prewarming {label}: {result}")
+            else:
+                written += result
+        return written
+
+    async def _prewarm_quote(self, symbol: str, pinned_until: float) -> int:
+        key = quote_key(symbol)
+        loader = lambda priority: self.ts_client.get_quote(symbol, priority=priority)
+        self._warm(key, QUOTE_TTL, loader, pinned_until, max_stale=QUOTE_MAX_STALE)
+        return 1 if await self._load(key, QUOTE_TTL, loader, max_stale=QUOTE_MAX_STALE) else 0
+
+    async def _expirations(self, symbol: str) -> Any:
+        key = options_expirations_key(symbol)
+        loader = lambda priority: self.ts_client.get_options_expirations(symbol, priority=priority)
+        expirations = await self._load_if_missing(key, OPTIONS_EXPIRATIONS_TTL, loader)
+        index = self.chain_store.index if self.chain_store else None
+        if expirations and index is not None:
+            index.record_expirations(symbol, expirations)
+        return expirations
+
+    async def _plan_chains(self) -> Tuple[List[Tuple[str, str]], int]:
+        """
+        Watchlist (symbol, expiration) pairs within max_dte, nearest expiration
+        first and in watchlist order within an expiration
+
+        Also returns the number of symbols with expirations.
+        """
+        results = await asyncio.gather(*(self._expirations(symbol) for symbol in self.watchlist),
+                                       return_exceptions=True)
+        planned = []
+        written = 0
+        for rank, (symbol, expirations) in enumerate(zip(self.watchlist, results)):
+            if isinstance(expirations, Exception):
+                logger.error(f"Error prewarming expirations for {symbol}: {expirations}")
+                continue
+            if not expirations:
+                continue
+            written += 1
+            for expiration in expirations:
+                exp_date = parse_expiration(expiration)
+                if exp_date is None:
+                    continue
+                dte = days_to_expiration(exp_date)
+                if dte > self.max_dte:
+                    continue
+                planned.append((dte, rank, symbol, exp_date.isoformat()))
+
+        planned.sort()
+        return [(symbol, expiration) for _, _, symbol, expiration in planned], written
+
+    def _chain_loader(self, symbol: str, expiration: str) -> Loader:
+        return lambda priority: self.ts_client.get_options_chain(symbol, expiration, priority=priority)
+
+    def _chain_age(self, symbol: str, expiration: str) -> Optional[AgeFn]:
+        if not self.chain_store:
+            return None
+        return lambda: self.chain_store.age(symbol, expiration)
+
+    def _is_prewarmed(self, key: str, now: float) -> bool:
+        """Whether a prewarm pass fetched key ahead of the coming open"""
+        fetched = self._prewarmed.get(key)
+        return fetched is not None and now - fetched <= self.lead_seconds
+
+    async def _prewarm_chains(self, chains: List[Tuple[str, str]], budget: int) -> int:
+        """Fetch up to budget chains not already prewarmed or fresh in the chain store"""
+        now = time.monotonic()
+        fetches = []
+        labels = []
+        deferred = 0
+        for symbol, expiration in chains:
+            key = options_chain_key(symbol, expiration)
+            if self._is_prewarmed(key, now):
+                continue
+            if self.chain_store and self.chain_store.is_fresh(symbol, expiration, OPTIONS_CHAIN_TTL):
+                continue
+            if len(fetches) >= budget:
+                deferred += 1
+                continue
+            fetches.append(self._prewarm_chain(symbol, expiration))
+            labels.append(f"{symbol} {expiration}")
+
+        if deferred:
+            self.chains_deferred += deferred
+            logger.info(f"Chain quota allows {budget} chains before the open; {deferred} left to load on demand")
+        return await self._gather(fetches, labels)
+
+    async def _prewarm_chain(self, symbol: str, expiration: str) -> int:
+        key = options_chain_key(symbol, expiration)
+        written = 0
+        if not (self.chain_store and self.chain_store.index is not None):
+            strikes_loader = lambda priority: self.ts_client.get_options_strikes(symbol, expiration, priority=priority)
+            if await self._load_if_missing(options_strikes_key(symbol, expiration), OPTIONS_STRIKES_TTL,
+                                           strikes_loader):
+                written += 1
+        if await self._load(key, OPTIONS_CHAIN_TTL, self._chain_loader(symbol, expiration),
+                            self._chain_writer(symbol, expiration)):
+            self._prewarmed[key] = time.monotonic()
+            written += 1
+        return written
+
+    def _pin_chains(self, chains: List[Tuple[str, str]], pinned_until: float):
+        """Pin the nearest prewarmed chains, as many as refresh-ahead can afford"""
+        now = time.monotonic()
+        limit = self._pinned_chain_limit()
+        pinned = 0
+        for symbol, expiration in chains:
+            if pinned >= limit:
+                break
+            key = options_chain_key(symbol, expiration)
+            if not self._is_prewarmed(key, now):
+                continue
+            self._warm(key, OPTIONS_CHAIN_TTL, self._chain_loader(symbol, expiration), pinned_until,
+                       self._chain_writer(symbol, expiration), age=self._chain_age(symbol, expiration))
+            pinned += 1
+
+        # Fetch times are only needed until the open
+        self._prewarmed = {key: fetched for key, fetched in self._prewarmed.items()
+                           if self._is_prewarmed(key, now)}
+
+    def _chain_writer(self, symbol: str, expiration: str) -> Optional[Writer]:
+        if not self.chain_store:
+            return None
+        return lambda data: self.chain_store.apply(symbol, expiration, data)
+
+    # ==================== Background Loops ====================
+
+    async def _session_loop(self):
+        """Prewarm ahead of every session open"""
+        while True:
+            until_open = MarketHoursUtil.seconds_until_open()
+            if until_open is None:
+                logger.warning("Market calendar exhausted; session prewarming stopped")
+                return
+
+            if until_open == 0:
+                # Market is open: wait for the close, then plan the next session
+                await asyncio.sleep((MarketHoursUtil.seconds_until_close() or 60) + 1)
+                continue
+
+            if until_open > self.lead_seconds:
+                await asyncio.sleep(until_open - self.lead_seconds)
+                continue
+
+            # Chains and metadata first, then a final quote pass just before the bell
+            await self.prewarm(final=False)
+
+            until_open = MarketHoursUtil.seconds_until_open() or 0.0
+            if until_open > self.final_pass_seconds:
+                await asyncio.sleep(until_open - self.final_pass_seconds)
+            await self.prewarm(final=True)
+
+            await asyncio.sleep((MarketHoursUtil.seconds_until_open() or 0.0) + 1)
+
+    async def _refresh_loop(self, interval: float = 0.5):
+        """Refresh hot keys before their TTL runs out"""
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+
+            for key, entry in list(self._keys.items()):
+                if not self._is_hot(entry, now):
+                    if now - entry.last_access > self.hot_window and now >= entry.pinned_until:
+                        del self._keys[key]
+                    continue
+
+                if entry.refreshing:
+                    continue
+
+                if entry.expires_at is None:
+                    remaining = self._remaining(key, entry)
+                    if remaining is None:
+                        continue
+                    entry.expires_at = now + remaining
+
+                if entry.expires_at - now <= self._refresh_margin(entry):
+                    entry.refreshing = True
+                    task = asyncio.create_task(self._refresh(key, entry))
+                    self._refreshing.add(task)
+                    task.add_done_callback(self._refreshing.discard)
+
+    def start(self):
+        """Start the session and refresh-ahead loops"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._session_loop()),
+            asyncio.create_task(self._refresh_loop()),
+        ]
+        logger.info(f"Cache prewarmer started (watchlist: {', '.join(self.watchlist)})")
+
+    async def stop(self):
+        """Cancel background loops and in-flight refreshes"""
+        tasks = [*self._tasks, *self._refreshing]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._refreshing.clear()
+
+    def get_stats(self) -> Dict:
+        now = time.monotonic()
+        next_open = MarketHoursUtil.next_open()
+        return {
+            "watchlist": self.watchlist,
+            "tracked_keys": len(self._keys),
+            "hot_keys": sum(1 for entry in self._keys.values() if self._is_hot(entry, now)),
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "refreshing": len(self._refreshing),
+            "chains_deferred": self.chains_deferred,
+            "last_prewarm": self.last_prewarm,
+            "next_open": next_open.isoformat() if next_open else None,
+        }
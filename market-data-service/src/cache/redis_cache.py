@@ -1,9 +1,9 @@
 """Redis caching layer for market data"""
 
 import redis
-import json
 import logging
-from typing import Optional, Any
+import orjson
+from typing import Optional, Any, Dict, List, Tuple
 from datetime import timedelta
 
 logger = logging.getLogger(__name__)
@@ -22,10 +22,18 @@ class RedisCache:
             )
             # Test connection
             self.redis.ping()
+            # Same server, replies left as bytes: cached JSON is passed through without decoding
+            self.raw_redis = redis.Redis(
+                host=host,
+                port=port,
+                db=db,
+                socket_connect_timeout=5
+            )
             logger.info(f"Connected to Redis at {host}:{port}")
         except Exception as e:
             logger.error(f"Failed to connect to Redis: {e}")
             self.redis = None
+            self.raw_redis = None
     
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
@@ -35,7 +43,7 @@ class RedisCache:
         try:
             value = self.redis.get(key)
             if value:
-                return json.loads(value)
+                return orjson.loads(value)
             return None
         except Exception as e:
             logger.error(f"Error getting from cache: {e}")
@@ -47,13 +55,137 @@ class RedisCache:
             return False
         
         try:
-            serialized = json.dumps(value)
+            serialized = orjson.dumps(value)
             self.redis.setex(key, ttl_seconds, serialized)
             return True
         except Exception as e:
             logger.error(f"Error setting cache: {e}")
             return False
     
+    def set_raw(self, key: str, body: bytes, ttl_seconds: int = 60) -> bool:
+        """Set an already serialized JSON value with TTL"""
+        if not self.raw_redis:
+            return False
+        
+        try:
+            self.raw_redis.setex(key, ttl_seconds, body)
+            return True
+        except Exception as e:
+            logger.error(f"Error setting cache: {e}")
+            return False
+    
+    def ttl(self, key: str) -> Optional[float]:
+        """Remaining TTL in seconds, or None if the key is missing or has no expiry"""
+        if not self.redis:
+            return None
+
+        try:
+            remaining_ms = self.redis.pttl(key)
+            if remaining_ms is None or remaining_ms < 0:
+                return None
+            return remaining_ms / 1000.0
+        except Exception as e:
+            logger.error(f"Error getting TTL from cache: {e}")
+            return None
+    
+    def get_with_ttl(self, key: str) -> Tuple[Optional[Any], Optional[float]]:
+        """Get value and remaining TTL in seconds in one round trip"""
+        if not self.redis:
+            return None, None
+        
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.pttl(key)
+            value, remaining_ms = pipe.execute()
+            if not value:
+                return None, None
+            remaining = remaining_ms / 1000.0 if remaining_ms is not None and remaining_ms >= 0 else None
+            return orjson.loads(value), remaining
+        except Exception as e:
+            logger.error(f"Error getting from cache: {e}")
+            return None, None
+    
+    def get_raw_with_ttl(self, key: str) -> Tuple[Optional[bytes], Optional[float]]:
+        """Get the stored JSON bytes (not decoded) and remaining TTL in seconds"""
+        if not self.raw_redis:
+            return None, None
+        
+        try:
+            pipe = self.raw_redis.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.pttl(key)
+            value, remaining_ms = pipe.execute()
+            if not value:
+                return None, None
+            remaining = remaining_ms / 1000.0 if remaining_ms is not None and remaining_ms >= 0 else None
+            return value, remaining
+        except Exception as e:
+            logger.error(f"Error getting from cache: {e}")
+            return None, None
+
+    def hash_update(self, key: str, upserts: Dict[str, Any], removals: Optional[List[str]] = None,
+                    ttl_seconds: Optional[int] = None) -> bool:
+        """Write changed hash fields (JSON-encoded) and delete removed ones in one round trip"""
+        if not self.redis:
+            return False
+        
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            if upserts:
+                pipe.hset(key, mapping={field: orjson.dumps(value) for field, value in upserts.items()})
+            if removals:
+                pipe.hdel(key, *removals)
+            if ttl_seconds:
+                pipe.expire(key, ttl_seconds)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error updating hash in cache: {e}")
+            return False
+    
+    def hash_get_all(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get all fields of a hash, JSON-decoded"""
+        if not self.redis:
+            return None
+        
+        try:
+            values = self.redis.hgetall(key)
+            if values:
+                return {field: orjson.loads(value) for field, value in values.items()}
+            return None
+        except Exception as e:
+            logger.error(f"Error getting hash from cache: {e}")
+            return None
+    
+    def list_push(self, key: str, value: Any, max_length: int, ttl_seconds: Optional[int] = None) -> bool:
+        """Push a JSON value onto the head of a capped list"""
+        if not self.redis:
+            return False
+        
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.lpush(key, orjson.dumps(value))
+            pipe.ltrim(key, 0, max_length - 1)
+            if ttl_seconds:
+                pipe.expire(key, ttl_seconds)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error pushing to list in cache: {e}")
+            return False
+    
+    def list_range(self, key: str, start: int = 0, end: int = -1) -> List[Any]:
+        """Get JSON values from a list (head first)"""
+        if not self.redis:
+            return []
+        
+        try:
+            return [orjson.loads(value) for value in self.redis.lrange(key, start, end)]
+        except Exception as e:
+            logger.error(f"Error reading list from cache: {e}")
+            return []
+    
     def delete(self, key: str) -> bool:
         """Delete key from cache"""
         if not self.redis:
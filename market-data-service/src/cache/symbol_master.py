@@ -0,0 +1,474 @@
+"""
+Local symbol master for symbol search
+
+Symbol lookups are answered from an in-memory index instead of forwarding
+every keystroke of a type-ahead box to TradeStation's symbollookup. The
+index holds every symbol seen in a lookup response, by asset type:
+
+- Prefix search bisects two sorted arrays, one of symbols and one of the
+  words in their descriptions ("micro" finds MSFT through "Microsoft").
+- Fuzzy search finds symbols and words one edit away (a typo, a missing or
+  extra letter, two swapped letters) through a map from every key and every
+  single-character deletion of it to its records, so a query only costs
+  len(query) + 1 dict lookups however many symbols are indexed.
+
+TradeStation is only consulted when nothing matches locally; what it returns
+is merged in, so the next keystroke is answered locally. The master is
+filled by a periodic background sweep of symbollookup over seed prefixes,
+persisted to a JSON file and reloaded from it on startup.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..clients.rate_limiter import Priority
+
+logger = logging.getLogger(__name__)
+
+# Prefix entries examined per query, so a one-letter query stays cheap
+MAX_PREFIX_SCAN = 2000
+
+# Fuzzy matching only starts at this query length (shorter ones match everything)
+MIN_FUZZY_LENGTH = 3
+
+# Queries TradeStation had nothing for are not asked again for this long
+MISS_TTL = 3600
+MAX_MISSES = 10000
+
+# Wait between attempts while sweeps keep failing
+REFRESH_RETRY_SECONDS = 600
+
+_WORD = re.compile(r'[A-Z0-9]+')
+
+# Recent search results kept until the index changes
+MAX_CACHED_RESULTS = 4096
+
+
+def _deletions(key: str) -> Set[str]:
+    """key with each single character removed"""
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Whether a and b differ by at most one substitution, insertion, deletion or adjacent swap"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return (len(diffs) == 2 and diffs[1] == diffs[0] + 1
+                and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]])
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+def upstream_records(data: Any, asset_type: str) -> List[Dict]:
+    """
+    Symbol records from a symbollookup response
+    
+    The response is a list of symbols or {'Symbols': [...]}; each record is
+    kept as TradeStation sent it, with 'Symbol' upper-cased and 'AssetType'
+    set to the asset type that was looked up.
+    """
+    items = data.get('Symbols') if isinstance(data, dict) else data
+    records = []
+    for item in items or []:
+        if not isinstance(item, dict):
+            continue
+        symbol = item.get('Symbol') or item.get('Name')
+        if symbol:
+            records.append({**item, 'Symbol': str(symbol).upper(), 'AssetType': asset_type.upper()})
+    return records
+
+
+class SymbolIndex:
+    """Prefix and fuzzy search over symbol records"""
+    
+    def __init__(self):
+        self.records: Dict[int, Dict] = {}
+        self._ids: Dict[Tuple[str, str], int] = {}
+        self._next_id = 0
+        # Sorted (key, record id) pairs
+        self._symbols: List[Tuple[str, int]] = []
+        self._words: List[Tuple[str, int]] = []
+        # Key or one deletion of it -> (key, record id)
+        self._variants: Dict[str, Set[Tuple[str, int]]] = {}
+        self._results: 'OrderedDict[Tuple[str, Optional[str], int], List[Dict]]' = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    @staticmethod
+    def _words_of(record: Dict) -> List[str]:
+        return [word for word in _WORD.findall(str(record.get('Description') or '').upper()) if len(word) > 1]
+    
+    def _keys(self, record: Dict) -> Set[str]:
+        return {record['Symbol'], *self._words_of(record)}
+    
+    def _fuzzy_keys(self, record: Dict) -> Set[str]:
+        """
+        Symbol and first description word (the name: "Microsoft" in "Microsoft Corp")
+        
+        Words like INC, ETF or TRUST shared by thousands of descriptions are
+        left out, so a typo doesn't match all of them.
+        """
+        words = self._words_of(record)
+        return {record['Symbol'], *words[:1]}
+    
+    def get(self, symbol: str, asset_type: str) -> Optional[Dict]:
+        record_id = self._ids.get((symbol, asset_type))
+        return self.records[record_id] if record_id is not None else None
+    
+    def add(self, record: Dict):
+        """Insert a record, replacing the one with the same symbol and asset type"""
+        self.add_many([record])
+    
+    def add_many(self, records: Iterable[Dict]):
+        """Insert records, sorting the prefix arrays once for the whole batch"""
+        # The last record of the batch wins
+        batch = {(record['Symbol'], record['AssetType']): record for record in records}
+        batch = {identity: record for identity, record in batch.items()
+                 if identity not in self._ids or self.records[self._ids[identity]] != record}
+        if not batch:
+            return
+        
+        # Replaced records go first: remove() bisects the arrays, which are only
+        # sorted until the first new entry is appended
+        for identity in batch:
+            self.remove(*identity)
+        
+        for identity, record in batch.items():
+            record_id = self._next_id
+            self._next_id += 1
+            self.records[record_id] = record
+            self._ids[identity] = record_id
+            self._symbols.append((record['Symbol'], record_id))
+            self._words.extend((word, record_id) for word in set(self._words_of(record)))
+            for key in self._fuzzy_keys(record):
+                for variant in _deletions(key) | {key}:
+                    self._variants.setdefault(variant, set()).add((key, record_id))
+        
+        # Appended entries are merged into the sorted runs in linear time
+        self._symbols.sort()
+        self._words.sort()
+        self._results.clear()
+    
+    def remove(self, symbol: str, asset_type: str):
+        record_id = self._ids.pop((symbol, asset_type), None)
+        if record_id is None:
+            return
+        record = self.records.pop(record_id)
+        self._results.clear()
+        self._symbols.pop(bisect_left(self._symbols, (symbol, record_id)))
+        for word in set(self._words_of(record)):
+            self._words.pop(bisect_left(self._words, (word, record_id)))
+        for key in self._fuzzy_keys(record):
+            for variant in _deletions(key) | {key}:
+                entries = self._variants.get(variant)
+                if entries is not None:
+                    entries.discard((key, record_id))
+                    if not entries:
+                        del self._variants[variant]
+    
+    @staticmethod
+    def _prefixed(keys: List[Tuple[str, int]], prefix: str) -> Iterable[Tuple[str, int]]:
+        start = bisect_left(keys, (prefix,))
+        for key, record_id in keys[start:start + MAX_PREFIX_SCAN]:
+            if not key.startswith(prefix):
+                break
+            yield key, record_id
+    
+    def search(self, query: str, asset_type: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """
+        Records matching query, best first
+        
+        Symbol prefix (so an exact match first), then description word
+        prefix, then symbols and words one edit away; shorter symbols first
+        within a tier. A tier is only searched if the ones before it left
+        room under limit. With several words, every further word must prefix
+        the symbol or a word of the description. Results are cached until the
+        index changes.
+        """
+        cache_key = (query.upper(), asset_type, limit)
+        cached = self._results.get(cache_key)
+        if cached is not None:
+            self._results.move_to_end(cache_key)
+            return cached
+        
+        terms = query.upper().split()
+        first, rest = (terms[0], terms[1:]) if terms else ('', [])
+        seen: Set[int] = set()
+        results: List[Dict] = []
+        
+        def take(record_ids: Iterable[int]):
+            """Append the tier's matching records, shortest symbol first"""
+            matches = []
+            for record_id in record_ids:
+                if record_id in seen:
+                    continue
+                seen.add(record_id)
+                record = self.records[record_id]
+                if asset_type and record['AssetType'] != asset_type:
+                    continue
+                if rest:
+                    keys = self._keys(record)
+                    if not all(any(key.startswith(term) for key in keys) for term in rest):
+                        continue
+                matches.append((len(record['Symbol']), record['Symbol'], record_id))
+            matches.sort()
+            results.extend(self.records[record_id] for *_, record_id in matches[:limit - len(results)])
+        
+        if first:
+            take(record_id for _, record_id in self._prefixed(self._symbols, first))
+        if first and len(results) < limit:
+            take(record_id for _, record_id in self._prefixed(self._words, first))
+        if len(first) >= MIN_FUZZY_LENGTH and len(results) < limit:
+            fuzzy = set()
+            for variant in _deletions(first) | {first}:
+                fuzzy.update(record_id for key, record_id in self._variants.get(variant, ())
+                             if record_id not in seen and _within_one_edit(first, key))
+            take(fuzzy)
+        
+        self._results[cache_key] = results
+        if len(self._results) > MAX_CACHED_RESULTS:
+            self._results.popitem(last=False)
+        return results
+
+
+class SymbolMaster:
+    """Symbol index kept current from TradeStation and persisted to disk"""
+    
+    def __init__(self, ts_client, path: Optional[str] = None,
+                 asset_types: Iterable[str] = ('STOCK',),
+                 seeds: Optional[Iterable[str]] = None,
+                 refresh_seconds: float = 86400,
+                 max_age_seconds: float = 7 * 86400,
+                 save_interval: float = 60):
+        """
+        Args:
+            ts_client: TradeStationClient used for lookups
+            path: JSON file the master is persisted to (None: memory only)
+            asset_types: Asset types swept on each refresh
+            seeds: Queries swept on each refresh (default: A-Z)
+            refresh_seconds: Time between sweeps (0: no sweeps, filled by lookups only)
+            max_age_seconds: Records not seen in a lookup for this long are dropped on refresh
+            save_interval: How often pending changes are written to path
+        """
+        self.ts_client = ts_client
+        self.path = path
+        self.asset_types = [asset_type.upper() for asset_type in asset_types]
+        self.seeds = list(seeds) if seeds else [chr(c) for c in range(ord('A'), ord('Z') + 1)]
+        self.refresh_seconds = refresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self.save_interval = save_interval
+        
+        self.index = SymbolIndex()
+        self._seen_at: Dict[Tuple[str, str], float] = {}
+        self._misses: Dict[Tuple[str, str], float] = {}
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+        self._attempted_at = 0.0
+        
+        self.refreshed_at = 0.0
+        self.local_hits = 0
+        self.upstream_lookups = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+    
+    # ==================== Updating ====================
+    
+    def merge(self, records: Iterable[Dict], now: Optional[float] = None) -> int:
+        """Add or update records; returns how many were merged"""
+        now = now or time.time()
+        records = list(records)
+        self.index.add_many(records)
+        for record in records:
+            self._seen_at[(record['Symbol'], record['AssetType'])] = now
+        if records:
+            self._dirty = True
+        return len(records)
+    
+    async def refresh(self):
+        """Sweep symbollookup over the seed queries and drop records not seen for max_age_seconds"""
+        start = time.time()
+        failed = 0
+        for asset_type in self.asset_types:
+            for seed in self.seeds:
+                try:
+                    data = await self.ts_client.search_symbols(seed, asset_type, priority=Priority.BACKGROUND)
+                except Exception as e:
+                    data = None
+                    logger.warning(f"Symbol master sweep of {seed!r} ({asset_type}) failed: {e}")
+                if data is None:
+                    failed += 1
+                    continue
+                self.merge(upstream_records(data, asset_type), start)
+        
+        # Only prune after a complete sweep, or a failed one would empty the master
+        if not failed:
+            for identity, seen_at in list(self._seen_at.items()):
+                if start - seen_at > self.max_age_seconds:
+                    self.index.remove(*identity)
+                    del self._seen_at[identity]
+                    self._dirty = True
+            self.refreshed_at = start
+            self.refreshes += 1
+        else:
+            self.refresh_errors += 1
+        self._misses.clear()
+        logger.info(f"Symbol master refreshed: {len(self.index)} symbols in {time.time() - start:.1f}s"
+                    f"{f' ({failed} lookups failed)' if failed else ''}")
+    
+    # ==================== Lookups ====================
+    
+    def search(self, query: str, asset_type: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """Local matches only"""
+        return self.index.search(query, asset_type.upper() if asset_type else None, limit)
+    
+    async def lookup(self, query: str, asset_type: Optional[str] = None, limit: int = 20,
+                     use_cache: bool = True) -> List[Dict]:
+        """
+        Matches for query, asking TradeStation only when there are none locally
+        
+        asset_type None searches every asset type (and on a miss, looks up
+        each swept one). A query TradeStation had nothing for isn't sent again
+        for MISS_TTL seconds.
+        """
+        if use_cache:
+            results = self.search(query, asset_type, limit)
+            if results:
+                self.local_hits += 1
+                return results
+        
+        asset_types = [asset_type.upper()] if asset_type else self.asset_types
+        now = time.time()
+        pending = [typ for typ in asset_types
+                   if not use_cache or now - self._misses.get((query.upper(), typ), 0.0) >= MISS_TTL]
+        if not pending:
+            self.local_hits += 1
+            return []
+        
+        self.upstream_lookups += 1
+        responses = await asyncio.gather(*(self.ts_client.search_symbols(query, typ) for typ in pending))
+        for typ, data in zip(pending, responses):
+            if data is None:
+                continue
+            if not self.merge(upstream_records(data, typ), now):
+                self._misses[(query.upper(), typ)] = now
+        if len(self._misses) > MAX_MISSES:
+            self._misses.clear()
+        return self.search(query, asset_type, limit)
+    
+    # ==================== Persistence ====================
+    
+    def _read_file(self) -> Optional[Tuple[SymbolIndex, Dict[Tuple[str, str], float], float]]:
+        """Read the persisted master and index it (blocking)"""
+        if not self.path or not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        index = SymbolIndex()
+        index.add_many(record for record, _ in data.get('records', []))
+        seen_at = {(record['Symbol'], record['AssetType']): seen for record, seen in data.get('records', [])}
+        return index, seen_at, data.get('refreshed_at', 0.0)
+    
+    def _write_file(self, data: Dict):
+        """Atomically replace the persisted master (blocking): temp file, fsync, rename"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp_path = os.path.join(directory, f".{os.path.basename(self.path)}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    
+    async def load(self):
+        """Load the persisted master, if any (indexed off the event loop)"""
+        try:
+            loaded = await asyncio.to_thread(self._read_file)
+        except Exception as e:
+            logger.error(f"Error loading symbol master from {self.path}: {e}")
+            return
+        if not loaded:
+            return
+        index, seen_at, self.refreshed_at = loaded
+        # Keep anything merged from lookups while the file was loading
+        index.add_many(self.index.records.values())
+        self.index = index
+        self._seen_at = {**seen_at, **self._seen_at}
+        logger.info(f"Loaded {len(self.index)} symbols from {self.path}")
+    
+    async def save(self):
+        """Write the master to disk if it changed since the last save"""
+        if not self.path or not self._dirty:
+            return
+        self._dirty = False
+        data = {
+            'refreshed_at': self.refreshed_at,
+            'records': [[record, self._seen_at[(record['Symbol'], record['AssetType'])]]
+                        for record in self.index.records.values()],
+        }
+        try:
+            await asyncio.to_thread(self._write_file, data)
+        except Exception as e:
+            self._dirty = True
+            logger.error(f"Error saving symbol master to {self.path}: {e}")
+    
+    # ==================== Background Loop ====================
+    
+    async def _run(self):
+        await self.load()
+        while True:
+            now = time.time()
+            due = self.refresh_seconds and now - self.refreshed_at >= self.refresh_seconds
+            if due and now - self._attempted_at >= REFRESH_RETRY_SECONDS:
+                self._attempted_at = now
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    self.refresh_errors += 1
+                    logger.error(f"Symbol master refresh failed: {e}")
+            await self.save()
+            await asyncio.sleep(self.save_interval)
+    
+    def start(self):
+        """Load the persisted master, then refresh and save it in the background"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Cancel the background loop and save pending changes"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.save()
+    
+    def get_stats(self) -> Dict:
+        return {
+            "symbols": len(self.index),
+            "refreshed_at": self.refreshed_at or None,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "local_hits": self.local_hits,
+            "upstream_lookups": self.upstream_lookups,
+        }
@@ -0,0 +1,163 @@
+"""
+Circuit breakers for upstream endpoint families (TradeStation's by default)
+
+A breaker opens after consecutive upstream failures (timeouts, connection
+errors, 5xx after retries). While open, calls fail immediately with
+CircuitOpenError instead of each waiting out the HTTP timeout, and the API
+serves from cache only. After a recovery delay a single probe request is
+let through (half-open): success closes the breaker, failure re-opens it
+with a longer delay.
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .rate_limiter import ENDPOINT_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint family whose breaker is open"""
+
+    def __init__(self, name: str, retry_after: Optional[float] = None, upstream: str = 'TradeStation'):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{upstream} {name} unavailable (circuit open)")
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with half-open probing"""
+
+    def __init__(self, name: str,
+                 upstream: str = 'TradeStation',
+                 failure_threshold: int = 5,
+                 recovery_timeout: float = 15.0,
+                 max_recovery_timeout: float = 300.0,
+                 half_open_probes: int = 1):
+        self.name = name
+        self.upstream = upstream
+        self.failure_threshold = failure_threshold
+        self.base_recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self.half_open_probes = half_open_probes
+
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.recovery_timeout = recovery_timeout
+        self.opened_at: Optional[float] = None
+        self._probes = 0
+
+        # Stats
+        self.rejected = 0
+        self.times_opened = 0
+
+    def _retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.recovery_timeout - time.monotonic())
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go upstream now"""
+        if self.state == CircuitState.CLOSED:
+            return
+
+        if self.state == CircuitState.OPEN:
+            if self._retry_after() > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self._retry_after(), self.upstream)
+            self.state = CircuitState.HALF_OPEN
+            self._probes = 0
+            logger.info(f"Circuit {self.name} half-open, probing {self.upstream}")
+
+        if self._probes >= self.half_open_probes:
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self.recovery_timeout, self.upstream)
+        self._probes += 1
+
+    def record(self, success: Optional[bool]):
+        """
+        Record the outcome of a call allowed by before_call
+
+        None means the call ended without telling us anything about the
+        upstream (e.g. it was cancelled); it only frees a probe slot.
+        """
+        if self.state == CircuitState.HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+        if success is None:
+            return
+        if success:
+            self._on_success()
+        else:
+            self._on_failure()
+
+    def _on_success(self):
+        if self.state != CircuitState.CLOSED:
+            logger.info(f"Circuit {self.name} closed, {self.upstream} recovered")
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.recovery_timeout = self.base_recovery_timeout
+        self.opened_at = None
+
+    def _on_failure(self):
+        self.failures += 1
+        if self.state == CircuitState.HALF_OPEN:
+            # Failed probe: back off further before the next one
+            self.recovery_timeout = min(self.recovery_timeout * 2, self.max_recovery_timeout)
+            self._open()
+        elif self.state == CircuitState.CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = CircuitState.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        logger.warning(
+            f"Circuit {self.name} open after {self.failures} failures, "
+            f"fast-failing for {self.recovery_timeout:.0f}s"
+        )
+
+    def is_open(self) -> bool:
+        return self.state != CircuitState.CLOSED
+
+    def get_stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_after": round(self._retry_after(), 1) if self.state == CircuitState.OPEN else None,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreakers:
+    """One breaker per endpoint family (same families as the rate limiter)"""
+
+    def __init__(self, endpoint_buckets: Optional[List[Tuple[str, str]]] = None,
+                 upstream: str = 'TradeStation', **breaker_options):
+        self.endpoint_buckets = ENDPOINT_BUCKETS if endpoint_buckets is None else endpoint_buckets
+        self.upstream = upstream
+        self._options = breaker_options
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def for_endpoint(self, endpoint: str) -> CircuitBreaker:
+        name = next((name for prefix, name in self.endpoint_buckets if endpoint.startswith(prefix)), 'default')
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, self.upstream, **self._options)
+            self.breakers[name] = breaker
+        return breaker
+
+    def open_families(self) -> List[str]:
+        return [name for name, breaker in self.breakers.items() if breaker.is_open()]
+
+    def get_stats(self) -> Dict:
+        return {name: breaker.get_stats() for name, breaker in self.breakers.items()}
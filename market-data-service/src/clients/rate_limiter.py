@@ -0,0 +1,192 @@
+"""
+Upstream request scheduling for TradeStation and the other providers
+
+Every upstream call acquires a token from the bucket for its endpoint
+family before it is sent. Callers that can't get a token wait in a priority
+queue, so interactive requests (quotes for a user or scanner) go ahead of
+background work (prewarming, refresh-ahead). Time spent waiting is recorded
+per bucket - that is the measure of how much we are being throttled.
+
+The defaults are TradeStation's; other providers pass their own quotas and
+endpoint families (see providers/http.py).
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Priority:
+    """Request priorities (lower is served first)"""
+    INTERACTIVE = 0
+    BACKGROUND = 10
+
+
+# TradeStation v3 published quotas: (requests, interval seconds)
+TRADESTATION_RATE_LIMITS: Dict[str, Tuple[int, float]] = {
+    'quotes': (250, 300.0),
+    'barcharts': (250, 300.0),
+    'options_expirations': (30, 60.0),
+    'options_strikes': (30, 60.0),
+    'options_chains': (30, 60.0),
+    'symbollookup': (250, 300.0),
+    'default': (250, 300.0),
+}
+
+
+def scaled_rate_limits(scale: float, limits: Optional[Dict[str, Tuple[int, float]]] = None
+                       ) -> Dict[str, Tuple[int, float]]:
+    """Quotas (TradeStation's by default) multiplied by scale (e.g. for a fake upstream in benchmarks)"""
+    return {
+        name: (max(1, int(quota * scale)), interval)
+        for name, (quota, interval) in (limits or TRADESTATION_RATE_LIMITS).items()
+    }
+
+# Endpoint prefix -> bucket name (first match wins)
+ENDPOINT_BUCKETS: List[Tuple[str, str]] = [
+    ('/marketdata/quotes', 'quotes'),
+    ('/marketdata/barcharts', 'barcharts'),
+    ('/marketdata/options/expirations', 'options_expirations'),
+    ('/marketdata/options/strikes', 'options_strikes'),
+    ('/marketdata/options/chains', 'options_chains'),
+    ('/marketdata/symbollookup', 'symbollookup'),
+]
+
+
+class TokenBucket:
+    """
+    Token bucket with a priority wait queue
+
+    A bucket allowing `burst` immediate requests refills at
+    (quota - burst) / interval tokens per second, so no window of `interval`
+    seconds ever sees more than `quota` requests.
+    """
+
+    def __init__(self, name: str, quota: int, interval: float, burst_fraction: float = 0.2):
+        self.name = name
+        self.capacity = max(1, int(quota * burst_fraction))
+        self.rate = max(quota - self.capacity, 1) / interval
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+        self._waiters: List[list] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        # Throttling stats
+        self.requests = 0
+        self.queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _dispatch(self):
+        """Hand tokens to waiters in priority order, rescheduling if any remain"""
+        self._timer = None
+        self._refill()
+
+        while self._waiters and self.tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+
+        # Drop cancelled waiters sitting at the head
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+
+        if self._waiters:
+            delay = (1 - self.tokens) / self.rate
+            self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    async def acquire(self, priority: int = Priority.INTERACTIVE) -> float:
+        """Wait for a token; returns the time spent queued in seconds"""
+        self.requests += 1
+        self._refill()
+
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, next(self._seq), future])
+        self.queued += 1
+
+        if self._timer is None:
+            self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+        waited = time.monotonic() - start
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def available(self, seconds: float) -> int:
+        """Requests the bucket can admit over the next seconds, after those already queued"""
+        self._refill()
+        return max(0, int(self.tokens + seconds * self.rate) - len(self._waiters))
+
+    def penalize(self, seconds: float):
+        """Drain the bucket after an upstream 429 so queued callers back off too"""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+    def get_stats(self) -> Dict:
+        self._refill()
+        return {
+            "requests": self.requests,
+            "queued": self.queued,
+            "waiting": len(self._waiters),
+            "tokens": round(max(self.tokens, 0.0), 2),
+            "avg_wait_ms": round(self.total_wait / self.queued * 1000, 1) if self.queued else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+        }
+
+
+class UpstreamScheduler:
+    """Per-endpoint token buckets for all calls to one upstream"""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[int, float]]] = None,
+                 endpoint_buckets: Optional[List[Tuple[str, str]]] = None):
+        limits = limits or TRADESTATION_RATE_LIMITS
+        self.endpoint_buckets = ENDPOINT_BUCKETS if endpoint_buckets is None else endpoint_buckets
+        self.buckets = {
+            name: TokenBucket(name, quota, interval)
+            for name, (quota, interval) in limits.items()
+        }
+        if 'default' not in self.buckets:
+            quota, interval = TRADESTATION_RATE_LIMITS['default']
+            self.buckets['default'] = TokenBucket('default', quota, interval)
+
+    def bucket_for(self, endpoint: str) -> TokenBucket:
+        for prefix, name in self.endpoint_buckets:
+            if endpoint.startswith(prefix) and name in self.buckets:
+                return self.buckets[name]
+        return self.buckets['default']
+
+    async def acquire(self, endpoint: str, priority: int = Priority.INTERACTIVE) -> float:
+        """Wait until endpoint may be called; returns queue wait in seconds"""
+        bucket = self.bucket_for(endpoint)
+        waited = await bucket.acquire(priority)
+        if waited > 1.0:
+            logger.info(f"Throttled {bucket.name} request for {waited:.2f}s (priority {priority})")
+        return waited
+
+    def get_stats(self) -> Dict:
+        return {name: bucket.get_stats() for name, bucket in self.buckets.items()}
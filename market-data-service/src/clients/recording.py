@@ -0,0 +1,194 @@
+"""
+Capture and replay of TradeStation responses
+
+RecordingTransport wraps the client's HTTP transport and appends every
+upstream response to a gzip-compressed JSON-lines log:
+
+    {"t": <unix time>, "method": "GET", "path": "/v3/marketdata/quotes/SPY",
+     "query": "...", "status": 200, "elapsed": 0.041, "headers": {...}, "body": "..."}
+
+Request headers (the bearer token) are never written, and only API requests
+go through the transport (token refreshes use their own client).
+
+ReplayTransport serves a capture instead of the network. With speed > 0 a
+replay clock runs from the start of the capture at that multiple of real
+time, and each request gets the latest response recorded for it at that
+point of the capture, after the recorded latency (also scaled). With
+speed 0 responses are served without delay, each request for the same
+resource advancing to its next recorded response.
+"""
+
+import asyncio
+import bisect
+import gzip
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Response headers worth keeping (throttling and content type)
+RECORDED_HEADERS = ('content-type', 'retry-after')
+
+_CLOSE = object()
+
+
+def _query_key(url: httpx.URL) -> str:
+    """Query string with parameters sorted, so equal requests match"""
+    return str(httpx.QueryParams(sorted(url.params.multi_items())))
+
+
+class CaptureWriter:
+    """Appends capture records from a background thread (gzip is too slow for the event loop)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict):
+        self._queue.put(record)
+
+    def _run(self):
+        # Appending adds a gzip member per run; readers see one stream
+        with gzip.open(self.path, 'at', encoding='utf-8') as f:
+            while True:
+                record = self._queue.get()
+                if record is _CLOSE:
+                    break
+                f.write(json.dumps(record, separators=(',', ':')) + '\n')
+                self.records += 1
+                if self._queue.empty():
+                    f.flush()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+            self._thread.join(timeout=10)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Pass requests through and record every response"""
+
+    def __init__(self, path: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.writer = CaptureWriter(path)
+        logger.info(f"Capturing TradeStation responses to {path}")
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+
+        self.writer.write({
+            't': round(time.time(), 3),
+            'method': request.method,
+            'path': request.url.path,
+            'query': _query_key(request.url),
+            'status': response.status_code,
+            'elapsed': round(time.perf_counter() - start, 4),
+            'headers': {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            'body': body.decode('utf-8', errors='replace'),
+        })
+        # The body is already decoded, so drop the headers describing the wire encoding
+        headers = [(name, value) for name, value in response.headers.multi_items()
+                   if name.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')]
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+        self.writer.close()
+
+    def get_stats(self) -> Dict:
+        return {"mode": "capture", "path": self.writer.path, "records": self.writer.records}
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serve responses from a capture log, without network access"""
+
+    def __init__(self, path: str, speed: float = 1.0):
+        self.path = path
+        self.speed = speed
+        # (method, path, query) -> records in capture order, and (method, path) as a
+        # fallback for requests whose parameters were never captured
+        self._index: Dict[Tuple, List[Dict]] = {}
+        self._times: Dict[Tuple, List[float]] = {}
+        self._cursor: Dict[Tuple, int] = {}
+
+        records = self._load(path)
+        self.start_time = records[0]['t'] if records else 0.0
+        self.end_time = records[-1]['t'] if records else 0.0
+        for record in records:
+            for key in ((record['method'], record['path'], record['query']), (record['method'], record['path'])):
+                self._index.setdefault(key, []).append(record)
+                self._times.setdefault(key, []).append(record['t'])
+        self._started = time.monotonic()
+
+        self.records = len(records)
+        self.served = 0
+        self.missed = 0
+        logger.info(
+            f"Replaying {self.records} TradeStation responses from {path} "
+            f"({self.end_time - self.start_time:.0f}s of capture, speed {speed:g})"
+        )
+
+    @staticmethod
+    def _load(path: str) -> List[Dict]:
+        records = []
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+        records.sort(key=lambda record: record['t'])
+        return records
+
+    def _capture_clock(self) -> float:
+        """Capture time the replay has reached"""
+        return self.start_time + (time.monotonic() - self._started) * self.speed
+
+    def _select(self, key: Tuple, candidates: List[Dict]) -> Dict:
+        if self.speed <= 0:
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = min(index + 1, len(candidates) - 1)
+            return candidates[index]
+        # Latest response recorded at or before the replay clock (else the first one)
+        index = bisect.bisect_right(self._times[key], self._capture_clock()) - 1
+        return candidates[max(index, 0)]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = (request.method, request.url.path, _query_key(request.url))
+        candidates = self._index.get(key)
+        if candidates is None:
+            key = key[:2]
+            candidates = self._index.get(key)
+        if not candidates:
+            self.missed += 1
+            return httpx.Response(404, json={'Error': 'NotCaptured', 'Message': f"No capture for {request.url.path}"},
+                                  request=request)
+
+        record = self._select(key, candidates)
+        self.served += 1
+        if self.speed > 0 and record.get('elapsed'):
+            await asyncio.sleep(record['elapsed'] / self.speed)
+        return httpx.Response(record['status'], headers=record.get('headers') or {},
+                              content=record['body'].encode('utf-8'), request=request)
+
+    def get_stats(self) -> Dict:
+        return {
+            "mode": "replay",
+            "path": self.path,
+            "speed": self.speed,
+            "records": self.records,
+            "served": self.served,
+            "not_captured": self.missed,
+            "capture_position": round(min(self._capture_clock(), self.end_time) - self.start_time, 1)
+            if self.speed > 0 else None,
+        }
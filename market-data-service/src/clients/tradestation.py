@@ -13,65 +13,204 @@ import os
 from pathlib import Path
 import json
 import logging
+import random
+import time
+
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind
+
+from ..utils import metrics, tracing
+from .rate_limiter import Priority, UpstreamScheduler
+from .circuit_breaker import CircuitBreakers, CircuitOpenError
+from .recording import ReplayTransport
 
 logger = logging.getLogger(__name__)
 
+class RateLimitError(Exception):
+    """An upstream (TradeStation unless named) kept answering 429 after all retries"""
+
+    def __init__(self, endpoint: str, retry_after: Optional[float] = None, upstream: str = 'TradeStation'):
+        super().__init__(f"Rate limited by {upstream} on {endpoint}")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
 class TradeStationClient:
     """TradeStation API client for market data retrieval"""
     
     BASE_URL = "https://api.tradestation.com/v3"
     TOKEN_URL = "https://signin.tradestation.com/oauth/token"
     
-    def __init__(self, client_id: str, client_secret: str, token_storage_path: Optional[str] = None):
+    # Retry policy for 429 and 5xx responses
+    MAX_RETRIES = 3
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 10.0
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    
+    # Fail connects fast; slow reads still get the full timeout
+    REQUEST_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+    
+    # Background refresher renews the token this long before it expires
+    REFRESH_LEAD_SECONDS = 180
+    
+    def __init__(self, client_id: str, client_secret: str, token_storage_path: Optional[str] = None,
+                 scheduler: Optional[UpstreamScheduler] = None,
+                 breakers: Optional[CircuitBreakers] = None,
+                 base_url: Optional[str] = None,
+                 token_url: Optional[str] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.token_storage_path = token_storage_path or str(Path.home() / ".tradestation_token.json")
         
+        # Overridable to point the service at a fake API (see benchmarks/)
+        self.base_url = (base_url or self.BASE_URL).rstrip('/')
+        self.token_url = token_url or self.TOKEN_URL
+        
+        # API requests share one connection pool; transport can record or replay them
+        self.transport = transport
+        self._http: Optional[httpx.AsyncClient] = None
+        
         self.access_token: Optional[str] = None
         self.refresh_token: Optional[str] = None
         self.token_expires_at: Optional[datetime] = None
         
+        # Rate limiting and priority queueing for every upstream call
+        self.scheduler = scheduler or UpstreamScheduler()
+        
+        # Fast-fail per endpoint family while TradeStation is down
+        self.breakers = breakers or CircuitBreakers()
+        
+        # Token refresh coordination: one refresh at a time, renewed ahead of expiry
+        self._refresh_lock = asyncio.Lock()
+        self._refresher_task: Optional[asyncio.Task] = None
+        
         # Load existing tokens if available
         self._load_tokens()
+        
+        # Replayed responses need no credentials (and must not trigger refreshes)
+        if isinstance(transport, ReplayTransport):
+            self.access_token = 'replay'
+            self.token_expires_at = None
+    
+    def _read_token_file(self) -> Optional[Dict]:
+        """Read the shared token file (blocking)"""
+        if not os.path.exists(self.token_storage_path):
+            return None
+        with open(self.token_storage_path, 'r') as f:
+            return json.load(f)
+    
+    def _apply_token_data(self, data: Dict):
+        self.access_token = data.get('access_token')
+        self.refresh_token = data.get('refresh_token')
+        
+        expires_str = data.get('expires_at')
+        if expires_str:
+            self.token_expires_at = datetime.fromisoformat(expires_str)
     
     def _load_tokens(self):
         """Load tokens from storage file"""
         try:
-            if os.path.exists(self.token_storage_path):
-                with open(self.token_storage_path, 'r') as f:
-                    data = json.load(f)
-                    self.access_token = data.get('access_token')
-                    self.refresh_token = data.get('refresh_token')
-                    
-                    expires_str = data.get('expires_at')
-                    if expires_str:
-                        self.token_expires_at = datetime.fromisoformat(expires_str)
-                    
+            data = self._read_token_file()
+            if data:
+                self._apply_token_data(data)
                 logger.info("Loaded TradeStation tokens from storage")
         except Exception as e:
             logger.error(f"Error loading tokens: {e}")
     
-    def _save_tokens(self):
-        """Save tokens to storage file"""
+    def _write_token_file(self, data: Dict):
+        """
+        Atomically replace the token file (blocking)
+        
+        The file is shared with PIM and finvec, so readers must never see a
+        partially written file: write a private temp file in the same
+        directory, fsync it, then rename it over the old one.
+        """
+        directory = os.path.dirname(os.path.abspath(self.token_storage_path))
+        tmp_path = os.path.join(directory, f".{os.path.basename(self.token_storage_path)}.{os.getpid()}.tmp")
+        
+        # Create with restrictive permissions (owner read/write only)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
         try:
-            data = {
-                'access_token': self.access_token,
-                'refresh_token': self.refresh_token,
-                'expires_at': self.token_expires_at.isoformat() if self.token_expires_at else None
-            }
-            
-            with open(self.token_storage_path, 'w') as f:
+            with os.fdopen(fd, 'w') as f:
                 json.dump(data, f)
-            
-            # Set restrictive permissions (owner read/write only)
-            os.chmod(self.token_storage_path, 0o600)
-            
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.token_storage_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    
+    async def _save_tokens(self):
+        """Save tokens to storage file without blocking the event loop"""
+        data = {
+            'access_token': self.access_token,
+            'refresh_token': self.refresh_token,
+            'expires_at': self.token_expires_at.isoformat() if self.token_expires_at else None
+        }
+        
+        try:
+            await asyncio.to_thread(self._write_token_file, data)
             logger.info("Saved TradeStation tokens to storage")
         except Exception as e:
             logger.error(f"Error saving tokens: {e}")
     
-    async def _refresh_access_token(self) -> bool:
-        """Refresh the access token using the refresh token"""
+    def _token_needs_refresh(self, lead_seconds: float) -> bool:
+        if not self.token_expires_at:
+            return False
+        return datetime.now() >= self.token_expires_at - timedelta(seconds=lead_seconds)
+    
+    async def _adopt_shared_tokens(self, lead_seconds: float) -> bool:
+        """
+        Pick up a token another service already refreshed
+        
+        Returns True if the token file held a token that is good for more
+        than lead_seconds, so no refresh is needed.
+        """
+        try:
+            data = await asyncio.to_thread(self._read_token_file)
+        except Exception as e:
+            logger.debug(f"Could not read shared token file: {e}")
+            return False
+        
+        if not data or not data.get('expires_at') or data.get('access_token') == self.access_token:
+            return False
+        
+        expires_at = datetime.fromisoformat(data['expires_at'])
+        if datetime.now() >= expires_at - timedelta(seconds=lead_seconds):
+            return False
+        
+        self._apply_token_data(data)
+        logger.info("Adopted TradeStation token refreshed by another service")
+        return True
+    
+    async def _refresh_access_token(self, stale_token: Optional[str] = None,
+                                    lead_seconds: Optional[float] = None) -> bool:
+        """
+        Refresh the access token using the refresh token
+        
+        Refreshes are serialized by a lock. A caller that waited on the lock
+        re-checks the token first, so a burst of callers results in exactly
+        one refresh.
+        
+        Args:
+            stale_token: The token a request was rejected with (401); skip the
+                refresh if the current token already differs from it
+            lead_seconds: Only refresh if the token expires within this many
+                seconds (None refreshes unconditionally, e.g. after a 401)
+        """
+        async with self._refresh_lock:
+            if stale_token is not None and self.access_token != stale_token:
+                return True
+            if lead_seconds is not None and self.access_token and not self._token_needs_refresh(lead_seconds):
+                return True
+            if await self._adopt_shared_tokens(lead_seconds if lead_seconds is not None else self.REFRESH_LEAD_SECONDS):
+                return True
+            
+            return await self._request_new_token()
+    
+    async def _request_new_token(self) -> bool:
+        """Exchange the refresh token for a new access token (call under the lock)"""
         if not self.refresh_token:
             logger.error("No refresh token available")
             return False
@@ -79,7 +218,7 @@ class TradeStationClient:
         try:
             async with httpx.AsyncClient() as client:
                 response = await client.post(
-                    self.TOKEN_URL,
+                    self.token_url,
                     data={
                         'grant_type': 'refresh_token',
                         'refresh_token': self.refresh_token,
@@ -101,7 +240,7 @@ class TradeStationClient:
                     expires_in = data.get('expires_in', 1200)  # Default 20 minutes
                     self.token_expires_at = datetime.now() + timedelta(seconds=expires_in)
                     
-                    self._save_tokens()
+                    await self._save_tokens()
                     logger.info("Successfully refreshed access token")
                     return True
                 else:
@@ -114,10 +253,11 @@ class TradeStationClient:
     
     async def ensure_authenticated(self) -> bool:
         """Ensure we have a valid access token"""
-        # Check if token is expired or will expire in next 60 seconds
-        if self.token_expires_at and datetime.now() >= (self.token_expires_at - timedelta(seconds=60)):
+        # Fallback for when the background refresher isn't running or fell behind:
+        # refresh inline if the token is expired or will expire in next 60 seconds
+        if self._token_needs_refresh(60):
             logger.info("Token expired or expiring soon, refreshing...")
-            return await self._refresh_access_token()
+            return await self._refresh_access_token(lead_seconds=60)
         
         # Check if we have a token
         if not self.access_token:
@@ -126,56 +266,184 @@ class TradeStationClient:
         
         return True
     
-    async def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict]:
-        """Make an authenticated API request"""
-        if not await self.ensure_authenticated():
-            raise Exception("Authentication failed")
+    async def _token_refresh_loop(self):
+        """Renew the access token REFRESH_LEAD_SECONDS before it expires"""
+        while True:
+            if not self.token_expires_at:
+                await asyncio.sleep(60)
+                continue
+            
+            refresh_at = self.token_expires_at - timedelta(seconds=self.REFRESH_LEAD_SECONDS)
+            delay = (refresh_at - datetime.now()).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            
+            if not await self._refresh_access_token(lead_seconds=self.REFRESH_LEAD_SECONDS):
+                logger.warning("Background token refresh failed, retrying in 30s")
+                await asyncio.sleep(30)
+    
+    def start_token_refresher(self):
+        """Start renewing tokens in the background (call from a running event loop)"""
+        if self._refresher_task is None or self._refresher_task.done():
+            self._refresher_task = asyncio.create_task(self._token_refresh_loop())
+    
+    async def close(self):
+        """Stop background token renewal and close the connection pool"""
+        if self._refresher_task:
+            self._refresher_task.cancel()
+            try:
+                await self._refresher_task
+            except asyncio.CancelledError:
+                pass
+            self._refresher_task = None
+        if self._http:
+            await self._http.aclose()
+            self._http = None
+    
+    def _client(self) -> httpx.AsyncClient:
+        """Pooled client for API requests (created on first use, inside the event loop)"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=self.REQUEST_TIMEOUT, transport=self.transport)
+        return self._http
+    
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Full-jitter exponential backoff, honoring Retry-After when present"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.BACKOFF_MAX) + random.uniform(0, self.BACKOFF_BASE)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * (2 ** attempt)))
+    
+    @tracing.traced("tradestation.request")
+    async def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None,
+                            priority: int = Priority.INTERACTIVE) -> Optional[Dict]:
+        """
+        Make an authenticated API request
         
-        url = f"{self.BASE_URL}{endpoint}"
-        headers = {
-            'Authorization': f'Bearer {self.access_token}'
-        }
+        The request waits for a rate-limit token for its endpoint family
+        (interactive callers ahead of background ones) and is retried with
+        jittered backoff on 429 and 5xx responses. If the family's circuit
+        breaker is open it fails immediately with CircuitOpenError.
+        """
+        if method.upper() != 'GET':
+            raise ValueError(f"Unsupported method: {method}")
+        
+        span = trace.get_current_span()
+        span.set_attribute('tradestation.endpoint', endpoint)
+        span.set_attribute('tradestation.priority', priority)
+        
+        breaker = self.breakers.for_endpoint(endpoint)
+        breaker.before_call()
+        # Outcome for the breaker: True/False once the upstream answered or failed
+        upstream_ok: Optional[bool] = None
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                if method.upper() == 'GET':
-                    response = await client.get(url, headers=headers, params=params)
-                else:
-                    raise ValueError(f"Unsupported method: {method}")
+            if not await self.ensure_authenticated():
+                raise Exception("Authentication failed")
+            
+            url = f"{self.base_url}{endpoint}"
+            bucket = self.scheduler.bucket_for(endpoint)
+            
+            client = self._client()
                 
+            async def send(headers: Dict, attempt: int) -> httpx.Response:
+                # Every send spends a token, the retry after a 401 included
+                waited = await self.scheduler.acquire(endpoint, priority)
+                metrics.UPSTREAM_QUEUE_WAIT.labels(bucket.name).observe(waited)
+                span.add_event('rate_limit_token', {'attempt': attempt, 'queue_wait': waited})
+                # One client span per attempt, so retries show up in the trace
+                with tracing.tracer.start_as_current_span(
+                    f"TradeStation {method.upper()} {bucket.name}",
+                    kind=SpanKind.CLIENT,
+                    attributes={'http.method': method.upper(), 'http.url': url},
+                ) as attempt_span:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.get(url, headers=headers, params=params)
+                    except httpx.TransportError:
+                        metrics.record_upstream(bucket.name, 'error', time.perf_counter() - start)
+                        raise
+                    metrics.record_upstream(bucket.name, str(response.status_code), time.perf_counter() - start)
+                    attempt_span.set_attribute('http.status_code', response.status_code)
+                    return response
+                
+            for attempt in range(self.MAX_RETRIES + 1):
+                sent_token = self.access_token
+                headers = {
+                    'Authorization': f'Bearer {sent_token}'
+                }
+                response = await send(headers, attempt)
+                    
                 if response.status_code == 401:
-                    # Token expired, try refreshing
+                    # Token expired, try refreshing (skipped if another request already did)
                     logger.info("Got 401, attempting token refresh...")
-                    if await self._refresh_access_token():
+                    if await self._refresh_access_token(stale_token=sent_token):
                         # Retry the request with new token
                         headers['Authorization'] = f'Bearer {self.access_token}'
-                        response = await client.get(url, headers=headers, params=params)
+                        response = await send(headers, attempt)
                     else:
                         raise Exception("Token refresh failed")
+                    
+                if response.status_code not in self.RETRY_STATUSES:
+                    break
+                    
+                delay = self._retry_delay(attempt, response)
+                if response.status_code == 429:
+                    bucket.penalize(delay)
+                    
+                if attempt == self.MAX_RETRIES:
+                    break
+                    
+                logger.warning(
+                    f"TradeStation {response.status_code} on {endpoint}, "
+                    f"retry {attempt + 1}/{self.MAX_RETRIES} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+                
+            # Throttling and client errors mean TradeStation is up
+            upstream_ok = response.status_code < 500
+                
+            if response.status_code == 429:
+                retry_after = response.headers.get('Retry-After')
+                raise RateLimitError(endpoint, float(retry_after) if retry_after and retry_after.isdigit() else None)
                 
-                response.raise_for_status()
-                return response.json()
+            response.raise_for_status()
+            return response.json()
                 
+        except httpx.TransportError as e:
+            # Timeouts and connection failures
+            upstream_ok = False
+            logger.error(f"Request error: {e!r}")
+            raise
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error: {e.response.status_code} {e.response.text}")
             raise
         except Exception as e:
             logger.error(f"Request error: {e}")
             raise
+        finally:
+            breaker.record(upstream_ok)
     
     # ==================== Market Data Methods ====================
     
-    async def get_quote(self, symbol: str) -> Optional[Dict]:
+    async def get_quote(self, symbol: str, priority: int = Priority.INTERACTIVE) -> Optional[Dict]:
         """Get real-time quote for a symbol"""
         try:
-            data = await self._make_request('GET', f'/marketdata/quotes/{symbol}')
+            data = await self._make_request('GET', f'/marketdata/quotes/{symbol}', priority=priority)
             return data
+        except (RateLimitError, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error(f"Error getting quote for {symbol}: {e}")
             return None
     
     async def get_bars(self, symbol: str, interval: str = '1', unit: str = 'Minute', 
-                       bars_back: int = 100, start_date: Optional[str] = None) -> Optional[List[Dict]]:
+                       bars_back: int = 100, start_date: Optional[str] = None,
+                       priority: int = Priority.INTERACTIVE) -> Optional[List[Dict]]:
         """
         Get historical bars
         
@@ -185,6 +453,7 @@ class TradeStationClient:
             unit: Time unit (Minute, Daily, Weekly, Monthly)
             bars_back: Number of bars to retrieve
             start_date: Optional start date (YYYY-MM-DD)
+            priority: Upstream queue priority
         """
         params = {
             'interval': interval,
@@ -196,78 +465,97 @@ class TradeStationClient:
             params['firstdate'] = start_date
         
         try:
-            data = await self._make_request('GET', f'/marketdata/barcharts/{symbol}', params=params)
+            data = await self._make_request('GET', f'/marketdata/barcharts/{symbol}', params=params,
+                                            priority=priority)
             
             if data and 'Bars' in data:
                 return data['Bars']
             return []
             
+        except (RateLimitError, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error(f"Error getting bars for {symbol}: {e}")
             return None
     
-    async def get_options_chain(self, symbol: str, expiration: Optional[str] = None) -> Optional[Dict]:
+    async def get_options_chain(self, symbol: str, expiration: Optional[str] = None,
+                                priority: int = Priority.INTERACTIVE) -> Optional[Dict]:
         """
         Get options chain for a symbol
         
         Args:
             symbol: Underlying symbol (e.g., 'AAPL')
             expiration: Optional expiration date (YYYY-MM-DD)
+            priority: Upstream queue priority
         """
         params = {}
         if expiration:
             params['expiration'] = expiration
         
         try:
-            data = await self._make_request('GET', f'/marketdata/options/chains/{symbol}', params=params)
+            data = await self._make_request('GET', f'/marketdata/options/chains/{symbol}', params=params,
+                                            priority=priority)
             return data
+        except (RateLimitError, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error(f"Error getting options chain for {symbol}: {e}")
             return None
     
-    async def get_options_expirations(self, symbol: str) -> Optional[List[str]]:
+    async def get_options_expirations(self, symbol: str, priority: int = Priority.INTERACTIVE) -> Optional[List[str]]:
         """Get available option expiration dates for a symbol"""
         try:
-            data = await self._make_request('GET', f'/marketdata/options/expirations/{symbol}')
+            data = await self._make_request('GET', f'/marketdata/options/expirations/{symbol}', priority=priority)
             
             if data and 'Expirations' in data:
                 return data['Expirations']
             return []
             
+        except (RateLimitError, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error(f"Error getting option expirations for {symbol}: {e}")
             return None
     
-    async def get_options_strikes(self, symbol: str, expiration: str) -> Optional[List[float]]:
+    async def get_options_strikes(self, symbol: str, expiration: str,
+                                  priority: int = Priority.INTERACTIVE) -> Optional[List[float]]:
         """Get available strike prices for a symbol and expiration"""
         try:
             data = await self._make_request('GET', 
                 f'/marketdata/options/strikes/{symbol}',
-                params={'expiration': expiration}
+                params={'expiration': expiration},
+                priority=priority
             )
             
             if data and 'Strikes' in data:
                 return data['Strikes']
             return []
             
+        except (RateLimitError, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error(f"Error getting strikes for {symbol}: {e}")
             return None
     
-    async def search_symbols(self, query: str, asset_type: str = 'STOCK') -> Optional[List[Dict]]:
+    async def search_symbols(self, query: str, asset_type: str = 'STOCK',
+                             priority: int = Priority.INTERACTIVE) -> Optional[List[Dict]]:
         """
         Search for symbols
         
         Args:
             query: Search query
             asset_type: STOCK, FUTURES, OPTIONS, etc.
+            priority: Upstream queue priority
         """
         try:
             data = await self._make_request('GET', 
                 '/marketdata/symbollookup',
-                params={'search': query, 'assettype': asset_type}
+                params={'search': query, 'assettype': asset_type},
+                priority=priority
             )
             return data
+        except (RateLimitError, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error(f"Error searching symbols for {query}: {e}")
             return None
@@ -0,0 +1,11 @@
+from .base import MarketDataProvider, ProviderError, UnknownProvider, UnsupportedOperation
+from .coinbase import CoinbaseProvider
+from .models import Bar, OrderBook, Quote
+from .router import ProviderRouter
+from .tradestation import TradeStationProvider
+
+__all__ = [
+    'MarketDataProvider', 'ProviderError', 'UnknownProvider', 'UnsupportedOperation',
+    'CoinbaseProvider', 'TradeStationProvider', 'ProviderRouter',
+    'Bar', 'OrderBook', 'Quote',
+]
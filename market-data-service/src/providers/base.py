@@ -0,0 +1,123 @@
+"""
+Market data provider interface
+
+A provider serves normalized quotes, bars and order books for the symbols
+of its namespace, and optionally streams them. Operations a provider has no
+data for raise UnsupportedOperation. Symbols passed to a provider are its
+own (native) symbols; the router strips the namespace.
+
+Upstream throttling and outages surface as the same exceptions the
+TradeStation client raises (RateLimitError, CircuitOpenError), so the API's
+cache, stale-while-revalidate and degraded mode treat every provider alike.
+"""
+
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from ..clients.rate_limiter import Priority
+from .models import Bar, OrderBook, Quote
+
+# Streaming channels: 'quotes' (Quote updates) and 'book' (OrderBook updates)
+CHANNELS = ('quotes', 'book')
+
+
+class ProviderError(Exception):
+    """Base class of provider errors"""
+
+
+class UnsupportedOperation(ProviderError):
+    """The provider has no such data (e.g. order books from TradeStation, or a bar size an exchange lacks)"""
+
+
+class UnknownProvider(ProviderError):
+    """No provider is registered for a symbol's namespace"""
+
+    def __init__(self, namespace: str):
+        super().__init__(f"No market data provider for namespace {namespace!r}")
+        self.namespace = namespace
+
+
+class Subscription:
+    """Stream events for a set of symbols and channels; iterate it, and close it when done"""
+
+    async def get(self) -> Dict:
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def __aiter__(self) -> AsyncIterator[Dict]:
+        return self
+
+    async def __anext__(self) -> Dict:
+        return await self.get()
+
+
+class MarketDataProvider:
+    """Base class of market data providers"""
+
+    # Namespace the provider's symbols are qualified with ('coinbase:BTC-USD')
+    name = ''
+
+    # Operations implemented: 'quotes', 'bars', 'order_book', 'stream'
+    capabilities: Tuple[str, ...] = ()
+
+    # Streaming channels supported (see CHANNELS)
+    channels: Tuple[str, ...] = ()
+
+    def normalize_symbol(self, symbol: str) -> str:
+        """The provider's own spelling of a symbol"""
+        return symbol.strip().upper()
+
+    def qualify(self, symbol: str) -> str:
+        """The namespaced symbol reported in normalized data"""
+        return f"{self.name}:{symbol}"
+
+    def _unsupported(self, what: str) -> UnsupportedOperation:
+        return UnsupportedOperation(f"{self.name} does not provide {what}")
+
+    async def get_quote(self, symbol: str, priority: int = Priority.INTERACTIVE) -> Optional[Quote]:
+        """Latest quote, or None if the upstream has none for symbol"""
+        raise self._unsupported('quotes')
+
+    async def get_bars(self, symbol: str, interval: str = '1', unit: str = 'Minute', bars_back: int = 100,
+                       start_date: Optional[str] = None,
+                       priority: int = Priority.INTERACTIVE) -> Optional[List[Bar]]:
+        """
+        Historical bars, oldest first (same parameters as TradeStation's barcharts)
+
+        Args:
+            symbol: Native symbol
+            interval: Bar interval in units (1, 5, 15, ...)
+            unit: Minute, Daily, Weekly or Monthly
+            bars_back: Number of bars
+            start_date: Optional first date (YYYY-MM-DD)
+            priority: Upstream queue priority
+        """
+        raise self._unsupported('bars')
+
+    async def get_order_book(self, symbol: str, depth: int = 10,
+                             priority: int = Priority.INTERACTIVE) -> Optional[OrderBook]:
+        """The best depth price levels of each side"""
+        raise self._unsupported('order books')
+
+    async def subscribe(self, symbols: Sequence[str], channels: Sequence[str]) -> Subscription:
+        """Stream events for symbols on channels, starting with the current state where known"""
+        raise self._unsupported('streaming')
+
+    def live_quote(self, symbol: str) -> Optional[Quote]:
+        """A quote kept current by an open stream, if any (no upstream request)"""
+        return None
+
+    def live_order_book(self, symbol: str, depth: int) -> Optional[OrderBook]:
+        """An order book kept current by an open stream, if any (no upstream request)"""
+        return None
+
+    def open_circuits(self) -> List[str]:
+        """Endpoint families whose circuit breaker is open"""
+        return []
+
+    def get_stats(self) -> Dict:
+        return {}
+
+    async def close(self):
+        pass
@@ -0,0 +1,257 @@
+"""
+Coinbase Exchange market data
+
+Public REST endpoints (no key needed) for quotes, candles and L2 books, and
+the public WebSocket feed for streaming: 'ticker' for quotes and
+'level2_batch' for books, applied to a LocalOrderBook per product. While a
+product is streamed its quote and book are answered from the feed without
+an upstream request.
+
+Symbols are Coinbase product ids (BTC-USD, in any case).
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..clients.rate_limiter import Priority
+from .base import Subscription
+from .http import HTTPProvider
+from .models import Bar, OrderBook, Quote, to_float
+from .streaming import FeedKey, FeedProtocol, LocalOrderBook, WebSocketFeed
+
+logger = logging.getLogger(__name__)
+
+
+class CoinbaseProvider(HTTPProvider, FeedProtocol):
+    """Coinbase Exchange (public market data)"""
+
+    name = 'coinbase'
+    capabilities = ('quotes', 'bars', 'order_book', 'stream')
+    channels = ('quotes', 'book')
+
+    BASE_URL = 'https://api.exchange.coinbase.com'
+    WS_URL = 'wss://ws-feed.exchange.coinbase.com'
+
+    # Public endpoints allow 10 requests/second per IP
+    RATE_LIMITS = {'public': (10, 1.0), 'default': (10, 1.0)}
+    ENDPOINT_FAMILIES = [('/products', 'public')]
+
+    # Candles per request
+    MAX_CANDLES = 300
+
+    # (unit, interval) -> candle granularity in seconds
+    GRANULARITIES = {
+        ('Minute', 1): 60,
+        ('Minute', 5): 300,
+        ('Minute', 15): 900,
+        ('Minute', 60): 3600,
+        ('Minute', 360): 21600,
+        ('Daily', 1): 86400,
+    }
+
+    # Our channel -> feed channel
+    FEED_CHANNELS = {'quotes': 'ticker', 'book': 'level2_batch'}
+
+    # Levels per side in streamed book events
+    STREAM_BOOK_DEPTH = 50
+
+    def __init__(self, base_url: Optional[str] = None, ws_url: Optional[str] = None,
+                 rate_limit_scale: float = 1.0, **kwargs):
+        """
+        Args:
+            base_url: Overrides BASE_URL
+            ws_url: Overrides WS_URL
+            rate_limit_scale: Multiplier on RATE_LIMITS
+            **kwargs: As for HTTPProvider
+        """
+        super().__init__(base_url, rate_limit_scale, **kwargs)
+        self.feed = WebSocketFeed(self.name, ws_url or self.WS_URL, self)
+        # Streamed state, by product id
+        self._quotes: Dict[str, Quote] = {}
+        self._books: Dict[str, LocalOrderBook] = {}
+
+    def normalize_symbol(self, symbol: str) -> str:
+        return symbol.strip().upper().replace('/', '-')
+
+    # ==================== REST ====================
+
+    async def get_quote(self, symbol: str, priority: int = Priority.INTERACTIVE) -> Optional[Quote]:
+        data = await self._get(f"/products/{symbol}/ticker", priority=priority)
+        if not data:
+            return None
+        return Quote(
+            self.qualify(symbol), self.name,
+            last=to_float(data.get('price')),
+            bid=to_float(data.get('bid')),
+            ask=to_float(data.get('ask')),
+            volume=to_float(data.get('volume')),
+            timestamp=data.get('time'),
+        )
+
+    def _windows(self, granularity: int, bars_back: int,
+                 start_date: Optional[str]) -> List[Tuple[datetime, datetime]]:
+        """Request windows of at most MAX_CANDLES candles covering the bars wanted"""
+        step = timedelta(seconds=granularity)
+        now = datetime.now(timezone.utc)
+        if start_date:
+            start = datetime.fromisoformat(start_date).replace(tzinfo=timezone.utc)
+            end = min(start + step * bars_back, now)
+        else:
+            # The open of the current (partial) candle
+            end = datetime.fromtimestamp(now.timestamp() // granularity * granularity, timezone.utc)
+            start = end - step * (bars_back - 1)
+        windows = []
+        while start <= end:
+            last = min(start + step * (self.MAX_CANDLES - 1), end)
+            windows.append((start, last))
+            start = last + step
+        return windows
+
+    async def get_bars(self, symbol: str, interval: str = '1', unit: str = 'Minute', bars_back: int = 100,
+                       start_date: Optional[str] = None,
+                       priority: int = Priority.INTERACTIVE) -> Optional[List[Bar]]:
+        try:
+            granularity = self.GRANULARITIES.get((unit.capitalize(), int(interval)))
+        except ValueError:
+            granularity = None
+        if granularity is None:
+            sizes = ', '.join(f"{n} {u}" for u, n in self.GRANULARITIES)
+            raise self._unsupported(f"{interval} {unit} bars (available: {sizes})")
+
+        # Windows are fetched concurrently; the scheduler keeps them within quota
+        pages = await asyncio.gather(*(
+            self._get(f"/products/{symbol}/candles",
+                      params={'granularity': granularity, 'start': start.isoformat(), 'end': end.isoformat()},
+                      priority=priority)
+            for start, end in self._windows(granularity, bars_back, start_date)
+        ))
+        if all(page is None for page in pages):
+            return None
+
+        # Rows are [time, low, high, open, close, volume], newest first
+        rows = {int(row[0]): row for page in pages if page for row in page}
+        times = sorted(rows)
+        times = times[:bars_back] if start_date else times[-bars_back:]
+        return [
+            Bar(
+                datetime.fromtimestamp(t, timezone.utc).isoformat().replace('+00:00', 'Z'),
+                open=float(rows[t][3]), high=float(rows[t][2]), low=float(rows[t][1]),
+                close=float(rows[t][4]), volume=to_float(rows[t][5]),
+            )
+            for t in times
+        ]
+
+    async def get_order_book(self, symbol: str, depth: int = 10,
+                             priority: int = Priority.INTERACTIVE) -> Optional[OrderBook]:
+        data = await self._get(f"/products/{symbol}/book", params={'level': 2}, priority=priority)
+        if not data:
+            return None
+        # Levels are [price, size, orders], best first
+        return OrderBook(
+            self.qualify(symbol), self.name,
+            [[float(level[0]), float(level[1])] for level in data.get('bids', [])[:depth]],
+            [[float(level[0]), float(level[1])] for level in data.get('asks', [])[:depth]],
+            data.get('sequence'), data.get('time'),
+        )
+
+    # ==================== Streaming ====================
+
+    async def subscribe(self, symbols: Sequence[str], channels: Sequence[str]) -> Subscription:
+        unknown = set(channels) - set(self.channels)
+        if unknown:
+            raise self._unsupported(f"{', '.join(sorted(unknown))} streams")
+        return await self.feed.subscribe(symbols, channels)
+
+    def live_quote(self, symbol: str) -> Optional[Quote]:
+        if self.feed.is_live(symbol, 'quotes'):
+            return self._quotes.get(symbol)
+        return None
+
+    def live_order_book(self, symbol: str, depth: int) -> Optional[OrderBook]:
+        book = self._books.get(symbol)
+        if book is not None and self.feed.is_live(symbol, 'book'):
+            return book.snapshot(self.qualify(symbol), self.name, depth)
+        return None
+
+    def _book_event(self, symbol: str, book: LocalOrderBook) -> Dict:
+        return {'type': 'book', **book.snapshot(self.qualify(symbol), self.name, self.STREAM_BOOK_DEPTH).to_dict()}
+
+    def subscribe_messages(self, symbols_by_channel: Dict[str, List[str]]) -> List[Dict]:
+        return [
+            {'type': 'subscribe', 'product_ids': symbols, 'channels': [self.FEED_CHANNELS[channel]]}
+            for channel, symbols in symbols_by_channel.items()
+        ]
+
+    def unsubscribe_messages(self, symbols_by_channel: Dict[str, List[str]]) -> List[Dict]:
+        return [
+            {'type': 'unsubscribe', 'product_ids': symbols, 'channels': [self.FEED_CHANNELS[channel]]}
+            for channel, symbols in symbols_by_channel.items()
+        ]
+
+    def handle(self, message: Dict) -> List[Tuple[str, str, Dict]]:
+        kind = message.get('type')
+        symbol = message.get('product_id')
+
+        if kind == 'ticker':
+            quote = Quote(
+                self.qualify(symbol), self.name,
+                last=to_float(message.get('price')),
+                bid=to_float(message.get('best_bid')),
+                ask=to_float(message.get('best_ask')),
+                bid_size=to_float(message.get('best_bid_size')),
+                ask_size=to_float(message.get('best_ask_size')),
+                volume=to_float(message.get('volume_24h')),
+                timestamp=message.get('time'),
+            )
+            self._quotes[symbol] = quote
+            return [('quotes', symbol, {'type': 'quote', **quote.to_dict()})]
+
+        if kind == 'snapshot':
+            book = self._books.setdefault(symbol, LocalOrderBook())
+            book.reset(
+                ((float(price), float(size)) for price, size, *_ in message.get('bids', [])),
+                ((float(price), float(size)) for price, size, *_ in message.get('asks', [])),
+                timestamp=message.get('time'),
+            )
+            return [('book', symbol, self._book_event(symbol, book))]
+
+        if kind == 'l2update':
+            book = self._books.get(symbol)
+            if book is None:
+                # Updates before the snapshot can't be applied
+                return []
+            for side, price, size in message.get('changes', []):
+                book.update(side == 'buy', float(price), float(size))
+            book.timestamp = message.get('time')
+            return [('book', symbol, self._book_event(symbol, book))]
+
+        if kind == 'error':
+            logger.warning(f"Coinbase feed error: {message.get('message')} ({message.get('reason')})")
+        return []
+
+    def current(self, keys: Iterable[FeedKey]) -> List[Dict]:
+        events = []
+        for symbol, channel in keys:
+            if channel == 'quotes' and symbol in self._quotes:
+                events.append({'type': 'quote', **self._quotes[symbol].to_dict()})
+            elif channel == 'book' and symbol in self._books:
+                events.append(self._book_event(symbol, self._books[symbol]))
+        return events
+
+    def unsubscribed(self, keys: Iterable[FeedKey]):
+        for symbol, channel in keys:
+            (self._quotes if channel == 'quotes' else self._books).pop(symbol, None)
+
+    def disconnected(self):
+        # Books missed updates; they are rebuilt from the snapshot sent on resubscribe
+        self._books.clear()
+        self._quotes.clear()
+
+    def get_stats(self) -> Dict:
+        return {**super().get_stats(), "stream": self.feed.get_stats()}
+
+    async def close(self):
+        await self.feed.close()
+        await super().close()
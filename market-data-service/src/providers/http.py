@@ -0,0 +1,174 @@
+"""
+Shared REST plumbing for providers
+
+HTTPProvider gives a provider what the TradeStation client has: one pooled
+connection per upstream (HTTP keep-alive, created in the event loop on first
+use), per-endpoint-family token buckets with priority queueing, retries with
+full-jitter backoff on 429 and 5xx (honoring Retry-After), circuit breakers,
+upstream latency metrics and a client span per attempt. A provider declares
+its base URL, quotas and endpoint families and calls _get().
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from opentelemetry.trace import SpanKind
+
+from ..clients.circuit_breaker import CircuitBreakers
+from ..clients.rate_limiter import Priority, UpstreamScheduler, scaled_rate_limits
+from ..clients.tradestation import RateLimitError
+from ..utils import metrics, tracing
+from .base import MarketDataProvider
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPProvider(MarketDataProvider):
+    """A provider backed by a REST API"""
+
+    BASE_URL = ''
+
+    # Upstream quotas per endpoint family: (requests, interval seconds), with a 'default'
+    RATE_LIMITS: Dict[str, Tuple[int, float]] = {'default': (10, 1.0)}
+
+    # Endpoint prefix -> family (first match wins; the rest are 'default')
+    ENDPOINT_FAMILIES: List[Tuple[str, str]] = []
+
+    MAX_RETRIES = 3
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 10.0
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    REQUEST_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+    POOL_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+
+    def __init__(self, base_url: Optional[str] = None, rate_limit_scale: float = 1.0,
+                 scheduler: Optional[UpstreamScheduler] = None,
+                 breakers: Optional[CircuitBreakers] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Args:
+            base_url: Overrides BASE_URL (e.g. a fake exchange in benchmarks/)
+            rate_limit_scale: Multiplier on RATE_LIMITS (e.g. for a fake upstream)
+            scheduler: Rate limiter (default: RATE_LIMITS scaled by rate_limit_scale)
+            breakers: Circuit breakers (default: one per endpoint family)
+            transport: httpx transport, e.g. to record or replay responses
+        """
+        self.base_url = (base_url or self.BASE_URL).rstrip('/')
+        self.scheduler = scheduler or UpstreamScheduler(scaled_rate_limits(rate_limit_scale, self.RATE_LIMITS),
+                                                        self.ENDPOINT_FAMILIES)
+        self.breakers = breakers or CircuitBreakers(self.ENDPOINT_FAMILIES, upstream=self.name)
+        self.transport = transport
+        self._http: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+        self.retries = 0
+
+    def _client(self) -> httpx.AsyncClient:
+        """Pooled client (created on first use, inside the event loop)"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(base_url=self.base_url, timeout=self.REQUEST_TIMEOUT,
+                                           limits=self.POOL_LIMITS, transport=self.transport)
+        return self._http
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Full-jitter exponential backoff, honoring Retry-After when present"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.BACKOFF_MAX) + random.uniform(0, self.BACKOFF_BASE)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * (2 ** attempt)))
+
+    async def _get(self, endpoint: str, params: Optional[Dict] = None,
+                   priority: int = Priority.INTERACTIVE) -> Optional[Any]:
+        """
+        GET endpoint and return its JSON, or None on 404
+
+        Raises CircuitOpenError while the endpoint family's breaker is open,
+        RateLimitError if the upstream kept answering 429, and httpx errors
+        for other failures.
+        """
+        breaker = self.breakers.for_endpoint(endpoint)
+        breaker.before_call()
+        bucket = self.scheduler.bucket_for(endpoint)
+        label = f"{self.name}_{bucket.name}"
+        client = self._client()
+        # Outcome for the breaker: True/False once the upstream answered or failed
+        upstream_ok: Optional[bool] = None
+
+        async def send() -> httpx.Response:
+            with tracing.tracer.start_as_current_span(
+                f"{self.name} GET {bucket.name}",
+                kind=SpanKind.CLIENT,
+                attributes={'http.method': 'GET', 'http.url': f"{self.base_url}{endpoint}"},
+            ) as span:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(endpoint, params=params)
+                except httpx.TransportError:
+                    metrics.record_upstream(label, 'error', time.perf_counter() - start)
+                    raise
+                metrics.record_upstream(label, str(response.status_code), time.perf_counter() - start)
+                span.set_attribute('http.status_code', response.status_code)
+                return response
+
+        try:
+            for attempt in range(self.MAX_RETRIES + 1):
+                waited = await self.scheduler.acquire(endpoint, priority)
+                metrics.UPSTREAM_QUEUE_WAIT.labels(label).observe(waited)
+                self.requests += 1
+                response = await send()
+                if response.status_code not in self.RETRY_STATUSES:
+                    break
+
+                delay = self._retry_delay(attempt, response)
+                if response.status_code == 429:
+                    bucket.penalize(delay)
+                if attempt == self.MAX_RETRIES:
+                    break
+
+                self.retries += 1
+                logger.warning(f"{self.name} {response.status_code} on {endpoint}, "
+                               f"retry {attempt + 1}/{self.MAX_RETRIES} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+            # Throttling and client errors mean the upstream is up
+            upstream_ok = response.status_code < 500
+
+            if response.status_code == 429:
+                retry_after = response.headers.get('Retry-After')
+                raise RateLimitError(endpoint, float(retry_after) if retry_after and retry_after.isdigit() else None,
+                                     upstream=self.name)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.json()
+        except httpx.TransportError as e:
+            upstream_ok = False
+            logger.error(f"{self.name} request error on {endpoint}: {e!r}")
+            raise
+        finally:
+            breaker.record(upstream_ok)
+
+    def open_circuits(self) -> List[str]:
+        return self.breakers.open_families()
+
+    def get_stats(self) -> Dict:
+        return {
+            "base_url": self.base_url,
+            "requests": self.requests,
+            "retries": self.retries,
+            "upstream_throttling": self.scheduler.get_stats(),
+            "circuit_breakers": self.breakers.get_stats(),
+        }
+
+    async def close(self):
+        if self._http:
+            await self._http.aclose()
+            self._http = None
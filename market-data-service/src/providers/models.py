@@ -0,0 +1,84 @@
+"""
+Normalized market data types
+
+Every provider returns these, whatever its upstream format, so callers and
+the cache see one shape per kind of data. Symbols are qualified with the
+provider's namespace ('coinbase:BTC-USD'), prices and sizes are floats and
+timestamps ISO 8601 strings in UTC.
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class Quote:
+    """Last trade and top of book"""
+    symbol: str
+    provider: str
+    last: Optional[float] = None
+    bid: Optional[float] = None
+    ask: Optional[float] = None
+    bid_size: Optional[float] = None
+    ask_size: Optional[float] = None
+    # Over the provider's own window (the session, or 24 hours for crypto)
+    volume: Optional[float] = None
+    timestamp: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class Bar:
+    """One OHLCV bar, stamped with its open time"""
+    timestamp: str
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class OrderBook:
+    """Aggregated price levels, best first: [[price, size], ...]"""
+    symbol: str
+    provider: str
+    bids: List[List[float]] = field(default_factory=list)
+    asks: List[List[float]] = field(default_factory=list)
+    # The upstream's sequence number, when it has one
+    sequence: Optional[int] = None
+    timestamp: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'symbol': self.symbol,
+            'provider': self.provider,
+            'bids': self.bids,
+            'asks': self.asks,
+            'sequence': self.sequence,
+            'timestamp': self.timestamp,
+        }
+
+    def top(self, depth: int) -> 'OrderBook':
+        """The best depth levels of each side"""
+        return OrderBook(self.symbol, self.provider, self.bids[:depth], self.asks[:depth],
+                         self.sequence, self.timestamp)
+
+
+def to_float(value: Any) -> Optional[float]:
+    """Upstream number (often a string) as a float; None when missing or blank"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def bars_to_dicts(bars: List[Bar]) -> List[Dict]:
+    return [bar.to_dict() for bar in bars]
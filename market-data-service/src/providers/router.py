@@ -0,0 +1,76 @@
+"""
+Symbol routing across providers
+
+A symbol's namespace picks its provider: 'coinbase:BTC-USD' goes to
+Coinbase, 'crypto:BTC-USD' to whichever provider the 'crypto' alias names,
+and a bare symbol to the default provider.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from .base import MarketDataProvider, UnknownProvider
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderRouter:
+    """Registered providers by namespace"""
+
+    def __init__(self, default: str = 'tradestation', aliases: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            default: Provider for symbols without a namespace
+            aliases: Extra namespaces -> provider name (e.g. {'crypto': 'coinbase'})
+        """
+        self.default = default
+        self.aliases = {alias.lower(): name for alias, name in (aliases or {}).items()}
+        self.providers: Dict[str, MarketDataProvider] = {}
+
+    def register(self, provider: MarketDataProvider):
+        self.providers[provider.name] = provider
+        logger.info(f"Registered {provider.name} provider ({', '.join(provider.capabilities)})")
+
+    @staticmethod
+    def is_namespaced(symbol: str) -> bool:
+        return ':' in symbol
+
+    def get(self, namespace: str) -> MarketDataProvider:
+        namespace = namespace.strip().lower()
+        provider = self.providers.get(self.aliases.get(namespace, namespace))
+        if provider is None:
+            raise UnknownProvider(namespace)
+        return provider
+
+    def resolve(self, symbol: str) -> Tuple[MarketDataProvider, str]:
+        """The provider for symbol and the provider's own spelling of it"""
+        namespace, _, native = symbol.rpartition(':')
+        provider = self.get(namespace or self.default)
+        return provider, provider.normalize_symbol(native)
+
+    def open_circuits(self) -> List[str]:
+        """Open breakers as provider:family"""
+        return [f"{name}:{family}" for name, provider in self.providers.items()
+                for family in provider.open_circuits()]
+
+    def describe(self) -> List[Dict]:
+        return [
+            {
+                "name": name,
+                "default": name == self.default,
+                "aliases": sorted(alias for alias, target in self.aliases.items() if target == name),
+                "capabilities": list(provider.capabilities),
+                "channels": list(provider.channels),
+            }
+            for name, provider in self.providers.items()
+        ]
+
+    def get_stats(self) -> Dict:
+        return {name: provider.get_stats() for name, provider in self.providers.items()}
+
+    async def close(self):
+        for provider in self.providers.values():
+            try:
+                await provider.close()
+            except Exception as e:
+                logger.warning(f"Error closing {provider.name} provider: {e}")
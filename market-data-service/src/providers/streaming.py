@@ -0,0 +1,281 @@
+"""
+Shared WebSocket streaming for providers
+
+WebSocketFeed holds one upstream connection per provider, however many API
+clients are streaming. Subscriptions are reference counted per (symbol,
+channel): the first subscriber subscribes upstream, the last one leaving
+unsubscribes, and the connection is closed after IDLE_SECONDS without any.
+Dropped connections are re-established with jittered backoff and every
+current subscription is sent again.
+
+The provider supplies the wire protocol (FeedProtocol): the subscribe and
+unsubscribe messages, and turning upstream messages into normalized events.
+Events are whole states (a quote, the top of a book), so a subscriber that
+falls QUEUE_SIZE events behind loses its oldest ones instead of slowing the
+feed for everyone else.
+"""
+
+import asyncio
+import heapq
+import logging
+import random
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import orjson
+import websockets
+
+from .base import Subscription
+from .models import OrderBook
+
+logger = logging.getLogger(__name__)
+
+# (native symbol, channel)
+FeedKey = Tuple[str, str]
+
+
+class LocalOrderBook:
+    """An aggregated (L2) book kept from a snapshot and incremental updates"""
+
+    __slots__ = ('bids', 'asks', 'sequence', 'timestamp')
+
+    def __init__(self):
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self.sequence: Optional[int] = None
+        self.timestamp: Optional[str] = None
+
+    def reset(self, bids: Iterable[Tuple[float, float]], asks: Iterable[Tuple[float, float]],
+              sequence: Optional[int] = None, timestamp: Optional[str] = None):
+        self.bids = {price: size for price, size in bids if size > 0}
+        self.asks = {price: size for price, size in asks if size > 0}
+        self.sequence = sequence
+        self.timestamp = timestamp
+
+    def update(self, is_bid: bool, price: float, size: float):
+        """Set a level's size (0 removes it)"""
+        side = self.bids if is_bid else self.asks
+        if size > 0:
+            side[price] = size
+        else:
+            side.pop(price, None)
+
+    def snapshot(self, symbol: str, provider: str, depth: int) -> OrderBook:
+        """The best depth levels of each side (without sorting the whole book)"""
+        return OrderBook(
+            symbol, provider,
+            [[price, size] for price, size in heapq.nlargest(depth, self.bids.items())],
+            [[price, size] for price, size in heapq.nsmallest(depth, self.asks.items())],
+            self.sequence, self.timestamp,
+        )
+
+
+class FeedProtocol:
+    """A provider's side of a WebSocketFeed"""
+
+    def subscribe_messages(self, symbols_by_channel: Dict[str, List[str]]) -> List[Dict]:
+        raise NotImplementedError
+
+    def unsubscribe_messages(self, symbols_by_channel: Dict[str, List[str]]) -> List[Dict]:
+        raise NotImplementedError
+
+    def handle(self, message: Dict) -> List[Tuple[str, str, Dict]]:
+        """(channel, native symbol, event) for each event in an upstream message"""
+        raise NotImplementedError
+
+    def current(self, keys: Iterable[FeedKey]) -> List[Dict]:
+        """Events with the state already held for keys, sent to a new subscriber first"""
+        return []
+
+    def unsubscribed(self, keys: Iterable[FeedKey]):
+        """Nobody streams keys any more; drop state kept for them"""
+
+    def disconnected(self):
+        """The connection dropped; state kept from it is no longer current"""
+
+
+class FeedSubscription(Subscription):
+    """One API client's events from a WebSocketFeed"""
+
+    def __init__(self, feed: 'WebSocketFeed', keys: Set[FeedKey], queue_size: int):
+        self.feed = feed
+        self.keys = keys
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, event: Dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self) -> Dict:
+        return await self.queue.get()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.feed._release(self)
+
+
+def _by_channel(keys: Iterable[FeedKey]) -> Dict[str, List[str]]:
+    grouped: Dict[str, List[str]] = {}
+    for symbol, channel in sorted(keys):
+        grouped.setdefault(channel, []).append(symbol)
+    return grouped
+
+
+class WebSocketFeed:
+    """One reference-counted, self-healing WebSocket connection to a provider"""
+
+    RECONNECT_BASE = 0.5
+    RECONNECT_MAX = 30.0
+    IDLE_SECONDS = 30.0
+    QUEUE_SIZE = 256
+
+    def __init__(self, name: str, url: str, protocol: FeedProtocol):
+        self.name = name
+        self.url = url
+        self.protocol = protocol
+        self._subscribers: Dict[FeedKey, Set[FeedSubscription]] = {}
+        self._ws = None
+        self._task: Optional[asyncio.Task] = None
+        self._idle_timer: Optional[asyncio.TimerHandle] = None
+        self.connected = False
+
+        # Stats
+        self.connects = 0
+        self.reconnects = 0
+        self.messages = 0
+        self.events = 0
+        self.dropped = 0
+
+    def is_live(self, symbol: str, channel: str) -> bool:
+        """Whether (symbol, channel) is subscribed on an open connection"""
+        return self.connected and (symbol, channel) in self._subscribers
+
+    async def subscribe(self, symbols: Sequence[str], channels: Sequence[str]) -> FeedSubscription:
+        subscription = FeedSubscription(self, {(symbol, channel) for symbol in symbols for channel in channels},
+                                        self.QUEUE_SIZE)
+        new = [key for key in subscription.keys if key not in self._subscribers]
+        for key in subscription.keys:
+            self._subscribers.setdefault(key, set()).add(subscription)
+        if self._idle_timer:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+        for event in self.protocol.current(subscription.keys):
+            subscription.put(event)
+        if self._task is None or self._task.done():
+            # Subscribes to everything wanted once connected
+            self._task = asyncio.create_task(self._run())
+        elif new and self._ws is not None:
+            await self._send(self.protocol.subscribe_messages(_by_channel(new)))
+        if self.connected:
+            subscription.put(self._status('connected'))
+        return subscription
+
+    def _release(self, subscription: FeedSubscription):
+        self.dropped += subscription.dropped
+        gone = []
+        for key in subscription.keys:
+            subscribers = self._subscribers.get(key)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[key]
+                gone.append(key)
+        if gone:
+            self.protocol.unsubscribed(gone)
+            if self._ws is not None:
+                asyncio.create_task(self._send(self.protocol.unsubscribe_messages(_by_channel(gone))))
+        if not self._subscribers and self._task and not self._task.done():
+            loop = asyncio.get_running_loop()
+            self._idle_timer = loop.call_later(self.IDLE_SECONDS, self._stop_if_idle)
+
+    def _stop_if_idle(self):
+        self._idle_timer = None
+        if not self._subscribers and self._task:
+            logger.info(f"Closing idle {self.name} feed")
+            self._task.cancel()
+
+    def _status(self, status: str) -> Dict:
+        return {'type': 'status', 'provider': self.name, 'status': status}
+
+    def _broadcast(self, event: Dict):
+        for subscription in {s for subscribers in self._subscribers.values() for s in subscribers}:
+            subscription.put(event)
+
+    async def _send(self, messages: List[Dict]):
+        ws = self._ws
+        if ws is None:
+            return
+        try:
+            for message in messages:
+                await ws.send(orjson.dumps(message).decode())
+        except Exception as e:
+            # The read loop sees the broken connection and reconnects
+            logger.warning(f"{self.name} feed send failed: {e!r}")
+
+    async def _run(self):
+        attempt = 0
+        while self._subscribers:
+            try:
+                async with websockets.connect(self.url, ping_interval=20, ping_timeout=20,
+                                              open_timeout=10, max_size=2 ** 24) as ws:
+                    self._ws = ws
+                    self.connects += 1
+                    await self._send(self.protocol.subscribe_messages(_by_channel(self._subscribers)))
+                    self.connected = True
+                    attempt = 0
+                    logger.info(f"{self.name} feed connected ({len(self._subscribers)} subscriptions)")
+                    self._broadcast(self._status('connected'))
+                    async for raw in ws:
+                        self.messages += 1
+                        for channel, symbol, event in self.protocol.handle(orjson.loads(raw)):
+                            for subscription in self._subscribers.get((symbol, channel), ()):
+                                subscription.put(event)
+                                self.events += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"{self.name} feed connection lost: {e!r}")
+            finally:
+                self._ws = None
+                self.connected = False
+                self.protocol.disconnected()
+
+            if not self._subscribers:
+                break
+            delay = random.uniform(0, min(self.RECONNECT_MAX, self.RECONNECT_BASE * (2 ** attempt)))
+            attempt += 1
+            self.reconnects += 1
+            self._broadcast(self._status('reconnecting'))
+            await asyncio.sleep(delay)
+
+    def get_stats(self) -> Dict:
+        subscriptions = {id(s) for subscribers in self._subscribers.values() for s in subscribers}
+        return {
+            "url": self.url,
+            "connected": self.connected,
+            "subscriptions": len(subscriptions),
+            "streams": len(self._subscribers),
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "messages": self.messages,
+            "events": self.events,
+            "dropped_events": self.dropped,
+        }
+
+    async def close(self):
+        if self._idle_timer:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
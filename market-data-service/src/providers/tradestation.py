@@ -0,0 +1,68 @@
+"""
+TradeStation as a provider
+
+Wraps the server's TradeStationClient, which keeps its own OAuth, pooling,
+throttling and breakers, and normalizes its quotes and bars. Bare symbols
+still take the TradeStation endpoints' native responses; this provider
+answers 'tradestation:' symbols, and lets TradeStation sit behind the same
+interface as the other providers.
+"""
+
+from typing import Dict, List, Optional
+
+from ..clients.rate_limiter import Priority
+from ..clients.tradestation import TradeStationClient
+from .base import MarketDataProvider
+from .models import Bar, Quote, to_float
+
+
+class TradeStationProvider(MarketDataProvider):
+    """Normalized quotes and bars from TradeStation"""
+
+    name = 'tradestation'
+    capabilities = ('quotes', 'bars')
+
+    def __init__(self, client: TradeStationClient):
+        self.client = client
+
+    async def get_quote(self, symbol: str, priority: int = Priority.INTERACTIVE) -> Optional[Quote]:
+        data = await self.client.get_quote(symbol, priority=priority)
+        quotes = (data or {}).get('Quotes') or []
+        if not quotes:
+            return None
+        quote = quotes[0]
+        return Quote(
+            self.qualify(symbol), self.name,
+            last=to_float(quote.get('Last')),
+            bid=to_float(quote.get('Bid')),
+            ask=to_float(quote.get('Ask')),
+            bid_size=to_float(quote.get('BidSize')),
+            ask_size=to_float(quote.get('AskSize')),
+            volume=to_float(quote.get('Volume')),
+            timestamp=quote.get('TradeTime'),
+        )
+
+    async def get_bars(self, symbol: str, interval: str = '1', unit: str = 'Minute', bars_back: int = 100,
+                       start_date: Optional[str] = None,
+                       priority: int = Priority.INTERACTIVE) -> Optional[List[Bar]]:
+        bars = await self.client.get_bars(symbol, interval, unit, bars_back, start_date, priority=priority)
+        if bars is None:
+            return None
+        return [
+            Bar(
+                bar.get('TimeStamp'),
+                open=float(bar['Open']), high=float(bar['High']), low=float(bar['Low']),
+                close=float(bar['Close']), volume=to_float(bar.get('TotalVolume')),
+            )
+            for bar in bars
+        ]
+
+    def open_circuits(self) -> List[str]:
+        return self.client.breakers.open_families()
+
+    def get_stats(self) -> Dict:
+        return {"authenticated": self.client.is_authenticated()}
+
+    async def close(self):
+        # The client belongs to the server, which closes it
+        pass
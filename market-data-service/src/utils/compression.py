@@ -0,0 +1,166 @@
+"""
+Response compression negotiated from Accept-Encoding
+
+zstd is preferred when the client accepts it and the optional zstandard
+package is installed, gzip otherwise. Bodies smaller than minimum_size go out
+as they are. Streamed responses (the bulk NDJSON chains) are flushed after
+every chunk, so each line still reaches the client as soon as it is written;
+Starlette's GZipMiddleware buffers them until its compressor fills up.
+
+Compressed bodies of responses carrying an ETag are kept in a small LRU, so
+an unchanged chain requested again by another node isn't compressed again.
+"""
+
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import metrics
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# In order of preference
+SUPPORTED_ENCODINGS = ('zstd', 'gzip') if zstandard else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Preferred supported encoding the client accepts (q > 0), if any"""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in SUPPORTED_ENCODINGS:
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+class _Compressor:
+    """Incremental gzip or zstd compressor"""
+    
+    def __init__(self, encoding: str, level: int):
+        if encoding == 'zstd':
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            self._sync = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            # wbits 31: gzip header and trailer
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self._sync = zlib.Z_SYNC_FLUSH
+    
+    def compress(self, data: bytes) -> bytes:
+        """Compress and flush, so the client can decode everything sent so far"""
+        return self._compressor.compress(data) + self._compressor.flush(self._sync)
+    
+    def finish(self, data: bytes = b'') -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with gzip or zstd"""
+    
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 1,
+                 zstd_level: int = 3, cache_entries: int = 256):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {'gzip': gzip_level, 'zstd': zstd_level}
+        self.cache_entries = cache_entries
+        self._cache: 'OrderedDict[Tuple[str, str], bytes]' = OrderedDict()
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _Responder(self, encoding, send).run(scope, receive)
+    
+    def compress_body(self, body: bytes, encoding: str, etag: Optional[str]) -> bytes:
+        """Whole-body compression, reusing the cached result for a known ETag"""
+        key = (etag, encoding)
+        if etag:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+        compressed = _Compressor(encoding, self.levels[encoding]).finish(body)
+        metrics.record_compression(encoding, len(body), len(compressed))
+        if etag:
+            self._cache[key] = compressed
+            if len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return compressed
+
+
+class _Responder:
+    """Rewrites one response's messages"""
+    
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.passthrough = False
+        self.compressor: Optional[_Compressor] = None
+    
+    async def run(self, scope: Scope, receive: Receive):
+        await self.middleware.app(scope, receive, self.send_compressed)
+    
+    async def send_compressed(self, message: Message):
+        if message['type'] == 'http.response.start':
+            # Held back until the first body chunk shows whether to compress
+            self.start = message
+            headers = Headers(raw=message['headers'])
+            self.passthrough = ('content-encoding' in headers or message['status'] < 200
+                                or message['status'] in (204, 304))
+            return
+        if message['type'] != 'http.response.body':
+            await self.send(message)
+            return
+        
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            if self.passthrough or (not more_body and len(body) < self.middleware.minimum_size):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            
+            headers = MutableHeaders(raw=start['headers'])
+            headers['Content-Encoding'] = self.encoding
+            headers.add_vary_header('Accept-Encoding')
+            if more_body:
+                # Streamed: length unknown, compressed chunk by chunk
+                del headers['Content-Length']
+                self.compressor = _Compressor(self.encoding, self.middleware.levels[self.encoding])
+                message['body'] = self.compressor.compress(body)
+                metrics.record_compression(self.encoding, len(body), len(message['body']))
+            else:
+                message['body'] = self.middleware.compress_body(body, self.encoding, headers.get('etag'))
+                headers['Content-Length'] = str(len(message['body']))
+            await self.send(start)
+            await self.send(message)
+            return
+        
+        if self.passthrough or self.compressor is None:
+            await self.send(message)
+            return
+        message['body'] = self.compressor.compress(body) if more_body else self.compressor.finish(body)
+        metrics.record_compression(self.encoding, len(body), len(message['body']))
+        await self.send(message)
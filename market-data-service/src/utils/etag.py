@@ -0,0 +1,37 @@
+"""
+Content-hash ETags and If-None-Match matching
+
+ETags are weak (W/"...") because the same body may go out gzip- or
+zstd-encoded; they still change whenever a single byte of the JSON does.
+Matching follows the weak comparison used for If-None-Match, so a client
+sending back the tag with or without the W/ prefix matches.
+"""
+
+import hashlib
+from typing import Optional, Set
+
+
+def content_etag(body: bytes) -> str:
+    """Weak ETag for a response body"""
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith('W/') else tag
+
+
+def parse_etags(if_none_match: Optional[str]) -> Set[str]:
+    """The entity tags listed in an If-None-Match header, normalized to weak form"""
+    if not if_none_match:
+        return set()
+    return {f'W/{_opaque(tag)}' for tag in if_none_match.split(',') if tag.strip()}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether If-None-Match lists etag (or is '*')"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return f'W/{_opaque(etag)}' in parse_etags(if_none_match)
@@ -0,0 +1,186 @@
+"""
+NYSE exchange calendar - precomputed sessions with holidays and early closes
+
+Sessions are generated once for a range of years and stored as two sorted
+arrays of epoch timestamps (opens and closes). Lookups bisect those arrays,
+so is_open/next_open/next_close are O(log n) and never build a timezone.
+"""
+
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+import pytz
+
+# Built once at import; every conversion reuses this object
+ET = pytz.timezone('US/Eastern')
+
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+# One-off closures not covered by the holiday rules (national days of mourning)
+SPECIAL_CLOSURES = {
+    date(2018, 12, 5),   # President George H.W. Bush
+    date(2025, 1, 9),    # President Jimmy Carter
+}
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th weekday of a month (n=-1 for the last one)"""
+    if n > 0:
+        first = date(year, month, 1)
+        offset = (weekday - first.weekday()) % 7
+        return first + timedelta(days=offset + 7 * (n - 1))
+
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last = next_month - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(d: date) -> date:
+    """Saturday holidays move to Friday, Sunday holidays to Monday"""
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+def nyse_holidays(year: int) -> Dict[date, str]:
+    """Full-day NYSE closures for a year"""
+    holidays = {}
+
+    # New Year's Day: a Saturday holiday is not observed on the prior Friday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() == 6:
+        holidays[new_year + timedelta(days=1)] = "New Year's Day"
+    elif new_year.weekday() < 5:
+        holidays[new_year] = "New Year's Day"
+
+    holidays[_nth_weekday(year, 1, 0, 3)] = "Martin Luther King Jr. Day"
+    holidays[_nth_weekday(year, 2, 0, 3)] = "Washington's Birthday"
+    holidays[_easter(year) - timedelta(days=2)] = "Good Friday"
+    holidays[_nth_weekday(year, 5, 0, -1)] = "Memorial Day"
+    if year >= 2022:
+        holidays[_observed(date(year, 6, 19))] = "Juneteenth"
+    holidays[_observed(date(year, 7, 4))] = "Independence Day"
+    holidays[_nth_weekday(year, 9, 0, 1)] = "Labor Day"
+    holidays[_nth_weekday(year, 11, 3, 4)] = "Thanksgiving Day"
+    holidays[_observed(date(year, 12, 25))] = "Christmas Day"
+
+    for special in SPECIAL_CLOSURES:
+        if special.year == year:
+            holidays[special] = "Special closure"
+
+    return holidays
+
+
+def nyse_early_closes(year: int) -> Dict[date, str]:
+    """1:00 PM ET early closes for a year"""
+    early = {}
+
+    # Day before Independence Day, only when July 3 is Mon-Thu
+    july_3 = date(year, 7, 3)
+    if july_3.weekday() < 4:
+        early[july_3] = "Independence Day eve"
+
+    early[_nth_weekday(year, 11, 3, 4) + timedelta(days=1)] = "Day after Thanksgiving"
+
+    # Christmas Eve, unless it is itself the observed Christmas holiday
+    christmas_eve = date(year, 12, 24)
+    if christmas_eve.weekday() < 4:
+        early[christmas_eve] = "Christmas Eve"
+
+    return early
+
+
+class ExchangeCalendar:
+    """Bisect-indexed regular trading sessions for the NYSE"""
+
+    def __init__(self, start_year: int, end_year: int):
+        self.start_year = start_year
+        self.end_year = end_year
+
+        self.holidays: Dict[date, str] = {}
+        self.early_closes: Dict[date, str] = {}
+        for year in range(start_year, end_year + 1):
+            self.holidays.update(nyse_holidays(year))
+            self.early_closes.update(nyse_early_closes(year))
+
+        self._days: List[date] = []
+        self._opens: List[float] = []
+        self._closes: List[float] = []
+
+        day = date(start_year, 1, 1)
+        end = date(end_year, 12, 31)
+        while day <= end:
+            if day.weekday() < 5 and day not in self.holidays:
+                close_time = EARLY_CLOSE if day in self.early_closes else REGULAR_CLOSE
+                self._days.append(day)
+                self._opens.append(ET.localize(datetime.combine(day, REGULAR_OPEN)).timestamp())
+                self._closes.append(ET.localize(datetime.combine(day, close_time)).timestamp())
+            day += timedelta(days=1)
+
+    @staticmethod
+    def _to_timestamp(dt: datetime) -> float:
+        """Epoch seconds for a datetime; naive values are taken as Eastern time"""
+        if dt.tzinfo is None:
+            dt = ET.localize(dt)
+        return dt.timestamp()
+
+    def is_open(self, ts: float) -> bool:
+        """Whether the regular session is open at epoch time ts"""
+        i = bisect_right(self._opens, ts) - 1
+        return i >= 0 and ts < self._closes[i]
+
+    def next_open(self, ts: float) -> Optional[float]:
+        """First session open strictly after ts, or None past the calendar range"""
+        i = bisect_right(self._opens, ts)
+        return self._opens[i] if i < len(self._opens) else None
+
+    def next_close(self, ts: float) -> Optional[float]:
+        """First session close strictly after ts, or None past the calendar range"""
+        i = bisect_right(self._closes, ts)
+        return self._closes[i] if i < len(self._closes) else None
+
+    def previous_close(self, ts: float) -> Optional[float]:
+        """Most recent session close at or before ts"""
+        i = bisect_right(self._closes, ts) - 1
+        return self._closes[i] if i >= 0 else None
+
+    def session(self, day: date) -> Optional[Tuple[float, float]]:
+        """(open, close) epoch timestamps for a trading day, None if closed"""
+        i = bisect_right(self._days, day) - 1
+        if i >= 0 and self._days[i] == day:
+            return self._opens[i], self._closes[i]
+        return None
+
+    def is_trading_day(self, day: date) -> bool:
+        return self.session(day) is not None
+
+    def holiday_name(self, day: date) -> Optional[str]:
+        return self.holidays.get(day)
+
+    def is_early_close(self, day: date) -> bool:
+        return day in self.early_closes
+
+
+def default_calendar() -> ExchangeCalendar:
+    """Calendar spanning two years back through five years ahead"""
+    year = datetime.now(ET).year
+    return ExchangeCalendar(year - 2, year + 5)
@@ -0,0 +1,19 @@
+"""Option expiration parsing helpers"""
+
+from datetime import date, datetime
+from typing import Any, Optional
+
+
+def parse_expiration(expiration: Any) -> Optional[date]:
+    """Parse an expiration entry (plain date string or TradeStation {'Date': ...} record)"""
+    if isinstance(expiration, dict):
+        expiration = expiration.get('Date')
+    try:
+        return datetime.strptime(str(expiration)[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def days_to_expiration(exp_date: date, today: Optional[date] = None) -> int:
+    """Calendar days from today until exp_date"""
+    return (exp_date - (today or datetime.now().date())).days
@@ -1,69 +1,113 @@
 """Market hours utility - local time-based logic"""
 
-from datetime import datetime, time
-from typing import Tuple
-import pytz
+from datetime import datetime, time, timedelta
+from typing import Optional
+import time as time_module
+
+from .exchange_calendar import ET, ExchangeCalendar, default_calendar
 
 class MarketHoursUtil:
     """Utility for checking market hours without API calls"""
-    
+
     # US Stock Market Hours (Eastern Time)
     MARKET_OPEN_TIME = time(9, 30)
     MARKET_CLOSE_TIME = time(16, 0)
-    
+
     # Pre-market and after-hours
     PRE_MARKET_START = time(4, 0)
     AFTER_HOURS_END = time(20, 0)
-    
+
+    # Extended sessions relative to the regular open/close (half days included)
+    PRE_MARKET_DURATION = timedelta(hours=5, minutes=30)
+    AFTER_HOURS_DURATION = timedelta(hours=4)
+
+    # Precomputed NYSE sessions (holidays and early closes included)
+    calendar: ExchangeCalendar = default_calendar()
+
+    @staticmethod
+    def _timestamp(dt: Optional[datetime]) -> float:
+        """Epoch seconds for dt, or now"""
+        if dt is None:
+            return time_module.time()
+        if dt.tzinfo is None:
+            dt = ET.localize(dt)
+        return dt.timestamp()
+
+    @staticmethod
+    def _to_eastern(dt: Optional[datetime]) -> datetime:
+        """Eastern wall-clock datetime for dt, or now"""
+        if dt is None:
+            return datetime.now(ET)
+        if dt.tzinfo is None:
+            return ET.localize(dt)
+        return dt.astimezone(ET)
+
     @staticmethod
     def is_market_open(dt: datetime = None) -> bool:
         """
-        Check if market is open using local time
-        
+        Check if the regular session is open
+
         Args:
-            dt: DateTime to check (defaults to now in ET)
+            dt: DateTime to check (defaults to now; naive values are Eastern time)
         """
-        if dt is None:
-            et = pytz.timezone('US/Eastern')
-            dt = datetime.now(et)
-        
-        # Market is closed on weekends
-        if dt.weekday() >= 5:  # Saturday=5, Sunday=6
-            return False
-        
-        # Check if within market hours
-        current_time = dt.time()
-        return MarketHoursUtil.MARKET_OPEN_TIME <= current_time <= MarketHoursUtil.MARKET_CLOSE_TIME
-    
+        return MarketHoursUtil.calendar.is_open(MarketHoursUtil._timestamp(dt))
+
     @staticmethod
     def is_extended_hours(dt: datetime = None) -> bool:
         """Check if in pre-market or after-hours"""
-        if dt is None:
-            et = pytz.timezone('US/Eastern')
-            dt = datetime.now(et)
-        
-        # Extended hours not available on weekends
-        if dt.weekday() >= 5:
+        dt = MarketHoursUtil._to_eastern(dt)
+
+        # Extended hours only run on trading days
+        session = MarketHoursUtil.calendar.session(dt.date())
+        if session is None:
             return False
-        
-        current_time = dt.time()
-        
+
+        ts = dt.timestamp()
+        open_ts, close_ts = session
+        pre_market_start = open_ts - MarketHoursUtil.PRE_MARKET_DURATION.total_seconds()
+        after_hours_end = close_ts + MarketHoursUtil.AFTER_HOURS_DURATION.total_seconds()
+
         # Pre-market: 4:00 AM - 9:30 AM
-        # After-hours: 4:00 PM - 8:00 PM
-        return (
-            (MarketHoursUtil.PRE_MARKET_START <= current_time < MarketHoursUtil.MARKET_OPEN_TIME) or
-            (MarketHoursUtil.MARKET_CLOSE_TIME < current_time <= MarketHoursUtil.AFTER_HOURS_END)
-        )
-    
+        # After-hours: close until close + 4h (8:00 PM on regular days)
+        return pre_market_start <= ts < open_ts or close_ts <= ts < after_hours_end
+
+    @staticmethod
+    def next_open(dt: datetime = None) -> Optional[datetime]:
+        """Next regular session open after dt (Eastern time)"""
+        ts = MarketHoursUtil.calendar.next_open(MarketHoursUtil._timestamp(dt))
+        return datetime.fromtimestamp(ts, ET) if ts is not None else None
+
+    @staticmethod
+    def next_close(dt: datetime = None) -> Optional[datetime]:
+        """Next regular session close after dt (Eastern time)"""
+        ts = MarketHoursUtil.calendar.next_close(MarketHoursUtil._timestamp(dt))
+        return datetime.fromtimestamp(ts, ET) if ts is not None else None
+
+    @staticmethod
+    def seconds_until_open(dt: datetime = None) -> Optional[float]:
+        """Seconds until the next session open (0 while the market is open)"""
+        ts = MarketHoursUtil._timestamp(dt)
+        if MarketHoursUtil.calendar.is_open(ts):
+            return 0.0
+        next_ts = MarketHoursUtil.calendar.next_open(ts)
+        return next_ts - ts if next_ts is not None else None
+
+    @staticmethod
+    def seconds_until_close(dt: datetime = None) -> Optional[float]:
+        """Seconds until the next session close"""
+        ts = MarketHoursUtil._timestamp(dt)
+        next_ts = MarketHoursUtil.calendar.next_close(ts)
+        return next_ts - ts if next_ts is not None else None
+
     @staticmethod
     def get_market_status() -> dict:
         """Get current market status"""
-        et = pytz.timezone('US/Eastern')
-        now = datetime.now(et)
-        
+        now = datetime.now(ET)
+        today = now.date()
+
         is_open = MarketHoursUtil.is_market_open(now)
         is_extended = MarketHoursUtil.is_extended_hours(now)
-        
+
         status = "closed"
         if is_open:
             status = "open"
@@ -73,11 +117,19 @@ class MarketHoursUtil:
                 status = "pre_market"
             else:
                 status = "after_hours"
-        
+
+        next_open = MarketHoursUtil.next_open(now)
+        next_close = MarketHoursUtil.next_close(now)
+
         return {
             "status": status,
             "is_open": is_open,
             "is_extended_hours": is_extended,
+            "is_trading_day": MarketHoursUtil.calendar.is_trading_day(today),
+            "holiday": MarketHoursUtil.calendar.holiday_name(today),
+            "is_early_close": MarketHoursUtil.calendar.is_early_close(today),
+            "next_open": next_open.isoformat() if next_open else None,
+            "next_close": next_close.isoformat() if next_close else None,
             "current_time_et": now.strftime("%Y-%m-%d %H:%M:%S %Z"),
             "weekday": now.strftime("%A")
         }
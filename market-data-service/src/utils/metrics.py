@@ -0,0 +1,91 @@
+"""
+Prometheus metrics for the market data service
+
+Exposed at /metrics. Route latency uses the route template (e.g.
+/api/quotes/{symbol}) so label cardinality stays bounded; upstream metrics
+are labelled by TradeStation endpoint family, cache metrics by key namespace
+(the part of the key before the first ':').
+"""
+
+import time
+
+from fastapi import FastAPI, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+HTTP_REQUEST_DURATION = Histogram(
+    'market_data_http_request_duration_seconds',
+    'Time to produce a response (streaming bodies: until headers are sent)',
+    ['method', 'route', 'status'],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    'market_data_http_requests_in_flight',
+    'Requests currently being handled',
+)
+UPSTREAM_REQUEST_DURATION = Histogram(
+    'market_data_upstream_request_duration_seconds',
+    'TradeStation request latency per attempt',
+    ['endpoint', 'status'],
+)
+UPSTREAM_QUEUE_WAIT = Histogram(
+    'market_data_upstream_queue_wait_seconds',
+    'Time spent waiting for a rate-limit token',
+    ['endpoint'],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+CACHE_REQUESTS = Counter(
+    'market_data_cache_requests_total',
+    'Cache lookups by key namespace and result (hit, stale, miss)',
+    ['namespace', 'result'],
+)
+COMPRESSION_INPUT_BYTES = Counter(
+    'market_data_compression_input_bytes_total',
+    'Response bytes before compression',
+    ['encoding'],
+)
+COMPRESSION_OUTPUT_BYTES = Counter(
+    'market_data_compression_output_bytes_total',
+    'Response bytes after compression (cached compressed bodies are not counted again)',
+    ['encoding'],
+)
+
+
+def cache_namespace(key: str) -> str:
+    return key.split(':', 1)[0]
+
+
+def record_cache(key: str, result: str):
+    """Count a cache lookup; result is 'hit', 'stale' or 'miss'"""
+    CACHE_REQUESTS.labels(cache_namespace(key), result).inc()
+
+
+def record_upstream(endpoint: str, status: str, seconds: float):
+    UPSTREAM_REQUEST_DURATION.labels(endpoint, status).observe(seconds)
+
+
+def record_compression(encoding: str, input_bytes: int, output_bytes: int):
+    COMPRESSION_INPUT_BYTES.labels(encoding).inc(input_bytes)
+    COMPRESSION_OUTPUT_BYTES.labels(encoding).inc(output_bytes)
+
+
+def instrument_app(app: FastAPI):
+    """Time every request by route template and track requests in flight"""
+
+    @app.middleware("http")
+    async def prometheus_middleware(request: Request, call_next):
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        status = '500'
+        try:
+            response = await call_next(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            route = request.scope.get('route')
+            HTTP_REQUEST_DURATION.labels(
+                request.method, getattr(route, 'path', 'unmatched'), status
+            ).observe(time.perf_counter() - start)
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,107 @@
+"""
+OpenTelemetry tracing for the market data service
+
+Request spans continue the W3C trace context (traceparent header) sent by
+callers such as the opportunity scanner, so one scan is a single trace across
+both services and TradeStation. Export is configured from the environment:
+
+    TRACING_FILE                 append finished spans to this file, one JSON object per line
+    OTEL_EXPORTER_OTLP_ENDPOINT  send spans to an OTLP/HTTP collector
+                                 (needs the optional opentelemetry-exporter-otlp package)
+
+With neither set no spans are recorded.
+"""
+
+import functools
+import logging
+import os
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("market-data-service")
+
+_provider: Optional[TracerProvider] = None
+
+
+def setup_tracing(service_name: str) -> bool:
+    """Install a tracer provider with the configured exporters; returns whether tracing is on"""
+    global _provider
+
+    file_path = os.getenv('TRACING_FILE')
+    otlp_endpoint = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT')
+    if _provider or not (file_path or otlp_endpoint):
+        return _provider is not None
+
+    provider = TracerProvider(resource=Resource.create({SERVICE_NAME: service_name}))
+    if file_path:
+        exporter = ConsoleSpanExporter(
+            out=open(file_path, 'a'),
+            formatter=lambda span: span.to_json(indent=None) + os.linesep,
+        )
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    if otlp_endpoint:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        except ImportError:
+            logger.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-exporter-otlp is not installed")
+
+    trace.set_tracer_provider(provider)
+    _provider = provider
+    logger.info(f"Tracing enabled (file: {file_path or '-'}, otlp: {otlp_endpoint or '-'})")
+    return True
+
+
+def shutdown_tracing():
+    """Flush spans still waiting to be exported"""
+    if _provider:
+        _provider.shutdown()
+
+
+def traced(name: str):
+    """Run an async function in its own span"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_cache(key: str, result: str):
+    """Record a cache lookup ('hit', 'stale', 'miss', 'degraded') on the current span"""
+    span = trace.get_current_span()
+    span.set_attribute('cache.key', key)
+    span.set_attribute('cache.result', result)
+
+
+def instrument_app(app: FastAPI):
+    """Open a server span per request, continuing the caller's trace"""
+
+    @app.middleware("http")
+    async def tracing_middleware(request: Request, call_next):
+        with tracer.start_as_current_span(
+            f"{request.method} {request.url.path}",
+            context=propagate.extract(request.headers),
+            kind=SpanKind.SERVER,
+            attributes={'http.method': request.method, 'http.target': request.url.path},
+        ) as span:
+            response = await call_next(request)
+            route = request.scope.get('route')
+            if route is not None:
+                # Name by route template so spans group per endpoint
+                span.update_name(f"{request.method} {route.path}")
+                span.set_attribute('http.route', route.path)
+            span.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                span.set_status(Status(StatusCode.ERROR))
+            return response
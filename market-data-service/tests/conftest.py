@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import the service as `src`, as the server is run (from this directory)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
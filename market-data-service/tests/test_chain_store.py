@@ -0,0 +1,108 @@
+"""ChainStore strike queries and eviction (least recently used, idle and expired chains)"""
+
+from datetime import date, timedelta
+
+from src.cache.chain_store import ChainFilter, ChainStore
+
+TOMORROW = (date.today() + timedelta(days=1)).isoformat()
+YESTERDAY = (date.today() - timedelta(days=1)).isoformat()
+
+
+def chain(strike: str) -> dict:
+    return {'OptionQuotes': [{'Symbol': f"SPY C{strike}", 'Strike': strike, 'OptionType': 'Call'}]}
+
+
+def string_strike_chain(strikes, put='P', call='C') -> dict:
+    """Strikes, bids and open interest as strings, the way TradeStation sends them"""
+    rows = []
+    for strike in strikes:
+        for option_type in (put, call):
+            rows.append({'Symbol': f"SPY {option_type}{strike}", 'OptionType': option_type, 'Strike': strike,
+                         'Bid': '1.25', 'OpenInterest': '500'})
+    return {'OptionQuotes': rows}
+
+
+STRIKES_80_120 = [f"{80 + 2.5 * i:g}" for i in range(17)]
+
+
+def strikes_of(rows) -> list:
+    return [row['Strike'] for row in rows]
+
+
+def test_select_bisects_string_strikes_numerically():
+    store = ChainStore()
+    store.apply('SPY', TOMORROW, string_strike_chain(['90', '95', '100', '105', '110']))
+
+    rows = store.select('SPY', TOMORROW, option_type='P', min_strike=92, max_strike=108)
+    assert strikes_of(rows) == ['95', '100', '105']
+    rows = store.select('SPY', TOMORROW, option_type='C', min_strike=100, min_bid=1.0, min_open_interest=100)
+    assert strikes_of(rows) == ['100', '105', '110']
+
+
+def test_query_moneyness_with_string_strikes():
+    store = ChainStore()
+    store.apply('SPY', TOMORROW, string_strike_chain(STRIKES_80_120))
+
+    chain = store.query('SPY', TOMORROW, ChainFilter(moneyness='otm'), spot=101)
+    puts = [row for row in chain['OptionQuotes'] if row['OptionType'] == 'P']
+    calls = [row for row in chain['OptionQuotes'] if row['OptionType'] == 'C']
+    assert strikes_of(puts) == STRIKES_80_120[:9]
+    assert strikes_of(puts)[-1] == '100'
+    assert strikes_of(calls) == STRIKES_80_120[9:]
+
+
+def test_query_strike_percentages_with_string_strikes():
+    store = ChainStore()
+    store.apply('SPY', TOMORROW, string_strike_chain(STRIKES_80_120))
+
+    chain = store.query('SPY', TOMORROW, ChainFilter(option_type='P', min_strike_pct=-10, max_strike_pct=5),
+                        spot=100)
+    assert strikes_of(chain['OptionQuotes']) == ['90', '92.5', '95', '97.5', '100', '102.5', '105']
+
+
+def test_option_types_spelled_out_are_indexed_as_c_and_p():
+    store = ChainStore()
+    store.apply('SPY', TOMORROW, string_strike_chain(['90', '95', '100', '105', '110'], put='Put', call='Call'))
+
+    assert strikes_of(store.select('SPY', TOMORROW, option_type='Put', min_strike=92, max_strike=108)) == \
+        ['95', '100', '105']
+    chain = store.query('SPY', TOMORROW, ChainFilter(option_type='P', moneyness='otm'), spot=101)
+    assert strikes_of(chain['OptionQuotes']) == ['90', '95', '100']
+
+
+def test_least_recently_used_chains_are_evicted_past_max_chains():
+    store = ChainStore(max_chains=2)
+    store.apply('SPY', TOMORROW, chain('450'))
+    store.apply('QQQ', TOMORROW, chain('400'))
+    # A read makes SPY the most recently used
+    assert store.get('SPY', TOMORROW) is not None
+    store.apply('IWM', TOMORROW, chain('200'))
+
+    assert store.get('QQQ', TOMORROW) is None
+    assert store.get('SPY', TOMORROW) is not None
+    assert store.get('IWM', TOMORROW) is not None
+    assert store.get_stats()['chains'] == 2
+    assert store.get_stats()['evictions'] == 1
+
+
+def test_idle_chains_are_evicted():
+    store = ChainStore(max_idle=60)
+    store.apply('SPY', TOMORROW, chain('450'))
+    store._chains[('SPY', TOMORROW)].accessed_at -= 61
+    store.apply('QQQ', TOMORROW, chain('400'))
+
+    assert store.age('SPY', TOMORROW) is None
+    assert store.age('QQQ', TOMORROW) is not None
+
+
+def test_chains_past_their_expiration_are_dropped():
+    store = ChainStore()
+    store.apply('SPY', YESTERDAY, chain('450'))
+    store.apply('SPY', None, chain('450'))
+    # The daily sweep runs on the first insert of a new day
+    store._pruned_on = None
+    store.apply('SPY', TOMORROW, chain('455'))
+
+    assert store.get('SPY', YESTERDAY) is None
+    assert store.get('SPY', None) is not None
+    assert store.get('SPY', TOMORROW) is not None
@@ -0,0 +1,288 @@
+"""
+CoinbaseProvider and WebSocketFeed against the fake exchange in benchmarks/
+
+The fake runs in a uvicorn server thread with its feed stepped on demand
+(updates_per_second=0), so the book a subscriber should hold is known.
+"""
+
+import asyncio
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import pytest
+import uvicorn
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'benchmarks'))
+
+from fake_coinbase import FakeConfig, create_app  # noqa: E402
+
+from src.providers.base import UnsupportedOperation  # noqa: E402
+from src.providers.coinbase import CoinbaseProvider  # noqa: E402
+from src.providers.streaming import LocalOrderBook  # noqa: E402
+
+EVENT_TIMEOUT = 5.0
+
+
+class FakeExchange:
+    """The fake Coinbase app in a server thread, restartable on the same port"""
+
+    def __init__(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.ws_url = f"ws://127.0.0.1:{self.port}/ws"
+        self.server = None
+
+    def start(self):
+        config = FakeConfig(latency_ms=0, jitter_ms=0, updates_per_second=0)
+        self.server = uvicorn.Server(uvicorn.Config(create_app(config), host='127.0.0.1', port=self.port,
+                                                    log_level='warning', lifespan='off'))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            assert time.monotonic() < deadline, "fake exchange did not start"
+            time.sleep(0.01)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(10)
+
+
+@pytest.fixture
+def exchange():
+    fake = FakeExchange()
+    fake.start()
+    yield fake
+    fake.stop()
+
+
+def provider_for(exchange: FakeExchange) -> CoinbaseProvider:
+    provider = CoinbaseProvider(base_url=exchange.url, ws_url=exchange.ws_url)
+    provider.feed.RECONNECT_BASE = 0.05
+    provider.feed.RECONNECT_MAX = 0.2
+    provider.feed.IDLE_SECONDS = 0.1
+    return provider
+
+
+async def next_event(subscription, kind: str, **fields) -> dict:
+    """The next event of a type (and field values), skipping others"""
+    async def wait():
+        while True:
+            event = await subscription.get()
+            if event['type'] == kind and all(event.get(k) == v for k, v in fields.items()):
+                return event
+    return await asyncio.wait_for(wait(), EVENT_TIMEOUT)
+
+
+async def eventually(check, timeout: float = EVENT_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while not await check():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.02)
+
+
+async def fake_stats(exchange: FakeExchange) -> dict:
+    async with httpx.AsyncClient() as client:
+        return (await client.get(f"{exchange.url}/stats")).json()
+
+
+async def step(exchange: FakeExchange, product: str, count: int):
+    async with httpx.AsyncClient() as client:
+        (await client.post(f"{exchange.url}/control/step/{product}", params={'count': count})).raise_for_status()
+
+
+# ==================== Order books ====================
+
+def test_local_order_book_applies_snapshot_and_updates():
+    provider = CoinbaseProvider()
+    provider.handle({'type': 'snapshot', 'product_id': 'BTC-USD',
+                     'bids': [['100.0', '1.0'], ['99.0', '2.0'], ['98.0', '3.0']],
+                     'asks': [['101.0', '1.5'], ['102.0', '2.5']]})
+    events = provider.handle({'type': 'l2update', 'product_id': 'BTC-USD', 'time': '2026-10-19T00:00:00Z',
+                              'changes': [['buy', '100.0', '0'], ['buy', '99.5', '4.0'],
+                                          ['sell', '101.0', '0.5'], ['sell', '100.5', '0.25']]})
+
+    assert [(channel, symbol) for channel, symbol, _ in events] == [('book', 'BTC-USD')]
+    book = provider._books['BTC-USD'].snapshot('coinbase:BTC-USD', 'coinbase', 2)
+    assert book.bids == [[99.5, 4.0], [99.0, 2.0]]
+    assert book.asks == [[100.5, 0.25], [101.0, 0.5]]
+    assert book.timestamp == '2026-10-19T00:00:00Z'
+
+
+def test_updates_before_a_snapshot_are_ignored():
+    provider = CoinbaseProvider()
+    assert provider.handle({'type': 'l2update', 'product_id': 'ETH-USD', 'changes': [['buy', '1', '1']]}) == []
+    assert 'ETH-USD' not in provider._books
+
+
+def test_local_order_book_zero_size_levels_are_dropped():
+    book = LocalOrderBook()
+    book.reset([(10.0, 1.0), (9.0, 0.0)], [(11.0, 1.0)])
+    book.update(False, 11.0, 0.0)
+    book.update(False, 12.0, 0.0)
+    assert book.bids == {10.0: 1.0}
+    assert book.asks == {}
+
+
+def test_streamed_book_matches_the_exchange(exchange):
+    async def run():
+        provider = provider_for(exchange)
+        subscription = await provider.subscribe(['BTC-USD'], ['book'])
+        try:
+            await next_event(subscription, 'book', symbol='coinbase:BTC-USD')
+            await step(exchange, 'BTC-USD', 25)
+            for _ in range(25):
+                await next_event(subscription, 'book')
+
+            live = provider.live_order_book('BTC-USD', 50)
+            rest = await provider.get_order_book('BTC-USD', 50)
+            assert live.bids == rest.bids
+            assert live.asks == rest.asks
+            assert live.bids[0][0] < live.asks[0][0]
+        finally:
+            subscription.close()
+            await provider.close()
+
+    asyncio.run(run())
+
+
+# ==================== Subscriptions ====================
+
+def test_subscriptions_share_one_connection_and_unsubscribe_when_unused(exchange):
+    async def run():
+        provider = provider_for(exchange)
+        first = await provider.subscribe(['BTC-USD'], ['book', 'quotes'])
+        second = await provider.subscribe(['BTC-USD', 'ETH-USD'], ['book'])
+        try:
+            await next_event(first, 'book', symbol='coinbase:BTC-USD')
+            await next_event(second, 'book', symbol='coinbase:ETH-USD')
+
+            stats = await fake_stats(exchange)
+            assert stats['ws_connections'] == 1
+            # BTC-USD book, ticker; ETH-USD book
+            assert stats['streams'] == 3
+            assert provider.feed.get_stats()['subscriptions'] == 2
+
+            # The new subscriber starts from the book already held
+            third = await provider.subscribe(['BTC-USD'], ['book'])
+            assert (await asyncio.wait_for(third.get(), 1))['type'] == 'book'
+            third.close()
+
+            # BTC-USD book is still wanted by second
+            first.close()
+            async def first_released():
+                return (await fake_stats(exchange))['streams'] == 2
+            await eventually(first_released)
+            assert provider.live_order_book('BTC-USD', 5) is not None
+            assert provider.live_quote('BTC-USD') is None
+
+            await step(exchange, 'BTC-USD', 1)
+            await next_event(second, 'book', symbol='coinbase:BTC-USD')
+
+            second.close()
+            async def all_released():
+                stats = await fake_stats(exchange)
+                return stats['streams'] == 0 and stats['ws_open'] == 0
+            await eventually(all_released)
+            assert provider.live_order_book('BTC-USD', 5) is None
+            assert not provider.feed.connected
+        finally:
+            await provider.close()
+
+    asyncio.run(run())
+
+
+def test_unknown_channels_are_rejected():
+    async def run():
+        provider = CoinbaseProvider()
+        with pytest.raises(UnsupportedOperation, match='trades'):
+            await provider.subscribe(['BTC-USD'], ['trades'])
+
+    asyncio.run(run())
+
+
+# ==================== Reconnects ====================
+
+def test_reconnects_and_resubscribes(exchange):
+    async def run():
+        provider = provider_for(exchange)
+        subscription = await provider.subscribe(['BTC-USD'], ['book'])
+        try:
+            await next_event(subscription, 'status', status='connected')
+            await next_event(subscription, 'book')
+
+            await asyncio.to_thread(exchange.stop)
+            await next_event(subscription, 'status', status='reconnecting')
+            assert provider.live_order_book('BTC-USD', 5) is None
+
+            await asyncio.to_thread(exchange.start)
+            await next_event(subscription, 'status', status='connected')
+            snapshot = await next_event(subscription, 'book')
+            assert snapshot['bids'] and snapshot['asks']
+
+            # The restarted exchange has the subscription again and its updates arrive
+            stats = await fake_stats(exchange)
+            assert stats['ws_connections'] == 1
+            assert stats['streams'] == 1
+            await step(exchange, 'BTC-USD', 3)
+            for _ in range(3):
+                await next_event(subscription, 'book')
+            assert provider.feed.reconnects >= 1
+        finally:
+            subscription.close()
+            await provider.close()
+
+    asyncio.run(run())
+
+
+# ==================== Candles ====================
+
+def test_candles_are_paged_across_the_300_candle_limit(exchange):
+    async def run():
+        provider = provider_for(exchange)
+        try:
+            bars = await provider.get_bars('BTC-USD', '1', 'Minute', bars_back=700)
+            requests = (await fake_stats(exchange))['requests']
+        finally:
+            await provider.close()
+
+        assert requests == 3
+        assert len(bars) == 700
+        times = [datetime.fromisoformat(bar.timestamp.replace('Z', '+00:00')).timestamp() for bar in bars]
+        assert all(b - a == 60 for a, b in zip(times, times[1:]))
+        assert time.time() - times[-1] < 120
+
+    asyncio.run(run())
+
+
+def test_candles_from_a_start_date(exchange):
+    async def run():
+        provider = provider_for(exchange)
+        try:
+            bars = await provider.get_bars('ETH-USD', '1', 'Daily', bars_back=400, start_date='2024-01-01')
+            requests = (await fake_stats(exchange))['requests']
+        finally:
+            await provider.close()
+
+        assert requests == 2
+        assert len(bars) == 400
+        assert bars[0].timestamp == '2024-01-01T00:00:00Z'
+        assert bars[-1].timestamp == datetime(2025, 2, 3, tzinfo=timezone.utc).isoformat().replace('+00:00', 'Z')
+        assert all(bar.low <= min(bar.open, bar.close) <= max(bar.open, bar.close) <= bar.high for bar in bars)
+
+    asyncio.run(run())
+
+
+def test_unsupported_bar_sizes_are_rejected():
+    async def run():
+        with pytest.raises(UnsupportedOperation, match='2 Minute'):
+            await CoinbaseProvider().get_bars('BTC-USD', '2', 'Minute')
+
+    asyncio.run(run())
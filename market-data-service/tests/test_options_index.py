@@ -0,0 +1,23 @@
+"""OptionsIndex strikes in TradeStation's shape"""
+
+from datetime import date, timedelta
+
+from src.cache.options_index import OptionsIndex
+
+EXPIRATION = (date.today() + timedelta(days=7)).isoformat()
+
+
+def test_strikes_keep_upstream_strings():
+    index = OptionsIndex()
+    index.record_chain('SPY', EXPIRATION, ['450', '447.5', '452.50'])
+    assert index.strikes('SPY', EXPIRATION) == [['447.5'], ['450'], ['452.50']]
+
+
+def test_numeric_strikes_have_no_trailing_zero():
+    index = OptionsIndex()
+    index.record_chain('SPY', EXPIRATION, [450.0, 447.5, 455])
+    assert index.strikes('SPY', EXPIRATION) == [['447.5'], ['450'], ['455']]
+
+
+def test_strikes_of_an_unfetched_chain_are_unknown():
+    assert OptionsIndex().strikes('SPY', EXPIRATION) is None
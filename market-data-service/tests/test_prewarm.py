@@ -0,0 +1,131 @@
+"""
+CachePrewarmer against a fake TradeStation client: chain work sized to the
+options_chains quota, and refresh-ahead bookkeeping
+"""
+
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from src.cache.chain_store import ChainStore
+from src.cache.keys import OPTIONS_CHAIN_TTL, options_chain_key, quote_key
+from src.cache.options_index import OptionsIndex
+from src.cache.prewarm import CachePrewarmer
+from src.clients.rate_limiter import UpstreamScheduler
+from src.utils.market_hours import MarketHoursUtil
+
+WATCHLIST = ['SPY', 'QQQ', 'IWM', 'AAPL', 'MSFT']
+EXPIRATIONS = [(date.today() + timedelta(days=days)).isoformat() for days in range(1, 31)]
+
+
+class FakeClient:
+    def __init__(self):
+        self.scheduler = UpstreamScheduler()
+        self.chains = []
+        self.quotes = []
+
+    async def get_quote(self, symbol, priority=None):
+        self.quotes.append(symbol)
+        return {'Quotes': [{'Symbol': symbol, 'Last': 100.0}]}
+
+    async def get_options_expirations(self, symbol, priority=None):
+        return EXPIRATIONS
+
+    async def get_options_chain(self, symbol, expiration, priority=None):
+        self.chains.append((symbol, expiration))
+        return {'OptionQuotes': [{'Symbol': f"{symbol} {expiration} C450", 'Strike': '450', 'OptionType': 'Call'}]}
+
+
+class FakeCache:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ttl_seconds=60):
+        self.values[key] = value
+        return True
+
+    def ttl(self, key):
+        return None
+
+
+@pytest.fixture
+def prewarmer(monkeypatch):
+    monkeypatch.setattr(MarketHoursUtil, 'seconds_until_open', staticmethod(lambda dt=None: 300.0))
+    return CachePrewarmer(FakeClient(), FakeCache(), ChainStore(index=OptionsIndex()), watchlist=WATCHLIST)
+
+
+def test_early_pass_fetches_the_nearest_chains_the_quota_allows(prewarmer):
+    asyncio.run(prewarmer.prewarm(final=False))
+
+    # 6 burst + 0.4/s over the 285 s before the final pass, 80% of it
+    assert len(prewarmer.ts_client.chains) == 96
+    assert prewarmer.chains_deferred == len(WATCHLIST) * len(EXPIRATIONS) - 96
+    # Nearest expirations first: 19 for every symbol and the 20th for SPY
+    assert {expiration for _, expiration in prewarmer.ts_client.chains} == set(EXPIRATIONS[:20])
+    # Round-robin across the watchlist within an expiration
+    assert prewarmer.ts_client.chains[:5] == [(symbol, EXPIRATIONS[0]) for symbol in WATCHLIST]
+    assert prewarmer.ts_client.quotes == []
+
+
+def test_final_pass_fetches_quotes_only_and_pins_what_refresh_ahead_can_afford(prewarmer):
+    async def run():
+        await prewarmer.prewarm(final=False)
+        fetched = len(prewarmer.ts_client.chains)
+        await prewarmer.prewarm(final=True)
+        return fetched
+
+    fetched = asyncio.run(run())
+    assert len(prewarmer.ts_client.chains) == fetched
+    assert sorted(prewarmer.ts_client.quotes) == sorted(WATCHLIST)
+
+    pinned = [key for key, entry in prewarmer._keys.items() if entry.pinned_until and key.startswith('options_chain')]
+    # 0.4/s refill, half of it, each chain refetched every 45 s
+    assert len(pinned) == 9
+    assert options_chain_key('SPY', EXPIRATIONS[0]) in pinned
+    assert all(quote_key(symbol) in prewarmer._keys for symbol in WATCHLIST)
+
+
+def test_final_pass_alone_fetches_chains(prewarmer):
+    asyncio.run(prewarmer.prewarm(final=True))
+    # Only the bucket's burst and 300 s of refill, nothing deferred to a later pass
+    assert len(prewarmer.ts_client.chains) == int((6 + 0.4 * 300) * 0.8)
+
+
+def test_chain_keys_tracked_on_a_hit_expire_by_chain_age(prewarmer):
+    key = options_chain_key('SPY', EXPIRATIONS[0])
+    prewarmer.track(key, OPTIONS_CHAIN_TTL, None, age=lambda: 50.0)
+    assert prewarmer._remaining(key, prewarmer._keys[key]) == OPTIONS_CHAIN_TTL - 50.0
+
+    prewarmer.track(key, OPTIONS_CHAIN_TTL, None, age=lambda: None)
+    assert prewarmer._remaining(key, prewarmer._keys[key]) is None
+
+
+def test_stop_cancels_in_flight_refreshes(prewarmer):
+    async def run():
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def loader(priority):
+            started.set()
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        key = options_chain_key('SPY', EXPIRATIONS[0])
+        for _ in range(prewarmer.hot_hits):
+            prewarmer.track(key, OPTIONS_CHAIN_TTL, loader, age=lambda: OPTIONS_CHAIN_TTL - 1.0)
+        prewarmer._tasks = [asyncio.create_task(prewarmer._refresh_loop(interval=0.01))]
+
+        await asyncio.wait_for(started.wait(), 1)
+        assert len(prewarmer._refreshing) == 1
+        await prewarmer.stop()
+        assert cancelled.is_set()
+        assert not prewarmer._refreshing
+
+    asyncio.run(run())
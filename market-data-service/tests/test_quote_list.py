@@ -0,0 +1,70 @@
+"""Comma-separated quote requests served from per-symbol cache keys"""
+
+import time
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import server
+from src.cache.keys import QUOTE_MAX_STALE, QUOTE_TTL, quote_key
+
+
+class FakeClient:
+    def __init__(self):
+        self.requests = []
+
+    async def get_quote(self, symbols, priority=None):
+        self.requests.append(symbols)
+        return {'Quotes': [{'Symbol': symbol, 'Last': 100.0} for symbol in symbols.split(',')
+                           if symbol != 'NOPE']}
+
+
+class FakeCache:
+    """Raw bodies with an expiry, like RedisCache"""
+
+    def __init__(self):
+        self.entries = {}
+
+    def set_raw(self, key, body, ttl_seconds=60):
+        self.entries[key] = (body, time.monotonic() + ttl_seconds)
+        return True
+
+    def get_with_ttl(self, key):
+        body, expires = self.entries.get(key, (None, 0.0))
+        if body is None:
+            return None, None
+        return orjson.loads(body), expires - time.monotonic()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, 'ts_client', FakeClient())
+    monkeypatch.setattr(server, 'cache', FakeCache())
+    monkeypatch.setattr(server, 'prewarmer', None)
+    return TestClient(server.app)
+
+
+def test_misses_share_one_upstream_request_and_are_cached_per_symbol(client):
+    response = client.get('/api/quotes/SPY,QQQ,IWM')
+
+    assert response.status_code == 200
+    assert [quote['Symbol'] for quote in response.json()['Quotes']] == ['SPY', 'QQQ', 'IWM']
+    assert response.headers['X-Cache'] == 'MISS'
+    assert server.ts_client.requests == ['SPY,QQQ,IWM']
+    assert set(server.cache.entries) == {quote_key('SPY'), quote_key('QQQ'), quote_key('IWM')}
+
+
+def test_only_uncached_symbols_go_upstream(client):
+    server.cache.set_raw(quote_key('SPY'), orjson.dumps({'Quotes': [{'Symbol': 'SPY', 'Last': 1.0}]}),
+                         QUOTE_TTL + QUOTE_MAX_STALE)
+
+    response = client.get('/api/quotes/SPY,QQQ,NOPE')
+
+    assert [quote['Symbol'] for quote in response.json()['Quotes']] == ['SPY', 'QQQ']
+    assert response.json()['Quotes'][0]['Last'] == 1.0
+    assert server.ts_client.requests == ['QQQ,NOPE']
+
+    response = client.get('/api/quotes/QQQ,SPY')
+    assert response.headers['X-Cache'] == 'HIT'
+    assert server.ts_client.requests == ['QQQ,NOPE']
@@ -0,0 +1,63 @@
+from src.cache.symbol_master import SymbolIndex
+
+
+def record(symbol, description=''):
+    return {'Symbol': symbol, 'AssetType': 'STOCK', 'Description': description}
+
+
+def index_of(*records):
+    index = SymbolIndex()
+    index.add_many(records)
+    return index
+
+
+def assert_consistent(index):
+    assert index._symbols == sorted(index._symbols)
+    assert index._words == sorted(index._words)
+    assert sorted(record_id for _, record_id in index._symbols) == sorted(index.records)
+    assert set(index._ids.values()) == set(index.records)
+
+
+def test_batch_with_new_and_replaced_records():
+    index = index_of(record('A', 'Alpha'), record('C', 'Charlie'), record('E', 'Echo'), record('G', 'Golf'))
+
+    index.add_many([record('B', 'Bravo'), record('G', 'Golf Corp')])
+
+    assert_consistent(index)
+    assert len(index) == 5
+    assert index.get('G', 'STOCK')['Description'] == 'Golf Corp'
+    assert [r['Symbol'] for r in index.search('CORP')] == ['G']
+    assert [r['Symbol'] for r in index.search('B')] == ['B']
+
+
+def test_replacing_many_records_keeps_the_arrays_sorted():
+    index = index_of(*(record(f"S{i:03d}", f"Name{i} Inc") for i in range(50)))
+
+    index.add_many([record(f"N{i:03d}") for i in range(10)]
+                   + [record(f"S{i:03d}", f"Renamed{i} Inc") for i in range(0, 50, 3)])
+
+    assert_consistent(index)
+    assert len(index) == 60
+    assert index.get('S003', 'STOCK')['Description'] == 'Renamed3 Inc'
+    assert 'S003' not in [r['Symbol'] for r in index.search('NAME3', limit=100)]
+    assert [r['Symbol'] for r in index.search('RENAMED3', limit=100)][:5] == ['S003', 'S030', 'S033', 'S036', 'S039']
+
+
+def test_unchanged_records_are_not_reinserted():
+    index = index_of(record('A', 'Alpha'))
+    record_id = index._ids[('A', 'STOCK')]
+
+    index.add_many([record('A', 'Alpha')])
+
+    assert index._ids[('A', 'STOCK')] == record_id
+    assert_consistent(index)
+
+
+def test_remove():
+    index = index_of(record('A', 'Alpha'), record('B', 'Bravo'))
+
+    index.remove('A', 'STOCK')
+
+    assert_consistent(index)
+    assert not index.search('ALPHA')
+    assert [r['Symbol'] for r in index.search('BRAVO')] == ['B']
@@ -1,15 +1,27 @@
 """FastAPI server for Opportunity Scanner"""
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, List
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Callable, Dict, Literal, Optional, List
+import json
 import logging
 import os
+import time
 from dotenv import load_dotenv
-import asyncio
 
+from ..scanners.options.scoring import ProfileLoader, ScoringProfile
 from ..scanners.options.spread_scanner import OptionsSpreadScanner
 from ..intelligence.regime_detector import RegimeDetector
+from ..compute import ComputePool
+from ..jobs import TERMINAL_STATUSES, JobManager, ScanJob
+from ..market_data import MarketDataClient
+from ..state import MemoryScanState, ScanSnapshot, create_scan_state
+from opentelemetry import trace
+from opentelemetry.trace import Status, StatusCode
+
+from ..utils import metrics, tracing
 
 # Load environment variables
 load_dotenv()
@@ -25,7 +37,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Opportunity Scanner",
     description="Intelligent scanner for options, futures, and crypto trading opportunities",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -37,27 +50,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Service clients
+# Prometheus request metrics (exposed at /metrics)
+metrics.instrument_app(app)
+
+# Service clients (sharing one market data connection pool)
+market_data: Optional[MarketDataClient] = None
 options_scanner: Optional[OptionsSpreadScanner] = None
 regime_detector: Optional[RegimeDetector] = None
 market_data_url: str = ""
 
-# Latest scan results (in-memory cache)
-latest_regime: Optional[dict] = None
-latest_opportunities: Optional[dict] = None
-scan_in_progress: bool = False
+# Worker processes for spread evaluation, keeping scan CPU off the event loop
+compute_pool: Optional[ComputePool] = None
+
+# Latest regime and scan results, and the scan lock (shared between workers with Redis)
+scan_state: Optional[MemoryScanState] = None
+
+# Scan jobs queued and running on this worker
+job_manager: Optional[JobManager] = None
+
+# The scan lock expires unless the running scan keeps extending it
+SCAN_LOCK_TTL_SECONDS = float(os.getenv('SCAN_LOCK_TTL_SECONDS', '120'))
+
+# Targeted scan jobs run at once (next to one full scan)
+SCAN_JOB_CONCURRENCY = int(os.getenv('SCAN_JOB_CONCURRENCY', '2'))
+
+# Scoring weights and default filters, from a profile file re-read when it changes
+# (written by python -m src.backtest optimize --profiles-out)
+profile_loader = ProfileLoader(os.getenv('SCAN_PROFILE_PATH') or None, os.getenv('SCAN_PROFILE') or None)
+
+# Scan filters when neither the request nor its profile sets them
+SCAN_DEFAULTS = {'min_dte': 20, 'max_dte': 45, 'min_credit': 0.25, 'spread_width': 5.0,
+                 'top_n': 10, 'max_expirations': 3}
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
-    global options_scanner, regime_detector, market_data_url
+    global market_data, options_scanner, regime_detector, market_data_url, scan_state, compute_pool, job_manager
     
     logger.info("Starting Opportunity Scanner...")
     
+    tracing.setup_tracing("opportunity-scanner")
+    
     market_data_url = os.getenv('MARKET_DATA_SERVICE_URL', 'http://10.32.3.27:8010')
     
-    options_scanner = OptionsSpreadScanner(market_data_url)
-    regime_detector = RegimeDetector(market_data_url)
+    market_data = MarketDataClient(market_data_url)
+    compute_pool = ComputePool()
+    await compute_pool.start()
+    options_scanner = OptionsSpreadScanner(market_data_url, market_data, compute_pool)
+    regime_detector = RegimeDetector(market_data_url, market_data)
+    scan_state = create_scan_state()
+    job_manager = JobManager(scan_state, _run_scan_job, SCAN_JOB_CONCURRENCY, SCAN_LOCK_TTL_SECONDS)
+    await job_manager.start()
     
     logger.info(f"Connected to market data service: {market_data_url}")
     logger.info("Opportunity Scanner started successfully")
@@ -66,10 +109,19 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down Opportunity Scanner...")
+    if job_manager:
+        await job_manager.close()
     if options_scanner:
         await options_scanner.close()
     if regime_detector:
         await regime_detector.close()
+    if market_data:
+        await market_data.close()
+    if compute_pool:
+        compute_pool.close()
+    if scan_state:
+        scan_state.close()
+    tracing.shutdown_tracing()
 
 # ==================== Health Check ====================
 
@@ -80,9 +132,19 @@ async def health_check():
         "status": "healthy",
         "service": "opportunity-scanner",
         "market_data_url": market_data_url,
-        "scan_in_progress": scan_in_progress
+        "market_data_client": market_data.get_stats() if market_data else None,
+        "compute_pool": compute_pool.get_stats() if compute_pool else None,
+        "scan_jobs": job_manager.get_stats() if job_manager else None,
+        "scan_profiles": profile_loader.get_stats(),
+        "scan_in_progress": bool(scan_state and scan_state.scan_owner()),
+        "scan_state": scan_state.get_stats() if scan_state else None
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics"""
+    return metrics.metrics_response()
+
 # ==================== Regime Detection ====================
 
 @app.get("/api/regime")
@@ -93,8 +155,7 @@ async def get_regime():
     
     try:
         regime = await regime_detector.detect_regime()
-        global latest_regime
-        latest_regime = regime
+        scan_state.publish(regime=regime)
         return regime
     except Exception as e:
         logger.error(f"Error detecting regime: {e}")
@@ -115,91 +176,246 @@ async def get_scan_symbols():
 
 # ==================== Options Scanning ====================
 
+def _scan_profile(name: Optional[str]) -> ScoringProfile:
+    try:
+        return profile_loader.get(name)
+    except KeyError:
+        raise HTTPException(status_code=422, detail=f"Unknown scan profile: {name}")
+
+def _scan_params(params: Dict) -> Dict:
+    """Request params with the profile's filters filled in, and the profile named"""
+    profile = _scan_profile(params.get('profile'))
+    params = {**params, **profile.resolve({key: params.get(key) for key in SCAN_DEFAULTS}, SCAN_DEFAULTS),
+              'profile': profile.name}
+    if params['min_dte'] > params['max_dte']:
+        raise HTTPException(status_code=422, detail="min_dte is greater than max_dte")
+    return params
+
+@app.get("/api/scan/profiles")
+async def get_scan_profiles():
+    """Scan profiles (scoring weights and default filters) and the active one"""
+    return {
+        "active": profile_loader.get().name,
+        "defaults": SCAN_DEFAULTS,
+        "profiles": [profile.to_dict() for profile in profile_loader.profiles.values()],
+    }
+
 @app.get("/api/scan/options/{symbol}")
 async def scan_options(
     symbol: str,
-    min_dte: int = 20,
-    max_dte: int = 45,
-    min_credit: float = 0.25,
-    spread_width: float = 5.0
+    min_dte: Optional[int] = None,
+    max_dte: Optional[int] = None,
+    min_credit: Optional[float] = None,
+    spread_width: Optional[float] = None,
+    profile: Optional[str] = None
 ):
-    """Scan options for a specific symbol"""
+    """Scan options for a specific symbol (filters not given come from the profile)"""
     if not options_scanner:
         raise HTTPException(status_code=503, detail="Options scanner not available")
+    params = _scan_params({'min_dte': min_dte, 'max_dte': max_dte, 'min_credit': min_credit,
+                           'spread_width': spread_width, 'profile': profile})
+    scoring = _scan_profile(params['profile'])
     
     try:
-        result = await options_scanner.scan_symbol(symbol)
-        return result
+        result = await options_scanner.scan_symbol(
+            symbol, params['min_dte'], params['max_dte'], params['min_credit'], params['spread_width'],
+            weights=scoring.weights, max_expirations=params['max_expirations']
+        )
+        return {**result, 'profile': scoring.name}
     except Exception as e:
         logger.error(f"Error scanning {symbol}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+class ScanJobRequest(BaseModel):
+    """Body of POST /api/scan/jobs (filters left out come from the scan profile)"""
+    kind: Literal['full', 'targeted'] = 'targeted'
+    symbols: Optional[List[str]] = None
+    profile: Optional[str] = None
+    min_dte: Optional[int] = Field(None, ge=0)
+    max_dte: Optional[int] = Field(None, ge=0)
+    min_credit: Optional[float] = Field(None, ge=0)
+    spread_width: Optional[float] = Field(None, gt=0)
+    top_n: Optional[int] = Field(None, ge=1, le=100)
+    max_expirations: Optional[int] = Field(None, ge=1, le=20)
+
+def _job_links(job_id: str) -> Dict[str, str]:
+    return {
+        "job": f"/api/scan/jobs/{job_id}",
+        "results": f"/api/scan/jobs/{job_id}/results",
+        "events": f"/api/scan/jobs/{job_id}/events",
+        "cancel": f"/api/scan/jobs/{job_id}/cancel",
+    }
+
 @app.post("/api/scan/full")
-async def scan_full(background_tasks: BackgroundTasks, symbols: Optional[List[str]] = None):
+async def scan_full(symbols: Optional[List[str]] = None):
     """
     Scan multiple symbols for all opportunities
-    Runs in background and stores results
+    Queues a full scan job, whose results become the latest opportunities
     """
-    global scan_in_progress
-    
-    if scan_in_progress:
-        return {"status": "scan_already_in_progress", "message": "A scan is already running"}
-    
-    if not regime_detector or not options_scanner:
+    if not regime_detector or not options_scanner or not job_manager:
         raise HTTPException(status_code=503, detail="Scanners not available")
     
-    # Start background scan
-    background_tasks.add_task(_run_full_scan, symbols)
+    params = _scan_params(ScanJobRequest(kind='full', symbols=symbols).model_dump())
+    job, created = job_manager.submit('full', params)
+    if not created:
+        return {
+            "status": "scan_already_queued",
+            "message": "A full scan is already waiting to run",
+            "job_id": job.id,
+            "check_status": "/api/scan/status",
+            **_job_links(job.id)
+        }
     
+    ahead = job_manager.queued_ahead(job)
     return {
-        "status": "scan_started",
+        "status": "scan_queued" if ahead or scan_state.scan_owner() else "scan_started",
         "message": "Full scan initiated in background",
-        "check_status": "/api/scan/status"
+        "job_id": job.id,
+        "check_status": "/api/scan/status",
+        **_job_links(job.id)
     }
 
-async def _run_full_scan(symbols: Optional[List[str]] = None):
-    """Background task for full scan"""
-    global scan_in_progress, latest_regime, latest_opportunities
+@app.post("/api/scan/jobs", status_code=202)
+async def create_scan_job(request: ScanJobRequest):
+    """
+    Queue a scan job
     
-    scan_in_progress = True
-    logger.info("Starting full opportunity scan...")
+    'targeted' jobs scan the given symbols and run alongside full scans;
+    'full' jobs detect the regime first (symbols default to the regime's)
+    and publish the latest opportunities.
+    """
+    if not regime_detector or not options_scanner or not job_manager:
+        raise HTTPException(status_code=503, detail="Scanners not available")
+    if request.kind == 'targeted' and not request.symbols:
+        raise HTTPException(status_code=422, detail="Targeted scans need symbols")
+    
+    params = _scan_params(request.model_dump())
+    if params['symbols']:
+        params['symbols'] = [symbol.strip().upper() for symbol in params['symbols'] if symbol.strip()]
+    job, created = job_manager.submit(request.kind, params)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "created": created,
+        "queued_ahead": job_manager.queued_ahead(job),
+        **_job_links(job.id)
+    }
+
+@app.get("/api/scan/jobs")
+async def list_scan_jobs(limit: int = Query(20, ge=1, le=200)):
+    """Recent scan jobs, newest first"""
+    return {"jobs": job_manager.recent(limit) if job_manager else []}
+
+@app.get("/api/scan/jobs/{job_id}")
+async def get_scan_job(job_id: str):
+    """Scan job status and per-symbol progress"""
+    job = job_manager.get(job_id) if job_manager else None
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job
+
+@app.get("/api/scan/jobs/{job_id}/results")
+async def get_scan_job_results(job_id: str):
+    """Results of a completed scan job"""
+    job = job_manager.get(job_id) if job_manager else None
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    if job['status'] not in TERMINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Scan job is {job['status']}")
+    results = job_manager.results(job_id)
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"Scan job {job['status']} without results")
+    return {"job_id": job_id, "status": job['status'], **results}
+
+@app.get("/api/scan/jobs/{job_id}/events")
+async def stream_scan_job_events(job_id: str):
+    """
+    Server-sent events for a scan job until it finishes
+    
+    Starts with a 'status' event holding the job record, then 'waiting',
+    'started', 'regime', 'plan', 'chain' and 'symbol' progress events, and
+    ends with 'completed', 'failed' or 'cancelled'.
+    """
+    if not job_manager or not job_manager.get(job_id):
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    
+    async def stream():
+        async for event, data in job_manager.events(job_id):
+            if event == 'keepalive':
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/api/scan/jobs/{job_id}/cancel")
+async def cancel_scan_job(job_id: str):
+    """Cancel a queued or running scan job"""
+    job = job_manager.cancel(job_id) if job_manager else None
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job
+
+@tracing.traced("scan_job")
+async def _run_scan_job(job: ScanJob, progress: Callable[[str, Dict], None]) -> Dict:
+    """Run a scan job (the root span of its trace); full jobs publish the latest snapshot"""
+    span = trace.get_current_span()
+    span.set_attribute('scan.job_id', job.id)
+    span.set_attribute('scan.kind', job.kind)
+    params = job.params
+    symbols = params.get('symbols')
+    # Filters were resolved when the job was queued; the weights are the profile's as it runs
+    profile = profile_loader.get(params.get('profile'))
+    span.set_attribute('scan.profile', profile.name)
+    
+    metrics.SCANS_IN_PROGRESS.inc()
+    logger.info(f"Starting {job.kind} scan job {job.id}...")
+    scan_start = time.perf_counter()
+    timings: Dict[str, float] = {}
     
     try:
-        # Detect regime
-        regime = await regime_detector.detect_regime()
-        latest_regime = regime
+        regime = None
+        if job.kind == 'full':
+            # Detect regime
+            regime = await regime_detector.detect_regime()
+            timings['regime'] = time.perf_counter() - scan_start
+            progress('regime', {'regime': regime.get('regime')})
+            span.set_attribute('scan.regime', regime.get('regime') or '')
         
-        # Get symbols to scan
-        if not symbols:
-            symbols = await regime_detector.get_scan_symbols(regime)
+            # Get symbols to scan
+            if not symbols:
+                symbols = await regime_detector.get_scan_symbols(regime)
         
         logger.info(f"Scanning {len(symbols)} symbols: {symbols}")
+        span.set_attribute('scan.symbols', symbols)
+        progress('plan', {'symbols': symbols})
         
         # Scan each symbol
         all_opportunities = {
             'regime': regime,
+            'profile': profile.name,
             'symbols_scanned': [],
             'total_opportunities': 0,
             'put_spreads': [],
             'call_spreads': []
         }
         
-        for symbol in symbols:
-            try:
-                result = await options_scanner.scan_symbol(symbol)
-                all_opportunities['symbols_scanned'].append(symbol)
-                all_opportunities['put_spreads'].extend(result['put_credit_spreads'])
-                all_opportunities['call_spreads'].extend(result['call_credit_spreads'])
-                all_opportunities['total_opportunities'] += result['total_opportunities']
+        # One bulk chain request for all symbols; chains are evaluated as they stream in
+        results = await options_scanner.scan_symbols(
+            symbols, params['min_dte'], params['max_dte'], params['min_credit'], params['spread_width'],
+            top_n=params['top_n'], timings=timings, progress=progress,
+            max_expirations=params.get('max_expirations', 3), weights=profile.weights
+        )
                 
-                logger.info(f"Scanned {symbol}: {result['total_opportunities']} opportunities")
+        rank_start = time.perf_counter()
+        for symbol, result in results.items():
+            all_opportunities['symbols_scanned'].append(symbol)
+            all_opportunities['put_spreads'].extend(result['put_credit_spreads'])
+            all_opportunities['call_spreads'].extend(result['call_credit_spreads'])
+            all_opportunities['total_opportunities'] += result['total_opportunities']
                 
-                # Small delay to avoid hammering the API
-                await asyncio.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"Error scanning {symbol}: {e}")
-                continue
+            logger.info(f"Scanned {symbol}: {result['total_opportunities']} opportunities")
         
         # Sort by score
         all_opportunities['put_spreads'].sort(key=lambda x: x['score'], reverse=True)
@@ -209,21 +425,34 @@ async def _run_full_scan(symbols: Optional[List[str]] = None):
         all_opportunities['put_spreads'] = all_opportunities['put_spreads'][:50]
         all_opportunities['call_spreads'] = all_opportunities['call_spreads'][:50]
         
-        latest_opportunities = all_opportunities
+        if job.kind == 'full':
+            scan_state.publish(regime=regime, opportunities=all_opportunities)
+        timings['rank'] += time.perf_counter() - rank_start
+        metrics.record_scan(job.kind, time.perf_counter() - scan_start, timings)
+        span.set_attribute('scan.opportunities', all_opportunities['total_opportunities'])
         
-        logger.info(f"Full scan complete: {all_opportunities['total_opportunities']} total opportunities")
+        logger.info(f"Scan job {job.id} complete: {all_opportunities['total_opportunities']} total opportunities")
+        return all_opportunities
         
-    except Exception as e:
-        logger.error(f"Error in full scan: {e}")
+    except BaseException as e:
+        # Cancellation included; the job manager records the outcome
+        span.record_exception(e)
+        span.set_status(Status(StatusCode.ERROR))
+        raise
     finally:
-        scan_in_progress = False
+        metrics.SCANS_IN_PROGRESS.dec()
 
 @app.get("/api/scan/status")
 async def get_scan_status():
     """Get status of latest scan"""
+    snapshot = scan_state.snapshot()
+    latest_opportunities = snapshot.opportunities
+    active_jobs = job_manager.active() if job_manager else []
     return {
-        "scan_in_progress": scan_in_progress,
-        "latest_regime": latest_regime,
+        "scan_in_progress": bool(scan_state.scan_owner()) or bool(job_manager and job_manager.active('full')),
+        "active_jobs": active_jobs,
+        "snapshot_version": snapshot.version,
+        "latest_regime": snapshot.regime,
         "latest_scan_summary": {
             "total_opportunities": latest_opportunities['total_opportunities'] if latest_opportunities else 0,
             "symbols_scanned": len(latest_opportunities['symbols_scanned']) if latest_opportunities else 0,
@@ -238,13 +467,26 @@ async def get_opportunities(
     min_score: float = 0.0,
     limit: int = 20
 ):
-    """Get latest opportunities from scan"""
-    if not latest_opportunities:
+    """
+    Get latest opportunities from scan
+    
+    Each distinct query is serialized once per snapshot version and served
+    from those bytes until the next scan publishes.
+    """
+    snapshot = scan_state.snapshot()
+    if not snapshot.opportunities:
         return {
             "message": "No scan results available. Run /api/scan/full first",
             "opportunities": []
         }
     
+    body = snapshot.render(('opportunities', strategy, min_score, limit),
+                           lambda: _select_opportunities(snapshot, strategy, min_score, limit))
+    return Response(body, media_type="application/json")
+
+def _select_opportunities(snapshot: ScanSnapshot, strategy: Optional[str], min_score: float, limit: int) -> Dict:
+    """The /api/opportunities view of a snapshot"""
+    latest_opportunities = snapshot.opportunities
     opportunities = []
     
     if not strategy or strategy == 'put_credit_spread':
@@ -260,7 +502,8 @@ async def get_opportunities(
     opportunities.sort(key=lambda x: x['score'], reverse=True)
     
     return {
-        "regime": latest_regime,
+        "regime": snapshot.regime,
+        "snapshot_version": snapshot.version,
         "opportunities": opportunities[:limit],
         "total_available": len(opportunities)
     }
@@ -268,4 +511,9 @@ async def get_opportunities(
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv('PORT', '8011'))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+    if workers > 1:
+        # Workers import the app themselves; scan state is shared through SCAN_STATE_REDIS_URL
+        uvicorn.run("src.api.server:app", host="0.0.0.0", port=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
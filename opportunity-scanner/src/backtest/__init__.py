@@ -0,0 +1,8 @@
+from .candidates import CandidateCache, CandidateSet, build_candidates
+from .engine import STRATEGIES, Backtester, BacktestParams, BacktestReport, param_grid
+from .optimizer import Optimizer, pareto_front
+from .snapshots import DaySnapshot, SnapshotStore, import_captures
+
+__all__ = ['STRATEGIES', 'Backtester', 'BacktestParams', 'BacktestReport', 'param_grid',
+           'CandidateCache', 'CandidateSet', 'build_candidates', 'Optimizer', 'pareto_front',
+           'DaySnapshot', 'SnapshotStore', 'import_captures']
@@ -0,0 +1,112 @@
+"""
+Backtest command line
+
+Run from the opportunity-scanner directory:
+    python -m src.backtest import captures/*.jsonl.gz --store snapshots/
+    python -m src.backtest run --store snapshots/ --widths 2.5,5,10 --min-dte 7,14,21,30 \\
+        --max-dte 30,45,60 --min-credit 0.1,0.25,0.5 --top-n 1,3,10 --output report.json
+    python -m src.backtest optimize --store snapshots/ --probability-weights 1,3,5,8 \
+        --risk-reward-weights 0,1,2,4 --credit-weights 0,0.1,0.5 --profiles-out profiles.json
+"""
+
+import argparse
+import json
+import logging
+import sys
+from typing import Callable, List
+
+from .engine import STRATEGIES, Backtester, BacktestReport, param_grid
+from .optimizer import DEFAULT_OBJECTIVES, Optimizer
+from .snapshots import SnapshotStore, import_captures
+
+
+def _values(cast: Callable) -> Callable[[str], List]:
+    return lambda text: [cast(value) for value in text.split(',') if value.strip()]
+
+
+def _grid_arguments(parser: argparse.ArgumentParser):
+    """Parameter grid and run options shared by run and optimize"""
+    parser.add_argument('--store', required=True, help='Snapshot store directory')
+    parser.add_argument('--widths', type=_values(float), default=[5.0])
+    parser.add_argument('--min-dte', type=_values(int), default=[20])
+    parser.add_argument('--max-dte', type=_values(int), default=[45])
+    parser.add_argument('--min-credit', type=_values(float), default=[0.25])
+    parser.add_argument('--top-n', type=_values(int), default=[10])
+    parser.add_argument('--max-expirations', type=_values(int), default=[3])
+    parser.add_argument('--probability-weights', type=_values(float), default=[5.0])
+    parser.add_argument('--risk-reward-weights', type=_values(float), default=[2.0])
+    parser.add_argument('--credit-weights', type=_values(float), default=[0.1])
+    parser.add_argument('--strategies', type=_values(str), default=list(STRATEGIES))
+    parser.add_argument('--symbols', type=_values(str), default=None)
+    parser.add_argument('--start', help='First day (YYYY-MM-DD)')
+    parser.add_argument('--end', help='Last day (YYYY-MM-DD)')
+    parser.add_argument('--workers', type=int, default=None, help='Processes (default: one per core)')
+    parser.add_argument('--no-cache', action='store_true', help="Rebuild candidate sets without the store's cache")
+    parser.add_argument('--limit', type=int, default=20, help='Parameter sets to report')
+    parser.add_argument('--output', help='Write the report here instead of stdout')
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m src.backtest', description=__doc__.split('\n')[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    importer = commands.add_parser('import', help='Add the days of market data captures to a snapshot store')
+    importer.add_argument('captures', nargs='+', help='Capture logs (MARKET_DATA_CAPTURE_PATH files)')
+    importer.add_argument('--store', required=True, help='Snapshot store directory')
+    importer.add_argument('--entry-time', default='10:00', help='Market time (HH:MM) entries are taken at')
+    importer.add_argument('--vix-symbol', default='VIX', help='Symbol the VIX was quoted under')
+    
+    runner = commands.add_parser('run', help='Backtest a parameter grid')
+    _grid_arguments(runner)
+    runner.add_argument('--rank-by', default='total_pnl', choices=[m for m in BacktestReport.METRICS if m != 'trades'])
+    
+    optimizer = commands.add_parser('optimize', help='Pareto-optimal scoring weights and filters of a grid')
+    _grid_arguments(optimizer)
+    optimizer.add_argument('--objectives', type=_values(str), default=list(DEFAULT_OBJECTIVES),
+                           help='Metrics to optimize (max_drawdown is minimized)')
+    optimizer.add_argument('--min-trades', type=int, default=20, help='Fewest trades for a parameter set to count')
+    optimizer.add_argument('--profiles-out', help='Write the front as a scan profile file (SCAN_PROFILE_PATH)')
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s', stream=sys.stderr)
+    store = SnapshotStore(args.store)
+    
+    if args.command == 'import':
+        result = import_captures(args.captures, store, args.entry_time, args.vix_symbol)
+    else:
+        unknown = set(args.strategies) - set(STRATEGIES)
+        if unknown:
+            parser.error(f"unknown strategies: {', '.join(sorted(unknown))}")
+        params = param_grid(args.widths, args.min_dte, args.max_dte, args.min_credit,
+                            args.top_n, args.max_expirations, args.probability_weights,
+                            args.risk_reward_weights, args.credit_weights)
+        if not params:
+            parser.error('the grid is empty (every min_dte is above every max_dte)')
+        backtester = Backtester(store, args.workers)
+        options = dict(start=args.start, end=args.end, symbols=args.symbols,
+                       strategies=tuple(args.strategies), use_cache=not args.no_cache)
+        if args.command == 'run':
+            result = backtester.run(params, **options).to_dict(args.rank_by, args.limit)
+        else:
+            try:
+                optimizer = Optimizer(backtester, args.objectives, args.min_trades)
+            except ValueError as e:
+                parser.error(str(e))
+            report, front = optimizer.run(params, **options)
+            result = optimizer.to_dict(report, front, args.limit)
+            if args.profiles_out:
+                if not front:
+                    parser.error(f"no parameter set made {args.min_trades} trades; no profiles written")
+                optimizer.write_profiles(args.profiles_out, report, front)
+    
+    text = json.dumps(result, indent=2)
+    if getattr(args, 'output', None):
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+Candidate spreads per day and width, cached next to the snapshots
+
+A candidate set holds every credit spread of one width that the scanner
+could have returned on a day, for every symbol and strategy, with what
+ranking and selection need: expiration, credit, the score's inputs
+(probability, risk/reward, credit) and the P&L held to expiration.
+Enumerating and settling them is the expensive part of a backtest and
+doesn't depend on scoring weights or filters, so each set is computed once
+and stored; a sweep over weights and filters only re-ranks.
+
+Cache layout:
+    {store}/candidates/{width}/{YYYY-MM-DD}.npz
+
+A cached set is rebuilt when its day's snapshot or the stored closes change
+(a newly settled expiration adds candidates).
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..scanners.options.spread_scanner import credit_spreads, spread_metrics
+from .snapshots import DaySnapshot, SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ('put_credit_spread', 'call_credit_spread')
+
+# Bump when the cached columns or their meaning change
+CACHE_VERSION = 1
+
+# Candidates are enumerated down to this credit; filters can only raise it
+MIN_CREDIT_FLOOR = 0.0
+
+
+class Settlement:
+    """Daily closes: expiration settlement prices and trailing history"""
+    
+    def __init__(self, closes: Dict[str, Dict[str, float]]):
+        self._dates = {symbol: np.array(sorted(by_date), dtype='U10') for symbol, by_date in closes.items()}
+        self._closes = {symbol: np.array([by_date[day] for day in self._dates[symbol]], dtype=np.float64)
+                        for symbol, by_date in closes.items()}
+    
+    def price(self, symbol: str, expiration: str) -> Optional[float]:
+        """
+        Close on the expiration day, or the last one before it when the market
+        was closed that day; None until a close on or after it is known
+        """
+        dates = self._dates.get(symbol)
+        if dates is None or len(dates) == 0 or dates[-1] < expiration:
+            return None
+        index = int(np.searchsorted(dates, expiration, side='right')) - 1
+        return float(self._closes[symbol][index]) if index >= 0 else None
+    
+    def history(self, symbol: str, day: str, count: int) -> np.ndarray:
+        """The last count closes before day (no look-ahead)"""
+        dates = self._dates.get(symbol)
+        if dates is None:
+            return np.empty(0, dtype=np.float64)
+        end = int(np.searchsorted(dates, day, side='left'))
+        return self._closes[symbol][max(0, end - count):end]
+
+
+@dataclass
+class CandidateSet:
+    """
+    One day's candidates of one width, grouped by segment (a symbol and
+    strategy) and in the scanner's order within it: nearest expiration
+    first, then by strike
+    """
+    day: str
+    width: float
+    vix: Optional[float]
+    spots: Dict[str, float]
+    symbols: List[str]
+    # DTEs of every chain of symbols[i], nearest first: chain_dte[chain_offsets[i]:chain_offsets[i + 1]]
+    chain_dte: np.ndarray
+    chain_offsets: np.ndarray
+    # Per segment
+    segment_symbol: np.ndarray
+    segment_strategy: np.ndarray
+    segment_offsets: np.ndarray
+    # Per candidate
+    exp_index: np.ndarray
+    dte: np.ndarray
+    credit: np.ndarray
+    probability: np.ndarray
+    risk_reward: np.ndarray
+    pnl: np.ndarray
+    max_loss: np.ndarray
+    unsettled_chains: int = 0
+    meta: Dict = field(default_factory=dict)
+    
+    COLUMNS = ('chain_dte', 'chain_offsets', 'segment_symbol', 'segment_strategy', 'segment_offsets',
+               'exp_index', 'dte', 'credit', 'probability', 'risk_reward', 'pnl', 'max_loss')
+    
+    def __len__(self) -> int:
+        return len(self.credit)
+    
+    def segment_ids(self) -> np.ndarray:
+        """Segment of every candidate"""
+        return np.repeat(np.arange(len(self.segment_symbol)), np.diff(self.segment_offsets))
+
+
+def build_candidates(snapshot: DaySnapshot, width: float, settlement: Settlement) -> CandidateSet:
+    """Enumerate, score and settle every candidate of one width in a day snapshot"""
+    entry = date.fromisoformat(snapshot.date)
+    symbols = sorted(symbol for symbol in snapshot.chains if symbol in snapshot.spots)
+    chain_dte, chain_offsets = [], [0]
+    segment_symbol, segment_strategy, segment_offsets = [], [], [0]
+    columns: List[Tuple[np.ndarray, ...]] = []
+    unsettled = 0
+    
+    for symbol_index, symbol in enumerate(symbols):
+        chains = snapshot.chains[symbol]
+        spot = snapshot.spots[symbol]
+        dtes = [(date.fromisoformat(expiration) - entry).days for expiration, _ in chains]
+        chain_dte.extend(dtes)
+        chain_offsets.append(len(chain_dte))
+        settles = [settlement.price(symbol, expiration) for expiration, _ in chains]
+        unsettled += sum(1 for dte, settle in zip(dtes, settles) if dte >= 0 and settle is None)
+        
+        for strategy_index, strategy in enumerate(STRATEGIES):
+            spread_type = 'put_credit' if strategy == 'put_credit_spread' else 'call_credit'
+            below_spot = spread_type == 'put_credit'
+            count = 0
+            for exp_index, (_, chain) in enumerate(chains):
+                settle = settles[exp_index]
+                if dtes[exp_index] < 0 or settle is None:
+                    continue
+                short_strike, long_strike, short_premium, long_premium = credit_spreads(
+                    chain.side('P' if below_spot else 'C'), spot, width, MIN_CREDIT_FLOOR, below_spot
+                )
+                if len(short_strike) == 0:
+                    continue
+                metrics = spread_metrics(short_strike, long_strike, short_premium, long_premium, spot, spread_type)
+                # Intrinsic value of the spread at expiration, capped at its width
+                itm = short_strike - settle if below_spot else settle - short_strike
+                loss = np.clip(itm, 0.0, metrics['spread_width'])
+                columns.append((
+                    np.full(len(short_strike), exp_index), np.full(len(short_strike), dtes[exp_index]),
+                    metrics['net_credit'], metrics['probability'], metrics['risk_reward'],
+                    (metrics['net_credit'] - loss) * 100, metrics['max_loss'],
+                ))
+                count += len(short_strike)
+            if count:
+                segment_symbol.append(symbol_index)
+                segment_strategy.append(strategy_index)
+                segment_offsets.append(segment_offsets[-1] + count)
+    
+    def concat(index: int, dtype) -> np.ndarray:
+        return np.concatenate([column[index] for column in columns]).astype(dtype) if columns \
+            else np.empty(0, dtype=dtype)
+    
+    return CandidateSet(
+        day=snapshot.date, width=width, vix=snapshot.vix, spots=dict(snapshot.spots), symbols=symbols,
+        chain_dte=np.array(chain_dte, dtype=np.int64), chain_offsets=np.array(chain_offsets, dtype=np.int64),
+        segment_symbol=np.array(segment_symbol, dtype=np.int64),
+        segment_strategy=np.array(segment_strategy, dtype=np.int64),
+        segment_offsets=np.array(segment_offsets, dtype=np.int64),
+        exp_index=concat(0, np.int64), dte=concat(1, np.int64), credit=concat(2, np.float64),
+        probability=concat(3, np.float64), risk_reward=concat(4, np.float64),
+        pnl=concat(5, np.float64), max_loss=concat(6, np.float64),
+        unsettled_chains=unsettled,
+    )
+
+
+class CandidateCache:
+    """Candidate sets of a snapshot store, built on first use and kept on disk"""
+    
+    def __init__(self, store: SnapshotStore, enabled: bool = True):
+        self.store = store
+        self.enabled = enabled
+        self.directory = store.directory / 'candidates'
+        self._settlement: Optional[Settlement] = None
+        closes = store.directory / 'closes.json'
+        self._closes_version = closes.stat().st_mtime_ns if closes.exists() else 0
+        self.hits = 0
+        self.builds = 0
+    
+    @property
+    def settlement(self) -> Settlement:
+        if self._settlement is None:
+            self._settlement = Settlement(self.store.closes())
+        return self._settlement
+    
+    def _path(self, day: str, width: float):
+        return self.directory / f"{width:g}" / f"{day}.npz"
+    
+    def _signature(self, day: str) -> str:
+        stat = (self.store.directory / f"{day}.npz").stat()
+        return f"{CACHE_VERSION}:{stat.st_mtime_ns}:{stat.st_size}:{self._closes_version}"
+    
+    def get(self, day: str, width: float, snapshot: Callable[[], DaySnapshot]) -> CandidateSet:
+        """A day's candidate set, from disk if still current, else built from snapshot()"""
+        path = self._path(day, width)
+        signature = self._signature(day)
+        if self.enabled and path.exists():
+            try:
+                candidates = self._load(path, day, width)
+                if candidates.meta.get('signature') == signature:
+                    self.hits += 1
+                    return candidates
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Rebuilding unreadable candidate cache {path}: {e}")
+        
+        candidates = build_candidates(snapshot(), width, self.settlement)
+        candidates.meta['signature'] = signature
+        self.builds += 1
+        if self.enabled:
+            self._save(path, candidates)
+        return candidates
+    
+    def _save(self, path, candidates: CandidateSet):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {'vix': candidates.vix, 'spots': candidates.spots, 'symbols': candidates.symbols,
+                'unsettled_chains': candidates.unsettled_chains, **candidates.meta}
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta)),
+                     **{name: getattr(candidates, name) for name in CandidateSet.COLUMNS})
+        os.replace(tmp, path)
+    
+    @staticmethod
+    def _load(path, day: str, width: float) -> CandidateSet:
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            columns = {name: data[name] for name in CandidateSet.COLUMNS}
+        return CandidateSet(
+            day=day, width=width, vix=meta.pop('vix'), spots=meta.pop('spots'), symbols=meta.pop('symbols'),
+            unsettled_chains=meta.pop('unsettled_chains'), meta=meta, **columns,
+        )
@@ -0,0 +1,458 @@
+"""
+Vectorized backtest of the credit spread scanner
+
+Replays stored day snapshots through the scanner's own spread enumeration
+and scoring (credit_spreads, spread_metrics), enters the spreads a scan with
+each parameter set would have returned, and holds them to expiration, where
+they settle against the underlying's close.
+
+Candidates depend only on the day and spread width. They are built once,
+cached on disk (see candidates.py) and shared by every parameter set of that
+width. For each set of scoring weights they are ranked once per symbol and
+strategy. Which of them a parameter set picks (its DTE window, first
+max_expirations expirations, min_credit and top_n by score) is computed for
+all parameter sets at once as boolean matrices over the day's candidates,
+and their P&L is summed with a matrix product. Days are split into chunks
+evaluated in worker processes.
+
+P&L is per contract, at mid prices, with no commissions, booked on the entry
+day. Spreads whose expiration has no close yet are left out.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from itertools import product
+from multiprocessing import get_context
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..intelligence import RegimeDetector
+from ..scanners.options.scoring import DEFAULT_WEIGHTS, ScoringProfile, ScoringWeights
+from .candidates import MIN_CREDIT_FLOOR, STRATEGIES, CandidateCache, CandidateSet
+from .snapshots import SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+# Return on risk (P&L / max loss) histogram: 5% bins from -100% to +300%
+RETURN_BINS = np.linspace(-1.0, 3.0, 81)
+
+# Annualizes the daily P&L Sharpe ratio
+TRADING_DAYS = 252
+
+
+@dataclass(frozen=True)
+class BacktestParams:
+    """One scanner configuration: the scan_symbols filters it varies and the scoring weights"""
+    spread_width: float = 5.0
+    min_dte: int = 20
+    max_dte: int = 45
+    min_credit: float = 0.25
+    top_n: int = 10
+    max_expirations: int = 3
+    probability_weight: float = DEFAULT_WEIGHTS.probability
+    risk_reward_weight: float = DEFAULT_WEIGHTS.risk_reward
+    credit_weight: float = DEFAULT_WEIGHTS.credit
+    
+    @property
+    def weights(self) -> ScoringWeights:
+        return ScoringWeights(self.probability_weight, self.risk_reward_weight, self.credit_weight)
+    
+    def profile(self, name: str, backtest: Optional[Dict] = None) -> ScoringProfile:
+        """The scan profile running these parameters"""
+        scan = {key: value for key, value in asdict(self).items() if not key.endswith('_weight')}
+        return ScoringProfile(name, self.weights, scan, backtest)
+
+
+def param_grid(spread_width: Iterable[float] = (5.0,), min_dte: Iterable[int] = (20,),
+               max_dte: Iterable[int] = (45,), min_credit: Iterable[float] = (0.25,),
+               top_n: Iterable[int] = (10,), max_expirations: Iterable[int] = (3,),
+               probability_weight: Iterable[float] = (DEFAULT_WEIGHTS.probability,),
+               risk_reward_weight: Iterable[float] = (DEFAULT_WEIGHTS.risk_reward,),
+               credit_weight: Iterable[float] = (DEFAULT_WEIGHTS.credit,)) -> List[BacktestParams]:
+    """Every combination of the given values (empty DTE windows are skipped)"""
+    return [
+        BacktestParams(float(width), int(low), int(high), float(credit), int(n), int(expirations),
+                       float(w_probability), float(w_risk_reward), float(w_credit))
+        for width, low, high, credit, n, expirations, w_probability, w_risk_reward, w_credit
+        in product(spread_width, min_dte, max_dte, min_credit, top_n, max_expirations,
+                   probability_weight, risk_reward_weight, credit_weight)
+        if low <= high
+    ]
+
+
+def regime_of(vix: Optional[float], spy_price: Optional[float], spy_closes: np.ndarray) -> str:
+    """Regime label as RegimeDetector would have reported it that day"""
+    volatility, trend = RegimeDetector.classify(20.0 if vix is None else vix, spy_price,
+                                                spy_closes if len(spy_closes) >= 10 else None)
+    return f"{volatility}_vol_{trend}"
+
+
+class _Stats:
+    """Sums over the trades of every parameter set (one row per parameter set)"""
+    
+    __slots__ = ('trades', 'pnl', 'pnl_sq', 'wins', 'risk', 'returns')
+    
+    def __init__(self, count: int):
+        self.trades = np.zeros(count, dtype=np.int64)
+        self.pnl = np.zeros(count)
+        self.pnl_sq = np.zeros(count)
+        self.wins = np.zeros(count, dtype=np.int64)
+        self.risk = np.zeros(count)
+        self.returns = np.zeros((count, len(RETURN_BINS) - 1), dtype=np.int64)
+    
+    def merge(self, other: '_Stats'):
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+    
+    def summary(self, index: int) -> Dict:
+        trades = int(self.trades[index])
+        if trades == 0:
+            return {'trades': 0}
+        mean = self.pnl[index] / trades
+        variance = max(self.pnl_sq[index] / trades - mean * mean, 0.0)
+        summary = {
+            'trades': trades,
+            'total_pnl': round(float(self.pnl[index]), 2),
+            'mean_pnl': round(float(mean), 2),
+            'std_pnl': round(float(np.sqrt(variance)), 2),
+            'win_rate': round(float(self.wins[index] / trades), 4),
+            'return_on_risk': round(float(self.pnl[index] / self.risk[index]), 4) if self.risk[index] > 0 else None,
+        }
+        # Percentiles of return on risk, to the histogram's bin
+        cumulative = np.cumsum(self.returns[index]) / trades
+        centers = (RETURN_BINS[:-1] + RETURN_BINS[1:]) / 2
+        for q in (5, 25, 50, 75, 95):
+            bin_index = min(int(np.searchsorted(cumulative, q / 100)), len(centers) - 1)
+            summary[f'return_p{q}'] = round(float(centers[bin_index]), 3)
+        return summary
+
+
+class _Accumulator:
+    """Per (strategy, regime) stats and daily P&L of a chunk of days"""
+    
+    def __init__(self, params: int, days: int):
+        self.params = params
+        self.stats: Dict[Tuple[str, str], _Stats] = {}
+        self.daily = np.zeros((params, days))
+        self.regimes: Dict[str, str] = {}
+        self.candidates = 0
+        self.unsettled_chains = 0
+        self.cache_hits = 0
+        self.cache_builds = 0
+    
+    def merge(self, other: '_Accumulator'):
+        for key, stats in other.stats.items():
+            if key in self.stats:
+                self.stats[key].merge(stats)
+            else:
+                self.stats[key] = stats
+        self.daily += other.daily
+        self.regimes.update(other.regimes)
+        self.candidates += other.candidates
+        self.unsettled_chains += other.unsettled_chains
+        self.cache_hits += other.cache_hits
+        self.cache_builds += other.cache_builds
+    
+    def _stats(self, strategy: str, regime: str) -> _Stats:
+        stats = self.stats.get((strategy, regime))
+        if stats is None:
+            stats = self.stats[(strategy, regime)] = _Stats(self.params)
+        return stats
+    
+    def add(self, regime: str, day_index: int, param_index: np.ndarray, chosen: np.ndarray,
+            strategy: np.ndarray, pnl: np.ndarray, max_loss: np.ndarray):
+        """Trades chosen (parameter sets x candidates) among candidates of the given strategy indexes"""
+        # One product sums trades, P&L, squared P&L, wins and risk per strategy for every parameter set
+        columns = []
+        for strategy_index in range(len(STRATEGIES)):
+            selected = (strategy == strategy_index).astype(np.float64)
+            columns += [selected, pnl * selected, pnl * pnl * selected, (pnl > 0) * selected, max_loss * selected]
+        sums = chosen.astype(np.float64) @ np.stack(columns, axis=1)
+        
+        rows, picked = np.nonzero(chosen)
+        returns = np.divide(pnl, max_loss, out=np.zeros_like(pnl), where=max_loss > 0)
+        bins = np.clip(np.searchsorted(RETURN_BINS, returns, side='right') - 1, 0, len(RETURN_BINS) - 2)
+        bin_count = len(RETURN_BINS) - 1
+        histogram = np.bincount((strategy[picked] * len(param_index) + rows) * bin_count + bins[picked],
+                                minlength=len(STRATEGIES) * len(param_index) * bin_count)
+        histogram = histogram.reshape(len(STRATEGIES), len(param_index), bin_count)
+        
+        for strategy_index, name in enumerate(STRATEGIES):
+            trades, pnl_sum, pnl_sq, wins, risk = sums[:, strategy_index * 5:strategy_index * 5 + 5].T
+            if not trades.any():
+                continue
+            stats = self._stats(name, regime)
+            stats.trades[param_index] += np.rint(trades).astype(np.int64)
+            stats.pnl[param_index] += pnl_sum
+            stats.pnl_sq[param_index] += pnl_sq
+            stats.wins[param_index] += np.rint(wins).astype(np.int64)
+            stats.risk[param_index] += risk
+            stats.returns[param_index] += histogram[strategy_index]
+            self.daily[param_index, day_index] += pnl_sum
+
+
+@dataclass
+class _ParamGroup:
+    """The parameter sets sharing a spread width and scoring weights, as columns"""
+    width: float
+    weights: ScoringWeights
+    index: np.ndarray
+    min_dte: np.ndarray
+    max_dte: np.ndarray
+    min_credit: np.ndarray
+    top_n: np.ndarray
+    max_expirations: np.ndarray
+
+
+def _param_groups(params: Sequence[BacktestParams]) -> Dict[float, List[_ParamGroup]]:
+    """Parameter groups by width"""
+    members: Dict[Tuple[float, ScoringWeights], List[int]] = {}
+    for i, p in enumerate(params):
+        members.setdefault((p.spread_width, p.weights), []).append(i)
+    groups: Dict[float, List[_ParamGroup]] = {}
+    for (width, weights), index in members.items():
+        column = lambda name, dtype: np.array([getattr(params[i], name) for i in index], dtype=dtype)
+        groups.setdefault(width, []).append(_ParamGroup(
+            width, weights, np.array(index), column('min_dte', np.int64), column('max_dte', np.int64),
+            column('min_credit', np.float64), column('top_n', np.int64), column('max_expirations', np.int64),
+        ))
+    return groups
+
+
+def _choose(group: _ParamGroup, candidates: CandidateSet, keep: Optional[np.ndarray]) -> Tuple[np.ndarray, ...]:
+    """
+    The spreads each parameter set's scan returns
+    
+    Returns the (parameter sets x candidates) mask and the candidates'
+    strategy, P&L and max loss, in ranked order.
+    """
+    weights = group.weights
+    score = (candidates.probability * weights.probability) + (candidates.risk_reward * weights.risk_reward) \
+        + (candidates.credit * weights.credit)
+    segment = candidates.segment_ids()
+    # The scanner's stable sort on the rounded score, per symbol and strategy
+    order = np.lexsort((-np.round(score, 2), segment))
+    if keep is not None:
+        order = order[keep[order]]
+    segment = segment[order]
+    exp_index = candidates.exp_index[order]
+    dte = candidates.dte[order]
+    credit = candidates.credit[order]
+    symbol = candidates.segment_symbol[segment]
+
+    # Scans evaluate the first max_expirations expirations in the DTE window:
+    # the window of each parameter set starts at chain first[p, symbol]
+    first = np.stack([
+        np.searchsorted(candidates.chain_dte[candidates.chain_offsets[i]:candidates.chain_offsets[i + 1]],
+                        group.min_dte, side='left')
+        for i in range(len(candidates.symbols))
+    ], axis=1)
+    eligible = ((dte[None, :] >= group.min_dte[:, None]) & (dte[None, :] <= group.max_dte[:, None])
+                & (exp_index[None, :] - first[:, symbol] < group.max_expirations[:, None])
+                & (credit[None, :] >= group.min_credit[:, None]))
+
+    # Ranked, so the top_n of a segment are its first top_n eligible: a running
+    # count restarted at every segment
+    running = np.cumsum(eligible, axis=1, dtype=np.int32)
+    starts = np.flatnonzero(np.r_[True, segment[1:] != segment[:-1]])
+    before = np.zeros((len(group.index), len(starts)), dtype=np.int32)
+    before[:, 1:] = running[:, starts[1:] - 1]
+    position = np.cumsum(np.r_[True, segment[1:] != segment[:-1]]) - 1
+    chosen = eligible & (running - before[:, position] <= group.top_n[:, None])
+    return chosen, candidates.segment_strategy[segment], candidates.pnl[order], candidates.max_loss[order]
+
+
+def _run_days(directory: str, days: List[str], day_offset: int, total_days: int,
+              params: Sequence[BacktestParams], strategies: Tuple[str, ...],
+              symbols: Optional[Tuple[str, ...]], use_cache: bool = True) -> _Accumulator:
+    """Backtest a chunk of days (runs in a worker process, or inline)"""
+    store = SnapshotStore(directory)
+    cache = CandidateCache(store, enabled=use_cache)
+    groups = _param_groups(params)
+    accumulator = _Accumulator(len(params), total_days)
+    wanted_strategies = np.array([strategy in strategies for strategy in STRATEGIES])
+    
+    for day_index, day in enumerate(days, start=day_offset):
+        loaded = []
+        
+        def snapshot():
+            # Loaded once a day, and only if a candidate set has to be built
+            if not loaded:
+                loaded.append(store.load(day))
+            return loaded[0]
+        
+        regime = None
+        for width, width_groups in groups.items():
+            candidates = cache.get(day, width, snapshot)
+            if regime is None:
+                spy_closes = cache.settlement.history('SPY', day, 10)
+                spy_price = candidates.spots.get('SPY') or (float(spy_closes[-1]) if len(spy_closes) else None)
+                regime = accumulator.regimes[day] = regime_of(candidates.vix, spy_price, spy_closes)
+                accumulator.unsettled_chains += candidates.unsettled_chains
+            if len(candidates) == 0:
+                continue
+            
+            keep = None
+            if symbols or not wanted_strategies.all():
+                wanted_symbols = np.array([not symbols or symbol in symbols for symbol in candidates.symbols])
+                segment = candidates.segment_ids()
+                keep = (wanted_symbols[candidates.segment_symbol[segment]]
+                        & wanted_strategies[candidates.segment_strategy[segment]])
+                if not keep.any():
+                    continue
+            accumulator.candidates += int(keep.sum()) if keep is not None else len(candidates)
+            
+            for group in width_groups:
+                chosen, strategy, pnl, max_loss = _choose(group, candidates, keep)
+                accumulator.add(regime, day_index, group.index, chosen, strategy, pnl, max_loss)
+    
+    accumulator.cache_hits = cache.hits
+    accumulator.cache_builds = cache.builds
+    return accumulator
+
+
+class BacktestReport:
+    """Results of every parameter set, overall and per strategy and regime"""
+    
+    METRICS = ('trades', 'total_pnl', 'mean_pnl', 'win_rate', 'return_on_risk', 'max_drawdown', 'sharpe')
+    
+    def __init__(self, params: List[BacktestParams], days: List[str], accumulator: _Accumulator,
+                 seconds: float):
+        self.params = params
+        self.days = days
+        self.accumulator = accumulator
+        self.seconds = seconds
+        self.overall = _Stats(len(params))
+        for stats in accumulator.stats.values():
+            self.overall.merge(stats)
+        self._metrics: Optional[Dict[str, np.ndarray]] = None
+    
+    def metrics(self) -> Dict[str, np.ndarray]:
+        """Rankable metrics of every parameter set, as arrays indexed like params"""
+        if self._metrics is None:
+            overall = self.overall
+            trades = np.maximum(overall.trades, 1)
+            equity = np.cumsum(self.accumulator.daily, axis=1)
+            drawdown = (np.maximum.accumulate(np.maximum(equity, 0.0), axis=1) - equity).max(axis=1, initial=0.0)
+            daily_std = self.accumulator.daily.std(axis=1)
+            self._metrics = {
+                'trades': overall.trades.astype(np.float64),
+                'total_pnl': overall.pnl,
+                'mean_pnl': overall.pnl / trades,
+                'win_rate': overall.wins / trades,
+                'return_on_risk': np.divide(overall.pnl, overall.risk, out=np.zeros_like(overall.pnl),
+                                            where=overall.risk > 0),
+                'max_drawdown': drawdown,
+                'sharpe': np.divide(self.accumulator.daily.mean(axis=1), daily_std,
+                                    out=np.zeros_like(daily_std), where=daily_std > 0) * np.sqrt(TRADING_DAYS),
+            }
+        return self._metrics
+    
+    def summary(self, index: int) -> Dict:
+        """One parameter set: overall stats, per strategy and per strategy and regime"""
+        metrics = self.metrics()
+        by_strategy: Dict[str, _Stats] = {}
+        for (strategy, _), stats in self.accumulator.stats.items():
+            by_strategy.setdefault(strategy, _Stats(len(self.params))).merge(stats)
+        return {
+            'params': asdict(self.params[index]),
+            **self.overall.summary(index),
+            'max_drawdown': round(float(metrics['max_drawdown'][index]), 2),
+            'sharpe': round(float(metrics['sharpe'][index]), 3),
+            'by_strategy': {strategy: stats.summary(index) for strategy, stats in sorted(by_strategy.items())},
+            'by_regime': {
+                f"{strategy}/{regime}": stats.summary(index)
+                for (strategy, regime), stats in sorted(self.accumulator.stats.items())
+                if stats.trades[index]
+            },
+        }
+    
+    def ranked(self, metric: str = 'total_pnl', limit: Optional[int] = 20, min_trades: int = 1) -> List[Dict]:
+        """Summaries of the best parameter sets by metric (max_drawdown: lowest first)"""
+        metrics = self.metrics()
+        values = metrics[metric] if metric == 'max_drawdown' else -metrics[metric]
+        order = [int(i) for i in np.argsort(values, kind='stable') if self.overall.trades[i] >= min_trades]
+        return [self.summary(i) for i in order[:limit]]
+    
+    def profile(self, index: int, name: str) -> ScoringProfile:
+        """A scan profile for one parameter set, with its backtest results"""
+        summary = self.summary(index)
+        backtest = {key: value for key, value in summary.items() if key not in ('params', 'by_regime')}
+        backtest['days'] = len(self.days)
+        backtest['first_day'] = self.days[0] if self.days else None
+        backtest['last_day'] = self.days[-1] if self.days else None
+        return self.params[index].profile(name, backtest)
+    
+    def to_dict(self, metric: str = 'total_pnl', limit: Optional[int] = 20) -> Dict:
+        regimes: Dict[str, int] = {}
+        for regime in self.accumulator.regimes.values():
+            regimes[regime] = regimes.get(regime, 0) + 1
+        return {
+            'days': len(self.days),
+            'first_day': self.days[0] if self.days else None,
+            'last_day': self.days[-1] if self.days else None,
+            'regime_days': dict(sorted(regimes.items())),
+            'parameter_sets': len(self.params),
+            'candidates': self.accumulator.candidates,
+            'unsettled_chains': self.accumulator.unsettled_chains,
+            'candidate_sets': {'cached': self.accumulator.cache_hits, 'built': self.accumulator.cache_builds},
+            'seconds': round(self.seconds, 2),
+            'ranked_by': metric,
+            'results': self.ranked(metric, limit),
+        }
+
+
+class Backtester:
+    """Runs parameter grids over a snapshot store"""
+    
+    def __init__(self, store: SnapshotStore, workers: Optional[int] = None):
+        """
+        Args:
+            store: Day snapshots and closes to replay
+            workers: Processes to split the days between (default: one per core; 0 or 1: inline)
+        """
+        self.store = store
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+    
+    def run(self, params: Sequence[BacktestParams], start: Optional[str] = None, end: Optional[str] = None,
+            symbols: Optional[Iterable[str]] = None,
+            strategies: Tuple[str, ...] = STRATEGIES, use_cache: bool = True) -> BacktestReport:
+        """
+        Backtest every parameter set over the stored days within [start, end]
+        
+        use_cache=False rebuilds every candidate set without reading or
+        writing the store's candidate cache.
+        """
+        run_start = time.perf_counter()
+        params = list(params)
+        if any(p.min_credit < MIN_CREDIT_FLOOR for p in params):
+            raise ValueError(f"min_credit below {MIN_CREDIT_FLOOR} is not supported")
+        days = self.store.dates(start, end)
+        symbols = tuple(symbol.upper() for symbol in symbols) if symbols else None
+        directory = str(self.store.directory)
+        logger.info(f"Backtesting {len(params)} parameter sets over {len(days)} days "
+                    f"with {self.workers} workers")
+        
+        accumulator = _Accumulator(len(params), len(days))
+        if self.workers <= 1 or len(days) <= 1:
+            accumulator.merge(_run_days(directory, days, 0, len(days), params, strategies, symbols, use_cache))
+        else:
+            # Several chunks per worker even out days with more chains
+            chunk = max(1, -(-len(days) // (self.workers * 4)))
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn')) as executor:
+                futures = [
+                    executor.submit(_run_days, directory, days[offset:offset + chunk], offset, len(days),
+                                    params, strategies, symbols, use_cache)
+                    for offset in range(0, len(days), chunk)
+                ]
+                for future in futures:
+                    accumulator.merge(future.result())
+        
+        report = BacktestReport(params, days, accumulator, time.perf_counter() - run_start)
+        logger.info(f"Backtest done in {report.seconds:.1f}s ({accumulator.candidates} candidates, "
+                    f"{accumulator.cache_builds} candidate sets built, {accumulator.cache_hits} cached)")
+        return report
@@ -0,0 +1,110 @@
+"""
+Scoring weight and filter optimizer
+
+Backtests a grid of scoring weights and scan filters and keeps the
+Pareto-optimal parameter sets: those no other set beats on every objective
+at once (by default total P&L, return on risk and win rate, maximized, and
+max drawdown, minimized). The front is written as a scan profile file the
+scanner loads at runtime (SCAN_PROFILE_PATH).
+
+Candidate sets are cached by the backtester, so sweeping further weights
+over the same store only re-ranks.
+"""
+
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..scanners.options.scoring import ScoringProfile, write_profiles
+from .engine import BacktestParams, BacktestReport, Backtester
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OBJECTIVES = ('total_pnl', 'return_on_risk', 'win_rate', 'max_drawdown')
+
+# Objectives where lower is better
+MINIMIZED = {'max_drawdown'}
+
+
+def pareto_front(values: np.ndarray) -> np.ndarray:
+    """
+    Indexes of the non-dominated rows of values (rows x objectives, all
+    maximized), best first by the first objective
+    
+    Rows are visited in decreasing order of the first objective, so a row can
+    only be dominated by one already kept.
+    """
+    order = np.lexsort(tuple(-values[:, j] for j in reversed(range(values.shape[1]))))
+    front: List[int] = []
+    for i in order:
+        row = values[i]
+        if front:
+            kept = values[front]
+            if np.any(np.all(kept >= row, axis=1) & np.any(kept > row, axis=1)) \
+                    or np.any(np.all(kept == row, axis=1)):
+                continue
+        front.append(int(i))
+    return np.array(front, dtype=np.int64)
+
+
+class Optimizer:
+    """Pareto-optimal scanner configurations over a snapshot store"""
+    
+    def __init__(self, backtester: Backtester, objectives: Sequence[str] = DEFAULT_OBJECTIVES,
+                 min_trades: int = 20):
+        """
+        Args:
+            backtester: Runs the grid
+            objectives: BacktestReport metrics to optimize (max_drawdown minimized, the rest maximized)
+            min_trades: Parameter sets with fewer trades are left out of the front
+        """
+        unknown = set(objectives) - set(BacktestReport.METRICS)
+        if unknown or not objectives:
+            raise ValueError(f"unknown objectives: {', '.join(sorted(unknown)) or 'none given'}")
+        self.backtester = backtester
+        self.objectives = tuple(objectives)
+        self.min_trades = min_trades
+    
+    def front(self, report: BacktestReport) -> List[int]:
+        """Indexes of the report's Pareto-optimal parameter sets, best first by the first objective"""
+        metrics = report.metrics()
+        candidates = np.flatnonzero(report.overall.trades >= max(self.min_trades, 1))
+        if len(candidates) == 0:
+            return []
+        values = np.stack([
+            -metrics[name][candidates] if name in MINIMIZED else metrics[name][candidates]
+            for name in self.objectives
+        ], axis=1)
+        return [int(candidates[i]) for i in pareto_front(values)]
+    
+    def run(self, params: Sequence[BacktestParams], **kwargs) -> Tuple[BacktestReport, List[int]]:
+        """Backtest params (kwargs as for Backtester.run); returns the report and its front"""
+        report = self.backtester.run(params, **kwargs)
+        front = self.front(report)
+        logger.info(f"{len(front)} Pareto-optimal of {len(report.params)} parameter sets "
+                    f"on {', '.join(self.objectives)}")
+        return report, front
+    
+    def profiles(self, report: BacktestReport, front: Sequence[int]) -> List[ScoringProfile]:
+        """The front as scan profiles pareto-1, pareto-2, ... (best first)"""
+        return [report.profile(index, f"pareto-{rank}") for rank, index in enumerate(front, start=1)]
+    
+    def to_dict(self, report: BacktestReport, front: Sequence[int], limit: Optional[int] = None) -> Dict:
+        summary = report.to_dict(self.objectives[0], limit=0)
+        del summary['results']
+        return {
+            **summary,
+            'objectives': list(self.objectives),
+            'min_trades': self.min_trades,
+            'pareto_front': len(front),
+            'results': [{'profile': f"pareto-{rank}", **report.summary(index)}
+                        for rank, index in enumerate(front[:limit], start=1)],
+        }
+    
+    def write_profiles(self, path: str, report: BacktestReport, front: Sequence[int]):
+        """Write the front as a scan profile file, the first objective's best active"""
+        if not front:
+            raise ValueError("no parameter set has enough trades for a profile")
+        write_profiles(path, self.profiles(report, front))
+        logger.info(f"Wrote {len(front)} scan profiles to {path}")
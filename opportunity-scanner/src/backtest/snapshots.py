@@ -0,0 +1,307 @@
+"""
+Chain snapshots for backtesting, imported from market data captures
+
+The market data service can record every TradeStation response it receives
+(MARKET_DATA_CAPTURE_PATH). import_captures reduces those logs to one
+snapshot per trading day: for each underlying and expiration, the chain as it
+was first captured at or after the entry time (else the day's last capture),
+the underlying's price quoted closest to it, and the VIX level. Daily closes
+from captured bars (and from quotes captured after the close) are kept too;
+they settle spreads at expiration and give the regime its SPY trend.
+
+Store layout (one directory):
+    {YYYY-MM-DD}.npz    option rows of all chains of the day, as columns
+    closes.json         symbol -> {date: close}
+"""
+
+import gzip
+import json
+import logging
+import os
+import re
+import tempfile
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from ..market_data import OptionChain
+
+logger = logging.getLogger(__name__)
+
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_CLOSE = dt_time(16, 0)
+
+_DAY_FILE = re.compile(r'^\d{4}-\d{2}-\d{2}\.npz$')
+
+
+@dataclass
+class DaySnapshot:
+    """Chains of one trading day at the entry time"""
+    date: str
+    # Underlying price when its chains were captured
+    spots: Dict[str, float] = field(default_factory=dict)
+    vix: Optional[float] = None
+    # symbol -> [(expiration, chain)], nearest expiration first
+    chains: Dict[str, List[Tuple[str, OptionChain]]] = field(default_factory=dict)
+
+
+class SnapshotStore:
+    """Directory of DaySnapshots and daily closes"""
+    
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+    
+    def _day_path(self, day: str) -> Path:
+        return self.directory / f"{day}.npz"
+    
+    def dates(self, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+        """Stored trading days within [start, end], oldest first"""
+        if not self.directory.is_dir():
+            return []
+        days = sorted(path.name[:10] for path in self.directory.iterdir() if _DAY_FILE.match(path.name))
+        return [day for day in days if (start is None or day >= start) and (end is None or day <= end)]
+    
+    def save(self, snapshot: DaySnapshot):
+        """Write (or replace) a day's snapshot"""
+        chain_symbols, chain_expirations, offsets = [], [], [0]
+        option_type, strike, bid, ask = [], [], [], []
+        for symbol, chains in sorted(snapshot.chains.items()):
+            for expiration, chain in chains:
+                chain_symbols.append(symbol)
+                chain_expirations.append(expiration)
+                offsets.append(offsets[-1] + len(chain))
+                option_type.append(chain.option_type)
+                strike.append(chain.strike)
+                bid.append(chain.bid)
+                ask.append(chain.ask)
+        
+        def column(parts: List[np.ndarray], dtype) -> np.ndarray:
+            return np.concatenate(parts).astype(dtype) if parts else np.empty(0, dtype=dtype)
+        
+        meta = {'date': snapshot.date, 'spots': snapshot.spots, 'vix': snapshot.vix}
+        self._write(self._day_path(snapshot.date), lambda f: np.savez_compressed(
+            f,
+            meta=np.array(json.dumps(meta)),
+            chain_symbol=np.array(chain_symbols, dtype='U16'),
+            chain_expiration=np.array(chain_expirations, dtype='U10'),
+            offsets=np.array(offsets, dtype=np.int64),
+            option_type=column(option_type, 'U1'),
+            strike=column(strike, np.float64),
+            bid=column(bid, np.float64),
+            ask=column(ask, np.float64),
+        ))
+    
+    def load(self, day: str) -> DaySnapshot:
+        with np.load(self._day_path(day), allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            offsets = data['offsets']
+            option_type, strike, bid, ask = data['option_type'], data['strike'], data['bid'], data['ask']
+            snapshot = DaySnapshot(meta['date'], meta.get('spots') or {}, meta.get('vix'))
+            for i, (symbol, expiration) in enumerate(zip(data['chain_symbol'].tolist(),
+                                                         data['chain_expiration'].tolist())):
+                rows = slice(offsets[i], offsets[i + 1])
+                chain = OptionChain(option_type[rows], strike[rows], bid[rows], ask[rows])
+                snapshot.chains.setdefault(symbol, []).append((expiration, chain))
+        for chains in snapshot.chains.values():
+            chains.sort(key=lambda item: item[0])
+        return snapshot
+    
+    def closes(self) -> Dict[str, Dict[str, float]]:
+        """symbol -> {date: close}"""
+        path = self.directory / 'closes.json'
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text())
+    
+    def save_closes(self, closes: Dict[str, Dict[str, float]]):
+        """Merge daily closes into the stored ones"""
+        merged = self.closes()
+        for symbol, by_date in closes.items():
+            merged.setdefault(symbol, {}).update(by_date)
+        merged = {symbol: dict(sorted(by_date.items())) for symbol, by_date in sorted(merged.items())}
+        self._write(self.directory / 'closes.json',
+                    lambda f: f.write(json.dumps(merged, separators=(',', ':')).encode('utf-8')))
+    
+    def _write(self, path: Path, write):
+        """Atomic replace, so a crashed import never leaves a torn file"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+# ==================== Capture import ====================
+
+def _read_capture(path: str) -> Iterable[Dict]:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _market_time(t: float) -> datetime:
+    return datetime.fromtimestamp(t, MARKET_TZ)
+
+
+class _Importer:
+    """Reduces capture records to per-day chains, quotes and closes"""
+    
+    def __init__(self, entry_time: dt_time, vix_symbol: str):
+        self.entry_time = entry_time
+        self.vix_symbol = vix_symbol
+        # (day, symbol, expiration) -> (rank, t, body); lowest rank wins
+        self.chains: Dict[Tuple[str, str, str], Tuple[Tuple, float, str]] = {}
+        # (day, symbol) -> [(t, last)]
+        self.quotes: Dict[Tuple[str, str], List[Tuple[float, float]]] = {}
+        # symbol -> {date: (t, close)}; bars override quotes
+        self.bar_closes: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        self.quote_closes: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        self.records = 0
+    
+    def add(self, record: Dict):
+        if record.get('status') != 200 or record.get('method', 'GET') != 'GET':
+            return
+        path = record.get('path') or ''
+        self.records += 1
+        try:
+            if '/marketdata/options/chains/' in path:
+                self._add_chain(record, path.rsplit('/', 1)[-1].upper())
+            elif '/marketdata/quotes/' in path:
+                self._add_quotes(record)
+            elif '/marketdata/barcharts/' in path:
+                self._add_bars(record, path.rsplit('/', 1)[-1].upper())
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"Skipping unreadable capture record for {path}: {e}")
+    
+    def _add_chain(self, record: Dict, symbol: str):
+        t = record['t']
+        moment = _market_time(t)
+        day = moment.date().isoformat()
+        query = parse_qs(record.get('query') or '')
+        expiration = (query.get('expiration') or [None])[0]
+        body = record['body']
+        if not expiration:
+            expiration = json.loads(body).get('Expiration')
+        if not expiration:
+            return
+        expiration = str(expiration)[:10]
+        # First capture at or after the entry time, else the day's last one
+        rank = (0, t) if moment.time() >= self.entry_time else (1, -t)
+        key = (day, symbol, expiration)
+        current = self.chains.get(key)
+        if current is None or rank < current[0]:
+            self.chains[key] = (rank, t, body)
+    
+    def _add_quotes(self, record: Dict):
+        t = record['t']
+        moment = _market_time(t)
+        day = moment.date().isoformat()
+        data = json.loads(record['body'])
+        quotes = data.get('Quotes') if isinstance(data, dict) else data
+        for quote in quotes or []:
+            symbol = (quote.get('Symbol') or '').upper()
+            try:
+                last = float(quote.get('Last'))
+            except (TypeError, ValueError):
+                continue
+            self.quotes.setdefault((day, symbol), []).append((t, last))
+            if moment.time() >= MARKET_CLOSE:
+                closes = self.quote_closes.setdefault(symbol, {})
+                if day not in closes or t > closes[day][0]:
+                    closes[day] = (t, last)
+    
+    def _add_bars(self, record: Dict, symbol: str):
+        query = parse_qs(record.get('query') or '')
+        if (query.get('unit') or [''])[0].lower() != 'daily':
+            return
+        t = record['t']
+        moment = _market_time(t)
+        # Today's bar is only final once the market has closed
+        last_final = moment.date().isoformat() if moment.time() >= MARKET_CLOSE else None
+        closes = self.bar_closes.setdefault(symbol, {})
+        for bar in json.loads(record['body']).get('Bars') or []:
+            day = str(bar.get('TimeStamp') or '')[:10]
+            if not day or (day >= moment.date().isoformat() and day != last_final):
+                continue
+            try:
+                close = float(bar.get('Close'))
+            except (TypeError, ValueError):
+                continue
+            if day not in closes or t > closes[day][0]:
+                closes[day] = (t, close)
+    
+    def _nearest_quote(self, day: str, symbol: str, t: float) -> Optional[float]:
+        quotes = self.quotes.get((day, symbol))
+        if not quotes:
+            return None
+        return min(quotes, key=lambda quote: abs(quote[0] - t))[1]
+    
+    def snapshots(self) -> List[DaySnapshot]:
+        by_day: Dict[str, DaySnapshot] = {}
+        times: Dict[Tuple[str, str], float] = {}
+        for (day, symbol, expiration), (_, t, body) in sorted(self.chains.items()):
+            chain = OptionChain.from_json(json.loads(body))
+            if len(chain) == 0:
+                continue
+            snapshot = by_day.setdefault(day, DaySnapshot(day))
+            snapshot.chains.setdefault(symbol, []).append((expiration, chain))
+            times[(day, symbol)] = min(t, times.get((day, symbol), t))
+        
+        for day, snapshot in by_day.items():
+            for symbol in list(snapshot.chains):
+                spot = self._nearest_quote(day, symbol, times[(day, symbol)])
+                if spot is None:
+                    logger.warning(f"No quote for {symbol} on {day}; its chains are skipped")
+                    del snapshot.chains[symbol]
+                    continue
+                snapshot.spots[symbol] = spot
+            entry = datetime.combine(date.fromisoformat(day), self.entry_time, MARKET_TZ).timestamp()
+            snapshot.vix = self._nearest_quote(day, self.vix_symbol, entry)
+        return [by_day[day] for day in sorted(by_day) if by_day[day].chains]
+    
+    def closes(self) -> Dict[str, Dict[str, float]]:
+        closes: Dict[str, Dict[str, float]] = {}
+        for source in (self.quote_closes, self.bar_closes):
+            for symbol, by_date in source.items():
+                closes.setdefault(symbol, {}).update({day: close for day, (_, close) in by_date.items()})
+        return closes
+
+
+def import_captures(paths: List[str], store: SnapshotStore, entry_time: str = '10:00',
+                    vix_symbol: str = 'VIX') -> Dict:
+    """
+    Add the days found in capture logs to a snapshot store
+    
+    A day present in the captures replaces the stored one, so all captures of
+    a day should be imported together. entry_time is market time (HH:MM).
+    """
+    importer = _Importer(dt_time.fromisoformat(entry_time), vix_symbol.upper())
+    for path in paths:
+        logger.info(f"Reading capture {path}")
+        for record in _read_capture(path):
+            importer.add(record)
+    
+    snapshots = importer.snapshots()
+    for snapshot in snapshots:
+        store.save(snapshot)
+    closes = importer.closes()
+    store.save_closes(closes)
+    
+    stats = {
+        'records': importer.records,
+        'days': [snapshot.date for snapshot in snapshots],
+        'chains': sum(len(chains) for snapshot in snapshots for chains in snapshot.chains.values()),
+        'closes': sum(len(by_date) for by_date in closes.values()),
+    }
+    logger.info(f"Imported {len(snapshots)} days ({stats['chains']} chains) from {len(paths)} captures")
+    return stats
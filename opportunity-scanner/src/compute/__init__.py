@@ -0,0 +1,3 @@
+from .pool import ChainTask, ComputePool, evaluate_chain
+
+__all__ = ['ChainTask', 'ComputePool', 'evaluate_chain']
@@ -0,0 +1,196 @@
+"""
+Process pool for scan compute
+
+Spread enumeration and scoring are CPU-bound numpy and Python loops. Run on
+the API's event loop, a large scan stalls every other request until it
+finishes. ComputePool moves that work to worker processes. The event loop
+submits one ChainTask per chain as the chain streams in, and gets back that
+chain's ranked spreads while it keeps streaming.
+
+Workers are started with 'spawn' (the API process has threads, which don't
+survive fork) and each builds its own scanner. With SCAN_COMPUTE_WORKERS=0
+tasks run inline on the event loop, as before.
+
+A worker that dies (killed, out of memory) breaks the whole executor and
+fails every task in it. The pool is then rebuilt and each affected task is
+retried once on the new one, so only a task that kills its worker again fails.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from ..market_data import OptionChain
+from ..utils import metrics
+
+if TYPE_CHECKING:
+    from ..scanners.options.scoring import ScoringWeights
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class ChainTask:
+    """One expiration's chain to evaluate"""
+    symbol: str
+    current_price: float
+    expiration: str
+    dte: int
+    chain: OptionChain
+    min_credit: float
+    spread_width: float
+    strategies: Tuple[str, ...]
+    top_n: Optional[int]
+    # None: the default scoring weights
+    weights: Optional['ScoringWeights'] = None
+
+
+# Scanner used by tasks in this process (built on first use in each worker)
+_scanner = None
+
+
+def _local_scanner():
+    global _scanner
+    if _scanner is None:
+        # Imported here: the scanner module imports this one
+        from ..scanners.options.spread_scanner import OptionsSpreadScanner
+        # Compute only; the market data client is never used
+        _scanner = OptionsSpreadScanner(market_data_url='http://127.0.0.1:0')
+    return _scanner
+
+
+def evaluate_chain(task: ChainTask) -> Dict:
+    """Ranked spreads for one chain (runs in a worker process, or inline)"""
+    start = time.process_time()
+    result = _local_scanner().evaluate_chain(
+        task.symbol, task.current_price, task.expiration, task.dte, task.chain,
+        task.min_credit, task.spread_width, task.strategies, task.top_n, task.weights
+    )
+    result['seconds'] = time.process_time() - start
+    return result
+
+
+def _warm_up() -> int:
+    _local_scanner()
+    return os.getpid()
+
+
+def default_workers() -> int:
+    """
+    SCAN_COMPUTE_WORKERS, else the cores but one (left for the event loop)
+    split between the API workers
+    """
+    configured = os.getenv('SCAN_COMPUTE_WORKERS')
+    if configured is not None:
+        return max(0, int(configured))
+    api_workers = max(1, int(os.getenv('WEB_CONCURRENCY', '1')))
+    return max(1, ((os.cpu_count() or 2) - 1) // api_workers)
+
+
+class ComputePool:
+    """Evaluates chains in worker processes, off the event loop"""
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Args:
+            workers: Worker processes (default: default_workers()); 0 evaluates inline
+        """
+        self.workers = default_workers() if workers is None else workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if self.workers > 0:
+            self._executor = self._new_executor()
+
+        # Stats
+        self.tasks = 0
+        self.pending = 0
+        self.compute_seconds = 0.0
+        self.failures = 0
+        self.rebuilds = 0
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+
+    async def start(self):
+        """Start the workers and import the scanner in each, so the first scan doesn't pay for it"""
+        if not self._executor:
+            logger.info("Scan compute runs inline on the event loop")
+            return
+
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        pids = await asyncio.gather(*(loop.run_in_executor(self._executor, _warm_up)
+                                      for _ in range(self.workers)))
+        logger.info(f"Scan compute pool ready: {len(set(pids))} worker process(es) "
+                    f"in {time.perf_counter() - start:.1f}s")
+
+    async def evaluate(self, task: ChainTask) -> Dict:
+        """
+        Ranked spreads for one chain
+
+        Returns {'put_credit_spreads', 'call_credit_spreads', 'total', 'seconds'}
+        where the lists hold the chain's top_n of each and total counts all
+        spreads found.
+        """
+        self.tasks += 1
+        self.pending += 1
+        metrics.COMPUTE_TASKS_PENDING.inc()
+        try:
+            if not self._executor:
+                result = evaluate_chain(task)
+            else:
+                result = await self._run(task)
+            self.compute_seconds += result['seconds']
+            return result
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.pending -= 1
+            metrics.COMPUTE_TASKS_PENDING.dec()
+
+    async def _run(self, task: ChainTask) -> Dict:
+        """Evaluate in a worker, retrying once on a rebuilt pool if a worker died"""
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = self._executor
+            try:
+                return await loop.run_in_executor(executor, evaluate_chain, task)
+            except BrokenProcessPool:
+                self._rebuild(executor)
+                if attempt or self._executor is None:
+                    raise
+                logger.warning(f"Compute worker died; retrying {task.symbol} {task.expiration} on a new pool")
+
+    def _rebuild(self, broken: ProcessPoolExecutor):
+        """Replace a broken executor (once, however many of its tasks failed)"""
+        if self._executor is not broken:
+            # Already replaced by another failed task, or closed
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._new_executor()
+        self.rebuilds += 1
+        logger.error(f"Scan compute pool broken (a worker process died); started {self.workers} new worker(s)")
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "tasks": self.tasks,
+            "pending": self.pending,
+            "failures": self.failures,
+            "rebuilds": self.rebuilds,
+            "compute_seconds": round(self.compute_seconds, 3),
+        }
@@ -5,11 +5,15 @@ Determines current market regime to guide scanning strategy.
 Uses VIX + trend analysis to classify market conditions.
 """
 
-import httpx
+import asyncio
 import logging
-from typing import Dict, Optional
+import numpy as np
+from typing import Dict, Optional, Tuple
 from datetime import datetime
 
+from ..market_data import BarSeries, MarketDataClient, Quote
+from ..utils import tracing
+
 logger = logging.getLogger(__name__)
 
 class RegimeDetector:
@@ -20,41 +24,26 @@ class RegimeDetector:
     VIX_MEDIUM = 20
     VIX_HIGH = 30
     
-    def __init__(self, market_data_url: str = "http://10.32.3.27:8010"):
+    def __init__(self, market_data_url: str = "http://10.32.3.27:8010",
+                 market_data: Optional[MarketDataClient] = None):
         self.market_data_url = market_data_url
-        self.client = httpx.AsyncClient(timeout=30.0)
+        self._owns_client = market_data is None
+        self.market_data = market_data or MarketDataClient(market_data_url)
     
     async def close(self):
         """Close HTTP client"""
-        await self.client.close()
+        if self._owns_client:
+            await self.market_data.close()
     
-    async def _get_quote(self, symbol: str) -> Optional[Dict]:
+    async def _get_quote(self, symbol: str) -> Optional[Quote]:
         """Get quote from market data service"""
-        try:
-            response = await self.client.get(f"{self.market_data_url}/api/quotes/{symbol}")
-            if response.status_code == 200:
-                data = response.json()
-                if 'Quotes' in data and len(data['Quotes']) > 0:
-                    return data['Quotes'][0]
-            return None
-        except Exception as e:
-            logger.error(f"Error getting quote for {symbol}: {e}")
-            return None
+        return await self.market_data.get_quote(symbol)
     
-    async def _get_bars(self, symbol: str, bars_back: int = 20) -> Optional[list]:
-        """Get historical bars"""
-        try:
-            response = await self.client.get(
-                f"{self.market_data_url}/api/bars/{symbol}",
-                params={'interval': '1', 'unit': 'Daily', 'bars_back': bars_back}
-            )
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            logger.error(f"Error getting bars for {symbol}: {e}")
-            return None
+    async def _get_bars(self, symbol: str, bars_back: int = 20) -> Optional[BarSeries]:
+        """Get historical daily bars"""
+        return await self.market_data.get_bars(symbol, interval='1', unit='Daily', bars_back=bars_back)
     
+    @tracing.traced("detect_regime")
     async def detect_regime(self) -> Dict:
         """
         Detect current market regime
@@ -70,38 +59,18 @@ class RegimeDetector:
         """
         logger.info("Detecting market regime...")
         
-        # Get VIX (volatility indicator)
-        vix_quote = await self._get_quote('VIX')
-        vix_level = vix_quote['Last'] if vix_quote else 20.0  # Default to medium
-        
-        # Classify volatility
-        if vix_level < self.VIX_LOW:
-            volatility = 'low'
-        elif vix_level < self.VIX_MEDIUM:
-            volatility = 'medium'
-        elif vix_level < self.VIX_HIGH:
-            volatility = 'high'
-        else:
-            volatility = 'extreme'
-        
-        # Get SPY for trend
-        spy_quote = await self._get_quote('SPY')
-        spy_price = spy_quote['Last'] if spy_quote else None
+        # VIX (volatility), SPY (trend) and SPY bars in parallel; the two
+        # quotes go out as one batched request
+        vix_quote, spy_quote, spy_bars = await asyncio.gather(
+            self._get_quote('VIX'),
+            self._get_quote('SPY'),
+            self._get_bars('SPY', bars_back=20)
+        )
         
-        # Get recent SPY bars for trend analysis
-        spy_bars = await self._get_bars('SPY', bars_back=20)
-        
-        trend = 'neutral'
-        if spy_bars and len(spy_bars) >= 10:
-            # Simple trend: compare current price to 10-day average
-            closes = [bar['Close'] for bar in spy_bars[-10:]]
-            avg_close = sum(closes) / len(closes)
-            
-            if spy_price:
-                if spy_price > avg_close * 1.02:  # 2% above average
-                    trend = 'bullish'
-                elif spy_price < avg_close * 0.98:  # 2% below average
-                    trend = 'bearish'
+        vix_level = vix_quote.last if vix_quote and vix_quote.last is not None else 20.0  # Default to medium
+        spy_price = spy_quote.last if spy_quote else None
+        closes = spy_bars.close if spy_bars and len(spy_bars) >= 10 else None
+        volatility, trend = self.classify(vix_level, spy_price, closes)
         
         # Determine regime
         regime = f"{volatility}_vol_{trend}"
@@ -128,6 +97,38 @@ class RegimeDetector:
         logger.info(f"Detected regime: {regime} (confidence: {confidence})")
         return result
     
+    @classmethod
+    def classify(cls, vix_level: float, spy_price: Optional[float],
+                 closes: Optional[np.ndarray]) -> Tuple[str, str]:
+        """
+        (volatility, trend) from the VIX level and SPY's price against its
+        last 10 daily closes (neutral without at least 10 closes)
+        """
+        # Classify volatility
+        if vix_level < cls.VIX_LOW:
+            volatility = 'low'
+        elif vix_level < cls.VIX_MEDIUM:
+            volatility = 'medium'
+        elif vix_level < cls.VIX_HIGH:
+            volatility = 'high'
+        else:
+            volatility = 'extreme'
+        
+        trend = 'neutral'
+        if closes is not None and len(closes) >= 10:
+            # Simple trend: compare current price to 10-day average
+            closes = np.asarray(closes, dtype=np.float64)[-10:]
+            closes = closes[~np.isnan(closes)]
+            avg_close = float(closes.mean()) if len(closes) else None
+            
+            if spy_price and avg_close:
+                if spy_price > avg_close * 1.02:  # 2% above average
+                    trend = 'bullish'
+                elif spy_price < avg_close * 0.98:  # 2% below average
+                    trend = 'bearish'
+        
+        return volatility, trend
+    
     def _get_recommended_strategies(self, volatility: str, trend: str) -> list:
         """Get recommended strategies for current regime"""
         strategies = []
@@ -0,0 +1,3 @@
+from .scan_jobs import TERMINAL_STATUSES, JobManager, ScanJob
+
+__all__ = ['TERMINAL_STATUSES', 'JobManager', 'ScanJob']
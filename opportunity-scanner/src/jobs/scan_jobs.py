@@ -0,0 +1,400 @@
+"""
+Scan jobs
+
+Every scan is a job with an id. Jobs are queued in two lanes on the worker
+that accepted them:
+
+    full      regime detection + scan, publishes the latest snapshot; one at
+              a time, and only while holding the shared scan lock
+    targeted  scan of the given symbols; up to SCAN_JOB_CONCURRENCY at once,
+              alongside a running full scan
+
+A job moves from queued to running to completed, failed or cancelled. Its
+record (status, per-symbol progress) and results are kept in the scan state
+store, so with Redis any worker can report on, stream or cancel any job.
+Progress events are pushed to local subscribers as they happen; a worker
+streaming another worker's job follows its record instead. Status changes
+save the record at once, while progress events are coalesced into at most
+one save per SAVE_INTERVAL_SECONDS, so a scan reporting hundreds of chains
+doesn't make a blocking state write for each.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..state import MemoryScanState
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+# Polling intervals: scan lock while waiting for it, cancel requests from other
+# workers, and records of jobs running elsewhere
+LOCK_POLL_SECONDS = 1.0
+CANCEL_POLL_SECONDS = 1.0
+REMOTE_POLL_SECONDS = 0.5
+
+# Local jobs kept for event subscribers after they finish
+MAX_LOCAL_JOBS = 100
+
+# Events that change a job's status are saved at once; progress events
+# at most this often (other workers poll records every REMOTE_POLL_SECONDS)
+STATUS_EVENTS = ('queued', 'started') + TERMINAL_STATUSES
+SAVE_INTERVAL_SECONDS = 0.5
+
+ProgressCallback = Callable[[str, Dict], None]
+
+
+@dataclass
+class ScanJob:
+    """A scan request and its progress"""
+    id: str
+    kind: str
+    params: Dict
+    status: str = 'queued'
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    worker: str = field(default_factory=lambda: f"{socket.gethostname()}:{os.getpid()}")
+    progress: Dict = field(default_factory=lambda: {
+        'symbols_total': 0, 'symbols_done': 0, 'chains_done': 0, 'opportunities': 0,
+    })
+    symbols: Dict[str, Dict] = field(default_factory=dict)
+    regime: Optional[str] = None
+    error: Optional[str] = None
+    seq: int = 0
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class JobManager:
+    """Queues, runs, tracks and cancels scan jobs on this worker"""
+    
+    def __init__(self, state: MemoryScanState,
+                 run_job: Callable[[ScanJob, ProgressCallback], Awaitable[Dict]],
+                 concurrency: int = 2, lock_ttl: float = 120.0):
+        """
+        Args:
+            state: Scan state store holding job records, results and the scan lock
+            run_job: Runs a job, reporting progress(event, data); returns its results
+            concurrency: Targeted jobs run at once
+            lock_ttl: Scan lock TTL for full jobs (extended while they run)
+        """
+        self.state = state
+        self.run_job = run_job
+        self.concurrency = concurrency
+        self.lock_ttl = lock_ttl
+        self._queues: Dict[str, asyncio.Queue] = {'full': asyncio.Queue(), 'targeted': asyncio.Queue()}
+        self._jobs: 'OrderedDict[str, ScanJob]' = OrderedDict()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self._tasks: List[asyncio.Task] = []
+        # Job id -> last record save, and progress saves waiting out the interval
+        self._saved_at: Dict[str, float] = {}
+        self._pending_saves: Dict[str, asyncio.TimerHandle] = {}
+        
+        # Stats
+        self.submitted = 0
+        self.finished = {status: 0 for status in TERMINAL_STATUSES}
+    
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._runner('full'))]
+        self._tasks += [asyncio.create_task(self._runner('targeted')) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._watch_cancels()))
+    
+    async def close(self):
+        for task in list(self._running.values()) + self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._running.values(), *self._tasks, return_exceptions=True)
+        for job in list(self._jobs.values()):
+            if job.id in self._pending_saves:
+                self._save(job)
+    
+    # ==================== Submitting ====================
+    
+    def submit(self, kind: str, params: Dict) -> Tuple[ScanJob, bool]:
+        """
+        Queue a job, returning it and whether it was created
+        
+        A full job already waiting in the queue is returned instead of
+        queueing another one behind it.
+        """
+        if kind == 'full':
+            for job in self._jobs.values():
+                if job.kind == 'full' and job.status == 'queued' and job.id not in self._running:
+                    return job, False
+        
+        job = ScanJob(id=uuid.uuid4().hex[:12], kind=kind, params=params)
+        self._jobs[job.id] = job
+        while len(self._jobs) > MAX_LOCAL_JOBS:
+            old_id, old_job = next(iter(self._jobs.items()))
+            if old_job.status not in TERMINAL_STATUSES:
+                break
+            self._jobs.pop(old_id)
+        self.submitted += 1
+        self._queues[kind].put_nowait(job)
+        self._emit(job, 'queued', {'kind': kind, 'params': params})
+        return job, True
+    
+    def queued_ahead(self, job: ScanJob) -> int:
+        """Jobs that will start before this one in its lane"""
+        ahead = sum(1 for other in self._jobs.values()
+                    if other.kind == job.kind and other.status in ('queued', 'running')
+                    and other.created_at < job.created_at)
+        if job.kind == 'targeted':
+            ahead = max(0, ahead - self.concurrency + 1)
+        return ahead
+    
+    # ==================== Running ====================
+    
+    async def _runner(self, lane: str):
+        queue = self._queues[lane]
+        while True:
+            job = await queue.get()
+            if job.status != 'queued':
+                # Cancelled while queued
+                continue
+            task = asyncio.create_task(self._execute(job))
+            self._running[job.id] = task
+            try:
+                # wait() rather than await: cancelling the job must not stop the runner
+                await asyncio.wait([task])
+            finally:
+                self._running.pop(job.id, None)
+            if job.status not in TERMINAL_STATUSES:
+                # Cancelled before it got to run
+                job.status = 'cancelled'
+                self._finish(job, None)
+    
+    async def _execute(self, job: ScanJob):
+        lock_token = None
+        heartbeat = None
+        results = None
+        try:
+            if job.kind == 'full':
+                lock_token = await self._acquire_scan_lock(job)
+                heartbeat = asyncio.create_task(self._extend_scan_lock(lock_token))
+            
+            job.status = 'running'
+            job.started_at = time.time()
+            self._emit(job, 'started', {})
+            
+            results = await self.run_job(job, lambda event, data: self._on_progress(job, event, data))
+            job.status = 'completed'
+        except asyncio.CancelledError:
+            job.status = 'cancelled'
+            logger.info(f"Scan job {job.id} cancelled")
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            logger.error(f"Scan job {job.id} failed: {e}")
+        finally:
+            if heartbeat:
+                heartbeat.cancel()
+            if lock_token:
+                self.state.release_scan(lock_token)
+            self._finish(job, results)
+    
+    async def _acquire_scan_lock(self, job: ScanJob) -> str:
+        """Wait until this worker holds the scan lock (another full scan may be running anywhere)"""
+        waiting = False
+        while True:
+            lock_token = self.state.try_acquire_scan(self.lock_ttl)
+            if lock_token:
+                return lock_token
+            if not waiting:
+                waiting = True
+                self._emit(job, 'waiting', {'reason': 'Another full scan is running',
+                                            'scan_owner': self.state.scan_owner()})
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+    
+    async def _extend_scan_lock(self, lock_token: str):
+        """Keep the scan lock alive while the scan runs"""
+        while True:
+            await asyncio.sleep(self.lock_ttl / 3)
+            if not self.state.extend_scan(lock_token, self.lock_ttl):
+                logger.warning("Lost the scan lock; another scan may start before this one finishes")
+                return
+    
+    def _on_progress(self, job: ScanJob, event: str, data: Dict):
+        """Fold a run_job progress event into the job record"""
+        progress = job.progress
+        if event == 'regime':
+            job.regime = data.get('regime')
+        elif event == 'plan':
+            job.symbols = {symbol: {'status': 'pending', 'chains': 0, 'opportunities': 0}
+                           for symbol in data['symbols']}
+            progress['symbols_total'] = len(job.symbols)
+        elif event == 'chain':
+            symbol = job.symbols.setdefault(data['symbol'], {'status': 'pending', 'chains': 0, 'opportunities': 0})
+            symbol['status'] = 'running'
+            symbol['chains'] += 1
+            symbol['opportunities'] += data.get('opportunities') or 0
+            progress['chains_done'] += 1
+            progress['opportunities'] += data.get('opportunities') or 0
+        elif event == 'symbol':
+            symbol = job.symbols.setdefault(data['symbol'], {'status': 'pending', 'chains': 0, 'opportunities': 0})
+            failed = data.get('error') or (data['errors'] and data['errors'] == data['chains'])
+            symbol['status'] = 'error' if failed else 'done'
+            progress['symbols_done'] += 1
+        self._emit(job, event, data)
+    
+    def _finish(self, job: ScanJob, results: Optional[Dict]):
+        job.finished_at = time.time()
+        self.finished[job.status] += 1
+        self._emit(job, job.status, {'error': job.error} if job.error else {}, results)
+    
+    # ==================== Events ====================
+    
+    def _emit(self, job: ScanJob, event: str, data: Dict, results: Optional[Dict] = None):
+        """Save the job record (progress coalesced) and push the event to local subscribers"""
+        job.seq += 1
+        if event in STATUS_EVENTS:
+            self._save(job, results)
+        else:
+            self._save_later(job)
+        message = {'job_id': job.id, 'status': job.status, 'progress': dict(job.progress), **data}
+        for queue in self._subscribers.get(job.id, []):
+            queue.put_nowait((event, message))
+    
+    def _save(self, job: ScanJob, results: Optional[Dict] = None):
+        timer = self._pending_saves.pop(job.id, None)
+        if timer:
+            timer.cancel()
+        if job.status in TERMINAL_STATUSES:
+            self._saved_at.pop(job.id, None)
+        else:
+            self._saved_at[job.id] = time.monotonic()
+        self.state.save_job(job.to_dict(), results)
+    
+    def _save_later(self, job: ScanJob):
+        """Save the record once SAVE_INTERVAL_SECONDS have passed since the last save"""
+        if job.id in self._pending_saves:
+            # The pending save writes the record as it is then
+            return
+        delay = self._saved_at.get(job.id, 0.0) + SAVE_INTERVAL_SECONDS - time.monotonic()
+        if delay <= 0:
+            self._save(job)
+        else:
+            self._pending_saves[job.id] = asyncio.get_running_loop().call_later(delay, self._save, job)
+    
+    async def events(self, job_id: str, keepalive: float = 15.0) -> AsyncIterator[Tuple[str, Optional[Dict]]]:
+        """
+        (event, data) pairs for a job until it finishes, starting with a
+        'status' event carrying the whole record. ('keepalive', None) is
+        yielded when nothing happened for keepalive seconds.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            async for item in self._remote_events(job_id, keepalive):
+                yield item
+            return
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(queue)
+        try:
+            yield 'status', job.to_dict()
+            if job.status in TERMINAL_STATUSES:
+                return
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield 'keepalive', None
+                    continue
+                yield event, data
+                if event in TERMINAL_STATUSES:
+                    return
+        finally:
+            self._subscribers[job_id].remove(queue)
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
+    
+    async def _remote_events(self, job_id: str, keepalive: float) -> AsyncIterator[Tuple[str, Optional[Dict]]]:
+        """Follow the stored record of a job running on another worker"""
+        seq = None
+        quiet = 0.0
+        while True:
+            record = self.state.get_job(job_id)
+            if record is None:
+                return
+            if record['seq'] != seq:
+                seq = record['seq']
+                quiet = 0.0
+                yield 'status', record
+                if record['status'] in TERMINAL_STATUSES:
+                    return
+            elif quiet >= keepalive:
+                quiet = 0.0
+                yield 'keepalive', None
+            await asyncio.sleep(REMOTE_POLL_SECONDS)
+            quiet += REMOTE_POLL_SECONDS
+    
+    # ==================== Lookup and Cancellation ====================
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        job = self._jobs.get(job_id)
+        return job.to_dict() if job else self.state.get_job(job_id)
+    
+    def active(self, kind: Optional[str] = None) -> List[str]:
+        """Ids of this worker's queued and running jobs (of one kind)"""
+        return [job.id for job in self._jobs.values()
+                if job.status not in TERMINAL_STATUSES and (kind is None or job.kind == kind)]
+    
+    def results(self, job_id: str) -> Optional[Dict]:
+        return self.state.get_job_results(job_id)
+    
+    def recent(self, limit: int = 20) -> List[Dict]:
+        return self.state.recent_jobs(limit)
+    
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """Cancel a queued or running job; returns its record, None if unknown"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            record = self.state.get_job(job_id)
+            if record and record['status'] not in TERMINAL_STATUSES:
+                # Running on another worker, which checks for cancel requests
+                self.state.request_cancel(job_id)
+                record['cancel_requested'] = True
+            return record
+        
+        self._cancel_local(job)
+        record = job.to_dict()
+        if job.status not in TERMINAL_STATUSES:
+            # A running job stops at its next await
+            record['cancel_requested'] = True
+        return record
+    
+    def _cancel_local(self, job: ScanJob):
+        task = self._running.get(job.id)
+        if task:
+            task.cancel()
+        elif job.status == 'queued':
+            # Skipped by the runner when it reaches the queue head
+            job.status = 'cancelled'
+            self._finish(job, None)
+    
+    async def _watch_cancels(self):
+        """Apply cancel requests made on other workers"""
+        while True:
+            await asyncio.sleep(CANCEL_POLL_SECONDS)
+            for job in list(self._jobs.values()):
+                if job.status not in TERMINAL_STATUSES and self.state.cancel_requested(job.id):
+                    self._cancel_local(job)
+    
+    def get_stats(self) -> Dict:
+        return {
+            "submitted": self.submitted,
+            "queued": {lane: queue.qsize() for lane, queue in self._queues.items()},
+            "running": list(self._running),
+            "finished": dict(self.finished),
+            "targeted_concurrency": self.concurrency,
+        }
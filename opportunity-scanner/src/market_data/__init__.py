@@ -0,0 +1,4 @@
+from .client import MarketDataClient
+from .models import BarSeries, OptionChain, OptionSide, Quote
+
+__all__ = ['MarketDataClient', 'BarSeries', 'OptionChain', 'OptionSide', 'Quote']
@@ -0,0 +1,419 @@
+"""
+Shared client for the market data service
+
+One instance is shared by every consumer in the scanner process, so they
+use a single connection pool instead of one per class. On top of the pool:
+
+- Quote requests made within a few milliseconds of each other are batched
+  into one `/api/quotes/{SYM1,SYM2,...}` call (which the service answers
+  from its per-symbol quote cache).
+- Concurrent requests for the same resource share one in-flight request.
+- Responses are kept in a short-TTL local cache, so a quote fetched for
+  regime detection is reused by the scan that follows it.
+- Results are parsed into typed objects once, when they arrive.
+- Responses are revalidated with the ETag they came with. A 304, or a bulk
+  chain line marked not_modified, reuses what was received before, so
+  unchanged bodies aren't sent (or parsed) again.
+- Each request is a client span whose trace context is sent along, so the
+  market data service continues the caller's trace.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+import httpx
+import orjson
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from .models import BarSeries, OptionChain, Quote
+from ..utils import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+# Local cache lifetimes (the service's own Redis TTLs are longer)
+QUOTE_CACHE_TTL = 2.0
+BARS_CACHE_TTL = 30.0
+EXPIRATIONS_CACHE_TTL = 300.0
+
+# TradeStation accepts up to 100 symbols per quote request
+MAX_QUOTE_BATCH = 50
+
+# Responses and chains kept for revalidation (least recently used dropped first)
+MAX_VALIDATORS = 256
+MAX_CACHED_CHAINS = 512
+
+# Chain ETags sent per bulk request (keeps If-None-Match well under header size limits)
+MAX_KNOWN_CHAINS = 200
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (httpx[http2])"""
+    return importlib.util.find_spec('h2') is not None
+
+
+class MarketDataClient:
+    """Pooled, batching, caching client for the market data service"""
+
+    def __init__(self, base_url: str = "http://10.32.3.27:8010",
+                 timeout: float = 30.0,
+                 max_connections: int = 20,
+                 batch_window: float = 0.005,
+                 http2: Optional[bool] = None):
+        """
+        Args:
+            base_url: Market data service URL
+            timeout: Request timeout in seconds
+            max_connections: Connection pool size
+            batch_window: Seconds to collect quote requests before sending a batch
+            http2: Use HTTP/2 (default: when h2 is installed). Negotiated via
+                   TLS ALPN, so plain http:// URLs stay on HTTP/1.1 keep-alive.
+        """
+        self.base_url = base_url.rstrip('/')
+        self.batch_window = batch_window
+        self.http2 = http2_available() if http2 is None else http2
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            http2=self.http2,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+        )
+
+        self._cache: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._pending_quotes: Dict[str, asyncio.Future] = {}
+        self._batch_timer: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Task] = set()
+
+        # ETag and body of previous responses, and chains by (symbol, expiration, filters)
+        self._validators: 'OrderedDict[Hashable, Tuple[str, Any]]' = OrderedDict()
+        self._chains: 'OrderedDict[Hashable, Tuple[str, OptionChain]]' = OrderedDict()
+        
+        # Stats
+        self.requests = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.batched_quotes = 0
+        self.not_modified = 0
+        self.chains_not_modified = 0
+
+    async def close(self):
+        """Close the connection pool"""
+        if self._batch_timer:
+            self._batch_timer.cancel()
+        for task in self._batches:
+            task.cancel()
+        await asyncio.gather(*self._batches, return_exceptions=True)
+        await self.client.aclose()
+
+    # ==================== Local Cache ====================
+
+    def _cache_get(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] < time.monotonic():
+            del self._cache[key]
+            return False, None
+        self.cache_hits += 1
+        self._record_cache(key[0], 'hit')
+        return True, entry[1]
+    
+    def _record_cache(self, namespace: str, result: str):
+        metrics.MARKET_DATA_CACHE.labels(namespace, result).inc()
+        tracing.record_cache(namespace, result)
+
+    def _cache_set(self, key: Hashable, value: Any, ttl: float):
+        if value is not None and ttl > 0:
+            self._cache[key] = (time.monotonic() + ttl, value)
+
+    def invalidate(self):
+        """Drop all locally cached responses"""
+        self._cache.clear()
+        self._validators.clear()
+        self._chains.clear()
+    
+    @staticmethod
+    def _remember(entries: OrderedDict, key: Hashable, value: Any, limit: int):
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > limit:
+            entries.popitem(last=False)
+
+    async def _single_flight(self, key: Hashable, ttl: float,
+                             fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Serve key from the local cache or one shared in-flight fetch"""
+        hit, value = self._cache_get(key)
+        if hit:
+            return value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            self._record_cache(key[0], 'coalesced')
+            return await asyncio.shield(future)
+
+        self._record_cache(key[0], 'miss')
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+            self._cache_set(key, value, ttl)
+            future.set_result(value)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody else awaited isn't logged as unhandled
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        return value
+
+    # ==================== Requests ====================
+
+    async def get_json(self, path: str, params: Optional[Dict] = None) -> Optional[Any]:
+        """
+        GET a JSON resource, returning None on any error
+        
+        The request carries the ETag of the last response for the same path
+        and parameters; on a 304 that response's data is returned.
+        """
+        self.requests += 1
+        resource = metrics.market_data_resource(path)
+        start = time.perf_counter()
+        status = 'error'
+        key = (path, tuple(sorted((params or {}).items())))
+        with tracing.tracer.start_as_current_span(
+            f"GET {resource}", kind=SpanKind.CLIENT, attributes={'http.method': 'GET', 'http.target': path}
+        ) as span:
+            try:
+                headers = tracing.trace_headers()
+                validator = self._validators.get(key)
+                if validator:
+                    headers['If-None-Match'] = validator[0]
+                response = await self.client.get(path, params=params, headers=headers)
+                status = str(response.status_code)
+                span.set_attribute('http.status_code', response.status_code)
+                if response.status_code == 304 and validator:
+                    self.not_modified += 1
+                    self._validators.move_to_end(key)
+                    return validator[1]
+                if response.status_code == 200:
+                    data = orjson.loads(response.content)
+                    etag = response.headers.get('etag')
+                    if etag:
+                        self._remember(self._validators, key, (etag, data), MAX_VALIDATORS)
+                    return data
+                logger.warning(f"Market data request {path} failed: {response.status_code}")
+                span.set_status(Status(StatusCode.ERROR))
+                return None
+            except Exception as e:
+                logger.error(f"Error requesting {path}: {e}")
+                span.record_exception(e)
+                span.set_status(Status(StatusCode.ERROR))
+                return None
+            finally:
+                metrics.MARKET_DATA_REQUEST_DURATION.labels(resource, status).observe(time.perf_counter() - start)
+
+    async def stream_json_lines(self, path: str, params: Optional[Dict] = None,
+                                headers: Optional[Dict[str, str]] = None) -> AsyncIterator[Dict]:
+        """GET an NDJSON resource, yielding each object as its line arrives"""
+        self.requests += 1
+        resource = metrics.market_data_resource(path)
+        start = time.perf_counter()
+        status = 'error'
+        # Not made current: the consumer runs between yields, in its own spans
+        span = tracing.tracer.start_span(
+            f"GET {resource}", kind=SpanKind.CLIENT, attributes={'http.method': 'GET', 'http.target': path}
+        )
+        lines = 0
+        try:
+            async with self.client.stream('GET', path, params=params,
+                                          headers={**tracing.trace_headers(span), **(headers or {})}) as response:
+                status = str(response.status_code)
+                span.set_attribute('http.status_code', response.status_code)
+                if response.status_code != 200:
+                    logger.error(f"Market data stream {path} failed: {response.status_code}")
+                    span.set_status(Status(StatusCode.ERROR))
+                    return
+                async for line in response.aiter_lines():
+                    if line:
+                        lines += 1
+                        yield orjson.loads(line)
+        except Exception as e:
+            logger.error(f"Error streaming {path}: {e}")
+            span.record_exception(e)
+            span.set_status(Status(StatusCode.ERROR))
+        finally:
+            # Whole stream, until the last line was consumed
+            metrics.MARKET_DATA_REQUEST_DURATION.labels(resource, status).observe(time.perf_counter() - start)
+            span.set_attribute('stream.lines', lines)
+            span.end()
+
+    # ==================== Quotes ====================
+
+    async def get_quote(self, symbol: str) -> Optional[Quote]:
+        """Latest quote for symbol (batched with concurrent quote requests)"""
+        symbol = symbol.upper()
+        hit, quote = self._cache_get(('quote', symbol))
+        if hit:
+            return quote
+
+        future = self._pending_quotes.get(symbol) or self._inflight.get(('quote', symbol))
+        if future is not None:
+            self.coalesced += 1
+            self._record_cache('quote', 'coalesced')
+            return await asyncio.shield(future)
+        
+        self._record_cache('quote', 'miss')
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending_quotes[symbol] = future
+        if self._batch_timer is None:
+            self._batch_timer = loop.call_later(self.batch_window, self._flush_quotes)
+        return await asyncio.shield(future)
+
+    async def get_quotes(self, symbols: List[str]) -> Dict[str, Quote]:
+        """Quotes for several symbols; symbols without a quote are left out"""
+        quotes = await asyncio.gather(*(self.get_quote(symbol) for symbol in symbols))
+        return {symbol: quote for symbol, quote in zip(symbols, quotes) if quote is not None}
+
+    def _flush_quotes(self):
+        """Send the quote requests collected during the batch window"""
+        self._batch_timer = None
+        pending, self._pending_quotes = self._pending_quotes, {}
+
+        symbols = list(pending)
+        for start in range(0, len(symbols), MAX_QUOTE_BATCH):
+            batch = {symbol: pending[symbol] for symbol in symbols[start:start + MAX_QUOTE_BATCH]}
+            for symbol, future in batch.items():
+                self._inflight[('quote', symbol)] = future
+            task = asyncio.create_task(self._fetch_quote_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _fetch_quote_batch(self, batch: Dict[str, asyncio.Future]):
+        if len(batch) > 1:
+            self.batched_quotes += len(batch)
+
+        quotes: Dict[str, Quote] = {}
+        try:
+            data = await self.get_json(f"/api/quotes/{','.join(batch)}")
+            for item in (data or {}).get('Quotes') or []:
+                quote = Quote.from_json(item)
+                quotes[quote.symbol.upper()] = quote
+        except Exception as e:
+            # Nobody awaits this task: the waiters get None, as for a missing quote
+            logger.error(f"Error fetching quotes for {','.join(batch)}: {e}")
+        finally:
+            for symbol, future in batch.items():
+                self._inflight.pop(('quote', symbol), None)
+                quote = quotes.get(symbol)
+                self._cache_set(('quote', symbol), quote, QUOTE_CACHE_TTL)
+                if not future.done():
+                    future.set_result(quote)
+
+    # ==================== Bars ====================
+
+    async def get_bars(self, symbol: str, interval: str = '1', unit: str = 'Daily',
+                       bars_back: int = 20) -> Optional[BarSeries]:
+        """Historical bars, oldest first"""
+        path = f"/api/bars/{symbol.upper()}"
+        params = {'interval': interval, 'unit': unit, 'bars_back': bars_back}
+
+        async def fetch() -> Optional[BarSeries]:
+            data = await self.get_json(path, params)
+            if data is None:
+                return None
+            return BarSeries.from_json(data)
+
+        return await self._single_flight(('bars', path, interval, unit, bars_back), BARS_CACHE_TTL, fetch)
+
+    # ==================== Options ====================
+
+    async def get_expirations(self, symbol: str, min_dte: int = 0,
+                              max_dte: Optional[int] = None) -> List[Dict]:
+        """
+        Expirations within a DTE window, nearest first
+        
+        Each item has 'expiration', 'dte' and 'type', plus 'strikes',
+        'min_strike' and 'max_strike' once the service has fetched that chain.
+        """
+        path = f"/api/options/index/{symbol.upper()}"
+        params = {'min_dte': min_dte}
+        if max_dte is not None:
+            params['max_dte'] = max_dte
+        
+        async def fetch() -> List[Dict]:
+            data = await self.get_json(path, params)
+            return (data or {}).get('expirations') or []
+        
+        return await self._single_flight(('expirations', path, min_dte, max_dte), EXPIRATIONS_CACHE_TTL, fetch)
+    
+    async def stream_options_chains(self, symbols: List[str], min_dte: int, max_dte: int,
+                                    max_expirations: int = 3, include_quotes: bool = False,
+                                    **filters) -> AsyncIterator[Dict]:
+        """
+        Stream chains from the bulk NDJSON endpoint
+
+        Chain items are yielded with 'chain' parsed into an OptionChain and
+        quote items with 'quote' parsed into a Quote. Extra keyword arguments
+        are passed as chain filter parameters (option_type, moneyness,
+        min_strike_pct, fields, ...).
+        
+        The ETags of chains already received for these symbols and filters
+        are sent along; the service skips the body of any that haven't
+        changed and the chain received earlier is yielded instead.
+        """
+        params = {
+            'symbols': ','.join(symbols),
+            'min_dte': min_dte,
+            'max_dte': max_dte,
+            'max_expirations': max_expirations,
+            'include_quotes': str(include_quotes).lower(),
+            **{name: value for name, value in filters.items() if value is not None},
+        }
+        filters_key = tuple(sorted((name, value) for name, value in params.items()
+                                   if name not in ('symbols', 'min_dte', 'max_dte', 'max_expirations')))
+        requested = set(symbols)
+        known = {etag: chain for (symbol, _, key), (etag, chain) in self._chains.items()
+                 if symbol in requested and key == filters_key}
+        if len(known) > MAX_KNOWN_CHAINS:
+            # Most recently received last
+            known = dict(list(known.items())[-MAX_KNOWN_CHAINS:])
+        headers = {'If-None-Match': ', '.join(known)} if known else None
+        
+        async for item in self.stream_json_lines("/api/options/chains", params, headers):
+            if item.get('type') == 'chain':
+                chain_key = (item.get('symbol'), item.get('expiration'), filters_key)
+                if item.get('not_modified') and item.get('etag') in known:
+                    self.chains_not_modified += 1
+                    item['chain'] = known[item['etag']]
+                else:
+                    item['chain'] = OptionChain.from_json(item.get('chain'))
+                if item.get('etag'):
+                    self._remember(self._chains, chain_key, (item['etag'], item['chain']), MAX_CACHED_CHAINS)
+            elif item.get('type') == 'quote':
+                quotes = (item.get('quote') or {}).get('Quotes') or []
+                item['quote'] = Quote.from_json(quotes[0]) if quotes else None
+            yield item
+
+    def get_stats(self) -> Dict:
+        return {
+            "http2": self.http2,
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "batched_quotes": self.batched_quotes,
+            "cached_entries": len(self._cache),
+            "not_modified": self.not_modified,
+            "chains_not_modified": self.chains_not_modified,
+        }
@@ -0,0 +1,135 @@
+"""
+Typed market data results, parsed once when a response arrives
+
+Quotes are slotted dataclasses. Bars and option chains are stored as
+struct-of-arrays (one numpy column per field) so scanner loops and regime
+averages run over contiguous float arrays instead of per-row JSON dicts
+carrying dozens of unused keys.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def _float(value: Any) -> Optional[float]:
+    """TradeStation sends numbers as strings in some feeds"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _column(rows: List[Dict], field: str, default: float = np.nan) -> np.ndarray:
+    values = [_float(row.get(field)) for row in rows]
+    return np.array([default if v is None else v for v in values], dtype=np.float64)
+
+
+@dataclass(slots=True)
+class Quote:
+    """Latest quote for one symbol"""
+    symbol: str
+    last: Optional[float]
+    bid: Optional[float] = None
+    ask: Optional[float] = None
+    volume: Optional[float] = None
+    timestamp: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, data: Dict) -> 'Quote':
+        return cls(
+            symbol=data.get('Symbol', ''),
+            last=_float(data.get('Last')),
+            bid=_float(data.get('Bid')),
+            ask=_float(data.get('Ask')),
+            volume=_float(data.get('Volume')),
+            timestamp=data.get('TradeTime'),
+        )
+
+
+class BarSeries:
+    """OHLCV bars as columns, oldest first (missing values are NaN)"""
+    
+    __slots__ = ('timestamps', 'open', 'high', 'low', 'close', 'volume')
+    
+    def __init__(self, timestamps: List[Optional[str]], open: np.ndarray, high: np.ndarray,
+                 low: np.ndarray, close: np.ndarray, volume: np.ndarray):
+        self.timestamps = timestamps
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def from_json(cls, bars: List[Dict]) -> 'BarSeries':
+        return cls(
+            timestamps=[bar.get('TimeStamp') for bar in bars],
+            open=_column(bars, 'Open'),
+            high=_column(bars, 'High'),
+            low=_column(bars, 'Low'),
+            close=_column(bars, 'Close'),
+            volume=_column(bars, 'TotalVolume'),
+        )
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+
+class OptionSide:
+    """Puts or calls of one chain, sorted by strike (views into the chain's columns)"""
+    
+    __slots__ = ('strike', 'bid', 'ask')
+    
+    def __init__(self, strike: np.ndarray, bid: np.ndarray, ask: np.ndarray):
+        self.strike = strike
+        self.bid = bid
+        self.ask = ask
+    
+    def __len__(self) -> int:
+        return len(self.strike)
+
+
+class OptionChain:
+    """
+    One expiration's option quotes as columns, sorted by type then strike
+    
+    Only the fields the scanner reads are kept; missing bids and asks are 0
+    (the scanners treat a zero quote as untradeable).
+    """
+    
+    __slots__ = ('option_type', 'strike', 'bid', 'ask', '_sides')
+    
+    def __init__(self, option_type: np.ndarray, strike: np.ndarray, bid: np.ndarray, ask: np.ndarray):
+        self.option_type = option_type
+        self.strike = strike
+        self.bid = bid
+        self.ask = ask
+        self._sides: Dict[str, OptionSide] = {}
+    
+    @classmethod
+    def from_json(cls, data: Optional[Dict]) -> 'OptionChain':
+        rows = [row for row in (data or {}).get('OptionQuotes') or [] if _float(row.get('Strike')) is not None]
+        option_type = np.array([row.get('OptionType') or '' for row in rows], dtype='U1')
+        strike = _column(rows, 'Strike')
+        bid = _column(rows, 'Bid', default=0.0)
+        ask = _column(rows, 'Ask', default=0.0)
+        
+        order = np.lexsort((strike, option_type))
+        return cls(option_type[order], strike[order], bid[order], ask[order])
+    
+    def side(self, option_type: str) -> OptionSide:
+        """Contiguous slice of one option type ('P' or 'C')"""
+        side = self._sides.get(option_type)
+        if side is None:
+            start = int(np.searchsorted(self.option_type, option_type, side='left'))
+            end = int(np.searchsorted(self.option_type, option_type, side='right'))
+            side = OptionSide(self.strike[start:end], self.bid[start:end], self.ask[start:end])
+            self._sides[option_type] = side
+        return side
+    
+    def __len__(self) -> int:
+        return len(self.strike)
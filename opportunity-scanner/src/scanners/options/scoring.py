@@ -0,0 +1,175 @@
+"""
+Spread scoring weights and scan profiles
+
+A spread's score is a weighted sum of its estimated probability of profit,
+its risk/reward ratio and its net credit. A ScoringProfile names a set of
+weights and, optionally, the scan filters they were tuned with (the
+backtest optimizer writes its Pareto-optimal configurations as profiles).
+
+Profile files are JSON, either a single profile or several:
+
+    {"active": "balanced",
+     "profiles": [{"name": "balanced",
+                   "weights": {"probability": 5, "risk_reward": 2, "credit": 0.1},
+                   "scan": {"spread_width": 5, "min_dte": 20, "max_dte": 45,
+                            "min_credit": 0.25, "top_n": 10, "max_expirations": 3},
+                   "backtest": {...}}]}
+
+ProfileLoader re-reads the file when it changes, so a new profile is picked
+up by the next scan without a restart.
+"""
+
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Scan filters a profile may set
+SCAN_FIELDS = ('spread_width', 'min_dte', 'max_dte', 'min_credit', 'top_n', 'max_expirations')
+
+
+@dataclass(frozen=True)
+class ScoringWeights:
+    """score = probability * probability weight + risk_reward * ... + net_credit * ..."""
+    probability: float = 5.0
+    risk_reward: float = 2.0
+    credit: float = 0.1
+
+
+DEFAULT_WEIGHTS = ScoringWeights()
+
+
+@dataclass(frozen=True)
+class ScoringProfile:
+    """Named scoring weights, with the scan filters they go with"""
+    name: str = 'default'
+    weights: ScoringWeights = DEFAULT_WEIGHTS
+    # Filters applied when a scan request doesn't set them (spread_width, min_dte, ...)
+    scan: Dict = field(default_factory=dict)
+    # How the profile did in the backtest it came from, for reference
+    backtest: Optional[Dict] = None
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ScoringProfile':
+        weights = data.get('weights') or {}
+        unknown = set(weights) - {'probability', 'risk_reward', 'credit'}
+        if unknown:
+            raise ValueError(f"unknown scoring weights: {', '.join(sorted(unknown))}")
+        scan = data.get('scan') or {}
+        unknown = set(scan) - set(SCAN_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown scan filters: {', '.join(sorted(unknown))}")
+        return cls(
+            name=str(data.get('name') or 'default'),
+            weights=ScoringWeights(**{key: float(value) for key, value in weights.items()}),
+            scan=dict(scan),
+            backtest=data.get('backtest'),
+        )
+    
+    def to_dict(self) -> Dict:
+        data = {'name': self.name, 'weights': asdict(self.weights), 'scan': dict(self.scan)}
+        if self.backtest is not None:
+            data['backtest'] = self.backtest
+        return data
+    
+    def resolve(self, params: Dict, defaults: Dict) -> Dict:
+        """Scan filters: the request's own, else the profile's, else defaults"""
+        return {key: params[key] if params.get(key) is not None else self.scan.get(key, defaults.get(key))
+                for key in set(defaults) | set(params)}
+
+
+DEFAULT_PROFILE = ScoringProfile()
+
+
+def parse_profiles(data: Dict) -> Dict:
+    """{'active': name, 'profiles': {name: ScoringProfile}} from a profile file's JSON"""
+    items = data.get('profiles') if isinstance(data, dict) and 'profiles' in data else [data]
+    profiles = {}
+    for item in items:
+        profile = ScoringProfile.from_dict(item)
+        profiles[profile.name] = profile
+    if not profiles:
+        raise ValueError("no profiles")
+    active = data.get('active') if isinstance(data, dict) else None
+    if active is not None and active not in profiles:
+        raise ValueError(f"active profile {active!r} is not defined")
+    return {'active': active or next(iter(profiles)), 'profiles': profiles}
+
+
+def write_profiles(path: str, profiles: List[ScoringProfile], active: Optional[str] = None):
+    """Write a profile file (replaced atomically, so a loader never reads half of it)"""
+    data = {'active': active or profiles[0].name, 'profiles': [profile.to_dict() for profile in profiles]}
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+class ProfileLoader:
+    """Profiles from a JSON file, re-read whenever the file changes"""
+    
+    def __init__(self, path: Optional[str] = None, active: Optional[str] = None):
+        """
+        Args:
+            path: Profile file (None: only the default profile)
+            active: Profile used when a scan names none (default: the file's 'active')
+        """
+        self.path = path
+        self.active_override = active
+        self.active = DEFAULT_PROFILE.name
+        self.profiles: Dict[str, ScoringProfile] = {DEFAULT_PROFILE.name: DEFAULT_PROFILE}
+        self._mtime: Optional[int] = None
+        self._missing = False
+        self.loads = 0
+        self.errors = 0
+        self._refresh()
+    
+    def _refresh(self):
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            if not self._missing:
+                # Logged once until the file is back
+                logger.error(f"Scan profile file unavailable, keeping current profiles: {e}")
+                self.errors += 1
+                self._missing = True
+            return
+        self._missing = False
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        try:
+            with open(self.path) as f:
+                parsed = parse_profiles(json.load(f))
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"Invalid scan profile file {self.path}, keeping current profiles: {e}")
+            self.errors += 1
+            return
+        active = self.active_override or parsed['active']
+        if active not in parsed['profiles']:
+            logger.error(f"Scan profile {active!r} not in {self.path}; using {parsed['active']!r}")
+            active = parsed['active']
+        self.profiles = {DEFAULT_PROFILE.name: DEFAULT_PROFILE, **parsed['profiles']}
+        self.active = active
+        self.loads += 1
+        logger.info(f"Loaded {len(parsed['profiles'])} scan profile(s) from {self.path} (active: {active})")
+    
+    def get(self, name: Optional[str] = None) -> ScoringProfile:
+        """A profile by name, or the active one; raises KeyError for unknown names"""
+        self._refresh()
+        return self.profiles[name or self.active]
+    
+    def get_stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "active": self.active,
+            "profiles": sorted(self.profiles),
+            "loads": self.loads,
+            "errors": self.errors,
+        }
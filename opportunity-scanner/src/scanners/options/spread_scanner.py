@@ -5,66 +5,208 @@ Scans options chains for profitable spread opportunities.
 Focus on safety-first: vertical spreads (put credit spreads, call credit spreads)
 """
 
-import httpx
 import logging
-from typing import List, Dict, Optional, Tuple
-from datetime import datetime, timedelta
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, List, Dict, Optional, Tuple
 import asyncio
+import time
+
+import numpy as np
+
+from ...compute import ChainTask, ComputePool
+from ...market_data import MarketDataClient, OptionChain, OptionSide
+from ...utils import metrics, tracing
+from .scoring import DEFAULT_WEIGHTS, ScoringWeights
 
 logger = logging.getLogger(__name__)
 
+# Option fields the spread enumeration reads
+CHAIN_FIELDS = ('OptionType', 'Strike', 'Bid', 'Ask')
+
+# progress(event, data) callback for scan_symbols
+ProgressCallback = Callable[[str, Dict], None]
+
+
+def credit_spreads(side: OptionSide, current_price: float, spread_width: float,
+                   min_credit: float, below_spot: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vertical credit spreads of one width over a chain side, vectorized
+    
+    The short leg must be OTM (below spot for puts, above for calls), the
+    long leg exactly spread_width further OTM, the short bid and long ask
+    non-zero, and the mid-price credit at least min_credit.
+    
+    Returns (short_strike, long_strike, short_premium, long_premium) arrays.
+    """
+    strikes = side.strike
+    count = len(strikes)
+    if count == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return empty, empty, empty, empty
+    
+    long_strikes = strikes - spread_width if below_spot else strikes + spread_width
+    long_index = np.searchsorted(strikes, long_strikes)
+    long_found = long_index < count
+    long_index = np.minimum(long_index, count - 1)
+    
+    otm = strikes < current_price if below_spot else strikes > current_price
+    mids = (side.bid + side.ask) / 2
+    long_mids = mids[long_index]
+    
+    valid = (otm & long_found & (strikes[long_index] == long_strikes)
+             & (side.bid != 0) & (side.ask[long_index] != 0)
+             & (mids - long_mids >= min_credit))
+    
+    return strikes[valid], long_strikes[valid], mids[valid], long_mids[valid]
+
+
+def spread_metrics(short_strike, long_strike, short_premium, long_premium,
+                   current_price, spread_type: str,
+                   weights: ScoringWeights = DEFAULT_WEIGHTS) -> Dict[str, np.ndarray]:
+    """
+    Metrics of vertical credit spreads, unrounded
+    
+    Arguments are scalars or numpy arrays (broadcast together), so one call
+    scores every candidate of a chain, or of many chains in a backtest.
+    spread_type is 'put_credit' or 'call_credit'.
+    """
+    short_strike = np.asarray(short_strike, dtype=np.float64)
+    long_strike = np.asarray(long_strike, dtype=np.float64)
+    net_credit = np.asarray(short_premium, dtype=np.float64) - long_premium
+    max_profit = net_credit * 100  # Per contract
+    spread_width = np.abs(short_strike - long_strike)
+    max_loss = (spread_width - net_credit) * 100
+    
+    # Calculate probability of profit (simplified)
+    if spread_type == 'put_credit':
+        # Profit if stock stays above short strike
+        distance_to_short = (current_price - short_strike) / current_price
+    else:  # call_credit
+        # Profit if stock stays below short strike
+        distance_to_short = (short_strike - current_price) / current_price
+    # Simple estimate: assume ~68% of moves within 1 std dev
+    # This is very simplified - real implementation would use IV
+    probability = np.minimum(0.95, np.maximum(0.50, 0.50 + (distance_to_short * 10)))
+    
+    # Risk/reward ratio
+    risk_reward = np.divide(max_profit, max_loss, out=np.zeros_like(max_profit), where=max_loss > 0)
+    
+    # Score: higher is better
+    # Favor high probability, good risk/reward, and decent premium (by default)
+    score = (probability * weights.probability) + (risk_reward * weights.risk_reward) + (net_credit * weights.credit)
+    
+    return {
+        'net_credit': net_credit,
+        'max_profit': max_profit,
+        'max_loss': max_loss,
+        'spread_width': spread_width,
+        'probability': probability,
+        'risk_reward': risk_reward,
+        'score': score,
+    }
+
+
+class ScanProgress:
+    """
+    Per-symbol progress of a streaming scan
+    
+    Reports a 'chain' event as each chain is evaluated (or fails) and a
+    'symbol' event once all of a symbol's chains are done. The number of
+    chains per symbol comes from the stream's 'expirations' items; symbols
+    without one are reported when the scan finishes.
+    """
+    
+    def __init__(self, symbols: List[str], callback: Optional[ProgressCallback]):
+        self.callback = callback
+        self.symbols = {
+            symbol: {'expected': None, 'chains': 0, 'errors': 0, 'opportunities': 0, 'done': False}
+            for symbol in symbols
+        }
+    
+    def _report(self, event: str, data: Dict):
+        if self.callback:
+            try:
+                self.callback(event, data)
+            except Exception as e:
+                logger.error(f"Error reporting scan progress: {e}")
+    
+    def expected(self, symbol: str, chains: int):
+        self.symbols[symbol]['expected'] = chains
+        self._check_done(symbol)
+    
+    def chain_done(self, symbol: str, expiration: Optional[str], opportunities: int = 0,
+                   error: Optional[str] = None):
+        state = self.symbols[symbol]
+        state['chains'] += 1
+        state['opportunities'] += opportunities
+        if error:
+            state['errors'] += 1
+        self._report('chain', {'symbol': symbol, 'expiration': expiration,
+                               'opportunities': opportunities, 'error': error})
+        self._check_done(symbol)
+    
+    def symbol_failed(self, symbol: str, error: str):
+        self.symbols[symbol]['errors'] += 1
+        self.symbols[symbol]['expected'] = self.symbols[symbol]['chains']
+        self._check_done(symbol, error)
+    
+    def finish(self):
+        for symbol in self.symbols:
+            self._check_done(symbol, final=True)
+    
+    def _check_done(self, symbol: str, error: Optional[str] = None, final: bool = False):
+        state = self.symbols[symbol]
+        if state['done']:
+            return
+        if final or (state['expected'] is not None and state['chains'] >= state['expected']):
+            state['done'] = True
+            self._report('symbol', {'symbol': symbol, 'chains': state['chains'], 'errors': state['errors'],
+                                    'opportunities': state['opportunities'], 'error': error})
+
 class OptionsSpreadScanner:
     """Scanner for options spread opportunities"""
     
-    def __init__(self, market_data_url: str = "http://10.32.3.27:8010"):
+    def __init__(self, market_data_url: str = "http://10.32.3.27:8010",
+                 market_data: Optional[MarketDataClient] = None,
+                 compute: Optional[ComputePool] = None):
+        """
+        Args:
+            market_data_url: Market data service URL (used if no client is given)
+            market_data: Shared market data client; the scanner closes only a client it created
+            compute: Process pool for spread evaluation (default: inline on the event loop)
+        """
         self.market_data_url = market_data_url
-        self.client = httpx.AsyncClient(timeout=30.0)
+        self._owns_client = market_data is None
+        self.market_data = market_data or MarketDataClient(market_data_url)
+        self.compute = compute
     
     async def close(self):
         """Close HTTP client"""
-        await self.client.close()
+        if self._owns_client:
+            await self.market_data.close()
     
-    async def _get_quote(self, symbol: str) -> Optional[Dict]:
-        """Get current quote from market data service"""
-        try:
-            response = await self.client.get(f"{self.market_data_url}/api/quotes/{symbol}")
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            logger.error(f"Error getting quote for {symbol}: {e}")
-            return None
-    
-    async def _get_options_chain(self, symbol: str, expiration: Optional[str] = None) -> Optional[Dict]:
-        """Get options chain from market data service"""
-        try:
-            url = f"{self.market_data_url}/api/options/chain/{symbol}"
-            params = {}
-            if expiration:
-                params['expiration'] = expiration
-            
-            response = await self.client.get(url, params=params)
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            logger.error(f"Error getting options chain for {symbol}: {e}")
-            return None
-    
-    async def _get_expirations(self, symbol: str) -> List[str]:
-        """Get available expiration dates"""
-        try:
-            response = await self.client.get(f"{self.market_data_url}/api/options/expirations/{symbol}")
-            if response.status_code == 200:
-                return response.json()
-            return []
-        except Exception as e:
-            logger.error(f"Error getting expirations for {symbol}: {e}")
-            return []
+    def _stream_chains(self, symbols: List[str], min_dte: int, max_dte: int,
+                       max_expirations: int = 3) -> AsyncIterator[Dict]:
+        """
+        Stream chains for several symbols in one request
+        
+        Uses the market data service's bulk endpoint, which resolves expirations
+        in the DTE window and fetches chains concurrently. Items are yielded as
+        they arrive.
+        
+        Only OTM options and the fields the scanner reads are requested; the
+        service filters its cached chains. Bids are not filtered server-side
+        because a long leg with a zero bid can still complete a spread.
+        """
+        return self.market_data.stream_options_chains(
+            symbols, min_dte, max_dte, max_expirations,
+            moneyness='otm', fields=','.join(CHAIN_FIELDS)
+        )
     
     def _calculate_spread_metrics(self, short_strike: float, long_strike: float,
                                   short_premium: float, long_premium: float,
-                                  current_price: float, spread_type: str) -> Dict:
+                                  current_price: float, spread_type: str,
+                                  weights: ScoringWeights = DEFAULT_WEIGHTS) -> Dict:
         """
         Calculate metrics for a vertical spread
         
@@ -75,40 +217,101 @@ class OptionsSpreadScanner:
             long_premium: Premium paid for long option
             current_price: Current stock price
             spread_type: 'put_credit' or 'call_credit'
+            weights: Scoring weights
         """
-        net_credit = short_premium - long_premium
-        max_profit = net_credit * 100  # Per contract
-        spread_width = abs(short_strike - long_strike)
-        max_loss = (spread_width - net_credit) * 100
+        metrics = spread_metrics(short_strike, long_strike, short_premium, long_premium,
+                                 current_price, spread_type, weights)
+        return {name: round(float(value), 2) for name, value in metrics.items()}
+    
+    def _find_credit_spreads(self, symbol: str, current_price: float,
+                             exp_str: str, dte: int, chain: OptionChain,
+                             min_credit: float, spread_width: float,
+                             spread_type: str, weights: ScoringWeights = DEFAULT_WEIGHTS) -> List[Dict]:
+        """Enumerate put_credit or call_credit spreads in one expiration's chain"""
+        side = chain.side('P' if spread_type == 'put_credit' else 'C')
+        short_strikes, long_strikes, short_premiums, long_premiums = credit_spreads(
+            side, current_price, spread_width, min_credit, below_spot=spread_type == 'put_credit'
+        )
+        if len(short_strikes) == 0:
+            return []
         
-        # Calculate probability of profit (simplified)
-        if spread_type == 'put_credit':
-            # Profit if stock stays above short strike
-            distance_to_short = (current_price - short_strike) / current_price
-            # Simple estimate: assume ~68% of moves within 1 std dev
-            # This is very simplified - real implementation would use IV
-            probability = min(0.95, max(0.50, 0.50 + (distance_to_short * 10)))
-        else:  # call_credit
-            # Profit if stock stays below short strike
-            distance_to_short = (short_strike - current_price) / current_price
-            probability = min(0.95, max(0.50, 0.50 + (distance_to_short * 10)))
+        metrics = spread_metrics(short_strikes, long_strikes, short_premiums, long_premiums,
+                                 current_price, spread_type, weights)
+        names = list(metrics)
+        rows = zip(*([round(value, 2) for value in values.tolist()] for values in metrics.values()))
         
-        # Risk/reward ratio
-        risk_reward = max_profit / max_loss if max_loss > 0 else 0
+        opportunities = []
+        for short_strike, long_strike, short_premium, long_premium, row in zip(
+                short_strikes.tolist(), long_strikes.tolist(), short_premiums.tolist(), long_premiums.tolist(), rows):
+            opportunity = {
+                'symbol': symbol,
+                'strategy': f'{spread_type}_spread',
+                'expiration': exp_str,
+                'dte': dte,
+                'current_price': round(current_price, 2),
+                'short_strike': short_strike,
+                'long_strike': long_strike,
+                'short_premium': round(short_premium, 2),
+                'long_premium': round(long_premium, 2),
+            }
+            opportunity.update(zip(names, row))
+            opportunities.append(opportunity)
         
-        # Score: higher is better
-        # Favor high probability, good risk/reward, and decent premium
-        score = (probability * 5) + (risk_reward * 2) + (net_credit * 0.1)
+        return opportunities
+    
+    def _find_put_credit_spreads(self, symbol: str, current_price: float,
+                                 exp_str: str, dte: int, chain: OptionChain,
+                                 min_credit: float, spread_width: float,
+                                 weights: ScoringWeights = DEFAULT_WEIGHTS) -> List[Dict]:
+        """Enumerate put credit spreads (sell higher strike put, buy lower strike put)"""
+        return self._find_credit_spreads(symbol, current_price, exp_str, dte, chain,
+                                         min_credit, spread_width, 'put_credit', weights)
+    
+    def _find_call_credit_spreads(self, symbol: str, current_price: float,
+                                  exp_str: str, dte: int, chain: OptionChain,
+                                  min_credit: float, spread_width: float,
+                                  weights: ScoringWeights = DEFAULT_WEIGHTS) -> List[Dict]:
+        """Enumerate call credit spreads (sell lower strike call, buy higher strike call)"""
+        return self._find_credit_spreads(symbol, current_price, exp_str, dte, chain,
+                                         min_credit, spread_width, 'call_credit', weights)
+    
+    def evaluate_chain(self, symbol: str, current_price: float, exp_str: str, dte: int,
+                       chain: OptionChain, min_credit: float, spread_width: float,
+                       strategies: Tuple[str, ...], top_n: Optional[int],
+                       weights: Optional[ScoringWeights] = None) -> Dict:
+        """
+        Ranked spreads of the requested strategies in one expiration's chain
         
-        return {
-            'net_credit': round(net_credit, 2),
-            'max_profit': round(max_profit, 2),
-            'max_loss': round(max_loss, 2),
-            'spread_width': round(spread_width, 2),
-            'probability': round(probability, 2),
-            'risk_reward': round(risk_reward, 2),
-            'score': round(score, 2)
-        }
+        Keeping a chain's top_n is enough for the scan's top_n over all chains;
+        total counts every spread found. weights defaults to DEFAULT_WEIGHTS.
+        """
+        weights = weights or DEFAULT_WEIGHTS
+        result = {'put_credit_spreads': [], 'call_credit_spreads': [], 'total': 0}
+        if 'put_credit_spread' in strategies:
+            result['put_credit_spreads'] = self._find_put_credit_spreads(
+                symbol, current_price, exp_str, dte, chain, min_credit, spread_width, weights
+            )
+        if 'call_credit_spread' in strategies:
+            result['call_credit_spreads'] = self._find_call_credit_spreads(
+                symbol, current_price, exp_str, dte, chain, min_credit, spread_width, weights
+            )
+        for key in ('put_credit_spreads', 'call_credit_spreads'):
+            spreads = result[key]
+            result['total'] += len(spreads)
+            spreads.sort(key=lambda x: x['score'], reverse=True)
+            result[key] = spreads[:top_n]
+        return result
+    
+    async def _evaluate(self, task: ChainTask) -> Dict:
+        """evaluate_chain in the compute pool, or inline without one"""
+        if self.compute:
+            return await self.compute.evaluate(task)
+        start = time.process_time()
+        result = self.evaluate_chain(task.symbol, task.current_price, task.expiration, task.dte,
+                                     task.chain, task.min_credit, task.spread_width,
+                                     task.strategies, task.top_n, task.weights)
+        result['seconds'] = time.process_time() - start
+        return result
     
     async def scan_put_credit_spreads(self, symbol: str, 
                                       min_dte: int = 20, 
@@ -130,100 +333,9 @@ class OptionsSpreadScanner:
         """
         logger.info(f"Scanning put credit spreads for {symbol}")
         
-        # Get current price
-        quote = await self._get_quote(symbol)
-        if not quote or 'Quotes' not in quote or len(quote['Quotes']) == 0:
-            logger.warning(f"No quote data for {symbol}")
-            return []
-        
-        current_price = quote['Quotes'][0]['Last']
-        
-        # Get expirations
-        expirations = await self._get_expirations(symbol)
-        if not expirations:
-            logger.warning(f"No expirations found for {symbol}")
-            return []
-        
-        # Filter expirations by DTE
-        today = datetime.now()
-        valid_expirations = []
-        for exp_str in expirations:
-            exp_date = datetime.strptime(exp_str, "%Y-%m-%d")
-            dte = (exp_date - today).days
-            if min_dte <= dte <= max_dte:
-                valid_expirations.append((exp_str, dte))
-        
-        if not valid_expirations:
-            logger.warning(f"No valid expirations in {min_dte}-{max_dte} DTE range")
-            return []
-        
-        opportunities = []
-        
-        # Scan each valid expiration
-        for exp_str, dte in valid_expirations[:3]:  # Limit to first 3 expirations
-            chain = await self._get_options_chain(symbol, exp_str)
-            if not chain or 'OptionQuotes' not in chain:
-                continue
-            
-            puts = [opt for opt in chain['OptionQuotes'] if opt['OptionType'] == 'P']
-            
-            # Sort by strike
-            puts.sort(key=lambda x: x['Strike'])
-            
-            # Look for put credit spread opportunities
-            for i, short_put in enumerate(puts):
-                short_strike = short_put['Strike']
-                
-                # Only consider OTM puts (strike below current price)
-                if short_strike >= current_price:
-                    continue
-                
-                # Find long put at spread_width below
-                long_strike = short_strike - spread_width
-                long_put = next((p for p in puts if p['Strike'] == long_strike), None)
-                
-                if not long_put:
-                    continue
-                
-                # Get mid prices (average of bid/ask)
-                short_bid = short_put.get('Bid', 0)
-                short_ask = short_put.get('Ask', 0)
-                long_bid = long_put.get('Bid', 0)
-                long_ask = long_put.get('Ask', 0)
-                
-                if short_bid == 0 or long_ask == 0:
-                    continue
-                
-                short_premium = (short_bid + short_ask) / 2
-                long_premium = (long_bid + long_ask) / 2
-                
-                net_credit = short_premium - long_premium
-                
-                if net_credit < min_credit:
-                    continue
-                
-                # Calculate metrics
-                metrics = self._calculate_spread_metrics(
-                    short_strike, long_strike,
-                    short_premium, long_premium,
-                    current_price, 'put_credit'
-                )
-                
-                opportunities.append({
-                    'symbol': symbol,
-                    'strategy': 'put_credit_spread',
-                    'expiration': exp_str,
-                    'dte': dte,
-                    'current_price': round(current_price, 2),
-                    'short_strike': short_strike,
-                    'long_strike': long_strike,
-                    'short_premium': round(short_premium, 2),
-                    'long_premium': round(long_premium, 2),
-                    **metrics
-                })
-        
-        # Sort by score
-        opportunities.sort(key=lambda x: x['score'], reverse=True)
+        results = await self.scan_symbols([symbol], min_dte, max_dte, min_credit, spread_width,
+                                          strategies=('put_credit_spread',), top_n=None)
+        opportunities = results[symbol]['put_credit_spreads']
         
         logger.info(f"Found {len(opportunities)} put credit spread opportunities for {symbol}")
         return opportunities
@@ -241,98 +353,168 @@ class OptionsSpreadScanner:
         """
         logger.info(f"Scanning call credit spreads for {symbol}")
         
-        quote = await self._get_quote(symbol)
-        if not quote or 'Quotes' not in quote or len(quote['Quotes']) == 0:
-            return []
+        results = await self.scan_symbols([symbol], min_dte, max_dte, min_credit, spread_width,
+                                          strategies=('call_credit_spread',), top_n=None)
+        opportunities = results[symbol]['call_credit_spreads']
         
-        current_price = quote['Quotes'][0]['Last']
+        logger.info(f"Found {len(opportunities)} call credit spread opportunities for {symbol}")
+        return opportunities
+    
+    @tracing.traced("scan_symbols")
+    async def scan_symbols(self, symbols: List[str],
+                           min_dte: int = 20,
+                           max_dte: int = 45,
+                           min_credit: float = 0.25,
+                           spread_width: float = 5.0,
+                           strategies: Tuple[str, ...] = ('put_credit_spread', 'call_credit_spread'),
+                           top_n: Optional[int] = 10,
+                           timings: Optional[Dict[str, float]] = None,
+                           progress: Optional[ProgressCallback] = None,
+                           max_expirations: int = 3,
+                           weights: ScoringWeights = DEFAULT_WEIGHTS) -> Dict[str, Dict]:
+        """
+        Scan several symbols for spread opportunities with one bulk request
         
-        expirations = await self._get_expirations(symbol)
-        if not expirations:
-            return []
+        Chains are evaluated as they stream in (in the compute pool when the
+        scanner has one), for the first max_expirations expirations in the
+        DTE window of each symbol. Spreads are scored with weights.
         
-        today = datetime.now()
-        valid_expirations = []
-        for exp_str in expirations:
-            exp_date = datetime.strptime(exp_str, "%Y-%m-%d")
-            dte = (exp_date - today).days
-            if min_dte <= dte <= max_dte:
-                valid_expirations.append((exp_str, dte))
+        Stage times (fetch, compute, rank) are added to timings when given;
+        otherwise they are recorded as a 'symbols' scan. progress, if given,
+        is called with ScanProgress events as chains and symbols complete.
+        Cancelling the scan cancels its pending chain evaluations.
         
-        if not valid_expirations:
-            return []
+        Returns {symbol: scan_symbol-style result}.
+        """
+        scan_start = time.perf_counter()
+        evaluations: List[Tuple[str, asyncio.Task]] = []
+        scan_progress = ScanProgress(symbols, progress)
+        results = {
+            symbol: {
+                'symbol': symbol,
+                'put_credit_spreads': [],
+                'call_credit_spreads': [],
+                'total_opportunities': 0
+            }
+            for symbol in symbols
+        }
         
-        opportunities = []
+        # Quotes come from the shared client (one batched request, often already
+        # cached by regime detection) while the chain stream is opening
+        quotes_task = asyncio.create_task(self.market_data.get_quotes(symbols))
+        prices: Optional[Dict[str, float]] = None
+        
+        async def last_prices() -> Dict[str, float]:
+            quotes = await quotes_task
+            return {sym: quote.last for sym, quote in quotes.items() if quote.last is not None}
+
+        async def evaluate(task: ChainTask) -> Dict:
+            try:
+                chain_result = await self._evaluate(task)
+            except Exception as e:
+                scan_progress.chain_done(task.symbol, task.expiration, error=str(e))
+                raise
+            scan_progress.chain_done(task.symbol, task.expiration, chain_result['total'])
+            return chain_result
         
-        for exp_str, dte in valid_expirations[:3]:
-            chain = await self._get_options_chain(symbol, exp_str)
-            if not chain or 'OptionQuotes' not in chain:
+        try:
+            async with aclosing(self._stream_chains(symbols, min_dte, max_dte, max_expirations)) as stream:
+                async for item in stream:
+                    symbol = item.get('symbol')
+                    if symbol not in results:
+                        continue
+                    
+                    if item['type'] == 'expirations':
+                        scan_progress.expected(symbol, len(item.get('expirations') or []))
+                        continue
+                    
+                    if prices is None:
+                        prices = await last_prices()
+                    
+                    if item['type'] == 'error':
+                        logger.warning(f"No data for {symbol} {item.get('expiration') or ''}: {item.get('detail')}")
+                        if item.get('expiration'):
+                            scan_progress.chain_done(symbol, item['expiration'], error=item.get('detail'))
+                        else:
+                            scan_progress.symbol_failed(symbol, item.get('detail') or 'error')
+                        continue
+                    
+                    if item['type'] != 'chain':
+                        continue
+                    
+                    current_price = prices.get(symbol)
+                    if current_price is None:
+                        scan_progress.chain_done(symbol, item['expiration'], error='No quote')
+                        continue
+                    
+                    task = ChainTask(symbol, current_price, item['expiration'], item['dte'], item['chain'],
+                                     min_credit, spread_width, strategies, top_n, weights)
+                    evaluations.append((symbol, asyncio.ensure_future(evaluate(task))))
+            
+            if prices is None:
+                prices = await last_prices()
+            
+            # Chains still being evaluated after the stream ended
+            fetch_end = time.perf_counter()
+            chain_results = await asyncio.gather(*(evaluation for _, evaluation in evaluations),
+                                                 return_exceptions=True)
+        except asyncio.CancelledError:
+            quotes_task.cancel()
+            for _, evaluation in evaluations:
+                evaluation.cancel()
+            raise
+            
+        scan_progress.finish()
+        compute = 0.0
+        for (symbol, _), chain_result in zip(evaluations, chain_results):
+            if isinstance(chain_result, BaseException):
+                logger.error(f"Error evaluating {symbol} chain: {chain_result}")
                 continue
+            result = results[symbol]
+            result['put_credit_spreads'].extend(chain_result['put_credit_spreads'])
+            result['call_credit_spreads'].extend(chain_result['call_credit_spreads'])
+            result['total_opportunities'] += chain_result['total']
+            compute += chain_result['seconds']
+        
+        rank_start = time.perf_counter()
+        for symbol, result in results.items():
+            if symbol not in prices:
+                logger.warning(f"No quote data for {symbol}")
+            
+            put_spreads = result['put_credit_spreads']
+            call_spreads = result['call_credit_spreads']
             
-            calls = [opt for opt in chain['OptionQuotes'] if opt['OptionType'] == 'C']
-            calls.sort(key=lambda x: x['Strike'])
+            # Sort by score
+            put_spreads.sort(key=lambda x: x['score'], reverse=True)
+            call_spreads.sort(key=lambda x: x['score'], reverse=True)
             
-            for i, short_call in enumerate(calls):
-                short_strike = short_call['Strike']
-                
-                # Only consider OTM calls (strike above current price)
-                if short_strike <= current_price:
-                    continue
-                
-                long_strike = short_strike + spread_width
-                long_call = next((c for c in calls if c['Strike'] == long_strike), None)
-                
-                if not long_call:
-                    continue
-                
-                short_bid = short_call.get('Bid', 0)
-                short_ask = short_call.get('Ask', 0)
-                long_bid = long_call.get('Bid', 0)
-                long_ask = long_call.get('Ask', 0)
-                
-                if short_bid == 0 or long_ask == 0:
-                    continue
-                
-                short_premium = (short_bid + short_ask) / 2
-                long_premium = (long_bid + long_ask) / 2
-                
-                net_credit = short_premium - long_premium
-                
-                if net_credit < min_credit:
-                    continue
-                
-                metrics = self._calculate_spread_metrics(
-                    short_strike, long_strike,
-                    short_premium, long_premium,
-                    current_price, 'call_credit'
-                )
-                
-                opportunities.append({
-                    'symbol': symbol,
-                    'strategy': 'call_credit_spread',
-                    'expiration': exp_str,
-                    'dte': dte,
-                    'current_price': round(current_price, 2),
-                    'short_strike': short_strike,
-                    'long_strike': long_strike,
-                    'short_premium': round(short_premium, 2),
-                    'long_premium': round(long_premium, 2),
-                    **metrics
-                })
+            result['put_credit_spreads'] = put_spreads[:top_n]
+            result['call_credit_spreads'] = call_spreads[:top_n]
         
-        opportunities.sort(key=lambda x: x['score'], reverse=True)
+        if not self.compute:
+            # Inline evaluation ran inside the stream loop
+            fetch_end -= compute
+        stages = {
+            'fetch': fetch_end - scan_start,
+            'compute': compute,
+            'rank': time.perf_counter() - rank_start,
+        }
+        if timings is None:
+            metrics.record_scan('symbols', time.perf_counter() - scan_start, stages)
+        else:
+            for name, seconds in stages.items():
+                timings[name] = timings.get(name, 0.0) + seconds
         
-        logger.info(f"Found {len(opportunities)} call credit spread opportunities for {symbol}")
-        return opportunities
+        return results
     
-    async def scan_symbol(self, symbol: str) -> Dict:
-        """Scan a symbol for all spread opportunities"""
-        put_spreads = await self.scan_put_credit_spreads(symbol)
-        call_spreads = await self.scan_call_credit_spreads(symbol)
-        
-        return {
-            'symbol': symbol,
-            'put_credit_spreads': put_spreads[:10],  # Top 10
-            'call_credit_spreads': call_spreads[:10],  # Top 10
-            'total_opportunities': len(put_spreads) + len(call_spreads)
-        }
+    async def scan_symbol(self, symbol: str,
+                          min_dte: int = 20,
+                          max_dte: int = 45,
+                          min_credit: float = 0.25,
+                          spread_width: float = 5.0,
+                          weights: ScoringWeights = DEFAULT_WEIGHTS,
+                          max_expirations: int = 3) -> Dict:
+        """Scan a symbol for all spread opportunities (top 10 of each)"""
+        results = await self.scan_symbols([symbol], min_dte, max_dte, min_credit, spread_width,
+                                          max_expirations=max_expirations, weights=weights)
+        return results[symbol]
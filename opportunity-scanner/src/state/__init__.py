@@ -0,0 +1,3 @@
+from .scan_state import MemoryScanState, RedisScanState, ScanSnapshot, create_scan_state
+
+__all__ = ['MemoryScanState', 'RedisScanState', 'ScanSnapshot', 'create_scan_state']
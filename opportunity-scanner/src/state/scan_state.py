@@ -0,0 +1,423 @@
+"""
+Scan state shared between API workers
+
+The latest regime and scan results are published as a versioned snapshot,
+and only one full scan runs at a time. With SCAN_STATE_REDIS_URL set the
+snapshot and the scan lock live in Redis, so any number of uvicorn workers
+(on any number of hosts) serve the same results and share one lock:
+
+    scanner:snapshot           JSON snapshot (version, regime, opportunities)
+    scanner:snapshot:version   version counter, checked before re-reading
+    scanner:scan_lock          lock held by the worker running a scan
+    scanner:jobs               ids of recent scan jobs, newest first
+    scanner:job:<id>           job record (status, progress)
+    scanner:job:<id>:results   job results
+    scanner:job:<id>:cancel    set to cancel a job running on another worker
+
+Each worker keeps the last snapshot it read and only fetches a new one
+when the version changes. Responses rendered from a snapshot are kept with
+it, so they are serialized once per version rather than once per request.
+The lock has a TTL and is extended while the scan runs, so a worker that
+dies mid-scan can't block scans for good.
+
+Without Redis (or if it is unreachable) state is kept in process, which is
+only correct with a single worker.
+"""
+
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, List, Optional
+
+import orjson
+import redis
+from redis.lock import Lock
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'scanner:snapshot'
+VERSION_KEY = 'scanner:snapshot:version'
+LOCK_KEY = 'scanner:scan_lock'
+JOBS_KEY = 'scanner:jobs'
+
+# Jobs kept (records expire after the TTL, the id list is capped)
+MAX_JOBS = 200
+
+# Rendered responses kept per snapshot (one per distinct query)
+MAX_RENDERED = 64
+JOB_TTL_SECONDS = int(os.getenv('SCAN_JOB_TTL_SECONDS', '86400'))
+
+
+# Writes a job record and, the first time, lists its id; the existence check
+# runs in Redis rather than as another round trip
+# KEYS: record, id list; ARGV: job id, record, TTL, MAX_JOBS
+SAVE_JOB_SCRIPT = """
+local new = redis.call('EXISTS', KEYS[1]) == 0
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+if new then
+    redis.call('LPUSH', KEYS[2], ARGV[1])
+    redis.call('LTRIM', KEYS[2], 0, tonumber(ARGV[4]) - 1)
+end
+return new and 1 or 0
+"""
+
+
+def job_key(job_id: str, suffix: str = '') -> str:
+    return f"scanner:job:{job_id}{suffix}"
+
+
+@dataclass
+class ScanSnapshot:
+    """Latest published scan state"""
+    version: int = 0
+    regime: Optional[Dict] = None
+    opportunities: Optional[Dict] = None
+    updated_at: Optional[float] = None
+    _rendered: Dict[Hashable, bytes] = field(default_factory=dict, repr=False, compare=False)
+
+    def to_json(self) -> bytes:
+        return orjson.dumps({
+            'version': self.version,
+            'regime': self.regime,
+            'opportunities': self.opportunities,
+            'updated_at': self.updated_at,
+        }, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    @classmethod
+    def from_json(cls, data: str) -> 'ScanSnapshot':
+        return cls(**orjson.loads(data))
+    
+    def render(self, key: Hashable, build: Callable[[], Dict]) -> bytes:
+        """
+        JSON of build()'s view of this snapshot, serialized on first use
+        
+        A published snapshot never changes, so the bytes are reused for every
+        request with the same key until a new version replaces it.
+        """
+        body = self._rendered.get(key)
+        if body is None:
+            if len(self._rendered) >= MAX_RENDERED:
+                self._rendered.clear()
+            body = self._rendered[key] = orjson.dumps(build(), option=orjson.OPT_SERIALIZE_NUMPY)
+        return body
+
+
+def _scan_owner() -> str:
+    """Lock token identifying the worker running the scan"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class MemoryScanState:
+    """In-process scan state (single worker)"""
+
+    backend = 'memory'
+
+    def __init__(self):
+        self._snapshot = ScanSnapshot()
+        self._owner: Optional[str] = None
+        self._lock_expires: float = 0.0
+        self._jobs: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._job_results: Dict[str, Dict] = {}
+        self._cancels: set = set()
+
+    def try_acquire_scan(self, ttl_seconds: float) -> Optional[str]:
+        """Take the scan lock, returning its token, or None if a scan is running"""
+        if self.scan_owner():
+            return None
+        self._owner = _scan_owner()
+        self._lock_expires = time.monotonic() + ttl_seconds
+        return self._owner
+
+    def extend_scan(self, token: str, ttl_seconds: float) -> bool:
+        if self._owner != token:
+            return False
+        self._lock_expires = time.monotonic() + ttl_seconds
+        return True
+
+    def release_scan(self, token: str):
+        if self._owner == token:
+            self._owner = None
+
+    def scan_owner(self) -> Optional[str]:
+        """Token of the running scan, if any"""
+        if self._owner and time.monotonic() >= self._lock_expires:
+            self._owner = None
+        return self._owner
+
+    def publish(self, regime: Optional[Dict] = None, opportunities: Optional[Dict] = None) -> int:
+        """Publish a new snapshot; arguments left as None keep their current value"""
+        current = self._snapshot
+        self._snapshot = ScanSnapshot(
+            version=current.version + 1,
+            regime=regime if regime is not None else current.regime,
+            opportunities=opportunities if opportunities is not None else current.opportunities,
+            updated_at=time.time(),
+        )
+        return self._snapshot.version
+
+    def snapshot(self) -> ScanSnapshot:
+        return self._snapshot
+    
+    # ==================== Jobs ====================
+    
+    def save_job(self, job: Dict, results: Optional[Dict] = None) -> bool:
+        """Store a job record (and its results once it has them)"""
+        self._jobs[job['id']] = job
+        self._jobs.move_to_end(job['id'])
+        if results is not None:
+            self._job_results[job['id']] = results
+        while len(self._jobs) > MAX_JOBS:
+            old_id, _ = self._jobs.popitem(last=False)
+            self._job_results.pop(old_id, None)
+            self._cancels.discard(old_id)
+        return True
+    
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        return self._jobs.get(job_id)
+    
+    def get_job_results(self, job_id: str) -> Optional[Dict]:
+        return self._job_results.get(job_id)
+    
+    def recent_jobs(self, limit: int = 20) -> List[Dict]:
+        """Newest first"""
+        return list(reversed(self._jobs.values()))[:limit]
+    
+    def request_cancel(self, job_id: str):
+        self._cancels.add(job_id)
+    
+    def cancel_requested(self, job_id: str) -> bool:
+        return job_id in self._cancels
+
+    def get_stats(self) -> Dict:
+        return {
+            "backend": self.backend,
+            "version": self._snapshot.version,
+            "scan_owner": self.scan_owner(),
+        }
+
+    def close(self):
+        pass
+
+
+class RedisScanState(MemoryScanState):
+    """Scan state in Redis, falling back to process memory when Redis fails"""
+
+    backend = 'redis'
+
+    def __init__(self, url: str, refresh_interval: float = 0.5):
+        super().__init__()
+        self.refresh_interval = refresh_interval
+        self._cached = ScanSnapshot()
+        self._checked_at = 0.0
+        self._locks: Dict[str, Lock] = {}
+        self.fallbacks = 0
+        try:
+            self.redis = redis.Redis.from_url(url, decode_responses=True, socket_connect_timeout=5,
+                                              socket_timeout=5)
+            self.redis.ping()
+            self._save_job = self.redis.register_script(SAVE_JOB_SCRIPT)
+            logger.info(f"Scan state in Redis at {url}")
+        except Exception as e:
+            logger.error(f"Failed to connect to Redis for scan state, keeping it in memory: {e}")
+            self.redis = None
+
+    def _fallback(self, action: str, error: Exception):
+        self.fallbacks += 1
+        logger.error(f"Redis scan state {action} failed, using local state: {error}")
+
+    def try_acquire_scan(self, ttl_seconds: float) -> Optional[str]:
+        if not self.redis:
+            return super().try_acquire_scan(ttl_seconds)
+
+        try:
+            token = _scan_owner()
+            lock = self.redis.lock(LOCK_KEY, timeout=ttl_seconds)
+            if not lock.acquire(blocking=False, token=token):
+                return None
+            self._locks[token] = lock
+            return token
+        except Exception as e:
+            self._fallback('lock', e)
+            return super().try_acquire_scan(ttl_seconds)
+
+    def extend_scan(self, token: str, ttl_seconds: float) -> bool:
+        lock = self._locks.get(token)
+        if lock is None:
+            return super().extend_scan(token, ttl_seconds)
+
+        try:
+            return lock.extend(ttl_seconds, replace_ttl=True)
+        except Exception as e:
+            logger.error(f"Error extending scan lock: {e}")
+            return False
+
+    def release_scan(self, token: str):
+        lock = self._locks.pop(token, None)
+        if lock is None:
+            super().release_scan(token)
+            return
+
+        try:
+            lock.release()
+        except Exception as e:
+            # Expired or taken over; the TTL cleans up either way
+            logger.warning(f"Error releasing scan lock: {e}")
+
+    def scan_owner(self) -> Optional[str]:
+        if not self.redis:
+            return super().scan_owner()
+
+        try:
+            return self.redis.get(LOCK_KEY) or super().scan_owner()
+        except Exception as e:
+            self._fallback('lock check', e)
+            return super().scan_owner()
+
+    def publish(self, regime: Optional[Dict] = None, opportunities: Optional[Dict] = None) -> int:
+        if not self.redis:
+            return super().publish(regime, opportunities)
+
+        try:
+            # Merge into the current snapshot, not the throttled cached one
+            self._checked_at = 0.0
+            current = self.snapshot()
+            snapshot = ScanSnapshot(
+                version=self.redis.incr(VERSION_KEY),
+                regime=regime if regime is not None else current.regime,
+                opportunities=opportunities if opportunities is not None else current.opportunities,
+                updated_at=time.time(),
+            )
+            # A reader that sees the new version before the snapshot lands keeps the
+            # old one (its version differs) and re-reads on the next check
+            self.redis.set(SNAPSHOT_KEY, snapshot.to_json())
+            self._cached, self._checked_at = snapshot, time.monotonic()
+            return snapshot.version
+        except Exception as e:
+            self._fallback('publish', e)
+            return super().publish(regime, opportunities)
+
+    def snapshot(self) -> ScanSnapshot:
+        """Latest snapshot, re-read from Redis only when its version has changed"""
+        if not self.redis:
+            return super().snapshot()
+
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_interval:
+            return self._newest()
+
+        try:
+            version = int(self.redis.get(VERSION_KEY) or 0)
+            if version != self._cached.version:
+                data = self.redis.get(SNAPSHOT_KEY)
+                if data:
+                    self._cached = ScanSnapshot.from_json(data)
+            self._checked_at = now
+        except Exception as e:
+            self._fallback('read', e)
+        return self._newest()
+
+    def _newest(self) -> ScanSnapshot:
+        """Snapshot from Redis unless a local fallback publish is more recent"""
+        local = super().snapshot()
+        return local if (local.updated_at or 0) > (self._cached.updated_at or 0) else self._cached
+
+    def save_job(self, job: Dict, results: Optional[Dict] = None) -> bool:
+        if not self.redis:
+            return super().save_job(job, results)
+        
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            self._save_job(keys=[job_key(job['id']), JOBS_KEY],
+                           args=[job['id'], orjson.dumps(job), JOB_TTL_SECONDS, MAX_JOBS], client=pipe)
+            if results is not None:
+                pipe.set(job_key(job['id'], ':results'), orjson.dumps(results, option=orjson.OPT_SERIALIZE_NUMPY), ex=JOB_TTL_SECONDS)
+            pipe.execute()
+            return True
+        except Exception as e:
+            self._fallback('job save', e)
+            return super().save_job(job, results)
+    
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        if not self.redis:
+            return super().get_job(job_id)
+        
+        try:
+            data = self.redis.get(job_key(job_id))
+            return orjson.loads(data) if data else super().get_job(job_id)
+        except Exception as e:
+            self._fallback('job read', e)
+            return super().get_job(job_id)
+    
+    def get_job_results(self, job_id: str) -> Optional[Dict]:
+        if not self.redis:
+            return super().get_job_results(job_id)
+        
+        try:
+            data = self.redis.get(job_key(job_id, ':results'))
+            return orjson.loads(data) if data else super().get_job_results(job_id)
+        except Exception as e:
+            self._fallback('job read', e)
+            return super().get_job_results(job_id)
+    
+    def recent_jobs(self, limit: int = 20) -> List[Dict]:
+        if not self.redis:
+            return super().recent_jobs(limit)
+        
+        try:
+            job_ids = self.redis.lrange(JOBS_KEY, 0, limit - 1)
+            if not job_ids:
+                return super().recent_jobs(limit)
+            records = self.redis.mget([job_key(job_id) for job_id in job_ids])
+            return [orjson.loads(data) for data in records if data]
+        except Exception as e:
+            self._fallback('job list', e)
+            return super().recent_jobs(limit)
+    
+    def request_cancel(self, job_id: str):
+        if not self.redis:
+            return super().request_cancel(job_id)
+        
+        try:
+            self.redis.set(job_key(job_id, ':cancel'), '1', ex=JOB_TTL_SECONDS)
+        except Exception as e:
+            self._fallback('job cancel', e)
+            super().request_cancel(job_id)
+    
+    def cancel_requested(self, job_id: str) -> bool:
+        if not self.redis:
+            return super().cancel_requested(job_id)
+        
+        try:
+            return bool(self.redis.exists(job_key(job_id, ':cancel'))) or super().cancel_requested(job_id)
+        except Exception as e:
+            self._fallback('job cancel check', e)
+            return super().cancel_requested(job_id)
+    
+    def get_stats(self) -> Dict:
+        stats = super().get_stats()
+        stats.update({
+            "backend": self.backend if self.redis else "memory (redis unavailable)",
+            "version": self.snapshot().version,
+            "fallbacks": self.fallbacks,
+        })
+        return stats
+
+    def close(self):
+        if self.redis:
+            self.redis.close()
+
+
+def create_scan_state() -> MemoryScanState:
+    """Redis-backed state if SCAN_STATE_REDIS_URL is set, else in-process state"""
+    url = os.getenv('SCAN_STATE_REDIS_URL')
+    if url:
+        return RedisScanState(url, float(os.getenv('SCAN_STATE_REFRESH_SECONDS', '0.5')))
+
+    workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+    if workers > 1:
+        logger.warning(f"{workers} workers without SCAN_STATE_REDIS_URL: each worker keeps its own scan results")
+    return MemoryScanState()
@@ -0,0 +1,114 @@
+"""
+Prometheus metrics for the opportunity scanner
+
+Exposed at /metrics. Scans are broken down into stages:
+    regime   regime detection (full scans only)
+    fetch    waiting on the market data service (chain stream and quotes)
+    compute  enumerating and scoring spreads
+    rank     sorting and trimming results
+
+With the compute pool, compute is the CPU time workers spent on the scan's
+chains and overlaps fetch, so stages no longer add up to the wall time.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory so /metrics aggregates every worker instead of whichever one
+answers the scrape.
+"""
+
+import os
+import time
+from typing import Dict
+
+from fastapi import FastAPI, Request, Response
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+HTTP_REQUEST_DURATION = Histogram(
+    'opportunity_scanner_http_request_duration_seconds',
+    'Time to produce a response',
+    ['method', 'route', 'status'],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    'opportunity_scanner_http_requests_in_flight',
+    'Requests currently being handled',
+    multiprocess_mode='livesum',
+)
+SCAN_DURATION = Histogram(
+    'opportunity_scanner_scan_duration_seconds',
+    'Wall time of a scan by kind (full, symbols)',
+    ['kind'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120),
+)
+SCAN_STAGE_DURATION = Histogram(
+    'opportunity_scanner_scan_stage_duration_seconds',
+    'Time spent per scan stage (regime, fetch, compute, rank)',
+    ['stage'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+COMPUTE_TASKS_PENDING = Gauge(
+    'opportunity_scanner_compute_tasks_pending',
+    'Chains queued or being evaluated by the compute pool',
+    multiprocess_mode='livesum',
+)
+SCANS_IN_PROGRESS = Gauge(
+    'opportunity_scanner_scans_in_progress',
+    'Scans currently running',
+    multiprocess_mode='livesum',
+)
+MARKET_DATA_REQUEST_DURATION = Histogram(
+    'opportunity_scanner_market_data_request_duration_seconds',
+    'Requests to the market data service by resource',
+    ['resource', 'status'],
+)
+MARKET_DATA_CACHE = Counter(
+    'opportunity_scanner_market_data_cache_total',
+    'Local market data client cache lookups by namespace and result (hit, coalesced, miss)',
+    ['namespace', 'result'],
+)
+
+
+# Market data paths that end in symbols
+SYMBOL_RESOURCES = ('/api/quotes/', '/api/bars/', '/api/options/index/')
+
+
+def market_data_resource(path: str) -> str:
+    """'/api/quotes/SPY,QQQ' -> '/api/quotes' (drops symbols to bound cardinality)"""
+    for prefix in SYMBOL_RESOURCES:
+        if path.startswith(prefix):
+            return prefix.rstrip('/')
+    return path
+
+
+def record_scan(kind: str, seconds: float, stages: Dict[str, float]):
+    """Record one scan's wall time and its per-stage totals"""
+    SCAN_DURATION.labels(kind).observe(seconds)
+    for name, stage_seconds in stages.items():
+        SCAN_STAGE_DURATION.labels(name).observe(stage_seconds)
+
+
+def instrument_app(app: FastAPI):
+    """Time every request by route template and track requests in flight"""
+
+    @app.middleware("http")
+    async def prometheus_middleware(request: Request, call_next):
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        status = '500'
+        try:
+            response = await call_next(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            route = request.scope.get('route')
+            HTTP_REQUEST_DURATION.labels(
+                request.method, getattr(route, 'path', 'unmatched'), status
+            ).observe(time.perf_counter() - start)
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+
+
+def metrics_response() -> Response:
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
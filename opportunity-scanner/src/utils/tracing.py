@@ -0,0 +1,88 @@
+"""
+OpenTelemetry tracing for the opportunity scanner
+
+A full scan is the root span; requests to the market data service carry
+its W3C trace context (traceparent header), and the service continues the
+trace down to TradeStation. Export is configured from the environment:
+
+    TRACING_FILE                 append finished spans to this file, one JSON object per line
+    OTEL_EXPORTER_OTLP_ENDPOINT  send spans to an OTLP/HTTP collector
+                                 (needs the optional opentelemetry-exporter-otlp package)
+
+With neither set no spans are recorded.
+"""
+
+import functools
+import logging
+import os
+from typing import Dict, Optional
+
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("opportunity-scanner")
+
+_provider: Optional[TracerProvider] = None
+
+
+def setup_tracing(service_name: str) -> bool:
+    """Install a tracer provider with the configured exporters; returns whether tracing is on"""
+    global _provider
+
+    file_path = os.getenv('TRACING_FILE')
+    otlp_endpoint = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT')
+    if _provider or not (file_path or otlp_endpoint):
+        return _provider is not None
+
+    provider = TracerProvider(resource=Resource.create({SERVICE_NAME: service_name}))
+    if file_path:
+        exporter = ConsoleSpanExporter(
+            out=open(file_path, 'a'),
+            formatter=lambda span: span.to_json(indent=None) + os.linesep,
+        )
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    if otlp_endpoint:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        except ImportError:
+            logger.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-exporter-otlp is not installed")
+
+    trace.set_tracer_provider(provider)
+    _provider = provider
+    logger.info(f"Tracing enabled (file: {file_path or '-'}, otlp: {otlp_endpoint or '-'})")
+    return True
+
+
+def shutdown_tracing():
+    """Flush spans still waiting to be exported"""
+    if _provider:
+        _provider.shutdown()
+
+
+def traced(name: str):
+    """Run an async function in its own span"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_headers(span: Optional[trace.Span] = None) -> Dict[str, str]:
+    """traceparent (and tracestate) headers for span, or the current span"""
+    headers: Dict[str, str] = {}
+    context = trace.set_span_in_context(span) if span is not None else None
+    propagate.inject(headers, context=context)
+    return headers
+
+
+def record_cache(namespace: str, result: str):
+    """Record a local cache lookup ('hit', 'coalesced', 'miss') as an event on the current span"""
+    trace.get_current_span().add_event('market_data.cache', {'cache.namespace': namespace, 'cache.result': result})